@@ -1,9 +1,18 @@
 """The victron_mqtt integration."""
 
 import logging
+from typing import cast
+
+import voluptuous as vol
 
 from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
-from homeassistant.core import Event, HomeAssistant, ServiceCall
+from homeassistant.core import (
+    Event,
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
 from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.exceptions import HomeAssistantError
@@ -11,19 +20,22 @@ import homeassistant.helpers.config_validation as cv
 
 
 from .const import (
+    ATTR_CLEAR,
     ATTR_DEVICE_ID,
     ATTR_METRIC_ID,
     ATTR_VALUE,
+    ATTR_WRITES,
     CONF_SIMPLE_NAMING,
     CONF_UPDATE_FREQUENCY_MODE,
     CONF_UPDATE_FREQUENCY_SECONDS,
     DEFAULT_UPDATE_FREQUENCY_SECONDS,
     DOMAIN,
+    SERVICE_DUMP_TRACE,
     SERVICE_PUBLISH,
     UPDATE_FREQUENCY_MODE_AUTO,
     UPDATE_FREQUENCY_MODE_MANUAL,
 )
-from .hub import Hub, VictronGxConfigEntry
+from .hub import Hub, VictronGxConfigEntry, discovery_store
 from ._vendor import VICTRON_MQTT_VERSION
 
 _LOGGER = logging.getLogger(__name__)
@@ -42,6 +54,24 @@ PLATFORMS: list[Platform] = [
     Platform.TIME,
 ]
 
+PUBLISH_WRITE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_METRIC_ID): cv.string,
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Required(ATTR_VALUE): object,
+    }
+)
+# metric_id and device_id are checked by the handler when writes is not given
+PUBLISH_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_METRIC_ID): cv.string,
+        vol.Optional(ATTR_DEVICE_ID): cv.string,
+        vol.Optional(ATTR_VALUE): object,
+        vol.Optional(ATTR_WRITES): vol.All(cv.ensure_list, [PUBLISH_WRITE_SCHEMA]),
+    }
+)
+
+
 async def async_setup_services(hass: HomeAssistant, entry: VictronGxConfigEntry) -> None:
     """Set up services for the Victron MQTT integration."""
 
@@ -49,8 +79,19 @@ async def async_setup_services(hass: HomeAssistant, entry: VictronGxConfigEntry)
     if hass.services.has_service(DOMAIN, SERVICE_PUBLISH):
         return
 
-    async def handle_publish(call: ServiceCall) -> None:
+    async def handle_publish(call: ServiceCall) -> ServiceResponse:
         """Handle the set_value service call."""
+        hub: Hub = entry.runtime_data
+        writes = call.data.get(ATTR_WRITES)
+        if writes:
+            # Without a response requested, a failed write fails the call
+            results = await hub.async_publish_many(
+                writes, raise_on_failure=not call.return_response
+            )
+            if not call.return_response:
+                return None
+            return cast(ServiceResponse, {"results": results})
+
         metric_id = call.data.get(ATTR_METRIC_ID)
         device_id = call.data.get(ATTR_DEVICE_ID)
         value = call.data.get(ATTR_VALUE)
@@ -60,15 +101,29 @@ async def async_setup_services(hass: HomeAssistant, entry: VictronGxConfigEntry)
         if not device_id:
             raise HomeAssistantError("device_id is required")
 
-        # Find the hub instance
-        hub: Hub = entry.runtime_data
         hub.publish(metric_id, device_id, value)
+        return None
 
     # Register the service
     hass.services.async_register(
         DOMAIN,
         SERVICE_PUBLISH,
         handle_publish,
+        schema=PUBLISH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_dump_trace(call: ServiceCall) -> ServiceResponse:
+        """Return the records of the elevated tracing."""
+        hub: Hub = entry.runtime_data
+        records = hub.dump_trace(clear=call.data.get(ATTR_CLEAR, False))
+        return cast(ServiceResponse, {"records": records})
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_DUMP_TRACE,
+        handle_dump_trace,
+        supports_response=SupportsResponse.ONLY,
     )
 
     _LOGGER.info("Victron MQTT services registered")
@@ -140,7 +195,9 @@ async def async_setup_entry(hass: HomeAssistant, entry: VictronGxConfigEntry) ->
     # Register the update listener
     async def _update_listener(hass: HomeAssistant, entry: VictronGxConfigEntry) -> None:
         _LOGGER.info("Options have been updated - applying changes")
-        # Reload the integration to apply changes
+        if hub.apply_config(entry.data):
+            return
+        # Reload the integration to apply changes the running hub cannot take
         await hass.config_entries.async_reload(entry.entry_id)
 
     entry.async_on_unload(entry.add_update_listener(_update_listener))
@@ -168,6 +225,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: VictronGxConfigEntry) -
     # Unregister services if this is the last entry
     if len(hass.config_entries.async_entries(DOMAIN)) == 1:
         hass.services.async_remove(DOMAIN, SERVICE_PUBLISH)
+        hass.services.async_remove(DOMAIN, SERVICE_DUMP_TRACE)
         _LOGGER.info("Victron MQTT services unregistered")
 
     await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
@@ -175,6 +233,12 @@ async def async_unload_entry(hass: HomeAssistant, entry: VictronGxConfigEntry) -
 
     return True
 
+
+async def async_remove_entry(hass: HomeAssistant, entry: VictronGxConfigEntry) -> None:
+    """Remove the discovery cache of a deleted config entry."""
+    await discovery_store(hass, entry.entry_id).async_remove()
+
+
 async def async_remove_config_entry_device(
     hass: HomeAssistant,
     config_entry: VictronGxConfigEntry,
@@ -51,18 +51,28 @@ from ._victron_enums import (
 from ._victron_products import ProductCapabilities, get_product_capabilities
 from .constants import (
     AUTO_UPDATE_INTERVALS,
+    DEFAULT_DEADBANDS,
+    HIGH_PRIORITY_METRIC_TYPES,
+    LOW_PRIORITY_METRIC_TYPES,
     UPDATE_FREQUENCY_AUTO,
     UPDATE_FREQUENCY_AUTO_POWER_NONE,
+    Deadband,
+    HistoryPolicy,
     MetricKind,
     MetricNature,
+    MetricPriority,
     MetricType,
     OperationMode,
     RangeType,
+    UpdateAggregation,
     VictronEnum,
 )
 from .data_classes import GpsLocation, ProductCapabilityRef
 from .device import Device
 from .formula_metric import FormulaMetric
+from .history import HistoryStats
+from .load_shedding import LoadSheddingStats
+from .memory import MemoryReport, MemoryUsage
 from .hub import (
     AuthenticationError,
     CannotConnectError,
@@ -75,9 +85,19 @@ from .hub import (
 from .metric import Metric
 from .pairing import PairingError, PairingToken, request_pairing_token
 from .writable_metric import WritableMetric
+from .write_scheduler import (
+    WriteConfirmationError,
+    WriteMismatchError,
+    WriteOutcome,
+    WriteStats,
+    WriteTimeoutError,
+)
 
 __all__ = [
     "AUTO_UPDATE_INTERVALS",
+    "DEFAULT_DEADBANDS",
+    "HIGH_PRIORITY_METRIC_TYPES",
+    "LOW_PRIORITY_METRIC_TYPES",
     "UPDATE_FREQUENCY_AUTO",
     "UPDATE_FREQUENCY_AUTO_POWER_NONE",
     "ACActiveInputSource",
@@ -96,6 +116,7 @@ __all__ = [
     "DESSRestrictions",
     "DESSStrategy",
     "DVCCMode",
+    "Deadband",
     "Device",
     "DeviceType",
     "DigitalInputInputState",
@@ -117,12 +138,18 @@ __all__ = [
     "GenericOnOff",
     "GenericOnOffInverted",
     "GpsLocation",
+    "HistoryPolicy",
+    "HistoryStats",
     "Hub",
     "InvalidInstallationIdError",
     "InverterMode",
+    "LoadSheddingStats",
+    "MemoryReport",
+    "MemoryUsage",
     "Metric",
     "MetricKind",
     "MetricNature",
+    "MetricPriority",
     "MetricType",
     "MppOperationMode",
     "NotConnectedError",
@@ -141,11 +168,17 @@ __all__ = [
     "TemperatureStatus",
     "TemperatureType",
     "TopicNotFoundError",
+    "UpdateAggregation",
     "VictronDeviceEnum",
     "VictronEnum",
     "VictronProductId",
     "VrmPortalMode",
     "WritableMetric",
+    "WriteConfirmationError",
+    "WriteMismatchError",
+    "WriteOutcome",
+    "WriteStats",
+    "WriteTimeoutError",
     "get_product_capabilities",
     "request_pairing_token",
 ]
@@ -3,9 +3,13 @@
 import json
 from collections.abc import Callable, Iterable
 from datetime import UTC, datetime
-from typing import Any
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
 
-from .constants import BITMASK_SEPARATOR, ValueType, VictronEnum
+from .constants import BITMASK_DECODE_CACHE_SIZE, BITMASK_SEPARATOR, ValueType, VictronEnum
+
+if TYPE_CHECKING:
+    from .data_classes import TopicDescriptor
 
 
 def unwrap_bool(json_str: str) -> bool | None:
@@ -106,13 +110,19 @@ def unwrap_bitmask(json_str: str, enum: type[VictronEnum]) -> str | None:
     try:
         data = json.loads(json_str)
         val = data["value"]
-        if val is None:
-            return None
-        vals = [2**idx for idx, bit in enumerate(bin(val)[:1:-1]) if int(bit)] if int(val) > 0 else [0]
     except (json.JSONDecodeError, KeyError, ValueError, TypeError):
         return None
-    enums = [enum.from_code(v) for v in vals]
-    return str.join(BITMASK_SEPARATOR, [e.string for e in enums if e is not None])
+    if not isinstance(val, int):
+        return None
+    return _decode_bitmask(enum, val)
+
+
+@lru_cache(maxsize=BITMASK_DECODE_CACHE_SIZE)
+def _decode_bitmask(enum: type[VictronEnum], value: int) -> str:
+    """Join the strings of the bits set in value, or the string of code 0 when none is."""
+    codes = [1 << bit for bit in range(value.bit_length()) if value >> bit & 1] if value > 0 else [0]
+    lookup = enum._lookup_by_code  # pylint: disable=protected-access
+    return BITMASK_SEPARATOR.join(member.string for member in map(lookup.get, codes) if member is not None)
 
 
 def unwrap_epoch(json_str: str) -> datetime | None:
@@ -225,3 +235,20 @@ VALUE_TYPE_WRAPPER: dict[ValueType, Callable[..., str]] = {
     ValueType.INT_SECONDS_TO_HOURS: wrap_int_hours_to_seconds,
     ValueType.INT_SECONDS_TO_MINUTES: wrap_int_minutes_to_seconds,
 }
+
+
+def unwrap_payload(topic_desc: "TopicDescriptor", payload: str) -> str | float | int | bool | VictronEnum | None:
+    """Unwrap the value of a payload of the topic described."""
+    assert topic_desc.value_type is not None
+    unwrapper = VALUE_TYPE_UNWRAPPER[topic_desc.value_type]
+    if unwrapper in [unwrap_enum, unwrap_bitmask]:
+        assert topic_desc.enum is not None, f"enum must be set for topic: {topic_desc.topic}"
+        return unwrapper(payload, topic_desc.enum)
+    if unwrapper in [
+        unwrap_float,
+        unwrap_int_seconds_to_hours,
+        unwrap_int_seconds_to_minutes,
+        unwrap_float_m3_to_liters,
+    ]:
+        return unwrapper(payload, topic_desc.precision)
+    return unwrapper(payload)
@@ -1,7 +1,7 @@
 """Constants for the victron venus OS client."""
 
 from dataclasses import dataclass
-from enum import Enum
+from enum import Enum, EnumType
 from typing import Final, Self
 
 TOPIC_INSTALLATION_ID = "N/+/system/0/Serial"
@@ -86,6 +86,136 @@ AUTO_UPDATE_INTERVALS: dict[str, dict[MetricType, int | None]] = {
 AUTO_UPDATE_INTERVAL_DEFAULT = 30
 
 
+class UpdateAggregation(Enum):
+    """Value notified for the samples of a measurement received during its update interval."""
+
+    LAST = "last"
+    MEAN = "mean"
+    MIN = "min"
+    MAX = "max"
+
+
+class MetricPriority(Enum):
+    """Delivery priority of the updates of a metric."""
+
+    # Alarms and critical state: never throttled, deadbanded or aggregated, and
+    # delivered ahead of the queued updates of all other metrics.
+    HIGH = "high"
+    NORMAL = "normal"
+    # First to be stretched by load shedding.
+    LOW = "low"
+
+
+@dataclass(frozen=True)
+class Deadband:
+    """Smallest change of a numeric metric that is worth notifying.
+
+    A change is held back while it stays below both thresholds, measured against
+    the last notified value: `absolute` in the metric unit and `relative` as a
+    fraction of the last notified value.
+    """
+
+    absolute: float = 0.0
+    relative: float = 0.0
+
+    def __post_init__(self) -> None:
+        if self.absolute < 0 or self.relative < 0:
+            raise ValueError("Deadband thresholds must not be negative")
+
+
+# Default deadbands for noisy measurements. Keys are metric types; the Hub also
+# accepts metric short ids (e.g. "battery_voltage") to override a single metric.
+DEFAULT_DEADBANDS: dict[MetricType, Deadband] = {
+    MetricType.POWER: Deadband(absolute=5, relative=0.01),
+    MetricType.APPARENT_POWER: Deadband(absolute=5, relative=0.01),
+    MetricType.CURRENT: Deadband(absolute=0.1, relative=0.01),
+    MetricType.VOLTAGE: Deadband(absolute=0.05),
+    MetricType.FREQUENCY: Deadband(absolute=0.05),
+    MetricType.POWER_FACTOR: Deadband(absolute=0.01),
+    MetricType.TEMPERATURE: Deadband(absolute=0.2),
+    MetricType.HUMIDITY: Deadband(absolute=0.5),
+    MetricType.IRRADIANCE: Deadband(absolute=5, relative=0.01),
+}
+# Longest time a change held back by a deadband waits before it is notified anyway.
+DEADBAND_MAX_SILENCE_SECONDS = 300
+
+
+@dataclass(frozen=True)
+class HistoryPolicy:
+    """How many recent samples of a numeric metric are kept in memory.
+
+    At most `max_samples` samples are kept, and with `max_age_seconds` only those
+    received within that many seconds are returned. The memory is allocated once,
+    16 bytes per sample.
+    """
+
+    max_samples: int = 120
+    max_age_seconds: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.max_samples < 1:
+            raise ValueError("History max_samples must be at least 1")
+        if self.max_age_seconds is not None and self.max_age_seconds <= 0:
+            raise ValueError("History max_age_seconds must be a positive number or None")
+
+# Load shedding: while the event loop lags or on_update callbacks pile up, the update
+# interval of low priority measurements is stretched by a growing factor, then
+# restored step by step once the pressure is gone.
+LOW_PRIORITY_METRIC_TYPES: Final = frozenset(
+    {
+        MetricType.VOLTAGE,
+        MetricType.TEMPERATURE,
+        MetricType.HUMIDITY,
+        MetricType.PRESSURE,
+        MetricType.FREQUENCY,
+        MetricType.POWER_FACTOR,
+        MetricType.PERCENTAGE,
+        MetricType.ELECTRIC_STORAGE_CAPACITY,
+        MetricType.LIQUID_VOLUME,
+        MetricType.IRRADIANCE,
+        MetricType.DURATION,
+    }
+)
+# Keepalives: dbus-flashmq stops forwarding values when no keepalive arrived for 60s. Hubs
+# send one every interval, give or take the jitter, which leaves margin for a full publish
+# slot wait. Full publishes of the hubs of a process take turns, each holding the slot
+# until it completed or for the slot length at most.
+KEEPALIVE_INTERVAL_SECONDS = 30
+KEEPALIVE_JITTER_SECONDS = 3
+FULL_PUBLISH_SLOT_SECONDS = 10
+FULL_PUBLISH_MAX_WAIT_SECONDS = 20
+
+# Once the first full publish completed, the new topics of a device are turned into metrics
+# once the device sent no other new topic for this long, without waiting for the next full publish.
+METRIC_SETTLE_SECONDS = 2.0
+
+# Shortest time between two writes to the same topic, e.g. while a slider is dragged.
+# Writes in between are coalesced, only the latest one is published.
+MIN_WRITE_INTERVAL_SECONDS = 0.5
+# Default time WritableMetric.set_and_confirm() waits for the N/ echo of a write
+WRITE_CONFIRM_TIMEOUT_SECONDS = 5.0
+# Records kept by the trace buffer of a hub, about 100 bytes each plus the payloads referenced
+TRACE_BUFFER_SIZE = 2048
+# Objects of a group deep sized by Hub.memory_report(), the size of the others is extrapolated
+MEMORY_REPORT_SAMPLE_SIZE = 64
+
+# Metric types whose updates are delivered in the high priority lane
+HIGH_PRIORITY_METRIC_TYPES: Final = frozenset({MetricType.PROBLEM, MetricType.LOW_BATTERY})
+# Queued normal and low priority on_update callbacks run per event loop iteration;
+# high priority callbacks scheduled meanwhile run before the next batch.
+NOTIFICATION_BATCH_SIZE = 100
+LOAD_PROBE_INTERVAL_SECONDS = 1.0
+LOAD_SHEDDING_LAG_HIGH_SECONDS = 0.25
+LOAD_SHEDDING_LAG_LOW_SECONDS = 0.05
+LOAD_SHEDDING_BACKLOG_HIGH = 2000
+LOAD_SHEDDING_BACKLOG_LOW = 200
+LOAD_SHEDDING_MAX_FACTOR = 16
+# Calm probes in a row before the stretch factor is halved
+LOAD_SHEDDING_RESTORE_PROBES = 10
+# Interval stretched for metrics that otherwise notify every change
+LOAD_SHEDDING_MIN_INTERVAL_SECONDS = 5
+
+
 class ValueType(Enum):
     """Value types."""
 
@@ -127,11 +257,27 @@ PLACEHOLDER_PHASE = "{phase}"
 PLACEHOLDER_NEXT_PHASE = "{next_phase}"
 
 BITMASK_SEPARATOR = ","
+# Distinct (enum, value) bitmask payloads whose decoded string is kept. Only a handful
+# of combinations occur on an installation, the bound only guards against a flood.
+BITMASK_DECODE_CACHE_SIZE = 256
+
+
+class _VictronEnumType(EnumType):
+    """Metaclass building the lookup tables of a Victron Enum once its members exist."""
 
+    def __new__(metacls, cls, bases, classdict, **kwds):
+        enum_class = super().__new__(metacls, cls, bases, classdict, **kwds)
+        enum_class._build_lookups()
+        return enum_class
 
-class VictronEnum(Enum):
+
+class VictronEnum(Enum, metaclass=_VictronEnumType):
     """Base class for Victron Enums with code and string representation."""
 
+    _lookup_by_code: dict[int | str, "VictronEnum"]
+    _lookup_by_string: dict[str, "VictronEnum"]
+    _lookup_by_id: dict[str, "VictronEnum"]
+
     def __init__(self, code: int | str, enum_id: str, string: str):
         self._value_ = (code, string)
         self.code = code
@@ -145,72 +291,73 @@ class VictronEnum(Enum):
         return self.string
 
     @classmethod
-    def _build_code_lookup(cls):
-        if not hasattr(cls, "_lookup_by_code"):
-            cls._lookup_by_code = {member.code: member for member in cls}
-        return cls._lookup_by_code
+    def _build_lookups(cls) -> None:
+        """Build the lookup tables, called once when the class is created."""
+        cls._lookup_by_code = {member.code: member for member in cls}
+        cls._lookup_by_string = {member.string: member for member in cls}
+        cls._lookup_by_id = {member.id: member for member in cls}
 
     @classmethod
     def from_code(cls: type[Self], value: int | str, default_value: "VictronEnum | None" = None) -> Self | None:
         """Get enum member from its code representation."""
-        lookup = cls._build_code_lookup()
-        result = lookup.get(value, default_value)
-        return result  # type: ignore[return-value]
-
-    @classmethod
-    def _build_string_lookup(cls):
-        if not hasattr(cls, "_lookup_by_string"):
-            cls._lookup_by_string = {member.string: member for member in cls}
-        return cls._lookup_by_string
+        return cls._lookup_by_code.get(value, default_value)  # type: ignore[return-value]
 
     @classmethod
     def from_string(cls: type[Self], value: str) -> Self:
         """Get enum member from its string representation."""
-        lookup = cls._build_string_lookup()
-        result = lookup.get(value)
+        result = cls._lookup_by_string.get(value)
         if result is None:
             raise ValueError(f"No enum member found with string={value}")
-        return result
-
-    @classmethod
-    def _build_id_lookup(cls):
-        if not hasattr(cls, "_lookup_by_id"):
-            cls._lookup_by_id = {member.id: member for member in cls}
-        return cls._lookup_by_id
+        return result  # type: ignore[return-value]
 
     @classmethod
     def from_id(cls: type[Self], value: str) -> Self:
         """Get enum member from its ID representation."""
-        lookup = cls._build_id_lookup()
-        result = lookup.get(value)
+        result = cls._lookup_by_id.get(value)
         if result is None:
             raise ValueError(f"No enum member found with id={value}")
-        return result
+        return result  # type: ignore[return-value]
 
     @classmethod
     def from_id_or_string(cls: type[Self], value: str) -> Self:
         """Get enum member from its ID or string representation."""
-        lookup = cls._build_id_lookup()
-        result = lookup.get(value)
+        result = cls._lookup_by_id.get(value)
         if result is not None:
-            return result
-        lookup = cls._build_string_lookup()
-        result = lookup.get(value)
+            return result  # type: ignore[return-value]
+        result = cls._lookup_by_string.get(value)
         if result is not None:
-            return result
+            return result  # type: ignore[return-value]
         raise ValueError(f"No enum member found with id or string={value}")
 
 
 class VictronDeviceEnum(VictronEnum):
     """Base class for Victron Enums that may map to other enum values."""
 
+    _lookup_by_mapped_code: dict[int | str, "VictronDeviceEnum"]
+
     def __init__(self, code: str, enum_id: str, string: str, mapped_to: str | None = None):
         super().__init__(code, enum_id, string)
         self.mapped_to = mapped_to
 
+    @classmethod
+    def _build_lookups(cls) -> None:
+        """Build the lookup tables, with the mappings already followed for the device codes."""
+        super()._build_lookups()
+        lookup = cls._lookup_by_code
+        cls._lookup_by_mapped_code = {}
+        for code, member in lookup.items():
+            assert isinstance(member, VictronDeviceEnum)
+            target = lookup.get(member.mapped_to) if member.mapped_to else member
+            if target is not None:
+                cls._lookup_by_mapped_code[code] = target  # type: ignore[assignment]
+
     @classmethod
     def from_code(cls: type[Self], value: int | str, default_value: "VictronEnum | None" = None) -> Self | None:
         """Get enum member from its device code representation, following mappings if necessary."""
+        result = cls._lookup_by_mapped_code.get(value)
+        if result is not None:
+            return result  # type: ignore[return-value]
+        # Unknown code, or a mapping to an unknown code: resolve the default value
         result = super().from_code(value, default_value)
         if result is None:
             return None
@@ -6,12 +6,27 @@ import logging
 import re
 from dataclasses import dataclass, field
 
-from ._victron_enums import DeviceType
-from .constants import MetricKind, MetricNature, MetricType, RangeType, ValueType, VictronEnum
+from ._victron_enums import DESSErrorCode, DeviceType, ErrorCode, GenericAlarmEnum, SolarChargerDeviceOffReason, State
+from .constants import (
+    HIGH_PRIORITY_METRIC_TYPES,
+    LOW_PRIORITY_METRIC_TYPES,
+    MetricKind,
+    MetricNature,
+    MetricPriority,
+    MetricType,
+    RangeType,
+    ValueType,
+    VictronEnum,
+)
 from .id_utils import replace_complex_id_to_simple
 
 _LOGGER = logging.getLogger(__name__)
 
+# Enums reporting alarms, errors or the operating state of a device, delivered in the high priority lane
+_HIGH_PRIORITY_ENUMS: frozenset[type[VictronEnum]] = frozenset(
+    {GenericAlarmEnum, ErrorCode, DESSErrorCode, State, SolarChargerDeviceOffReason}
+)
+
 
 @dataclass(frozen=True)
 class GpsLocation:
@@ -101,6 +116,7 @@ class TopicDescriptor:
     sub_device_key: str | None = (
         None  # When set, topics with this field create a separate sub-device per unique placeholder value (e.g., "output" creates sub-devices per output ID)
     )
+    priority: MetricPriority | None = None  # Delivery priority, derived from the metric type and enum when not set
 
     def __repr__(self) -> str:
         """Return a string representation of the topic."""
@@ -111,6 +127,13 @@ class TopicDescriptor:
             f"name={self.name})"
         )
 
+    def _default_priority(self) -> MetricPriority:
+        if self.metric_type in HIGH_PRIORITY_METRIC_TYPES or self.enum in _HIGH_PRIORITY_ENUMS:
+            return MetricPriority.HIGH
+        if self.message_type == MetricKind.SENSOR and self.metric_type in LOW_PRIORITY_METRIC_TYPES:
+            return MetricPriority.LOW
+        return MetricPriority.NORMAL
+
     def __post_init__(self):
         assert self.message_type == MetricKind.ATTRIBUTE or self.name is not None
         if self.message_type == MetricKind.DYNAMIC:
@@ -122,6 +145,9 @@ class TopicDescriptor:
             assert all(not isinstance(dep, TopicDependency) or dep.required for dep in self.depends_on), (
                 "Non-formula topics cannot have optional dependencies"
             )
+        # Derived before enum topics lose their metric type (e.g. PROBLEM) below
+        if self.priority is None:
+            self.priority = self._default_priority()
         if self.value_type == ValueType.ENUM:
             self.metric_type = MetricType.ENUM
         # Timestamp defaults
@@ -7,16 +7,7 @@ import logging
 from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
-from ._unwrappers import (
-    VALUE_TYPE_UNWRAPPER,
-    unwrap_bitmask,
-    unwrap_bool,
-    unwrap_enum,
-    unwrap_float,
-    unwrap_float_m3_to_liters,
-    unwrap_int_seconds_to_hours,
-    unwrap_int_seconds_to_minutes,
-)
+from ._unwrappers import unwrap_bool, unwrap_float, unwrap_payload
 from ._victron_enums import SwitchableOutputType
 from .constants import MetricKind, OperationMode, RangeType, VictronEnum
 from .data_classes import ParsedTopic, TopicDescriptor
@@ -37,6 +28,10 @@ _LOGGER = logging.getLogger(__name__)
 class Device:
     """Class to represent a Victron device."""
 
+    # Bumped whenever a device gains its first visible metric, loses its last one or gets
+    # another parent, which may change the parent_device of any device.
+    _topology_version = 0
+
     def __init__(
         self,
         unique_id: str,
@@ -49,6 +44,13 @@ class Device:
         self._descriptor = descriptor
         self._unique_id = unique_id
         self._metrics: dict[str, Metric] = {}
+        # Number of metrics whose descriptor is not hidden. The list metrics returns and the
+        # parent_device result are cached with the version they were computed for, so a cache
+        # filled on the event loop while the MQTT thread adds a metric is never taken as current.
+        self._visible_count = 0
+        self._metrics_version = 0
+        self._visible_metrics: tuple[int, list[Metric | WritableMetric]] = (-1, [])
+        self._effective_parent: tuple[int, Device | None] = (-1, None)
         self._device_type = parsed_topic.device_type
         self._device_id = parsed_topic.device_id
         self._installation_id = parsed_topic.installation_id
@@ -59,6 +61,12 @@ class Device:
         self._custom_name: str | None = None
         self._productid: int | None = None
         self._parent_device: Device | None = parent_device
+        # Last payload per attribute topic, so the structure can be exported and restored.
+        self._attribute_messages: dict[str, str] = {}
+        # Monotonic time of the last live message of the device, 0 until one arrives, and
+        # whether the hub considers it still publishing.
+        self._last_seen: float = 0
+        self._available = True
 
         _LOGGER.debug(
             "Device %s initialized (parent=%s)", self._unique_id, parent_device.unique_id if parent_device else None
@@ -86,7 +94,7 @@ class Device:
     ) -> None:
         """Set a device property from a topic."""
         short_id = topic_desc.short_id
-        value = Device._unwrap_payload(topic_desc, payload)
+        value = unwrap_payload(topic_desc, payload)
 
         if value is None:
             _LOGGER.debug("Ignoring empty/None payload for device %s property %s", self.unique_id, short_id)
@@ -124,10 +132,9 @@ class Device:
         log_debug: Callable[..., None],
     ) -> MetricPlaceholder | FallbackPlaceholder | None:
         """Handle a message."""
-        log_debug("Handling message for device %s: topic=%s", self.unique_id, parsed_topic)
-
         if topic_desc.message_type == MetricKind.ATTRIBUTE:
             self._set_device_property_from_topic(topic_desc, payload)
+            self._attribute_messages[topic] = payload
             return None
 
         parsed_topic.finalize_topic_fields(topic_desc, device_unique_id=self._unique_id)
@@ -141,9 +148,13 @@ class Device:
                 )
                 return None
             return FallbackPlaceholder(
-                device=self, parsed_topic=parsed_topic, topic_descriptor=topic_desc, value=fallback_value
+                device=self,
+                parsed_topic=parsed_topic,
+                topic_descriptor=topic_desc,
+                payload=payload,
+                value=fallback_value,
             )
-        value = Device._unwrap_payload(topic_desc, payload)
+        value = unwrap_payload(topic_desc, payload)
         if value is None:
             log_debug("Ignoring null topic value for device %s metric %s", self.unique_id, topic_desc.short_id)
             return None
@@ -155,29 +166,8 @@ class Device:
         assert value is not None, f"Value must not be None. topic={topic}, payload={payload}"
         return MetricPlaceholder(self, parsed_topic, topic_desc, payload, value)
 
-    @staticmethod
-    def _unwrap_payload(topic_desc: TopicDescriptor, payload: str) -> str | float | int | bool | VictronEnum | None:
-        assert topic_desc.value_type is not None
-        unwrapper = VALUE_TYPE_UNWRAPPER[topic_desc.value_type]
-        if unwrapper in [unwrap_enum, unwrap_bitmask]:
-            assert topic_desc.enum is not None, f"enum must be set for topic: {topic_desc.topic}"
-            return unwrapper(payload, topic_desc.enum)
-        if unwrapper in [
-            unwrap_float,
-            unwrap_int_seconds_to_hours,
-            unwrap_int_seconds_to_minutes,
-            unwrap_float_m3_to_liters,
-        ]:
-            return unwrapper(payload, topic_desc.precision)
-        return unwrapper(payload)
-
-    @staticmethod
-    def _is_same_adjustable_topics(topic: str, adjustable_topic: str) -> bool:
-        """Check if two topics are the same, considering adjustable suffixes."""
-        return topic.rsplit("/", 1)[0] == adjustable_topic.rsplit("/", 1)[0]
-
     def _create_metric_from_placeholder(
-        self, metric_placeholder: MetricPlaceholder, fallback_placeholders: list[FallbackPlaceholder], hub: Hub
+        self, metric_placeholder: MetricPlaceholder, fallback_placeholder: FallbackPlaceholder | None, hub: Hub
     ) -> Metric:
         _LOGGER.info("Creating new metric on device: %s", metric_placeholder)
 
@@ -188,16 +178,6 @@ class Device:
             # If there is a fallback placeholder for the same adjustable topic, and its value is False,
             # then we switch the topic to read-only (sensor).
             _LOGGER.info("Topic %s is adjustable", new_topic_desc.topic)
-            fallback_placeholder = next(
-                (
-                    fp
-                    for fp in fallback_placeholders
-                    if Device._is_same_adjustable_topics(
-                        fp.parsed_topic.full_topic, metric_placeholder.parsed_topic.full_topic
-                    )
-                ),
-                None,
-            )
             if fallback_placeholder and not fallback_placeholder.value:
                 _LOGGER.info("Switching topic from writable to read-only. topic=%s", new_topic_desc.topic)
                 new_topic_desc = copy.deepcopy(new_topic_desc)  # Deep copy
@@ -279,10 +259,11 @@ class Device:
                 unique_id=metric_placeholder.parsed_topic.unique_id,
                 short_id=metric_placeholder.parsed_topic.short_id,
                 key_values=metric_placeholder.parsed_topic.key_values,
+                topic=metric_placeholder.parsed_topic.full_topic,
                 hub=hub,
             )
         metric._handle_message(metric_placeholder.value, _LOGGER.debug)
-        self._metrics[metric.short_id] = metric
+        self._store_metric(metric)
         return metric
 
     def _add_formula_metric(self, topic_desc: TopicDescriptor, hub: Hub, key_values: dict[str, str]) -> FormulaMetric:
@@ -317,9 +298,35 @@ class Device:
                 hub=hub,
                 key_values=key_values,
             )
-        self._metrics[metric.short_id] = metric
+        self._store_metric(metric)
         return metric
 
+    def _store_metric(self, metric: Metric) -> None:
+        was_visible = self._visible_count > 0
+        previous = self._metrics.get(metric.short_id)
+        if previous is not None and not previous._descriptor.hidden:
+            self._visible_count -= 1
+        self._metrics[metric.short_id] = metric
+        if not metric._descriptor.hidden:
+            self._visible_count += 1
+        self._visibility_changed(was_visible)
+
+    def _remove_metric(self, short_id: str) -> None:
+        was_visible = self._visible_count > 0
+        metric = self._metrics.pop(short_id, None)
+        if metric is not None and not metric._descriptor.hidden:
+            self._visible_count -= 1
+        self._visibility_changed(was_visible)
+
+    def _visibility_changed(self, was_visible: bool) -> None:
+        self._metrics_version += 1
+        if was_visible != (self._visible_count > 0):
+            Device._topology_version += 1
+
+    def _set_parent_device(self, parent_device: Device | None) -> None:
+        self._parent_device = parent_device
+        Device._topology_version += 1
+
     def get_metric(self, short_id: str) -> Metric | WritableMetric | None:
         """Get a metric from a short id. Returns None for hidden metrics."""
         metric = self._metrics.get(short_id)
@@ -329,8 +336,21 @@ class Device:
 
     @property
     def metrics(self) -> list[Metric | WritableMetric]:
-        """Returns the list of visible metrics on this device."""
-        return [m for m in self._metrics.values() if not m._descriptor.hidden]
+        """Returns the list of visible metrics on this device.
+
+        The list is kept until a metric is added or removed, do not modify it.
+        """
+        version, visible = self._visible_metrics
+        if version != self._metrics_version:
+            version = self._metrics_version
+            visible = [m for m in self._metrics.values() if not m._descriptor.hidden]
+            self._visible_metrics = (version, visible)
+        return visible
+
+    @property
+    def has_visible_metrics(self) -> bool:
+        """Return True if the device has at least a visible metric."""
+        return self._visible_count > 0
 
     @property
     def unique_id(self) -> str:
@@ -373,6 +393,11 @@ class Device:
         """Return the device type."""
         return self._device_type
 
+    @property
+    def available(self) -> bool:
+        """Return False once the device stopped publishing, until it publishes again."""
+        return self._available
+
     @property
     def firmware_version(self) -> str | None:
         """Return the firmware version of the device."""
@@ -394,11 +419,16 @@ class Device:
 
         Skips empty intermediate parents (e.g. a switch device whose only
         purpose is to group SwitchableOutput sub-devices).  The root device
-        (one with no parent itself) is never skipped.
+        (one with no parent itself) is never skipped. The result is kept until
+        an ancestor gains its first visible metric or loses its last one.
         """
-        parent = self._parent_device
-        while parent is not None and not parent.metrics and parent._parent_device is not None:
-            parent = parent._parent_device
+        version, parent = self._effective_parent
+        if version != Device._topology_version:
+            version = Device._topology_version
+            parent = self._parent_device
+            while parent is not None and not parent._visible_count and parent._parent_device is not None:
+                parent = parent._parent_device
+            self._effective_parent = (version, parent)
         return parent
 
 
@@ -423,7 +453,8 @@ class FallbackPlaceholder:
     device: Device
     parsed_topic: ParsedTopic
     topic_descriptor: TopicDescriptor
+    payload: str
     value: str | float | int | bool | VictronEnum
 
     def __repr__(self) -> str:
-        return f"FallbackPlaceholder(device={self.device}, parsed_topic={self.parsed_topic}, topic_descriptor={self.topic_descriptor}, value={self.value})"
+        return f"FallbackPlaceholder(device={self.device}, parsed_topic={self.parsed_topic}, topic_descriptor={self.topic_descriptor}, payload={self.payload}, value={self.value})"
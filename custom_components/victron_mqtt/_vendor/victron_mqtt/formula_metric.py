@@ -56,6 +56,10 @@ class FormulaMetric(Metric):
     def value(self):
         return self._value
 
+    def _clear_value(self) -> None:
+        super()._clear_value()
+        self.transient_state = None
+
     def _handle_formula(self, log_debug: Callable[..., None]):
         # Formula functions may return None to indicate no value/update.
         result = self._func(self._depends_on, self.transient_state)
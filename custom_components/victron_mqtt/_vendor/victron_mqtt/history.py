@@ -0,0 +1,80 @@
+"""Recent samples of metrics, kept in fixed size ring buffers."""
+
+from array import array
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class HistoryStats:
+    """Snapshot of the memory held by the metric histories of a Hub."""
+
+    metrics: int
+    samples: int
+    capacity: int
+    bytes: int
+
+
+class MetricHistory:
+    """The last samples of a numeric metric, with the monotonic time they were received.
+
+    Values and timestamps are stored in two preallocated arrays of doubles, the
+    oldest sample is overwritten once they are full. Samples are appended from
+    the MQTT thread and read from the event loop without locking: a reader racing
+    a writer may miss the sample being written, never a sample in between.
+    """
+
+    __slots__ = ("_next", "_size", "_times", "_values", "capacity", "max_age_seconds")
+
+    def __init__(self, capacity: int, max_age_seconds: float | None = None) -> None:
+        """Initialize an empty history of capacity samples."""
+        self.capacity = capacity
+        self.max_age_seconds = max_age_seconds
+        self._values = array("d", [0.0]) * capacity
+        self._times = array("d", [0.0]) * capacity
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the sample buffers in bytes."""
+        return (len(self._values) + len(self._times)) * self._values.itemsize
+
+    def append(self, value: float, now: float) -> None:
+        """Store a sample, replacing the oldest one when full."""
+        index = self._next
+        self._values[index] = value
+        self._times[index] = now
+        self._next = (index + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def clear(self) -> None:
+        """Forget all samples, keeping the buffers."""
+        self._next = 0
+        self._size = 0
+
+    def samples(self, now: float, max_age_seconds: float | None = None) -> list[tuple[float, float]]:
+        """Return the (timestamp, value) samples, oldest first.
+
+        Only samples received within the max age of the history, and within
+        max_age_seconds when given, are returned.
+        """
+        size = self._size
+        end = self._next
+        max_age = self.max_age_seconds
+        if max_age_seconds is not None:
+            max_age = max_age_seconds if max_age is None else min(max_age, max_age_seconds)
+        oldest = now - max_age if max_age is not None else None
+        capacity = self.capacity
+        times = self._times
+        values = self._values
+        result: list[tuple[float, float]] = []
+        for index in range(end - size, end):
+            index %= capacity
+            timestamp = times[index]
+            if oldest is None or timestamp >= oldest:
+                result.append((timestamp, values[index]))
+        return result
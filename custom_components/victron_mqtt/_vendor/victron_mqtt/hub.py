@@ -8,7 +8,8 @@ import re
 import ssl
 import string
 import time
-from collections.abc import Callable
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
 from dataclasses import replace
 from typing import Any, Literal
 
@@ -21,13 +22,46 @@ from paho.mqtt.reasoncodes import ReasonCode
 
 from ._victron_enums import DeviceType
 from ._victron_topics import topics
-from .constants import AUTO_UPDATE_INTERVALS, TOPIC_INSTALLATION_ID, MetricKind, OperationMode
+from .constants import (
+    AUTO_UPDATE_INTERVALS,
+    DEADBAND_MAX_SILENCE_SECONDS,
+    DEFAULT_DEADBANDS,
+    LOAD_PROBE_INTERVAL_SECONDS,
+    MEMORY_REPORT_SAMPLE_SIZE,
+    METRIC_SETTLE_SECONDS,
+    MIN_WRITE_INTERVAL_SECONDS,
+    WRITE_CONFIRM_TIMEOUT_SECONDS,
+    NOTIFICATION_BATCH_SIZE,
+    TOPIC_INSTALLATION_ID,
+    TRACE_BUFFER_SIZE,
+    Deadband,
+    HistoryPolicy,
+    MetricKind,
+    MetricType,
+    OperationMode,
+    UpdateAggregation,
+    VictronEnum,
+)
 from .data_classes import ParsedTopic, TopicDescriptor, topic_to_device_type
 from .device import Device, FallbackPlaceholder, MetricPlaceholder
 from .formula_metric import FormulaMetric
 from .id_utils import reraise_same_exception
-from .metric import Metric
+from .keepalive_scheduler import KEEPALIVE_SCHEDULER, KeepaliveScheduler
+from .history import HistoryStats
+from .memory import MemoryReport, MemorySizer, MemoryUsage
+from .trace import TraceBuffer, TraceEvent
+from .value_store import ValueStore
+from .load_shedding import LoadShedder, LoadSheddingStats
+from .metric import CallbackOnUpdate, Metric
 from .writable_metric import WritableMetric
+from .write_scheduler import (
+    WriteMismatchError,
+    WriteOutcome,
+    WriteScheduler,
+    WriteStats,
+    WriteTimeoutError,
+    WriteWaiter,
+)
 
 _LOGGER = logging.getLogger(__name__)
 CONNECT_MAX_FAILED_ATTEMPTS = 3
@@ -36,14 +70,23 @@ FULL_PUBLISH_MIN_INTERVAL_SECONDS = 180
 FIRST_FULL_PUBLISH_MIN_INTERVAL_SECONDS = 30
 # Venus OS versions use a two-digit minor ("v3.50", "v3.54"), compared as integer tuples
 MINIMUM_FULLY_SUPPORTED_VERSION = (3, 50)
-# The keepalive loop ticks every 30s. Every Nth tick we send a forced full republish so the
-# broker re-sends every current value, refreshing last_seen for otherwise-constant metrics.
+# The keepalive loop ticks every 30s. On brokers that do not answer read requests, every Nth
+# tick we send a forced full republish so the broker re-sends every current value, refreshing
+# last_seen for otherwise-constant metrics.
 FULL_REPUBLISH_STALENESS_INTERVAL_CYCLES = 6
 # A metric not seen for this long is considered stale (its source stopped publishing) and is
 # marked unavailable. Must be larger than the forced full republish interval
 # (FULL_REPUBLISH_STALENESS_INTERVAL_CYCLES * 30s) so healthy but constant metrics are not
 # wrongly invalidated between republishes.
 STALE_METRIC_TIMEOUT_SECONDS = 360
+# Metrics not seen for this long get a read request (R/<id>/<path>), so the broker re-sends
+# just their value well before they would turn stale.
+STALE_REFRESH_AFTER_SECONDS = STALE_METRIC_TIMEOUT_SECONDS // 2
+# Read requests are published in batches, one batch per interval. Requests beyond the
+# per sweep limit wait for the next sweep.
+READ_REQUEST_BATCH_SIZE = 50
+READ_REQUEST_BATCH_INTERVAL_SECONDS = 1.0
+READ_REQUESTS_PER_SWEEP = 500
 
 # Modify the logger to include instance_id without changing the tracing level
 # class InstanceIDFilter(logging.Filter):
@@ -76,7 +119,13 @@ STALE_METRIC_TIMEOUT_SECONDS = 360
 _running_client_id = 0
 
 CallbackOnNewMetric = Callable[["Hub", Device, Metric], None]
+CallbackOnNewMetrics = Callable[["Hub", list[tuple[Device, Metric]]], None]
 CallbackOnNewDevice = Callable[["Hub", Device], None]
+CallbackOnMetricRemoved = Callable[["Hub", Device, Metric], None]
+CallbackOnDeviceUnavailable = Callable[["Hub", Device], None]
+CallbackOnDeviceRemoved = Callable[["Hub", Device], None]
+# Bumped whenever the layout returned by Hub.export_structure() changes.
+STRUCTURE_FORMAT_VERSION = 1
 
 
 class Hub:
@@ -98,6 +147,18 @@ class Hub:
         device_type_exclude_filter: list[DeviceType] | None = None,
         update_frequency_seconds: int | Literal["auto", "auto_power_none"] | None = None,
         ssl_context: ssl.SSLContext | None = None,
+        deadbands: Mapping[MetricType | str, Deadband | None] | None = None,
+        deadband_max_silence_seconds: int | None = DEADBAND_MAX_SILENCE_SECONDS,
+        update_aggregation: UpdateAggregation = UpdateAggregation.LAST,
+        load_shedding: bool = True,
+        min_write_interval_seconds: float | None = MIN_WRITE_INTERVAL_SECONDS,
+        optimistic_writes: bool = False,
+        history: Mapping[MetricType | str, HistoryPolicy | None] | None = None,
+        columnar_store: bool = False,
+        trace_buffer_size: int = TRACE_BUFFER_SIZE,
+        metric_settle_seconds: float | None = METRIC_SETTLE_SECONDS,
+        device_timeouts: Mapping[DeviceType, float] | None = None,
+        device_retention_seconds: float | None = None,
     ) -> None:
         """
         Initialize a Hub instance for communicating with a Venus OS MQTT broker.
@@ -127,7 +188,11 @@ class Hub:
         topic_prefix: str | None
             Optional prefix that is prepended to every subscribe/publish topic.
         topic_log_info: str | None
-            Optional substring used to elevate logging level for matching topics.
+            Optional substring selecting what is traced: the messages received and
+            published on topics containing it (e.g. "battery/512" for a device)
+            and the metrics whose topic or unique id contains it. Their records
+            are kept in a ring buffer, available from `dump_trace()`, instead of
+            being logged.
         operation_mode: OperationMode
             Controls which TopicDescriptor entries are active (e.g. FULL, READ_ONLY,
             EXPERIMENTAL).
@@ -150,6 +215,74 @@ class Hub:
             True, a default context without certificate verification is used.
             Only valid together with `use_ssl=True`; otherwise `ValueError`
             is raised.
+        deadbands: Mapping[MetricType | str, Deadband | None] | None
+            Overrides merged over DEFAULT_DEADBANDS. Keys are metric types or
+            metric short ids (specific like "solarcharger_tracker_0_power" or
+            generic like "solarcharger_tracker_{tracker}_power"); a short id wins
+            over the metric type. A None value disables the deadband for that key.
+            Numeric changes smaller than the deadband of a metric are not notified.
+        deadband_max_silence_seconds: int | None
+            Longest time a change held back by a deadband waits before it is
+            notified anyway. None holds it until a significant change arrives.
+        update_aggregation: UpdateAggregation
+            Value notified for a throttled measurement once its update interval
+            passed: the last sample (default), or the time weighted mean, the
+            minimum or the maximum of the samples received during the interval.
+            Except for LAST, the minimum and maximum are also available from
+            `Metric.window_min` and `Metric.window_max`.
+        load_shedding: bool
+            Stretch the update interval of low priority measurements (see
+            LOW_PRIORITY_METRIC_TYPES) while the event loop lags or on_update
+            callbacks pile up, and restore it once the pressure is gone. The
+            state is available from `load_shedding_stats`.
+        min_write_interval_seconds: float | None
+            Shortest time between two writes to the same topic. Writes arriving
+            sooner (e.g. while a slider is dragged) are coalesced, only the latest
+            one is published once the interval passed. Switches and buttons are
+            always written right away. None publishes every write. The state is
+            available from `write_stats` and `WritableMetric.pending_value`.
+        optimistic_writes: bool
+            Notify on_update with the value written as soon as it is written,
+            instead of waiting for the device to report it. The value reported
+            next (the echo of the write, or the value the device kept) is always
+            notified, regardless of the update frequency. Without a report within
+            WRITE_CONFIRM_TIMEOUT_SECONDS, the previous value is notified again.
+        history: Mapping[MetricType | str, HistoryPolicy | None] | None
+            Keep the recent numeric values of the metrics matched, available
+            from `Metric.history()` (e.g. to formulas). Keys are looked up like
+            the deadbands keys; no metric keeps a history by default. Every
+            history is allocated once at its full size, the memory held is
+            available from `history_stats`.
+        columnar_store: bool
+            Also keep the value and timestamps of every metric in contiguous
+            arrays, so the periodic staleness sweeps and `export_values()` scan
+            those (vectorized with numpy when installed) instead of every metric
+            object. Worth it on large installations, each message pays for one
+            more write.
+        trace_buffer_size: int
+            Number of records the trace buffer keeps, the oldest are overwritten.
+        metric_settle_seconds: float | None
+            Once the first full publish completed, the new topics (e.g. of a
+            device connected later) are turned into metrics without waiting for
+            the next full publish: right away for a device already announced
+            when the metric depends on nothing missing, otherwise once the device
+            sent no other new topic for this long. None waits for the next full
+            publish, like the first discovery does.
+        device_timeouts: Mapping[DeviceType, float] | None
+            Seconds without any message from a device of the type after which
+            the device is considered gone (e.g. a VE.Direct cable unplugged or a
+            Bluetooth sensor out of range): all its metrics are made unavailable
+            at once and `on_device_unavailable` is called. Types not listed use
+            STALE_METRIC_TIMEOUT_SECONDS. A timeout shorter than that suits
+            devices that publish continuously only, as the values of constant
+            metrics are refreshed every STALE_REFRESH_AFTER_SECONDS.
+        device_retention_seconds: float | None
+            Devices without any message for this long (e.g. an EV or a
+            Bluetooth sensor that went away) are forgotten with their metrics
+            and reported through `on_device_removed` only, their metrics are not
+            reported through `on_metric_removed`. They are discovered again if
+            they come back. None, the default, keeps every device for the life
+            of the hub.
 
         Behavior
         --------
@@ -168,6 +301,7 @@ class Hub:
             `ssl_context` is provided without `use_ssl=True`.
         TypeError
             If an argument has an incorrect type.
+
         """
         global _running_client_id  # noqa: PLW0603
         self._instance_id = _running_client_id
@@ -186,12 +320,31 @@ class Hub:
             raise ValueError("port must be an integer between 1 and 65535")
         if ssl_context is not None and not use_ssl:
             raise ValueError("ssl_context requires use_ssl=True")
-        if (
-            update_frequency_seconds is not None
-            and not isinstance(update_frequency_seconds, int)
-            and update_frequency_seconds not in AUTO_UPDATE_INTERVALS
+        Hub._validate_update_frequency(update_frequency_seconds)
+        if deadbands is not None and not all(
+            value is None or isinstance(value, Deadband) for value in deadbands.values()
         ):
-            raise ValueError(f"update_frequency_seconds must be an int, None or one of {sorted(AUTO_UPDATE_INTERVALS)}")
+            raise TypeError("deadbands values must be Deadband instances or None")
+        if deadband_max_silence_seconds is not None and deadband_max_silence_seconds <= 0:
+            raise ValueError("deadband_max_silence_seconds must be a positive number or None")
+        if history is not None and not all(
+            value is None or isinstance(value, HistoryPolicy) for value in history.values()
+        ):
+            raise TypeError("history values must be HistoryPolicy instances or None")
+        if min_write_interval_seconds is not None and min_write_interval_seconds <= 0:
+            raise ValueError("min_write_interval_seconds must be a positive number or None")
+        if trace_buffer_size <= 0:
+            raise ValueError("trace_buffer_size must be a positive number")
+        if metric_settle_seconds is not None and metric_settle_seconds < 0:
+            raise ValueError("metric_settle_seconds must be a non-negative number or None")
+        if device_timeouts is not None:
+            if not all(isinstance(device_type, DeviceType) for device_type in device_timeouts):
+                raise TypeError("device_timeouts keys must be DeviceType members")
+            if not all(timeout > 0 for timeout in device_timeouts.values()):
+                raise ValueError("device_timeouts values must be positive numbers")
+        if device_retention_seconds is not None and device_retention_seconds <= 0:
+            raise ValueError("device_retention_seconds must be a positive number or None")
+        Hub._validate_update_aggregation(update_aggregation)
         _LOGGER.info(
             "Initializing Hub[ID: %d](host=%s, port=%d, username=%s, use_ssl=%s, installation_id=%s, model_name=%s, topic_prefix=%s, operation_mode=%s, device_type_exclude_filter=%s, update_frequency_seconds=%s, topic_log_info=%s)",
             self._instance_id,
@@ -218,24 +371,79 @@ class Hub:
         self._expected_installation_id = installation_id
         self._topic_prefix = topic_prefix
         self._devices: dict[str, Device] = {}
+        # Unique ids of the devices with a visible metric. The dict devices returns is cached with
+        # the version of the set it was built for.
+        self._visible_device_ids: set[str] = set()
+        self._visible_devices_version = 0
+        self._visible_devices: tuple[int, dict[str, Device]] = (-1, {})
         self._first_refresh_event: asyncio.Event = asyncio.Event()
         self._installation_id_event: asyncio.Event = asyncio.Event()
         self._snapshot: dict[str, Any] = {}
         self._keepalive_task: asyncio.Task[None] | None = None
+        # The full publish requested by set_device_type_exclude_filter(), waiting for its turn
+        self._forced_keepalive_task: asyncio.Task[None] | None = None
         self._connected_event = asyncio.Event()
         self._on_new_metric: CallbackOnNewMetric | None = None
+        self._on_new_metrics: CallbackOnNewMetrics | None = None
         self._on_new_device: CallbackOnNewDevice | None = None
+        self._on_metric_removed: CallbackOnMetricRemoved | None = None
+        self._on_device_unavailable: CallbackOnDeviceUnavailable | None = None
+        self._on_device_removed: CallbackOnDeviceRemoved | None = None
+        self._device_timeouts: dict[DeviceType, float] = dict(device_timeouts or {})
+        self._device_retention_seconds = device_retention_seconds
+        # Monotonic time of the last successful connection, a device is only evicted when it
+        # stayed silent while connected
+        self._connected_at: float = 0
         self._topic_log_info = topic_log_info
+        self._trace = TraceBuffer(trace_buffer_size)
+        # Whether each topic received is traced, so the filter is matched once per topic
+        self._traced_topics: dict[str, bool] = {}
         self._operation_mode = operation_mode
         self._device_type_exclude_filter = device_type_exclude_filter
         self._update_frequency_seconds = update_frequency_seconds
+        self._deadbands: dict[MetricType | str, Deadband | None] = {**DEFAULT_DEADBANDS, **(deadbands or {})}
+        self._deadband_max_silence_seconds = deadband_max_silence_seconds
+        self._history_policies: dict[MetricType | str, HistoryPolicy | None] = dict(history or {})
+        self._value_store: ValueStore | None = ValueStore() if columnar_store else None
+        self._update_aggregation = update_aggregation
+        # Queued on_update callbacks of normal and low priority metrics, run in batches so that
+        # the high priority ones, scheduled directly on the loop, overtake them.
+        self._pending_updates: deque[tuple[CallbackOnUpdate, Metric, Any]] = deque()
+        self._drain_scheduled = False
+        self._load_shedder: LoadShedder | None = (
+            LoadShedder(self._apply_load_shedding, self._pending_updates.__len__) if load_shedding else None
+        )
+        self._load_probe_task: asyncio.Task[None] | None = None
+        self._keepalive_scheduler: KeepaliveScheduler = KEEPALIVE_SCHEDULER
+        self._write_scheduler: WriteScheduler | None = (
+            WriteScheduler(self._publish, min_write_interval_seconds) if min_write_interval_seconds is not None else None
+        )
+        self._optimistic_writes = optimistic_writes
+        # N/ topic -> writes waiting for their value to be reported, oldest first. Empty unless
+        # set_and_confirm() is awaited, so incoming messages only pay for a truthiness check.
+        self._write_waiters: dict[str, list[WriteWaiter]] = {}
+        # None until the broker answered (or ignored) the first read requests
+        self._read_requests_supported: bool | None = None
+        self._pending_reads: list[Metric] = []
+        self._reads_requested_at: float = 0
         # The client ID is generated using a random string and the instance ID. It has to be unique between all clients connected to the same mqtt server. If not, they may reset each other connection.
         random_string = "".join(random.choices(string.ascii_letters + string.digits, k=8))
         self._client_id = f"victron_mqtt-{random_string}-{self._instance_id}"
         self._keepalive_counter = 0
         self._metrics_placeholders: dict[str, MetricPlaceholder] = {}
+        # By unique id, which an adjustable fallback shares with the metric it applies to
         self._fallback_placeholders: dict[str, FallbackPlaceholder] = {}
+        self._metric_settle_seconds = metric_settle_seconds
+        # Placeholders received after the first full publish, by device unique id, with the time
+        # the device last sent a new topic; and the ones missing a dependency, by its unique id
+        self._staged_placeholders: dict[str, list[str]] = {}
+        self._settling_devices: dict[str, float] = {}
+        self._placeholders_by_dependency: dict[str, list[str]] = {}
         self._all_metrics: dict[str, Metric] = {}
+        # The (topic, payload) that created each metric and the adjustable fallbacks, by unique id,
+        # for export_structure()
+        self._structure_messages: dict[str, tuple[str, str]] = {}
+        self._structure_fallbacks: dict[str, tuple[str, str]] = {}
         self._first_connect = True
         self._first_full_publish = True
         self._notified_device_ids: set[str] = set()
@@ -249,11 +457,21 @@ class Hub:
         self._connect_failed_since: float = 0.0
         self._installation_id: str | None = None
 
+        # Populated on each connect() with {installation_id} resolved; _subscription_list stays
+        # as the unresolved template so the Hub can be reconnected cleanly.
+        self._resolved_subscription_list: list[str] = []
+        self._build_topic_tables()
+        self._client = MQTTClient(callback_api_version=CallbackAPIVersion.VERSION2, client_id=self._client_id)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        _LOGGER.info("Hub initialized. Client ID: %s", self._client_id)
+
+    def _build_topic_tables(self) -> None:
+        """Build the topic maps and the subscription list from the operation mode and device type filter."""
         # Filter the active topics
         metrics_active_topics: list[TopicDescriptor] = []
         self._service_active_topics: dict[str, TopicDescriptor] = {}
         for topic in topics:
-            if operation_mode != OperationMode.EXPERIMENTAL and topic.experimental:
+            if self._operation_mode != OperationMode.EXPERIMENTAL and topic.experimental:
                 continue
             if topic.message_type == MetricKind.SERVICE:
                 self._service_active_topics[topic.short_id] = topic
@@ -264,18 +482,7 @@ class Hub:
         expanded_topics = Hub.expand_topic_list(metrics_active_topics)
         # Apply device type filtering if specified
         if self._device_type_exclude_filter is not None and len(self._device_type_exclude_filter) > 0:
-            relevant_topics: list[TopicDescriptor] = []
-            for td in expanded_topics:
-                if td.message_type == MetricKind.ATTRIBUTE:
-                    relevant_topics.append(td)
-                    continue
-                topic_device_types = topic_to_device_type(td.topic.split("/"))
-                assert topic_device_types is not None
-                if topic_device_types in self._device_type_exclude_filter:
-                    _LOGGER.info("Topic %s is filtered by device type: %s", td.topic, topic_device_types)
-                else:
-                    relevant_topics.append(td)
-            expanded_topics = relevant_topics
+            expanded_topics = self._filter_excluded_device_types(expanded_topics, self._device_type_exclude_filter)
 
         def merge_is_adjustable_suffix(desc: TopicDescriptor) -> str:
             """Merge the topic with its adjustable suffix."""
@@ -304,12 +511,49 @@ class Hub:
             [desc for desc in expanded_topics if desc.is_adjustable_suffix],
             lambda desc: Hub._remove_placeholders_map(merge_is_adjustable_suffix(desc)),
         )
+        self.sub_device_topic_patterns = Hub._build_sub_device_patterns(expanded_topics)
+        subscription_list1 = [
+            Hub._remove_placeholders(topic.topic) for topic in expanded_topics if not topic.is_formula
+        ]
+        subscription_list2 = [
+            Hub._remove_placeholders(merge_is_adjustable_suffix(topic))
+            for topic in expanded_topics
+            if topic.is_adjustable_suffix and not topic.is_formula
+        ]
+        self._subscription_list = subscription_list1 + subscription_list2
+        self._pending_formula_topics: list[TopicDescriptor] = [topic for topic in expanded_topics if topic.is_formula]
+        for topic in self._pending_formula_topics:
+            _LOGGER.info("Formula topic detected: %s", topic.topic)
+
+    @staticmethod
+    def _filter_excluded_device_types(
+        expanded_topics: list[TopicDescriptor], excluded: list[DeviceType]
+    ) -> list[TopicDescriptor]:
+        """Return the topics not of an excluded device type, attributes included."""
+        relevant_topics: list[TopicDescriptor] = []
+        for td in expanded_topics:
+            if td.message_type == MetricKind.ATTRIBUTE:
+                relevant_topics.append(td)
+                continue
+            topic_device_types = topic_to_device_type(td.topic.split("/"))
+            assert topic_device_types is not None
+            if topic_device_types in excluded:
+                _LOGGER.info("Topic %s is filtered by device type: %s", td.topic, topic_device_types)
+            else:
+                relevant_topics.append(td)
+        return relevant_topics
+
+    @staticmethod
+    def _build_sub_device_patterns(
+        expanded_topics: list[TopicDescriptor],
+    ) -> dict[DeviceType, dict[int, dict[tuple[str, str], list[TopicDescriptor]]]]:
+        """Index the descriptors creating sub-devices by device type, placeholder index and (prefix, suffix)."""
         # Descriptors that create sub-devices may contain arbitrary string identifiers.
         # Build a map keyed by the placeholder's position index and then by (prefix, suffix)
         # around it so that the free-text segment (e.g. "output_1", "ev_connected") is simply
         # skipped during lookup.  Keying on the index avoids scanning every possible split
         # position at message-handling time.
-        self.sub_device_topic_patterns: dict[DeviceType, dict[int, dict[tuple[str, str], list[TopicDescriptor]]]] = {}
+        patterns: dict[DeviceType, dict[int, dict[tuple[str, str], list[TopicDescriptor]]]] = {}
         for desc in expanded_topics:
             if desc.sub_device_key is None:
                 continue
@@ -324,9 +568,9 @@ class Hub:
             sub_device_idx = desc_topic_parts.index(sub_device_placeholder)
             prefix = "/".join(desc_topic_parts[:sub_device_idx])
             suffix = "/".join(desc_topic_parts[sub_device_idx + 1 :])
-            if topic_device_type not in self.sub_device_topic_patterns:
-                self.sub_device_topic_patterns[topic_device_type] = {}
-            by_idx = self.sub_device_topic_patterns[topic_device_type]
+            if topic_device_type not in patterns:
+                patterns[topic_device_type] = {}
+            by_idx = patterns[topic_device_type]
             if sub_device_idx not in by_idx:
                 by_idx[sub_device_idx] = {}
             by_pattern = by_idx[sub_device_idx]
@@ -334,24 +578,7 @@ class Hub:
             if pattern_key not in by_pattern:
                 by_pattern[pattern_key] = []
             by_pattern[pattern_key].append(desc)
-        subscription_list1 = [
-            Hub._remove_placeholders(topic.topic) for topic in expanded_topics if not topic.is_formula
-        ]
-        subscription_list2 = [
-            Hub._remove_placeholders(merge_is_adjustable_suffix(topic))
-            for topic in expanded_topics
-            if topic.is_adjustable_suffix and not topic.is_formula
-        ]
-        self._subscription_list = subscription_list1 + subscription_list2
-        # Populated on each connect() with {installation_id} resolved; _subscription_list stays
-        # as the unresolved template so the Hub can be reconnected cleanly.
-        self._resolved_subscription_list: list[str] = []
-        self._pending_formula_topics: list[TopicDescriptor] = [topic for topic in expanded_topics if topic.is_formula]
-        for topic in self._pending_formula_topics:
-            _LOGGER.info("Formula topic detected: %s", topic.topic)
-        self._client = MQTTClient(callback_api_version=CallbackAPIVersion.VERSION2, client_id=self._client_id)
-        self._loop: asyncio.AbstractEventLoop | None = None
-        _LOGGER.info("Hub initialized. Client ID: %s", self._client_id)
+        return patterns
 
     def _schedule_threadsafe(self, callback: Callable[..., object], *args: object) -> None:
         """Schedule a callback on the event loop from any thread."""
@@ -372,6 +599,7 @@ class Hub:
             For any other failure (connection timeout, dropped connection, missing installation
             id, etc.). Every non-authentication error is surfaced as CannotConnectError so callers
             only need to handle these two exception types.
+
         """
         _LOGGER.info("Connecting to MQTT broker at %s:%d", self.host, self.port)
         assert self._client is not None
@@ -419,13 +647,13 @@ class Hub:
             assert self._installation_id is not None
             # Resolve the installation ID in the subscription topics. Keep _subscription_list as
             # the unresolved template so the Hub can be reconnected cleanly.
-            self._resolved_subscription_list = [
-                topic.replace("{installation_id}", self._installation_id) for topic in self._subscription_list
-            ]
+            self._resolved_subscription_list = self._resolve_subscription_list()
             # First setup subscriptions will happen here as we need the installation ID.
-            # Later we will do it from the connect callback
-            self._setup_subscriptions()
+            # Later we will do it from the connect callback. The keepalive loop asks for the
+            # first full publish, in turn with the other hubs of the process.
+            self._setup_subscriptions(full_publish=False)
             self._start_keep_alive_loop()
+            self._start_load_probe()
         except Exception as exc:
             # If anything fails after loop_start(), fully clean up (keepalive task, client
             # disconnect, paho thread) so nothing is leaked. On HA retry a new Hub is created.
@@ -482,6 +710,87 @@ class Hub:
         payload = WritableMetric._wrap_payload(topic_desc, value) if value is not None else ""
         self._publish(topic, payload)
 
+    async def set_many(
+        self,
+        writes: Iterable[tuple[WritableMetric, str | float | int | bool | VictronEnum]],
+        confirm: bool = False,
+        timeout: float = WRITE_CONFIRM_TIMEOUT_SECONDS,
+    ) -> list[WriteOutcome]:
+        """
+        Write the values of several metrics at once, e.g. all the slots of a charge schedule.
+
+        Parameters
+        ----------
+        writes: Iterable[tuple[WritableMetric, value]]
+            The metrics and the values to write, published in this order.
+        confirm: bool
+            If True, wait until the N/ topic of every metric reports its value (see
+            `WritableMetric.set_and_confirm()`). The writes are awaited together.
+        timeout: float
+            Seconds to wait for the confirmations.
+
+        Behavior
+        --------
+        - Every value is validated before the first one is published, so an invalid
+          value leaves all metrics untouched.
+        - The writes are published in one burst, without coalescing or waiting for
+          each other.
+
+        Returns
+        -------
+        list[WriteOutcome]
+            One outcome per write, in order. The error of an unconfirmed write is a
+            `WriteTimeoutError` or a `WriteMismatchError`.
+
+        Raises
+        ------
+        NotConnectedError
+            If the hub is not connected yet.
+        ValueError
+            If a value is invalid. The message lists every invalid value.
+
+        """
+        if self._loop is None or self._installation_id is None:
+            raise NotConnectedError("Cannot write before connect()")
+        items = list(writes)
+        payloads: list[str] = []
+        errors: list[str] = []
+        for metric, value in items:
+            try:
+                payloads.append(metric._build_payload(value))
+            except ValueError as err:
+                errors.append(str(err))
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        waiters: list[WriteWaiter | None] = []
+        try:
+            for (metric, value), payload in zip(items, payloads, strict=True):
+                assert metric._write_topic is not None
+                waiter: WriteWaiter | None = None
+                if confirm and (metric.pending_value is not None or not metric._reports(payload)):
+                    waiter = self._add_write_waiter(metric._write_topic, payload, metric._write_tolerance)
+                waiters.append(waiter)
+                metric._mark_optimistic(value, payload)
+                self._write(metric._write_topic, payload, value, immediate=True)
+        except Exception:
+            for waiter in waiters:
+                if waiter is not None:
+                    self._remove_write_waiter(waiter)
+            raise
+        if not confirm:
+            return [WriteOutcome(metric, value) for metric, value in items]
+
+        async def wait(waiter: WriteWaiter | None) -> None:
+            if waiter is not None:
+                await self._wait_for_write(waiter, timeout)
+
+        results = await asyncio.gather(*(wait(waiter) for waiter in waiters), return_exceptions=True)
+        return [
+            WriteOutcome(metric, value, result if isinstance(result, Exception) else None)
+            for (metric, value), result in zip(items, results, strict=True)
+        ]
+
     def _on_log(self, _client: MQTTClient, _userdata: Any, level: int, buf: str) -> None:
         _LOGGER.log(level, buf)
 
@@ -531,6 +840,10 @@ class Hub:
             )
 
         _LOGGER.info("Connected to MQTT broker successfully")
+        self._connected_at = time.monotonic()
+        # The broker may have been updated meanwhile, probe it again
+        self._read_requests_supported = None
+        self._pending_reads = []
         self._setup_subscriptions()
 
     def _on_disconnect(
@@ -562,14 +875,15 @@ class Hub:
         topic = message.topic
         payload = message.payload.decode()
 
-        # Determine log level based on the substring
-        is_info_level = self._topic_log_info and self._topic_log_info in topic
-        log_debug = _LOGGER.info if is_info_level else _LOGGER.debug
-
-        log_debug("Message received: topic=%s, payload=%s", topic, payload)
-
         # Remove topic prefix before processing
         topic = self._remove_topic_prefix(topic)
+        traced = False
+        if self._topic_log_info:
+            traced = self._traced_topics.get(topic)
+            if traced is None:
+                traced = self._traced_topics[topic] = self._topic_log_info in topic
+            if traced:
+                self._trace.record(TraceEvent.RECEIVED, topic, payload)
 
         if topic.endswith("full_publish_completed"):
             self._handle_full_publish_message(payload=payload)
@@ -578,12 +892,19 @@ class Hub:
         if self._installation_id is None and not self._installation_id_event.is_set():
             self._handle_installation_id_message(topic)
 
-        self._handle_normal_message(topic, payload, log_debug)
+        now = time.monotonic()
+        self._handle_normal_message(topic, payload, traced, now)
+        # After the message was handled, so the metric has the value once the write completes
+        if self._write_waiters and topic in self._write_waiters:
+            assert self._loop is not None
+            self._loop.call_soon_threadsafe(self._confirm_writes, topic, payload)
+
+        if self._settling_devices:
+            self._create_settled_metrics(now)
 
         # Ensure _handle_full_publish_message runs at least once every interval.
         # This is to handle old cerbo versions that do not send full publish completed messages.
         # Issue #139 and #205
-        now = time.monotonic()
         min_interval = (
             FIRST_FULL_PUBLISH_MIN_INTERVAL_SECONDS
             if not self._periodic_full_publish_triggered_once
@@ -620,12 +941,20 @@ class Hub:
             dependencies.append(dependency_metric)
         return True, dependencies
 
+    @staticmethod
+    def _regular_dependency_ids(metric_placeholder: MetricPlaceholder) -> list[str]:
+        """Return the unique ids of the metrics a regular topic depends on."""
+        return [
+            ParsedTopic.replace_ids(
+                TopicDescriptor.dependency_parts(dependency)[0], metric_placeholder.parsed_topic.key_values
+            )
+            for dependency in metric_placeholder.topic_descriptor.depends_on or ()
+        ]
+
     def _is_regular_dependency_met(self, metric_placeholder: MetricPlaceholder) -> bool:
         if not metric_placeholder.topic_descriptor.depends_on:
             return True
-        for dependency in metric_placeholder.topic_descriptor.depends_on:
-            dependency_short_id, _required = TopicDescriptor.dependency_parts(dependency)
-            metric_id = ParsedTopic.replace_ids(dependency_short_id, metric_placeholder.parsed_topic.key_values)
+        for metric_id in self._regular_dependency_ids(metric_placeholder):
             dependency_metric = self._all_metrics.get(metric_id)
             dependency_placeholder = self._metrics_placeholders.get(metric_id)
             if dependency_metric is None and dependency_placeholder is None:
@@ -655,77 +984,178 @@ class Hub:
                 return
 
         _LOGGER.debug("Full publish completed: %s", echo)
-        new_metrics: list[tuple[Device, Metric]] = []
-        if len(self._metrics_placeholders) > 0:
-            fallback_placeholders_list = list(self._fallback_placeholders.values())
-            for metric_placeholder in self._metrics_placeholders.values():
-                # Check if depedency met, if not, the topic will get ignored
-                if not self._is_regular_dependency_met(metric_placeholder):
-                    continue
-                metric = metric_placeholder.device._create_metric_from_placeholder(
-                    metric_placeholder, fallback_placeholders_list, self
+        self._keepalive_scheduler.release_full_publish(self)
+        self._create_pending_metrics()
+        if self._device_retention_seconds is not None:
+            self._evict_vanished_devices(time.monotonic())
+        # Trace the version once
+        if self._first_full_publish:
+            version_metric_name = "system_0_platform_venus_firmware_installed_version"
+            version_metric = self._all_metrics.get(version_metric_name)
+            if version_metric and version_metric.value:
+                if version_metric.value[0] == "v":
+                    try:
+                        # Accept versions like 'v3.70' and 'v3.70~15' by stripping any '~' suffix
+                        ver_str = version_metric.value[1:]
+                        if "~" in ver_str:
+                            ver_str = ver_str.split("~", 1)[0]
+                        self._firmware_version = tuple(int(part) for part in ver_str.split("."))
+                        if self._firmware_version < MINIMUM_FULLY_SUPPORTED_VERSION:
+                            _LOGGER.warning(
+                                "Firmware version is below v3.50: %s. Reduced functionality may occur.",
+                                version_metric.value,
+                            )
+                        else:
+                            _LOGGER.info("Firmware version is good enough: %s", version_metric.value)
+                    except (ValueError, TypeError):
+                        _LOGGER.error("Firmware version format not recognized: %s", version_metric.value)
+                else:
+                    _LOGGER.error("Firmware version format not supported: %s", version_metric.value)
+            else:
+                _LOGGER.warning("Version metric not found: %s", version_metric_name)
+        self._schedule_threadsafe(self._first_refresh_event.set)
+        self._first_full_publish = False
+        _LOGGER.debug("Full publish handling completed")
+
+    def _create_pending_metrics(self, unique_ids: list[str] | None = None) -> list[tuple[Device, Metric]]:
+        """Turn the pending placeholders into metrics and formulas, and notify them in device order.
+
+        With unique_ids, only those placeholders are considered and the ones whose
+        dependencies are not met stay pending. Otherwise all of them are, and the
+        ones whose dependencies are not met get ignored.
+        """
+        placeholders = self._metrics_placeholders
+        if unique_ids is None:
+            candidates = list(placeholders.values())
+        else:
+            candidates = [
+                placeholder for unique_id in dict.fromkeys(unique_ids) if (placeholder := placeholders.get(unique_id))
+            ]
+        # Check if depedency met before creating any, a dependency may be pending in the same batch
+        ready = [placeholder for placeholder in candidates if self._is_regular_dependency_met(placeholder)]
+        new_metrics = self._materialize_placeholders(ready, staged=unique_ids is not None)
+        if unique_ids is None:
+            for unique_id, fallback_placeholder in self._fallback_placeholders.items():
+                self._structure_fallbacks[unique_id] = (
+                    fallback_placeholder.parsed_topic.full_topic,
+                    fallback_placeholder.payload,
                 )
-                self._all_metrics[metric.unique_id] = metric
-                new_metrics.append((metric_placeholder.device, metric))
-        self._metrics_placeholders.clear()
-        self._fallback_placeholders.clear()
-        # Activate formula entities
+            placeholders.clear()
+            self._fallback_placeholders.clear()
+            self._staged_placeholders.clear()
+            self._settling_devices.clear()
+            self._placeholders_by_dependency.clear()
         if len(new_metrics) > 0:
-            for topic in self._pending_formula_topics:
-                _LOGGER.debug("Trying to resolve formula topic: %s", topic)
-                relevant_devices: list[Device] = [
-                    device for device in self._devices.values() if device.device_type.code == topic.topic.split("/")[1]
-                ]
-                dependency_short_ids = {TopicDescriptor.dependency_parts(dep)[0] for dep in topic.depends_on}
-                if len(dependency_short_ids) == 0:
-                    _LOGGER.debug("Skipping formula topic without dependencies: %s", topic)
-                    continue
-                for device in relevant_devices:
-                    # We need all depends_on metric to get the key_values associated with it to be able to generate new metrics per moniker.
-                    all_new_dependency_metrics = [
-                        t[1]
-                        for t in new_metrics
-                        if t[1]._device == device and t[1].generic_short_id in dependency_short_ids
-                    ]
-                    for depends_on_metric in all_new_dependency_metrics:
-                        metric_unique_id = ParsedTopic.make_unique_id(device.unique_id, topic.short_id)
-                        metric_unique_id = ParsedTopic.replace_ids(metric_unique_id, depends_on_metric.key_values)
-                        is_met, dependencies = self._is_formula_dependency_met(
-                            topic, device, depends_on_metric.key_values
-                        )
-                        if not is_met:
-                            continue
-                        existing_metric = self._all_metrics.get(metric_unique_id)
-                        if existing_metric is not None:
-                            # Optional dependencies may arrive after the formula metric was created.
-                            # If so, attach newly available dependencies and recompute once.
-                            if isinstance(existing_metric, FormulaMetric):
-                                new_dependency_added = False
-                                for dependency_metric in dependencies:
-                                    if dependency_metric.unique_id not in existing_metric._depends_on:
-                                        dependency_metric.add_dependency(existing_metric)
-                                        existing_metric._depends_on[dependency_metric.unique_id] = dependency_metric
-                                        new_dependency_added = True
-                                if new_dependency_added:
-                                    existing_metric._handle_formula(_LOGGER.debug)
-                            continue
-                        _LOGGER.info("Formula topic resolved: %s", topic)
-                        metric = device._add_formula_metric(topic, self, depends_on_metric.key_values)
-                        depends_on: dict[str, Metric] = {}
-                        for dependency_metric in dependencies:
-                            dependency_metric.add_dependency(metric)
-                            depends_on[dependency_metric.unique_id] = dependency_metric
-                        metric.init(depends_on, _LOGGER.debug)
-                        _LOGGER.info("Formula metric created: %s", metric)
-                        self._all_metrics[metric.unique_id] = metric
-                        new_metrics.append((device, metric))
+            self._resolve_formula_metrics(new_metrics)
         # We are sending the new metrics now as we can be sure that the metric handled all the attribute topics and now ready.
+        self._announce_new_metrics(new_metrics)
+        if self._placeholders_by_dependency:
+            # The staged placeholders that were only waiting for one of the new metrics
+            waiting = [
+                unique_id
+                for _device, metric in new_metrics
+                for unique_id in self._placeholders_by_dependency.pop(metric.unique_id, ())
+                if (placeholder := placeholders.get(unique_id)) is not None
+                and placeholder.device.unique_id not in self._settling_devices
+            ]
+            if waiting:
+                new_metrics.extend(self._create_pending_metrics(waiting))
+        return new_metrics
+
+    def _materialize_placeholders(self, ready: list[MetricPlaceholder], staged: bool) -> list[tuple[Device, Metric]]:
+        """Create the metrics of placeholders whose dependencies are met.
+
+        Staged placeholders are consumed with their fallback; otherwise the caller clears
+        all the placeholders at once afterwards.
+        """
+        new_metrics: list[tuple[Device, Metric]] = []
+        for metric_placeholder in ready:
+            unique_id = metric_placeholder.parsed_topic.unique_id
+            fallback_placeholder = self._take_fallback_placeholder(unique_id, staged)
+            metric = metric_placeholder.device._create_metric_from_placeholder(
+                metric_placeholder, fallback_placeholder, self
+            )
+            self._add_metric(metric)
+            self._structure_messages[metric.unique_id] = (
+                metric_placeholder.parsed_topic.full_topic,
+                metric_placeholder.payload,
+            )
+            new_metrics.append((metric_placeholder.device, metric))
+        return new_metrics
+
+    def _take_fallback_placeholder(self, unique_id: str, staged: bool) -> FallbackPlaceholder | None:
+        """Return the fallback of a placeholder, removing both from the pending ones if staged."""
+        if not staged:
+            return self._fallback_placeholders.get(unique_id)
+        self._metrics_placeholders.pop(unique_id, None)
+        fallback_placeholder = self._fallback_placeholders.pop(unique_id, None)
+        if fallback_placeholder is not None:
+            self._structure_fallbacks[unique_id] = (
+                fallback_placeholder.parsed_topic.full_topic,
+                fallback_placeholder.payload,
+            )
+        return fallback_placeholder
+
+    def _resolve_formula_metrics(self, new_metrics: list[tuple[Device, Metric]]) -> None:
+        """Activate the formulas whose dependencies are among the new metrics, appending them."""
+        for topic in self._pending_formula_topics:
+            _LOGGER.debug("Trying to resolve formula topic: %s", topic)
+            relevant_devices: list[Device] = [
+                device for device in self._devices.values() if device.device_type.code == topic.topic.split("/")[1]
+            ]
+            dependency_short_ids = {TopicDescriptor.dependency_parts(dep)[0] for dep in topic.depends_on}
+            if len(dependency_short_ids) == 0:
+                _LOGGER.debug("Skipping formula topic without dependencies: %s", topic)
+                continue
+            for device in relevant_devices:
+                # We need all depends_on metric to get the key_values associated with it to be able to generate new metrics per moniker.
+                all_new_dependency_metrics = [
+                    t[1]
+                    for t in new_metrics
+                    if t[1]._device == device and t[1].generic_short_id in dependency_short_ids
+                ]
+                for depends_on_metric in all_new_dependency_metrics:
+                    metric_unique_id = ParsedTopic.make_unique_id(device.unique_id, topic.short_id)
+                    metric_unique_id = ParsedTopic.replace_ids(metric_unique_id, depends_on_metric.key_values)
+                    is_met, dependencies = self._is_formula_dependency_met(topic, device, depends_on_metric.key_values)
+                    if not is_met:
+                        continue
+                    existing_metric = self._all_metrics.get(metric_unique_id)
+                    if existing_metric is not None:
+                        if isinstance(existing_metric, FormulaMetric):
+                            self._attach_formula_dependencies(existing_metric, dependencies)
+                        continue
+                    _LOGGER.info("Formula topic resolved: %s", topic)
+                    metric = device._add_formula_metric(topic, self, depends_on_metric.key_values)
+                    depends_on: dict[str, Metric] = {}
+                    for dependency_metric in dependencies:
+                        dependency_metric.add_dependency(metric)
+                        depends_on[dependency_metric.unique_id] = dependency_metric
+                    metric.init(depends_on, _LOGGER.debug)
+                    _LOGGER.info("Formula metric created: %s", metric)
+                    self._add_metric(metric)
+                    new_metrics.append((device, metric))
+
+    @staticmethod
+    def _attach_formula_dependencies(formula: FormulaMetric, dependencies: list[Metric]) -> None:
+        """Attach the optional dependencies that arrived after the formula was created, then recompute once."""
+        new_dependency_added = False
+        for dependency_metric in dependencies:
+            if dependency_metric.unique_id not in formula._depends_on:
+                dependency_metric.add_dependency(formula)
+                formula._depends_on[dependency_metric.unique_id] = dependency_metric
+                new_dependency_added = True
+        if new_dependency_added:
+            formula._handle_formula(_LOGGER.debug)
+
+    def _order_new_devices(self, new_metrics: list[tuple[Device, Metric]]) -> list[Device]:
+        """Return the devices of the new metrics and their parents, parent devices first."""
         # Assign parent_device to top-level devices that don't already have one
         system_device = self._devices.get("system_0")
         if system_device is not None:
             for device in self._devices.values():
                 if device.parent_device is None and device is not system_device:
-                    device._parent_device = system_device
+                    device._set_parent_device(system_device)
 
         # Topologically sort: parent devices before their children.
         # Collect devices that have new metrics in this batch.
@@ -742,14 +1172,12 @@ class Hub:
                     parent = parent.parent_device
 
         # Remove devices that have no visible metrics and no children in the set
-        def _has_visible_content(dev: Device) -> bool:
-            """Check if a device has visible metrics or children with visible metrics."""
-            if dev.metrics:  # Has visible (non-hidden) metrics
-                return True
-            # Check if any device in the set considers this device its parent
-            return any(d.parent_device is dev for d in new_device_set.values() if d is not dev)
-
-        new_device_set = {uid: dev for uid, dev in new_device_set.items() if _has_visible_content(dev)}
+        parent_ids = {
+            parent.unique_id for parent in (dev.parent_device for dev in new_device_set.values()) if parent is not None
+        }
+        new_device_set = {
+            uid: dev for uid, dev in new_device_set.items() if dev.has_visible_metrics or uid in parent_ids
+        }
 
         # Sort: devices without parents first, then by depth
         def _device_depth(dev: Device) -> tuple[int, int]:
@@ -762,7 +1190,11 @@ class Hub:
             is_system = 0 if dev.device_type == DeviceType.SYSTEM else 1
             return (depth, is_system)
 
-        ordered_devices = sorted(new_device_set.values(), key=_device_depth)
+        return sorted(new_device_set.values(), key=_device_depth)
+
+    def _announce_new_metrics(self, new_metrics: list[tuple[Device, Metric]]) -> None:
+        """Notify the new devices, then the new metrics in device order."""
+        ordered_devices = self._order_new_devices(new_metrics)
 
         # Fire on_new_device for devices not yet notified
         notified_devices: set[str] = set()
@@ -776,51 +1208,28 @@ class Hub:
                 except Exception as exc:
                     _LOGGER.exception("Error calling _on_new_device callback %s", exc)
 
-        # Fire on_new_metric in topological order (parent devices' metrics before children)
-        ordered_new_metrics: list[tuple[Device, Metric]] = []
+        # Announce the metrics in topological order (parent devices' metrics before children)
+        metrics_by_device: dict[str, list[tuple[Device, Metric]]] = {}
+        for dev, metric in new_metrics:
+            metrics_by_device.setdefault(dev.unique_id, []).append((dev, metric))
+        batch: list[tuple[Device, Metric]] = []
         for device in ordered_devices:
-            ordered_new_metrics.extend(
-                (dev, metric) for dev, metric in new_metrics if dev.unique_id == device.unique_id
-            )
+            for dev, metric in metrics_by_device.get(device.unique_id, []):
+                metric.phase2_init(dev.unique_id, self._all_metrics)
+                if metric._descriptor.hidden:
+                    _LOGGER.debug("Skipping on_new_metric for hidden metric: %s", metric.unique_id)
+                    continue
+                batch.append((dev, metric))
 
-        for device, metric in ordered_new_metrics:
-            metric.phase2_init(device.unique_id, self._all_metrics)
-            if metric._descriptor.hidden:
-                _LOGGER.debug("Skipping on_new_metric for hidden metric: %s", metric.unique_id)
-                continue
-            try:
-                if callable(self._on_new_metric):
+        try:
+            if callable(self._on_new_metrics):
+                if batch:
+                    self._schedule_threadsafe(self._on_new_metrics, self, batch)
+            elif callable(self._on_new_metric):
+                for device, metric in batch:
                     self._schedule_threadsafe(self._on_new_metric, self, device, metric)
-            except Exception as exc:
-                _LOGGER.exception("Error calling _on_new_metric callback %s", exc)
-        # Trace the version once
-        if self._first_full_publish:
-            version_metric_name = "system_0_platform_venus_firmware_installed_version"
-            version_metric = self._all_metrics.get(version_metric_name)
-            if version_metric and version_metric.value:
-                if version_metric.value[0] == "v":
-                    try:
-                        # Accept versions like 'v3.70' and 'v3.70~15' by stripping any '~' suffix
-                        ver_str = version_metric.value[1:]
-                        if "~" in ver_str:
-                            ver_str = ver_str.split("~", 1)[0]
-                        self._firmware_version = tuple(int(part) for part in ver_str.split("."))
-                        if self._firmware_version < MINIMUM_FULLY_SUPPORTED_VERSION:
-                            _LOGGER.warning(
-                                "Firmware version is below v3.50: %s. Reduced functionality may occur.",
-                                version_metric.value,
-                            )
-                        else:
-                            _LOGGER.info("Firmware version is good enough: %s", version_metric.value)
-                    except (ValueError, TypeError):
-                        _LOGGER.error("Firmware version format not recognized: %s", version_metric.value)
-                else:
-                    _LOGGER.error("Firmware version format not supported: %s", version_metric.value)
-            else:
-                _LOGGER.warning("Version metric not found: %s", version_metric_name)
-        self._schedule_threadsafe(self._first_refresh_event.set)
-        self._first_full_publish = False
-        _LOGGER.debug("Full publish handling completed")
+        except Exception as exc:
+            _LOGGER.exception("Error calling _on_new_metric callback %s", exc)
 
     def _handle_installation_id_message(self, topic: str) -> None:
         """Handle installation ID message."""
@@ -833,74 +1242,159 @@ class Hub:
         _LOGGER.info("Installation ID received: %s. Original topic: %s", self._installation_id, topic)
         self._schedule_threadsafe(self._installation_id_event.set)
 
-    def _handle_normal_message(self, topic: str, payload: str, log_debug: Callable[..., None]) -> None:
-        """Handle regular MQTT message."""
+    def _handle_normal_message(self, topic: str, payload: str, traced: bool = False, received: float = 0) -> None:
+        """Handle regular MQTT message, recording why it is ignored when the topic is traced.
+
+        received is the monotonic time a live message arrived, the time its device was last seen.
+        """
+        log_debug = _LOGGER.debug
         parsed_topic = ParsedTopic.from_topic(topic)
         if parsed_topic is None:
-            log_debug("Ignoring message - could not parse topic: %s", topic)
+            if traced:
+                self._trace.record(TraceEvent.IGNORED, topic, "could not parse topic")
             return
 
-        fallback_to_metric_topic: bool = False
-        desc_list = self.topic_map.get(parsed_topic.wildcards_with_device_type)
-        if desc_list is None:
-            desc_list = self.topic_map.get(parsed_topic.wildcards_without_device_type)
-        if desc_list is None:
-            desc_list = self.fallback_map.get(parsed_topic.wildcards_with_device_type)
-            if desc_list is not None:
-                fallback_to_metric_topic = True
-        if desc_list is None:
-            desc_list = self.fallback_map.get(parsed_topic.wildcards_without_device_type)
-            if desc_list is not None:
-                fallback_to_metric_topic = True
-        if desc_list is None:
-            # Fallback for sub-device descriptors (e.g., SwitchableOutput/{output}) where
-            # the segment right after the sub-device prefix is free text.
-            # Try every possible split position in the incoming topic as a (prefix, suffix) key.
-            device_pattern_map = self.sub_device_topic_patterns.get(parsed_topic.device_type)
-            if device_pattern_map:
-                topic_parts = parsed_topic.full_topic.split("/")
-                topic_parts[1] = "{installation_id}"
-                topic_parts[3] = "{device_id}"
-                for sub_device_idx, by_pattern in device_pattern_map.items():
-                    if sub_device_idx >= len(topic_parts):
-                        continue
-                    prefix = "/".join(topic_parts[:sub_device_idx])
-                    suffix = "/".join(topic_parts[sub_device_idx + 1 :])
-                    candidates = by_pattern.get((prefix, suffix))
-                    if candidates is not None:
-                        desc_list = candidates
-                        break
+        desc_list, fallback_to_metric_topic = self._lookup_descriptors(parsed_topic)
         if desc_list is None:
-            log_debug("Ignoring message - no descriptor found for topic: %s", topic)
+            if traced:
+                self._trace.record(TraceEvent.IGNORED, topic, "no descriptor")
             return
         desc = desc_list[0] if len(desc_list) == 1 else parsed_topic.match_from_list(desc_list)
         if desc is None:
-            log_debug("Ignoring message - no matching descriptor found for list of topic: %s", topic)
+            if traced:
+                self._trace.record(TraceEvent.IGNORED, topic, "no matching descriptor")
             return
 
         device = self._get_or_create_device(parsed_topic, desc)
+        if received:
+            Hub._mark_seen(device, received)
         placeholder = device.handle_message(fallback_to_metric_topic, topic, parsed_topic, desc, payload, log_debug)
+        if placeholder is not None:
+            self._store_placeholder(device, placeholder, log_debug)
+        elif desc.message_type is MetricKind.ATTRIBUTE and device.unique_id in self._settling_devices:
+            self._settling_devices[device.unique_id] = time.monotonic()
+
+    def _lookup_descriptors(self, parsed_topic: ParsedTopic) -> tuple[list[TopicDescriptor] | None, bool]:
+        """Return the descriptors matching a topic, and whether they were found as adjustable fallbacks."""
+        desc_list = self.topic_map.get(parsed_topic.wildcards_with_device_type)
+        if desc_list is None:
+            desc_list = self.topic_map.get(parsed_topic.wildcards_without_device_type)
+        if desc_list is not None:
+            return desc_list, False
+        desc_list = self.fallback_map.get(parsed_topic.wildcards_with_device_type)
+        if desc_list is None:
+            desc_list = self.fallback_map.get(parsed_topic.wildcards_without_device_type)
+        if desc_list is not None:
+            return desc_list, True
+        # Fallback for sub-device descriptors (e.g., SwitchableOutput/{output}) where
+        # the segment right after the sub-device prefix is free text.
+        # Try every possible split position in the incoming topic as a (prefix, suffix) key.
+        device_pattern_map = self.sub_device_topic_patterns.get(parsed_topic.device_type)
+        if not device_pattern_map:
+            return None, False
+        topic_parts = parsed_topic.full_topic.split("/")
+        topic_parts[1] = "{installation_id}"
+        topic_parts[3] = "{device_id}"
+        for sub_device_idx, by_pattern in device_pattern_map.items():
+            if sub_device_idx >= len(topic_parts):
+                continue
+            prefix = "/".join(topic_parts[:sub_device_idx])
+            suffix = "/".join(topic_parts[sub_device_idx + 1 :])
+            candidates = by_pattern.get((prefix, suffix))
+            if candidates is not None:
+                return candidates, False
+        return None, False
+
+    @staticmethod
+    def _mark_seen(device: Device, received: float) -> None:
+        """Record when a device last published, making it available again if it was not."""
+        device._last_seen = received
+        if not device._available:
+            device._available = True
+            _LOGGER.info("Device %s publishes again", device.unique_id)
+
+    def _store_placeholder(
+        self, device: Device, placeholder: MetricPlaceholder | FallbackPlaceholder, log_debug: Callable[..., None]
+    ) -> None:
+        """Keep the placeholder of a new topic until its metric is created."""
         if isinstance(placeholder, MetricPlaceholder):
             existing_placeholder = self._metrics_placeholders.get(placeholder.parsed_topic.unique_id)
             if existing_placeholder:
                 log_debug("Replacing existing metric placeholder: %s", existing_placeholder)
             self._metrics_placeholders[placeholder.parsed_topic.unique_id] = placeholder
-        elif isinstance(placeholder, FallbackPlaceholder):
-            existing_fallback = self._fallback_placeholders.get(placeholder.parsed_topic.unique_id)
-            if existing_fallback:
-                log_debug("Replacing existing fallback placeholder: %s", existing_fallback)
-            self._fallback_placeholders[placeholder.parsed_topic.unique_id] = placeholder
+            if self._metric_settle_seconds is not None and not self._first_full_publish:
+                self._stage_placeholder(placeholder)
+            return
+        existing_fallback = self._fallback_placeholders.get(placeholder.parsed_topic.unique_id)
+        if existing_fallback:
+            log_debug("Replacing existing fallback placeholder: %s", existing_fallback)
+        self._fallback_placeholders[placeholder.parsed_topic.unique_id] = placeholder
+        if device.unique_id in self._settling_devices:
+            self._settling_devices[device.unique_id] = time.monotonic()
+
+    def _stage_placeholder(self, placeholder: MetricPlaceholder) -> None:
+        """Create the metric of a placeholder received after the first full publish once it can be.
+
+        Right away when its device was announced and nothing it depends on is missing,
+        otherwise once its device settled. A placeholder missing a dependency is also
+        indexed by it, so it is created as soon as the dependency is.
+        """
+        unique_id = placeholder.parsed_topic.unique_id
+        device_id = placeholder.device.unique_id
+        missing = [
+            dependency_id
+            for dependency_id in self._regular_dependency_ids(placeholder)
+            if dependency_id not in self._all_metrics
+        ]
+        for dependency_id in missing:
+            self._placeholders_by_dependency.setdefault(dependency_id, []).append(unique_id)
+        if (
+            not missing
+            and device_id in self._notified_device_ids
+            and device_id not in self._settling_devices
+            and (not placeholder.topic_descriptor.is_adjustable_suffix or unique_id in self._fallback_placeholders)
+        ):
+            self._create_pending_metrics([unique_id])
+            return
+        self._staged_placeholders.setdefault(device_id, []).append(unique_id)
+        self._settling_devices[device_id] = time.monotonic()
+
+    def _create_settled_metrics(self, now: float) -> None:
+        """Create the staged metrics of the devices that sent no new topic for the settle time."""
+        assert self._metric_settle_seconds is not None
+        oldest = now - self._metric_settle_seconds
+        settled = [device_id for device_id, last_change in self._settling_devices.items() if last_change <= oldest]
+        if not settled:
+            return
+        unique_ids: list[str] = []
+        for device_id in settled:
+            del self._settling_devices[device_id]
+            unique_ids.extend(self._staged_placeholders.pop(device_id, ()))
+        _LOGGER.info("Creating the metrics of %d new topics of settled devices: %s", len(unique_ids), settled)
+        self._create_pending_metrics(unique_ids)
 
     async def disconnect(self) -> None:
         """Disconnect from the hub."""
         _LOGGER.info("Disconnecting from MQTT broker")
         self._stop_keepalive_loop()
+        self._stop_load_probe()
+        if self._forced_keepalive_task is not None:
+            self._forced_keepalive_task.cancel()
+            self._forced_keepalive_task = None
+        if self._write_scheduler is not None:
+            # Do not lose the latest value of a slider released just before
+            self._write_scheduler.flush()
         await asyncio.sleep(0.1)
         self._client.disconnect()
         self._client.loop_stop()  # stop the background thread started by loop_start()
         _LOGGER.info("Disconnected from MQTT broker")
         # Give a small delay to allow any pending MQTT messages to be processed
         await asyncio.sleep(0.1)
+        if self._optimistic_writes:
+            # No report can end them anymore
+            for metric in self._all_metrics.values():
+                if isinstance(metric, WritableMetric):
+                    metric._drop_optimistic()
 
     def _keepalive(self, force: bool = False) -> None:
         """Send a keep alive message to the hub. Updates will only be made to the metrics
@@ -918,17 +1412,105 @@ class Hub:
 
     def _publish(self, topic: str, value: PayloadType) -> None:
         assert self._client is not None
-        # Determine log level based on the substring
-        is_info_level = self._topic_log_info and self._topic_log_info in topic
-        log_debug = _LOGGER.info if is_info_level else _LOGGER.debug
-
+        if self._topic_log_info and self._topic_log_info in topic:
+            self._trace.record(TraceEvent.PUBLISHED, topic, value)
         prefixed_topic = self._add_topic_prefix(topic)
-        log_debug("Publishing message to topic: %s, value: %s", prefixed_topic, value)
         self._client.publish(prefixed_topic, value)
 
+    def _write(self, topic: str, payload: str, value: Any, immediate: bool) -> None:
+        """Publish a write, coalesced with the other writes to its topic unless immediate."""
+        if self._write_scheduler is None:
+            self._publish(topic, payload)
+        else:
+            self._write_scheduler.submit(topic, payload, value, immediate)
+
+    async def _write_and_confirm(
+        self, topic: str, payload: str, value: Any, immediate: bool, timeout: float, tolerance: float
+    ) -> None:
+        """Write and wait until the N/ topic reports the value written."""
+        waiter = self._add_write_waiter(topic, payload, tolerance)
+        try:
+            self._write(topic, payload, value, immediate)
+        except Exception:
+            self._remove_write_waiter(waiter)
+            raise
+        await self._wait_for_write(waiter, timeout)
+
+    def _add_write_waiter(self, topic: str, payload: str, tolerance: float) -> WriteWaiter:
+        """Start waiting for the N/ echo of a write, before it is published."""
+        assert self._loop is not None, "connect() must be awaited before writing"
+        state_topic = "N" + topic[1:]
+        waiter = WriteWaiter(state_topic, self._loop.create_future(), json.loads(payload).get("value"), tolerance)
+        self._write_waiters.setdefault(state_topic, []).append(waiter)
+        return waiter
+
+    async def _wait_for_write(self, waiter: WriteWaiter, timeout: float) -> None:
+        """Wait until the write is confirmed.
+
+        A write is also confirmed by the value of a later write to the same topic, which
+        superseded it (e.g. coalesced away while a slider was dragged).
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter.future
+        except TimeoutError:
+            if waiter.has_reported:
+                raise WriteMismatchError(
+                    f"{waiter.topic} reported {waiter.reported} instead of {waiter.expected}", waiter.reported
+                ) from None
+            raise WriteTimeoutError(f"{waiter.topic} did not report a value within {timeout}s") from None
+        finally:
+            self._remove_write_waiter(waiter)
+
+    def _remove_write_waiter(self, waiter: WriteWaiter) -> None:
+        waiters = self._write_waiters.get(waiter.topic)
+        if waiters is None:
+            return
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            del self._write_waiters[waiter.topic]
+
+    def _confirm_writes(self, topic: str, payload: str) -> None:
+        """Complete the writes confirmed by a value reported on their N/ topic."""
+        waiters = self._write_waiters.get(topic)
+        if not waiters:
+            return
+        try:
+            reported = json.loads(payload).get("value")
+        except (ValueError, AttributeError):
+            return
+        confirmed = next((index for index, waiter in enumerate(waiters) if waiter.matches(reported)), -1)
+        for index, waiter in enumerate(waiters):
+            if index <= confirmed:
+                # Earlier writes were superseded by the one confirmed
+                if not waiter.future.done():
+                    waiter.future.set_result(None)
+            else:
+                waiter.reported = reported
+        del waiters[: confirmed + 1]
+
     async def _keepalive_loop(self) -> None:
-        """Run keepalive every 30 seconds."""
+        """Run keepalive about every 30 seconds, scheduled with the other hubs of the process."""
         _LOGGER.info("Starting keepalive loop")
+        scheduler = self._keepalive_scheduler
+        phase_offset = scheduler.register(self)
+        try:
+            try:
+                await self._forced_keepalive()
+            except Exception as exc:
+                _LOGGER.exception("Error sending forced keepalive: %s", exc)
+            # Shift the following keepalives away from those of the other hubs
+            await asyncio.sleep(phase_offset)
+            await self._run_keepalives()
+        except asyncio.CancelledError:
+            _LOGGER.info("Keepalive loop canceled")
+            raise
+        finally:
+            scheduler.unregister(self)
+
+    async def _run_keepalives(self) -> None:
+        """Send the periodic keepalives and run the metric maintenance tied to them."""
         count = 0
         while True:
             try:
@@ -939,7 +1521,7 @@ class Hub:
                     self._keepalive()
                 except Exception as exc:
                     _LOGGER.exception("Error sending keepalive: %s", exc)
-                await asyncio.sleep(30)
+                await asyncio.sleep(self._keepalive_scheduler.next_delay())
                 # Old firmwars dont resend values after the keepalive message so we cant use this logic of invalidation if there is no new value
                 if self._firmware_version >= MINIMUM_FULLY_SUPPORTED_VERSION:
                     # We should keep alive all metrics every 60 seconds
@@ -950,15 +1532,22 @@ class Hub:
                             self._keepalive_metrics(stale_timeout=STALE_METRIC_TIMEOUT_SECONDS)
                         except Exception as exc:
                             _LOGGER.exception("Error keeping alive metrics: %s", exc)
-                    # Periodically force a full republish so the broker re-sends every current
-                    # value, refreshing last_seen for constant metrics that would otherwise look stale.
-                    if count % FULL_REPUBLISH_STALENESS_INTERVAL_CYCLES == 0:
+                        # Ask for the values of constant metrics before they look stale.
                         try:
-                            self._keepalive(force=True)
+                            await self._refresh_stale_metrics()
+                        except Exception as exc:
+                            _LOGGER.exception("Error refreshing stale metrics: %s", exc)
+                    # Brokers not answering read requests get a periodic forced full republish
+                    # instead, so they re-send every current value.
+                    if (
+                        self._read_requests_supported is False
+                        and count % FULL_REPUBLISH_STALENESS_INTERVAL_CYCLES == 0
+                    ):
+                        try:
+                            await self._forced_keepalive()
                         except Exception as exc:
                             _LOGGER.exception("Error sending forced keepalive: %s", exc)
             except asyncio.CancelledError:
-                _LOGGER.info("Keepalive loop canceled")
                 raise
             except Exception as exc:
                 _LOGGER.exception("Error in keepalive loop: %s", exc)
@@ -967,13 +1556,99 @@ class Hub:
     def _keepalive_metrics(self, force_invalidate: bool = False, stale_timeout: float | None = None) -> None:
         """Keep alive all metrics."""
         _LOGGER.debug("Keeping alive all metrics")
-        for metric in self._all_metrics.values():
-            # Determine log level based on the substring
-            is_info_level = self._topic_log_info and self._topic_log_info in metric._descriptor.topic
-            log_debug = _LOGGER.info if is_info_level else _LOGGER.debug
-
+        if stale_timeout is not None and not force_invalidate:
+            self._invalidate_silent_devices(time.monotonic(), stale_timeout)
+        metrics: Iterable[Metric] = self._all_metrics.values()
+        if self._value_store is not None and not force_invalidate:
+            # The others are up to date, nothing to do for them
+            metrics = self._value_store.keepalive_candidates(time.monotonic(), stale_timeout)
+        log_debug = _LOGGER.debug
+        for metric in metrics:
             metric._keepalive(force_invalidate, log_debug, stale_timeout=stale_timeout)
 
+    def _invalidate_silent_devices(self, now: float, default_timeout: float) -> None:
+        """Make all the metrics of each device silent for longer than its timeout unavailable at once.
+
+        The metrics of a silent device are left out of the per metric staleness check, which
+        only catches the metrics silent while the rest of their device keeps publishing.
+        """
+        log_debug = _LOGGER.debug
+        for device in list(self._devices.values()):
+            # Devices never seen live (e.g. restored and not confirmed yet) have nothing to invalidate
+            if not device._available or not device._last_seen:
+                continue
+            silence = now - device._last_seen
+            if silence <= self._device_timeouts.get(device.device_type, default_timeout):
+                continue
+            device._available = False
+            _LOGGER.info(
+                "Device %s silent for %.0f seconds, marking its metrics unavailable", device.unique_id, silence
+            )
+            for metric in list(device._metrics.values()):
+                metric._keepalive(True, log_debug)
+            if callable(self._on_device_unavailable):
+                self._schedule_threadsafe(self._on_device_unavailable, self, device)
+
+    async def _forced_keepalive(self) -> None:
+        """Send a forced keepalive once no other hub of the process runs a full publish."""
+        await self._keepalive_scheduler.acquire_full_publish(self)
+        self._keepalive(force=True)
+
+    async def _refresh_stale_metrics(self) -> None:
+        """Send read requests for the metrics about to turn stale, in rate-limited batches."""
+        await self._check_read_requests_answered()
+        if self._read_requests_supported is False or not self._client.is_connected():
+            return
+        now = time.monotonic()
+        stale: dict[str, Metric] = {}
+        metrics: Iterable[Metric] = list(self._all_metrics.values())
+        if self._value_store is not None:
+            metrics = self._value_store.silent_since(now - STALE_REFRESH_AFTER_SECONDS)
+        for metric in metrics:
+            read_topic = metric._read_topic
+            if (
+                read_topic is not None
+                and metric._value is not None
+                and now - metric._last_seen > STALE_REFRESH_AFTER_SECONDS
+            ):
+                stale.setdefault(read_topic, metric)
+                if len(stale) >= READ_REQUESTS_PER_SWEEP:
+                    break
+        if not stale:
+            return
+        _LOGGER.debug("Requesting %d values about to turn stale", len(stale))
+        if self._read_requests_supported is None:
+            # Only metrics of devices still publishing can tell whether the broker answers
+            self._pending_reads = [
+                metric
+                for metric in stale.values()
+                if now - metric._device._last_seen <= STALE_REFRESH_AFTER_SECONDS
+            ]
+            self._reads_requested_at = now
+        read_topics = list(stale)
+        for start in range(0, len(read_topics), READ_REQUEST_BATCH_SIZE):
+            if start:
+                await asyncio.sleep(READ_REQUEST_BATCH_INTERVAL_SECONDS)
+            for read_topic in read_topics[start : start + READ_REQUEST_BATCH_SIZE]:
+                self._publish(read_topic, "")
+
+    async def _check_read_requests_answered(self) -> None:
+        """Decide from the first read requests whether the broker answers them.
+
+        Older firmware ignores them; the hub then falls back to a periodic forced full
+        republish, starting right away so the requested metrics do not turn stale.
+        """
+        if self._read_requests_supported is not None or not self._pending_reads:
+            return
+        if any(metric._last_seen >= self._reads_requested_at for metric in self._pending_reads):
+            _LOGGER.info("Broker answers read requests, using them to refresh metrics about to turn stale")
+            self._read_requests_supported = True
+        else:
+            _LOGGER.warning("Broker does not answer read requests, falling back to periodic full republish")
+            self._read_requests_supported = False
+            await self._forced_keepalive()
+        self._pending_reads = []
+
     def _start_keep_alive_loop(self) -> None:
         """Start the keep_alive loop."""
         _LOGGER.info("Creating keepalive task")
@@ -989,6 +1664,505 @@ class Hub:
             self._keepalive_task.cancel()
             self._keepalive_task = None
 
+    async def _load_probe_loop(self) -> None:
+        """Measure how late the event loop runs a timer and let the load shedder react."""
+        assert self._load_shedder is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LOAD_PROBE_INTERVAL_SECONDS
+            await asyncio.sleep(LOAD_PROBE_INTERVAL_SECONDS)
+            try:
+                self._load_shedder.probe(max(0.0, loop.time() - expected))
+            except Exception as exc:
+                _LOGGER.exception("Error in load probe: %s", exc)
+
+    def _start_load_probe(self) -> None:
+        """Start the load probe, if load shedding is enabled."""
+        if self._load_shedder is None:
+            return
+        if self._load_probe_task is None or self._load_probe_task.done():
+            self._load_probe_task = asyncio.create_task(self._load_probe_loop())
+
+    def _stop_load_probe(self) -> None:
+        """Stop the load probe."""
+        if self._load_probe_task is not None:
+            self._load_probe_task.cancel()
+            self._load_probe_task = None
+
+    def _queue_update(self, callback: CallbackOnUpdate, metric: Metric, value: Any) -> None:
+        """Queue an on_update callback of a normal or low priority metric, from any thread."""
+        pending = self._pending_updates
+        pending.append((callback, metric, value))
+        shedder = self._load_shedder
+        if shedder is not None and len(pending) > shedder.backlog_high:
+            shedder.on_backlog_high()
+        if not self._drain_scheduled:
+            assert self._loop is not None
+            self._drain_scheduled = True
+            self._loop.call_soon_threadsafe(self._drain_updates)
+
+    def _drain_updates(self) -> None:
+        """Run a batch of queued on_update callbacks and schedule the next one.
+
+        Whatever was scheduled on the loop meanwhile, high priority callbacks included,
+        runs before the next batch.
+        """
+        # Cleared first: an update queued from the MQTT thread from now on schedules its own drain
+        self._drain_scheduled = False
+        pending = self._pending_updates
+        for _ in range(min(len(pending), NOTIFICATION_BATCH_SIZE)):
+            callback, metric, value = pending.popleft()
+            try:
+                callback(metric, value)
+            except Exception as exc:
+                _LOGGER.exception("Error in on_update callback for %s: %s", metric.unique_id, exc)
+        if pending and not self._drain_scheduled:
+            assert self._loop is not None
+            self._drain_scheduled = True
+            self._loop.call_soon(self._drain_updates)
+
+    def _apply_load_shedding(self, factor: int) -> None:
+        """Stretch the update interval of the low priority metrics by factor."""
+        # May run on the MQTT thread while the event loop adds metrics
+        for metric in list(self._all_metrics.values()):
+            metric._apply_load_shedding(factor)
+
+    @property
+    def load_shedding_stats(self) -> LoadSheddingStats | None:
+        """Return the load shedding state, or None when load shedding is disabled."""
+        if self._load_shedder is None:
+            return None
+        return self._load_shedder.stats()
+
+    @property
+    def history_stats(self) -> HistoryStats:
+        """Return the number of metrics keeping a history and the memory their samples hold."""
+        metrics = samples = capacity = size = 0
+        for metric in self._all_metrics.values():
+            history = metric._history  # pylint: disable=protected-access
+            if history is not None:
+                metrics += 1
+                samples += len(history)
+                capacity += history.capacity
+                size += history.nbytes
+        return HistoryStats(metrics=metrics, samples=samples, capacity=capacity, bytes=size)
+
+    def memory_report(self, sample_size: int = MEMORY_REPORT_SAMPLE_SIZE) -> MemoryReport:
+        """Estimate the memory held by the hub, by group of objects.
+
+        Every object is counted once, in the first group it is reached from. The groups
+        of many alike objects are deep sized from at most sample_size of them and
+        extrapolated, so the report is cheap enough to be taken periodically, e.g. to
+        watch for leaks.
+
+        Parameters
+        ----------
+        sample_size : int
+            Number of objects deep sized per group.
+
+        Returns
+        -------
+        MemoryReport
+            The estimated size and number of objects of each group, and their total.
+
+        """
+        if sample_size <= 0:
+            raise ValueError("sample_size must be a positive number")
+        own_types: tuple[type, ...] = (Hub, Device, Metric, MetricPlaceholder, FallbackPlaceholder)
+        sizer = MemorySizer((*own_types, TopicDescriptor), sample_size)
+        groups: dict[str, MemoryUsage] = {}
+
+        # The tables first, so the metrics keeping the descriptor of their topic as is do not count it
+        tables: list[Any] = [
+            self.topic_map,
+            self.fallback_map,
+            self.sub_device_topic_patterns,
+            self._service_active_topics,
+            self._pending_formula_topics,
+        ]
+        descriptors: dict[int, TopicDescriptor] = {}
+        for table in (self.topic_map, self.fallback_map):
+            for desc_list in list(table.values()):
+                descriptors.update((id(desc), desc) for desc in desc_list)
+        for device_pattern_map in self.sub_device_topic_patterns.values():
+            for by_pattern in device_pattern_map.values():
+                for desc_list in by_pattern.values():
+                    descriptors.update((id(desc), desc) for desc in desc_list)
+        descriptors.update((id(desc), desc) for desc in self._service_active_topics.values())
+        descriptors.update((id(desc), desc) for desc in self._pending_formula_topics)
+        tables_size = sum(sizer.sizeof(table) for table in tables)
+        usage = sizer.usage(list(descriptors.values()), own_types)
+        groups["topic_tables"] = replace(usage, bytes=tables_size + usage.bytes)
+
+        groups["devices"] = sizer.usage(list(self._devices.values()))
+        metrics = list(self._all_metrics.values())
+        by_class: dict[str, list[Metric]] = {}
+        for metric in metrics:
+            by_class.setdefault(type(metric).__name__, []).append(metric)
+        for class_name, class_metrics in sorted(by_class.items()):
+            groups[f"metrics.{class_name}"] = sizer.usage(class_metrics)
+        # Descriptors copied for a metric, e.g. an adjustable topic made read-only
+        copies = {id(metric._descriptor): metric._descriptor for metric in metrics}
+        groups["descriptor_copies"] = sizer.usage(
+            [desc for desc_id, desc in copies.items() if desc_id not in descriptors], own_types
+        )
+        groups["placeholders"] = sizer.usage(
+            [*self._metrics_placeholders.values(), *self._fallback_placeholders.values()]
+        )
+        groups["structure"] = sizer.mapping_usage(self._structure_messages)
+        groups["snapshot"] = sizer.mapping_usage(self._snapshot)
+        caches: list[Any] = [
+            self._traced_topics,
+            self._visible_device_ids,
+            self._visible_devices,
+            self._notified_device_ids,
+            self._staged_placeholders,
+            self._settling_devices,
+            self._placeholders_by_dependency,
+            self._structure_fallbacks,
+            self._pending_updates,
+            self._write_waiters,
+        ]
+        # The indexes of the metrics and devices hold the unique ids they keep anyway
+        indexes_size = sizer.shallow_sizeof(self._all_metrics) + sizer.shallow_sizeof(self._devices)
+        groups["caches"] = MemoryUsage(
+            count=len(caches) + 2,
+            sampled=len(caches) + 2,
+            bytes=indexes_size + sum(sizer.sizeof(cache) for cache in caches),
+        )
+        groups["trace"] = MemoryUsage(count=len(self._trace), sampled=len(self._trace), bytes=sizer.sizeof(self._trace))
+        if self._value_store is not None:
+            groups["value_store"] = MemoryUsage(
+                count=len(metrics), sampled=len(metrics), bytes=sizer.sizeof(self._value_store)
+            )
+        return MemoryReport(groups=groups, total_bytes=sum(usage.bytes for usage in groups.values()))
+
+    @property
+    def write_stats(self) -> WriteStats | None:
+        """Return the write coalescing state, or None when every write is published."""
+        if self._write_scheduler is None:
+            return None
+        return self._write_scheduler.stats()
+
+    def export_values(self) -> dict[str, float]:
+        """Return the current value of every metric with a numeric value, by unique id."""
+        if self._value_store is not None:
+            return self._value_store.numeric_values()
+        return {
+            unique_id: metric._value
+            for unique_id, metric in self._all_metrics.items()
+            if isinstance(metric._value, float | int) and not isinstance(metric._value, bool)
+        }
+
+    def export_structure(self) -> dict[str, Any]:
+        """Return the discovered devices and metrics as JSON-serializable data.
+
+        The result holds the messages that shaped the structure (device attributes,
+        adjustable fallbacks and the first message of every metric) and can be
+        passed to `restore_structure()` on a later start.
+        """
+        messages: list[list[str]] = []
+        for device in self._devices.values():
+            messages.extend([topic, payload] for topic, payload in device._attribute_messages.items())
+        messages.extend([topic, payload] for topic, payload in self._structure_fallbacks.values())
+        messages.extend([topic, payload] for topic, payload in self._structure_messages.values())
+        return {
+            "version": STRUCTURE_FORMAT_VERSION,
+            "installation_id": self._installation_id,
+            "messages": messages,
+        }
+
+    async def restore_structure(self, structure: dict[str, Any]) -> int:
+        """Recreate devices and metrics from `export_structure()` data before connecting.
+
+        Restored metrics are announced through `on_new_metrics` (or `on_new_metric`)
+        before this returns but have no value, so they look unavailable until live
+        data arrives. Restored metrics the broker does not publish any more stay
+        unavailable, a device may only be offline for a while.
+
+        Parameters
+        ----------
+        structure : dict[str, Any]
+            Data previously returned by `export_structure()`.
+
+        Returns
+        -------
+        int
+            The number of restored metrics, 0 if the data was not usable.
+
+        Raises
+        ------
+        ProgrammingError
+            If metrics were already discovered.
+
+        """
+        if self._all_metrics:
+            raise ProgrammingError("restore_structure() must be called before any metric is discovered")
+        if structure.get("version") != STRUCTURE_FORMAT_VERSION:
+            _LOGGER.info("Ignoring structure with unsupported version: %s", structure.get("version"))
+            return 0
+        installation_id = structure.get("installation_id")
+        if installation_id is None or (
+            self._expected_installation_id is not None and installation_id != self._expected_installation_id
+        ):
+            _LOGGER.info("Ignoring structure of installation %s", installation_id)
+            return 0
+        self._loop = asyncio.get_running_loop()
+        # Known while the callbacks run; connect() discovers it again from the broker.
+        self._installation_id = installation_id
+        for topic, payload in structure.get("messages", []):
+            self._handle_normal_message(topic, payload)
+        restored = self._create_pending_metrics()
+        for _device, metric in restored:
+            # The cached values were only needed to resolve names and ranges.
+            metric._clear_value()
+        _LOGGER.info("Restored %d metrics on %d devices", len(restored), len(self._devices))
+        # Let the scheduled on_new_device / on_new_metrics callbacks run.
+        await asyncio.sleep(0)
+        return len(restored)
+
+    def _evict_vanished_devices(self, now: float) -> None:
+        """Forget the devices silent for longer than the retention, with everything kept for them."""
+        assert self._device_retention_seconds is not None
+        # After (re)connecting, give every device a full publish to show it is still there
+        if not self._connected_at or now - self._connected_at < FULL_PUBLISH_MIN_INTERVAL_SECONDS:
+            return
+        horizon = now - self._device_retention_seconds
+        vanished = [device for device in self._devices.values() if 0 < device._last_seen < horizon]
+        if not vanished:
+            return
+        vanished_ids = {device.unique_id for device in vanished}
+        # The parent of sub-devices gets no message of its own, it goes with its last sub-device
+        parent_ids = {
+            device._parent_device.unique_id
+            for device in self._devices.values()
+            if device._parent_device is not None and device.unique_id not in vanished_ids
+        }
+        vanished.extend(
+            device
+            for device in self._devices.values()
+            if not device._last_seen and not device._metrics and device.unique_id not in parent_ids
+        )
+        _LOGGER.info(
+            "Evicting %d devices silent for more than %.0f seconds: %s",
+            len(vanished),
+            self._device_retention_seconds,
+            [device.unique_id for device in vanished],
+        )
+        for device in vanished:
+            self._evict_device(device)
+        self._traced_topics.clear()
+
+    def _evict_device(self, device: Device) -> None:
+        """Remove a device, its metrics and placeholders, then notify on_device_removed."""
+        for metric in list(device._metrics.values()):
+            # A formula may already be gone together with a dependency.
+            if metric.unique_id in self._all_metrics:
+                self._remove_metric(metric, notify=False)
+            if self._write_scheduler is not None and isinstance(metric, WritableMetric) and metric._write_topic:
+                # Its timers live on the event loop
+                self._schedule_threadsafe(self._write_scheduler.forget, metric._write_topic)
+        device_id = device.unique_id
+        del self._devices[device_id]
+        self._notified_device_ids.discard(device_id)
+        self._settling_devices.pop(device_id, None)
+        self._staged_placeholders.pop(device_id, None)
+        for placeholders in (self._metrics_placeholders, self._fallback_placeholders):
+            for unique_id in [unique_id for unique_id, p in placeholders.items() if p.device is device]:
+                del placeholders[unique_id]
+        for dependency_id, waiting in list(self._placeholders_by_dependency.items()):
+            waiting[:] = [unique_id for unique_id in waiting if unique_id in self._metrics_placeholders]
+            if not waiting:
+                del self._placeholders_by_dependency[dependency_id]
+        if device._parent_device is not None:
+            Device._topology_version += 1
+        if callable(self._on_device_removed):
+            self._schedule_threadsafe(self._on_device_removed, self, device)
+
+    def _add_metric(self, metric: Metric) -> None:
+        """Register a new metric, replacing any metric of the same unique id."""
+        previous = self._all_metrics.get(metric.unique_id)
+        self._all_metrics[metric.unique_id] = metric
+        self._update_device_visibility(metric._device)
+        store = self._value_store
+        if store is not None:
+            if previous is not None:
+                store.remove(previous)
+            store.add(metric)
+
+    def _update_device_visibility(self, device: Device) -> None:
+        """Track whether the device has a visible metric, after one was added or removed."""
+        if device.has_visible_metrics == (device.unique_id in self._visible_device_ids):
+            return
+        if device.has_visible_metrics:
+            self._visible_device_ids.add(device.unique_id)
+        else:
+            self._visible_device_ids.discard(device.unique_id)
+        self._visible_devices_version += 1
+
+    def _remove_metric(self, metric: Metric, notify: bool = True) -> None:
+        """Forget a metric, its dependency links and dependent formulas, then notify on_metric_removed if asked."""
+        metric.on_update = None
+        device = metric._device
+        device._remove_metric(metric.short_id)
+        self._update_device_visibility(device)
+        self._all_metrics.pop(metric.unique_id, None)
+        if self._value_store is not None:
+            self._value_store.remove(metric)
+        self._structure_messages.pop(metric.unique_id, None)
+        self._structure_fallbacks.pop(metric.unique_id, None)
+        if isinstance(metric, FormulaMetric):
+            for dependency in metric._depends_on.values():
+                if metric in dependency._depend_on_me:
+                    dependency._depend_on_me.remove(metric)
+        for formula in list(metric._depend_on_me):
+            if formula.unique_id in self._all_metrics:
+                self._remove_metric(formula, notify)
+        if not notify or metric._descriptor.hidden or not callable(self._on_metric_removed):
+            return
+        self._schedule_threadsafe(self._on_metric_removed, self, device, metric)
+
+    def set_update_frequency(self, update_frequency_seconds: int | Literal["auto", "auto_power_none"] | None) -> None:
+        """Change the update frequency of all current and future metrics without reconnecting.
+
+        Parameters
+        ----------
+        update_frequency_seconds : int | "auto" | "auto_power_none" | None
+            Same meaning as the constructor argument.
+
+        Raises
+        ------
+        ValueError
+            If the value is not a supported update frequency.
+
+        """
+        Hub._validate_update_frequency(update_frequency_seconds)
+        if update_frequency_seconds == self._update_frequency_seconds:
+            return
+        _LOGGER.info(
+            "Changing update frequency from %s to %s", self._update_frequency_seconds, update_frequency_seconds
+        )
+        self._update_frequency_seconds = update_frequency_seconds
+        for metric in self._all_metrics.values():
+            metric._apply_update_frequency(update_frequency_seconds)
+
+    def set_update_aggregation(self, update_aggregation: UpdateAggregation) -> None:
+        """Change the value notified for throttled measurements without reconnecting.
+
+        Parameters
+        ----------
+        update_aggregation : UpdateAggregation
+            Same meaning as the constructor argument.
+
+        Raises
+        ------
+        TypeError
+            If the value is not an UpdateAggregation.
+
+        """
+        Hub._validate_update_aggregation(update_aggregation)
+        if update_aggregation is self._update_aggregation:
+            return
+        _LOGGER.info("Changing update aggregation from %s to %s", self._update_aggregation, update_aggregation)
+        self._update_aggregation = update_aggregation
+        for metric in self._all_metrics.values():
+            metric._apply_aggregation(update_aggregation)
+
+    def set_topic_log_info(self, topic_log_info: str | None) -> None:
+        """Change the substring selecting the traced topics and metrics."""
+        _LOGGER.info("Changing topic_log_info from %s to %s", self._topic_log_info, topic_log_info)
+        self._topic_log_info = topic_log_info
+        self._traced_topics = {}
+        for metric in self._all_metrics.values():
+            metric._traced = self._is_traced(metric)
+
+    def _is_traced(self, metric: Metric) -> bool:
+        """Whether the topic or the unique id of the metric contains the trace filter."""
+        trace_filter = self._topic_log_info
+        if not trace_filter:
+            return False
+        read_topic = metric._read_topic
+        return trace_filter in metric.unique_id or (read_topic is not None and trace_filter in read_topic)
+
+    def dump_trace(self, clear: bool = False) -> list[dict[str, Any]]:
+        """Return the records of the trace buffer, oldest first.
+
+        Parameters
+        ----------
+        clear: bool
+            Forget the records once returned.
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            JSON compatible records with the wall clock "time" (ISO format), the
+            "event" (a TraceEvent name), the "subject" (a topic or a metric unique
+            id) and the "value" (the payload, the value or a reason).
+
+        """
+        records = self._trace.dump()
+        if clear:
+            self._trace.clear()
+        return records
+
+    def set_device_type_exclude_filter(self, device_type_exclude_filter: list[DeviceType] | None) -> None:
+        """Change the excluded device types while connected, adjusting subscriptions incrementally.
+
+        Metrics of newly excluded device types are removed and reported through
+        `on_metric_removed`. Topics of device types that are no longer excluded are
+        subscribed and a full publish is requested so their metrics get discovered.
+        Must be called from the event loop.
+
+        Parameters
+        ----------
+        device_type_exclude_filter : list[DeviceType] | None
+            Same meaning as the constructor argument.
+
+        """
+        old_excluded = set(self._device_type_exclude_filter or [])
+        new_excluded = set(device_type_exclude_filter or [])
+        if old_excluded == new_excluded:
+            return
+        _LOGGER.info(
+            "Changing excluded device types from %s to %s",
+            sorted(dt.code for dt in old_excluded),
+            sorted(dt.code for dt in new_excluded),
+        )
+        old_subscriptions = set(self._resolved_subscription_list)
+        self._device_type_exclude_filter = device_type_exclude_filter
+        self._build_topic_tables()
+
+        newly_excluded = new_excluded - old_excluded
+        if newly_excluded:
+            for unique_id, placeholder in list(self._metrics_placeholders.items()):
+                if placeholder.device.device_type in newly_excluded:
+                    del self._metrics_placeholders[unique_id]
+            for metric in [m for m in self._all_metrics.values() if m._device.device_type in newly_excluded]:
+                # A formula may already be gone together with an excluded dependency.
+                if metric.unique_id in self._all_metrics:
+                    self._remove_metric(metric)
+            for device in self._devices.values():
+                if device.device_type in newly_excluded:
+                    self._notified_device_ids.discard(device.unique_id)
+
+        if self._installation_id is None:
+            # Not connected yet, connect() resolves the new subscription list.
+            return
+        self._resolved_subscription_list = self._resolve_subscription_list()
+        new_subscriptions = set(self._resolved_subscription_list)
+        if not self._client.is_connected():
+            # _on_connect resubscribes with the new list.
+            return
+        for topic in sorted(old_subscriptions - new_subscriptions):
+            self._unsubscribe(topic)
+        added = sorted(new_subscriptions - old_subscriptions)
+        for topic in added:
+            self._subscribe(topic)
+        if added:
+            # Newly subscribed topics only publish on change, ask for everything once, taking
+            # turns with the full publishes of the other hubs.
+            self._forced_keepalive_task = asyncio.create_task(self._forced_keepalive())
+
     async def create_full_raw_snapshot(self) -> dict[str, Any]:
         """Create a full raw snapshot of the current state of the Venus OS device.
         Should not be used in conjunction with initialize_devices_and_metrics()."""
@@ -1041,6 +2215,7 @@ class Hub:
             If provided, subscribe to the specific topic for this installation ID
             instead of the wildcard. Raises InvalidInstallationIdError on timeout
             if the expected ID is not found on the broker.
+
         """
         _LOGGER.info("Reading installation ID (expected=%s)", expected_id)
         if not self._client.is_connected():
@@ -1098,6 +2273,11 @@ class Hub:
             return topic[len(self._topic_prefix) + 1 :]
         return topic
 
+    def _resolve_subscription_list(self) -> list[str]:
+        """Return the subscription list with the installation id filled in."""
+        assert self._installation_id is not None
+        return [topic.replace("{installation_id}", self._installation_id) for topic in self._subscription_list]
+
     def _subscribe(self, topic: str) -> None:
         """Subscribe to a topic with automatic prefix handling."""
         assert self._client is not None
@@ -1116,8 +2296,8 @@ class Hub:
         self._client.unsubscribe(prefixed_topic)
         _LOGGER.debug("Unsubscribed from: %s", prefixed_topic)
 
-    def _setup_subscriptions(self) -> None:
-        """Subscribe to list of topics."""
+    def _setup_subscriptions(self, full_publish: bool = True) -> None:
+        """Subscribe to list of topics, then ask for a full publish unless full_publish is False."""
         if self._first_connect:
             self._first_connect = False
             _LOGGER.info("Installation ID is not set, skipping subscription setup")
@@ -1132,7 +2312,8 @@ class Hub:
         assert self.installation_id is not None
         self._subscribe(f"N/{self.installation_id}/full_publish_completed")
         _LOGGER.info("Subscribed to full_publish_completed notification")
-        self._keepalive(True)
+        if full_publish:
+            self._keepalive(True)
 
     async def _wait_for_connect(self) -> None:
         """Wait for the first connection to complete."""
@@ -1206,9 +2387,18 @@ class Hub:
 
     @property
     def devices(self) -> dict[str, Device]:
-        "Return a list of devices attached to the hub. Requires initialize_devices_and_metrics() to be called first."
-        # Return only devices with at least a single metric
-        return {k: v for k, v in self._devices.items() if v.metrics}
+        """Return the devices attached to the hub with at least a visible metric, by unique id.
+
+        The dict is kept until a device gains its first visible metric or loses its
+        last one, do not modify it.
+        """
+        version, visible = self._visible_devices
+        if version != self._visible_devices_version:
+            version = self._visible_devices_version
+            visible_ids = self._visible_device_ids
+            visible = {k: v for k, v in self._devices.items() if k in visible_ids}
+            self._visible_devices = (version, visible)
+        return visible
 
     @property
     def installation_id(self) -> str | None:
@@ -1287,9 +2477,54 @@ class Hub:
 
     @on_new_metric.setter
     def on_new_metric(self, value: CallbackOnNewMetric | None):
-        """Sets the on_new_metric callback."""
+        """Set the on_new_metric callback."""
         self._on_new_metric = value
 
+    @property
+    def on_new_metrics(self) -> CallbackOnNewMetrics | None:
+        """Returns the on_new_metrics callback.
+
+        When set, it replaces on_new_metric: every full publish that discovered
+        metrics delivers them in one call, as (device, metric) pairs with parent
+        devices first.
+        """
+        return self._on_new_metrics
+
+    @on_new_metrics.setter
+    def on_new_metrics(self, value: CallbackOnNewMetrics | None):
+        """Set the on_new_metrics callback."""
+        self._on_new_metrics = value
+
+    @property
+    def on_metric_removed(self) -> CallbackOnMetricRemoved | None:
+        """Returns the on_metric_removed callback."""
+        return self._on_metric_removed
+
+    @on_metric_removed.setter
+    def on_metric_removed(self, value: CallbackOnMetricRemoved | None):
+        """Set the on_metric_removed callback."""
+        self._on_metric_removed = value
+
+    @property
+    def on_device_unavailable(self) -> CallbackOnDeviceUnavailable | None:
+        """Returns the on_device_unavailable callback, called once when a device stops publishing."""
+        return self._on_device_unavailable
+
+    @on_device_unavailable.setter
+    def on_device_unavailable(self, value: CallbackOnDeviceUnavailable | None):
+        """Set the on_device_unavailable callback."""
+        self._on_device_unavailable = value
+
+    @property
+    def on_device_removed(self) -> CallbackOnDeviceRemoved | None:
+        """Returns the on_device_removed callback, called once a device silent for too long is forgotten."""
+        return self._on_device_removed
+
+    @on_device_removed.setter
+    def on_device_removed(self, value: CallbackOnDeviceRemoved | None):
+        """Set the on_device_removed callback."""
+        self._on_device_removed = value
+
     @property
     def on_new_device(self) -> CallbackOnNewDevice | None:
         """Returns the on_new_device callback."""
@@ -1297,7 +2532,7 @@ class Hub:
 
     @on_new_device.setter
     def on_new_device(self, value: CallbackOnNewDevice | None):
-        """Sets the on_new_device callback."""
+        """Set the on_new_device callback."""
         self._on_new_device = value
 
     def generate_keepalive_options(self, force: bool) -> str:
@@ -1307,6 +2542,20 @@ class Hub:
             return f'{{ "keepalive-options" : [{{"full-publish-completed-echo": "{echo}"}}]}}'
         return f'{{ "keepalive-options" : [{{"full-publish-completed-echo": "{echo}"}}, "suppress-republish"] }}'
 
+    @staticmethod
+    def _validate_update_aggregation(update_aggregation: object) -> None:
+        if not isinstance(update_aggregation, UpdateAggregation):
+            raise TypeError("update_aggregation must be an UpdateAggregation")
+
+    @staticmethod
+    def _validate_update_frequency(update_frequency_seconds: object) -> None:
+        if (
+            update_frequency_seconds is not None
+            and not isinstance(update_frequency_seconds, int)
+            and update_frequency_seconds not in AUTO_UPDATE_INTERVALS
+        ):
+            raise ValueError(f"update_frequency_seconds must be an int, None or one of {sorted(AUTO_UPDATE_INTERVALS)}")
+
     @staticmethod
     def get_keepalive_echo(value: str) -> str | None:
         """Extract the keepalive echo value from the published message."""
@@ -0,0 +1,101 @@
+"""Process-wide scheduling of the keepalives of all hubs."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+
+from .constants import (
+    FULL_PUBLISH_MAX_WAIT_SECONDS,
+    FULL_PUBLISH_SLOT_SECONDS,
+    KEEPALIVE_INTERVAL_SECONDS,
+    KEEPALIVE_JITTER_SECONDS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Fractional part of the golden ratio: the offsets of slots 0, 1, 2... stay well
+# spread over the interval however many hubs come and go.
+_GOLDEN_RATIO_FRACTION = 0.6180339887498949
+_POLL_SECONDS = 0.1
+
+
+class KeepaliveScheduler:
+    """Keep the hubs of a process from sending their keepalives and full publishes together.
+
+    Every hub registered gets a slot with its own phase offset within the keepalive
+    interval, and every interval is jittered. Full publishes (the first keepalive of a
+    connection and forced republishes) take turns: a hub holds the full publish slot until
+    its full publish completed, or for `full_publish_slot_seconds` at most.
+
+    The state is plain attributes read and written on the event loop, except for the
+    release from the MQTT thread, so one scheduler serves any number of event loops.
+    """
+
+    def __init__(
+        self,
+        interval: float = KEEPALIVE_INTERVAL_SECONDS,
+        jitter: float = KEEPALIVE_JITTER_SECONDS,
+        full_publish_slot_seconds: float = FULL_PUBLISH_SLOT_SECONDS,
+        full_publish_max_wait_seconds: float = FULL_PUBLISH_MAX_WAIT_SECONDS,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.interval = interval
+        self.jitter = jitter
+        self.full_publish_slot_seconds = full_publish_slot_seconds
+        self.full_publish_max_wait_seconds = full_publish_max_wait_seconds
+        self._slots: dict[object, int] = {}
+        self._holder: object | None = None
+        self._busy_until = 0.0
+
+    def register(self, hub: object) -> float:
+        """Give the hub the lowest free slot and return its phase offset in seconds."""
+        if hub not in self._slots:
+            taken = set(self._slots.values())
+            self._slots[hub] = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+        return self.phase_offset(self._slots[hub])
+
+    def unregister(self, hub: object) -> None:
+        """Free the slot of the hub, and the full publish slot if it holds it."""
+        self._slots.pop(hub, None)
+        self.release_full_publish(hub)
+
+    def phase_offset(self, slot: int) -> float:
+        """Return the offset of a slot within the keepalive interval."""
+        return self.interval * ((slot * _GOLDEN_RATIO_FRACTION) % 1.0)
+
+    def next_delay(self) -> float:
+        """Return the jittered delay until the next keepalive."""
+        return self.interval + random.uniform(-self.jitter, self.jitter)
+
+    async def acquire_full_publish(self, hub: object) -> None:
+        """Wait until no other hub holds the full publish slot, then take it.
+
+        Gives up waiting after `full_publish_max_wait_seconds`, so the keepalive of the
+        hub still reaches the broker within its keepalive window.
+        """
+        deadline = time.monotonic() + self.full_publish_max_wait_seconds
+        while True:
+            now = time.monotonic()
+            if self._holder is None or self._holder is hub or now >= self._busy_until:
+                break
+            if now >= deadline:
+                _LOGGER.info(
+                    "Full publish slot still taken after %.0fs, not waiting any longer",
+                    self.full_publish_max_wait_seconds,
+                )
+                break
+            await asyncio.sleep(min(_POLL_SECONDS, self._busy_until - now, deadline - now))
+        self._holder = hub
+        self._busy_until = time.monotonic() + self.full_publish_slot_seconds
+
+    def release_full_publish(self, hub: object) -> None:
+        """Hand the full publish slot to the next hub, if this hub holds it."""
+        if self._holder is hub:
+            self._holder = None
+
+
+# Shared by all hubs of the process
+KEEPALIVE_SCHEDULER = KeepaliveScheduler()
@@ -0,0 +1,110 @@
+"""Adaptive load shedding driven by event loop lag and the pending notification backlog."""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .constants import (
+    LOAD_SHEDDING_BACKLOG_HIGH,
+    LOAD_SHEDDING_BACKLOG_LOW,
+    LOAD_SHEDDING_LAG_HIGH_SECONDS,
+    LOAD_SHEDDING_LAG_LOW_SECONDS,
+    LOAD_SHEDDING_MAX_FACTOR,
+    LOAD_SHEDDING_RESTORE_PROBES,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LoadSheddingStats:
+    """Snapshot of the load shedding state of a Hub."""
+
+    active: bool
+    factor: int
+    loop_lag_seconds: float
+    max_loop_lag_seconds: float
+    pending_notifications: int
+    max_pending_notifications: int
+    activations: int
+
+
+class LoadShedder:
+    """Decide how much the update interval of low priority metrics is stretched.
+
+    The backlog is the number of queued on_update callbacks of the hub that did not
+    run yet. A periodic probe reports how late the loop woke it up. High lag or
+    backlog doubles the stretch factor, a series of calm probes halves it again
+    until the intervals are back to normal.
+    """
+
+    def __init__(self, apply_factor: Callable[[int], None], backlog: Callable[[], int]) -> None:
+        """Initialize the shedder, apply_factor is called with every new stretch factor."""
+        self._apply_factor = apply_factor
+        self._backlog = backlog
+        self.factor = 1
+        self.backlog_high = LOAD_SHEDDING_BACKLOG_HIGH
+        self.backlog_low = LOAD_SHEDDING_BACKLOG_LOW
+        self.lag_high = LOAD_SHEDDING_LAG_HIGH_SECONDS
+        self.lag_low = LOAD_SHEDDING_LAG_LOW_SECONDS
+        self._loop_lag = 0.0
+        self._max_loop_lag = 0.0
+        self._max_backlog = 0
+        self._activations = 0
+        self._calm_probes = 0
+
+    @property
+    def backlog(self) -> int:
+        """Number of queued on_update callbacks that did not run yet."""
+        return self._backlog()
+
+    def on_backlog_high(self) -> None:
+        """Start shedding right away when the backlog passes its limit between two probes."""
+        backlog = self.backlog
+        self._max_backlog = max(self._max_backlog, backlog)
+        if self.factor == 1:
+            _LOGGER.warning("Notification backlog of %d, stretching low priority update intervals", backlog)
+            self._set_factor(2)
+
+    def probe(self, loop_lag: float) -> None:
+        """Record a loop lag measurement and adjust the stretch factor."""
+        backlog = self.backlog
+        self._loop_lag = loop_lag
+        self._max_loop_lag = max(self._max_loop_lag, loop_lag)
+        self._max_backlog = max(self._max_backlog, backlog)
+        if loop_lag >= self.lag_high or backlog >= self.backlog_high:
+            self._calm_probes = 0
+            if self.factor < LOAD_SHEDDING_MAX_FACTOR:
+                _LOGGER.info(
+                    "Under load (loop lag %.3fs, backlog %d), stretching low priority update intervals x%d",
+                    loop_lag,
+                    backlog,
+                    self.factor * 2,
+                )
+                self._set_factor(self.factor * 2)
+        elif loop_lag <= self.lag_low and backlog <= self.backlog_low:
+            self._calm_probes += 1
+            if self.factor > 1 and self._calm_probes >= LOAD_SHEDDING_RESTORE_PROBES:
+                self._calm_probes = 0
+                _LOGGER.info("Load decreased, stretching low priority update intervals x%d", self.factor // 2)
+                self._set_factor(self.factor // 2)
+        else:
+            self._calm_probes = 0
+
+    def stats(self) -> LoadSheddingStats:
+        """Return a snapshot of the current state."""
+        return LoadSheddingStats(
+            active=self.factor > 1,
+            factor=self.factor,
+            loop_lag_seconds=self._loop_lag,
+            max_loop_lag_seconds=self._max_loop_lag,
+            pending_notifications=self.backlog,
+            max_pending_notifications=self._max_backlog,
+            activations=self._activations,
+        )
+
+    def _set_factor(self, factor: int) -> None:
+        if self.factor == 1 and factor > 1:
+            self._activations += 1
+        self.factor = factor
+        self._apply_factor(factor)
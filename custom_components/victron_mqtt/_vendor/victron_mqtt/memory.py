@@ -0,0 +1,137 @@
+"""Estimates of the memory held by the objects of a Hub, from sampled deep sizes."""
+
+import sys
+from array import array
+from collections import deque
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from enum import Enum
+from statistics import median
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Any
+
+# Never followed: code, classes and shared singletons do not belong to any group
+_SHARED_TYPES: tuple[type, ...] = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, Enum)
+_LEAF_TYPES: tuple[type, ...] = (str, bytes, int, float, complex, bool, type(None), array)
+
+
+@dataclass(frozen=True)
+class MemoryUsage:
+    """Estimated memory of a group of objects, extrapolated from the ones sampled."""
+
+    count: int
+    sampled: int
+    bytes: int
+
+
+@dataclass(frozen=True)
+class MemoryReport:
+    """Estimated memory held by a Hub, by group of objects."""
+
+    groups: dict[str, MemoryUsage]
+    total_bytes: int
+
+
+class MemorySizer:
+    """Deep size objects with sys.getsizeof, counting every object once across all the groups.
+
+    Objects of the stop types (the hub, devices, metrics...) are sized in their own group
+    only: they are not followed when reached from another object. Sizes are lower bounds,
+    the memory allocator overhead and the objects shared with the rest of the process
+    are left out.
+    """
+
+    def __init__(self, stop_types: tuple[type, ...], sample_size: int) -> None:
+        """Initialize a sizer sampling at most sample_size objects per group."""
+        self._stop_types = stop_types
+        self._sample_size = sample_size
+        self._seen: set[int] = set()
+
+    def sizeof(self, obj: Any, stop_types: tuple[type, ...] | None = None) -> int:
+        """Return the size of obj and of everything it references not counted yet.
+
+        The root object is sized even when of a stop type. stop_types replaces the
+        stop types of the sizer for this call.
+        """
+        stop_types = self._stop_types if stop_types is None else stop_types
+        seen = self._seen
+        size = 0
+        pending = [obj]
+        root = True
+        while pending:
+            item = pending.pop()
+            if id(item) in seen or isinstance(item, _SHARED_TYPES):
+                continue
+            if not root and isinstance(item, stop_types):
+                continue
+            root = False
+            seen.add(id(item))
+            size += sys.getsizeof(item)
+            if isinstance(item, _LEAF_TYPES):
+                continue
+            if isinstance(item, dict):
+                # Copied first, the MQTT thread may change the dict meanwhile
+                pending.extend(list(item.keys()))
+                pending.extend(list(item.values()))
+            elif isinstance(item, list | tuple | set | frozenset | deque):
+                pending.extend(list(item))
+            else:
+                attributes = getattr(item, "__dict__", None)
+                if attributes is not None:
+                    pending.append(attributes)
+                pending.extend(_slot_values(item))
+        return size
+
+    def shallow_sizeof(self, obj: Any) -> int:
+        """Return the size of obj alone, if not counted yet."""
+        if id(obj) in self._seen:
+            return 0
+        self._seen.add(id(obj))
+        return sys.getsizeof(obj)
+
+    def usage(self, objects: Sequence[Any], stop_types: tuple[type, ...] | None = None) -> MemoryUsage:
+        """Estimate the size of a group of objects from evenly spread samples."""
+        count = len(objects)
+        if count == 0:
+            return MemoryUsage(count=0, sampled=0, bytes=0)
+        step = -(-count // self._sample_size)
+        samples = objects[::step]
+        sizes = [self.sizeof(obj, stop_types) for obj in samples]
+        return MemoryUsage(count=count, sampled=len(samples), bytes=_extrapolate(sizes, count))
+
+    def mapping_usage(self, mapping: Mapping[Any, Any]) -> MemoryUsage:
+        """Estimate the size of a dict from its own size and evenly spread samples of its items."""
+        items = list(mapping.items())
+        size = 0
+        if id(mapping) not in self._seen:
+            self._seen.add(id(mapping))
+            size = sys.getsizeof(mapping)
+        count = len(items)
+        if count == 0:
+            return MemoryUsage(count=0, sampled=0, bytes=size)
+        step = -(-count // self._sample_size)
+        samples = items[::step]
+        sizes = [self.sizeof(key) + self.sizeof(value) for key, value in samples]
+        return MemoryUsage(count=count, sampled=len(samples), bytes=size + _extrapolate(sizes, count))
+
+
+def _extrapolate(sizes: list[int], count: int) -> int:
+    """Return the size of count objects, of which those sized.
+
+    The objects shared by the group are counted with the first sample reaching them, so
+    the others are assumed to be of the median size rather than of the mean one.
+    """
+    return sum(sizes) + int(median(sizes)) * (count - len(sizes))
+
+
+def _slot_values(obj: Any) -> list[Any]:
+    """Return the values of the slots of obj, from its whole class hierarchy."""
+    values = []
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        values.extend(
+            value
+            for slot in ((slots,) if isinstance(slots, str) else slots)
+            if slot not in ("__dict__", "__weakref__") and (value := getattr(obj, slot, None)) is not None
+        )
+    return values
@@ -13,13 +13,20 @@ from typing import TYPE_CHECKING, Any
 from .constants import (
     AUTO_UPDATE_INTERVAL_DEFAULT,
     AUTO_UPDATE_INTERVALS,
+    LOAD_SHEDDING_MIN_INTERVAL_SECONDS,
+    Deadband,
+    HistoryPolicy,
     MetricKind,
     MetricNature,
+    MetricPriority,
     MetricType,
+    UpdateAggregation,
     VictronEnum,
 )
 from .data_classes import ParsedTopic, TopicDescriptor
+from .history import MetricHistory
 from .id_utils import replace_complex_ids
+from .trace import TraceEvent
 
 if TYPE_CHECKING:
     import re
@@ -33,6 +40,55 @@ _LOGGER = logging.getLogger(__name__)
 CallbackOnUpdate = Callable[["Metric", Any], None]
 
 
+class _AggregationWindow:
+    """Running time weighted mean, min and max of a numeric metric since its last notification.
+
+    Only the running sums are kept, so the cost per message does not depend on the
+    number of samples in the window.
+    """
+
+    __slots__ = ("area", "last_time", "maximum", "minimum", "start", "value")
+
+    def __init__(self) -> None:
+        self.start: float | None = None
+        self.last_time = 0.0
+        self.area = 0.0
+        self.value: float = 0.0
+        self.minimum: float = 0.0
+        self.maximum: float = 0.0
+
+    def add(self, value: Any, now: float) -> None:
+        """Add a sample, a non numeric value empties the window."""
+        if not isinstance(value, float | int) or isinstance(value, bool):
+            self.start = None
+            return
+        if self.start is None:
+            self.restart(value, now)
+            return
+        # The previous sample held until now
+        self.area += self.value * (now - self.last_time)
+        self.last_time = now
+        self.value = value
+        if value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+
+    def mean(self, now: float) -> float:
+        """Return the time weighted mean of the window up to now."""
+        assert self.start is not None
+        duration = now - self.start
+        if duration <= 0:
+            return self.value
+        return (self.area + self.value * (now - self.last_time)) / duration
+
+    def restart(self, value: float, now: float) -> None:
+        """Start a new window holding the current value."""
+        self.start = self.last_time = now
+        self.area = 0.0
+        self.value = self.minimum = self.maximum = value
+
+
 class Metric:
     """Representation of a Victron Venus sensor."""
 
@@ -45,6 +101,7 @@ class Metric:
         unique_id: str | None = None,
         short_id: str | None = None,
         key_values: dict[str, str] | None = None,
+        topic: str | None = None,
         hub: Hub | None = None,
     ) -> None:
         """Initialize the sensor."""
@@ -72,18 +129,36 @@ class Metric:
         self._on_update: CallbackOnUpdate | None = None
         self._depend_on_me: list[FormulaMetric] = []
         self._hub = hub
+        # Requests the broker to re-send the value, None for metrics not backed by a topic (formulas)
+        self._read_topic: str | None = None
+        if topic is not None:
+            assert topic.startswith("N")
+            self._read_topic = "R" + topic[1:]
         self._last_notified: float = 0
         self._last_seen: float = 0
         self._generic_short_id = self._descriptor.short_id
         self._generic_name = self._descriptor.generic_name
-        frequency = hub._update_frequency_seconds
-        if isinstance(frequency, str):
-            # The only string values Hub accepts are the auto profiles.
-            self._update_interval_seconds: int | None = AUTO_UPDATE_INTERVALS[frequency].get(
-                descriptor.metric_type, AUTO_UPDATE_INTERVAL_DEFAULT
-            )
-        else:
-            self._update_interval_seconds = frequency
+        self._update_interval_seconds: int | None = None
+        # The interval from the hub setting, before load shedding stretched it
+        self._base_update_interval_seconds: int | None = None
+        self._high_priority = descriptor.priority is MetricPriority.HIGH
+        self._aggregation: UpdateAggregation = UpdateAggregation.LAST
+        # Only allocated for throttled measurements when an aggregation other than LAST is selected
+        self._window: _AggregationWindow | None = None
+        self._window_min: float | None = None
+        self._window_max: float | None = None
+        self._apply_update_frequency(hub._update_frequency_seconds)
+        # The value last handed to on_update, deadbands are measured against it
+        self._notified_value: Any = None
+        self._deadband: Deadband | None = None
+        self._apply_deadbands(hub._deadbands)
+        # Only allocated for the metrics a history policy applies to
+        self._history: MetricHistory | None = None
+        self._apply_history(hub._history_policies)
+        # Row of the metric in the value store of the hub, -1 when there is none
+        self._store_index = -1
+        # Whether the metric matches the trace filter of the hub, updated when the filter changes
+        self._traced = hub._is_traced(self)
 
         _LOGGER.debug("Metric %s initialized", repr(self))
 
@@ -223,9 +298,139 @@ class Metric:
         """Get the enum string values for this metric, if defined."""
         return [e.id for e in self._descriptor.enum] if self._descriptor.enum else None
 
+    def _apply_update_frequency(self, frequency: int | str | None) -> None:
+        """Resolve the effective update interval from the hub update frequency setting."""
+        if isinstance(frequency, str):
+            # The only string values Hub accepts are the auto profiles.
+            self._base_update_interval_seconds = AUTO_UPDATE_INTERVALS[frequency].get(
+                self._descriptor.metric_type, AUTO_UPDATE_INTERVAL_DEFAULT
+            )
+        else:
+            self._base_update_interval_seconds = frequency
+        if self._high_priority:
+            self._base_update_interval_seconds = None
+        shedder = self._hub._load_shedder
+        self._update_interval_seconds = self._shed_interval(shedder.factor if shedder is not None else 1)
+        self._apply_aggregation(self._hub._update_aggregation)
+
+    def _shed_interval(self, factor: int) -> int | None:
+        """Return the update interval stretched by the load shedding factor."""
+        interval = self._base_update_interval_seconds
+        if factor > 1 and self._descriptor.priority is MetricPriority.LOW:
+            return max(interval or 0, LOAD_SHEDDING_MIN_INTERVAL_SECONDS) * factor
+        return interval
+
+    def _apply_load_shedding(self, factor: int) -> None:
+        """Stretch the update interval of a low priority measurement by factor, 1 restores it."""
+        interval = self._shed_interval(factor)
+        throttled_before = bool(self._update_interval_seconds)
+        self._update_interval_seconds = interval
+        if bool(interval) != throttled_before:
+            self._apply_aggregation(self._aggregation)
+
+    def _apply_aggregation(self, aggregation: UpdateAggregation) -> None:
+        """Set up the aggregation window, which only applies to throttled measurements."""
+        self._aggregation = aggregation
+        self._window_min = self._window_max = None
+        if (
+            aggregation is not UpdateAggregation.LAST
+            and self._update_interval_seconds
+            and self._descriptor.metric_nature == MetricNature.MEASUREMENT
+            and self._descriptor.message_type == MetricKind.SENSOR
+        ):
+            self._window = _AggregationWindow()
+            if self._value is not None:
+                self._window.add(self._value, time.monotonic())
+        else:
+            self._window = None
+
+    def _apply_deadbands(self, deadbands: dict[MetricType | str, Deadband | None]) -> None:
+        """Pick the deadband of this metric: by short id, then generic short id, then metric type.
+
+        Metric type deadbands only apply to measurement sensors, a changed setpoint is always notified.
+        High priority metrics are never deadbanded.
+        """
+        if self._high_priority:
+            self._deadband = None
+            return
+        self._deadband = self._lookup_policy(deadbands)
+
+    def _apply_history(self, policies: dict[MetricType | str, HistoryPolicy | None]) -> None:
+        """Pick the history policy of this metric, like `_apply_deadbands()`, and size its history."""
+        policy = self._lookup_policy(policies)
+        if policy is None:
+            self._history = None
+            return
+        history = self._history
+        if history is None or history.capacity != policy.max_samples:
+            self._history = MetricHistory(policy.max_samples, policy.max_age_seconds)
+        else:
+            history.max_age_seconds = policy.max_age_seconds
+
+    def _lookup_policy(self, policies: dict[MetricType | str, Any]) -> Any:
+        """Return the policy for this metric by short id, then generic short id, then metric type.
+
+        Metric type policies only apply to measurement sensors.
+        """
+        for key in (self._short_id, self._generic_short_id):
+            if key in policies:
+                return policies[key]
+        if (
+            self._descriptor.message_type == MetricKind.SENSOR
+            and self._descriptor.metric_nature == MetricNature.MEASUREMENT
+        ):
+            return policies.get(self._descriptor.metric_type)
+        return None
+
+    def _deadband_holds(self, value: Any, now: float) -> bool:
+        """Return True if value is too close to the last notified value to be worth notifying."""
+        deadband = self._deadband
+        if deadband is None:
+            return False
+        notified = self._notified_value
+        if (
+            not isinstance(value, float | int)
+            or not isinstance(notified, float | int)
+            or isinstance(value, bool)
+            or isinstance(notified, bool)
+        ):
+            return False
+        max_silence = self._hub._deadband_max_silence_seconds
+        if max_silence is not None and now - self._last_notified >= max_silence:
+            return False
+        return abs(value - notified) < max(deadband.absolute, deadband.relative * abs(notified))
+
+    def history(self, max_age_seconds: float | None = None) -> list[tuple[float, float]]:
+        """Return the recent values received, oldest first, as (time.monotonic() timestamp, value).
+
+        Every numeric value received is kept, including those the update frequency or
+        a deadband did not notify. Empty unless a history policy of the hub applies
+        to this metric. max_age_seconds narrows the result to the most recent values.
+        """
+        history = self._history
+        if history is None:
+            return []
+        return history.samples(time.monotonic(), max_age_seconds)
+
+    @property
+    def window_min(self) -> float | None:
+        """Minimum over the update interval behind the last notification, None when not aggregating."""
+        return self._window_min
+
+    @property
+    def window_max(self) -> float | None:
+        """Maximum over the update interval behind the last notification, None when not aggregating."""
+        return self._window_max
+
+    @property
+    def priority(self) -> MetricPriority:
+        """Delivery priority of the updates of this metric."""
+        assert self._descriptor.priority is not None
+        return self._descriptor.priority
+
     @property
     def update_interval_seconds(self) -> int | None:
-        """Effective update interval for this metric, resolved once from the hub setting."""
+        """Effective update interval for this metric, resolved from the hub setting."""
         return self._update_interval_seconds
 
     @property
@@ -238,6 +443,25 @@ class Metric:
         """Sets the on_update callback."""
         self._on_update = value
 
+    def _clear_value(self) -> None:
+        """Forget the value without notifying, so the metric looks never seen (e.g. restored from a cache)."""
+        self._value = None
+        self._notified_value = None
+        self._last_seen = 0
+        self._last_notified = 0
+        if self._window is not None:
+            self._window.start = None
+        self._window_min = self._window_max = None
+        if self._history is not None:
+            self._history.clear()
+        self._write_through()
+
+    def _write_through(self) -> None:
+        """Copy the value and timestamps to the value store of the hub, if the metric is in one."""
+        store = self._hub._value_store
+        if store is not None and self._store_index >= 0:
+            store.record(self._store_index, self._value, self._last_seen, self._last_notified)
+
     def _keepalive(
         self,
         force_invalidate: bool,
@@ -248,34 +472,42 @@ class Metric:
 
         stale_timeout, when provided, is a number of seconds: if the metric has not been seen
         for longer than that, its source is considered to have stopped publishing and the
-        metric is reset to None (unavailable). This relies on the hub periodically forcing a
-        full republish, so the timeout must be larger than that republish interval.
+        metric is reset to None (unavailable). This relies on the hub refreshing the metrics
+        about to turn stale (read requests, or a forced full republish on brokers that do not
+        answer them), so the timeout must leave room for that refresh. Only the time the rest
+        of the device kept publishing counts.
         """
         if force_invalidate and self._value is not None:
-            log_debug("Metric %s is being forced reset", self.unique_id)
+            if self._traced:
+                self._hub._trace.record(TraceEvent.RESET, self._unique_id, "forced")
             self._handle_message(None, log_debug, update_last_seen=False)  # Dont update the last_seen as it wasnt seen
             return
         if stale_timeout is not None and self._value is not None:
-            elapsed = time.monotonic() - self._last_seen
+            # Measured up to the last message of the device: once the whole device goes silent,
+            # the hub invalidates its metrics together instead of one at a time.
+            elapsed = (self._device._last_seen or time.monotonic()) - self._last_seen
             if elapsed > stale_timeout:
-                log_debug(
-                    "Metric %s has been silent for %.2fs (> %.2fs), resetting to unavailable",
-                    self.unique_id,
-                    elapsed,
-                    stale_timeout,
-                )
+                if self._traced:
+                    self._hub._trace.record(TraceEvent.RESET, self._unique_id, elapsed)
                 self._handle_message(None, log_debug, update_last_seen=False)  # Dont update last_seen as it wasnt seen
                 return
-        if self._last_seen > self._last_notified:
-            log_debug(
-                "Metric %s has been updated at %.2f but not published since %.2fs, re-publishing",
-                self.unique_id,
-                self._last_notified,
-                self._last_seen,
-            )
+        if self._last_seen > self._last_notified and not self._deadband_holds(self._value, time.monotonic()):
+            if self._traced:
+                self._hub._trace.record(TraceEvent.REPUBLISHED, self._unique_id, self._value)
             self._handle_message(self._value, log_debug, update_last_seen=False, force=True)
-            return
-        log_debug("Metric is active and up-to-date: %s", self.unique_id)
+
+    def _aggregate(self, window: _AggregationWindow, now: float) -> float:
+        """Return the value to notify for the window, per the selected aggregation."""
+        aggregation = self._aggregation
+        if aggregation is UpdateAggregation.MEAN:
+            mean = window.mean(now)
+            precision = self._descriptor.precision
+            return round(mean, precision) if precision is not None else mean
+        if aggregation is UpdateAggregation.MIN:
+            return window.minimum
+        if aggregation is UpdateAggregation.MAX:
+            return window.maximum
+        return window.value
 
     def _handle_message(
         self,
@@ -288,6 +520,7 @@ class Metric:
         now = time.monotonic()
         if update_last_seen:
             self._last_seen = now
+        self._record_sample(value, now, update_last_seen)
         should_notify = False
         update_interval = self._update_interval_seconds
 
@@ -297,20 +530,14 @@ class Metric:
             should_notify = True
             force = True
         elif value != self._value:
-            log_debug(
-                "Metric %s value changed: %s -> %s %s",
-                self.unique_id,
-                self._value,
-                value,
-                self._descriptor.unit_of_measurement or "",
-            )
             should_notify = True
             if self._value is None:
-                log_debug("Metric updated to non-None value. forcing it. metric: %s", self.unique_id)
+                # Back from unavailable, notify it regardless of the update frequency
                 force = True
-        else:
-            log_debug(
-                "Metric %s value unchanged: %s %s", self.unique_id, value, self._descriptor.unit_of_measurement or ""
+        traced = self._traced
+        if traced:
+            self._hub._trace.record(
+                TraceEvent.CHANGED if value != self._value else TraceEvent.UNCHANGED, self._unique_id, value
             )
         self._value = value
 
@@ -323,28 +550,70 @@ class Metric:
         ):
             elapsed = now - self._last_notified
             if elapsed < update_interval:
-                _LOGGER.debug(
-                    "Update for %s skipped due to frequency limit (%.2fs < %ds)",
-                    self.unique_id,
-                    elapsed,
-                    update_interval,
-                )
+                if traced and should_notify:
+                    self._hub._trace.record(TraceEvent.THROTTLED, self._unique_id, value)
                 should_notify = False
             else:
                 # This happens when the last time was before the update frequency passed so now we do really need to notify on it
                 should_notify = True
 
-        if should_notify and self._hub._loop and callable(self._on_update) and self._hub._loop.is_running():
-            self._last_notified = now
-            try:
-                # If the event loop is running, schedule the callback
-                self._hub._loop.call_soon_threadsafe(self._on_update, self, self.value)
-            except RuntimeError as exc:
-                # The loop can close between the is_running() check above and this call during shutdown
-                _LOGGER.debug("Skipping on_update callback for %s: %s", self.unique_id, exc)
-            except Exception as exc:
-                _LOGGER.exception("Error scheduling on_update callback for %s: %s", self.unique_id, exc)
+        notify_value = value
+        window = self._window
+        if should_notify and window is not None and window.start is not None:
+            notify_value = self._aggregate(window, now)
+
+        if should_notify and not force and self._deadband_holds(notify_value, now):
+            if traced:
+                self._hub._trace.record(TraceEvent.DEADBAND, self._unique_id, notify_value)
+            should_notify = False
+
+        hub = self._hub
+        if should_notify and hub._loop and callable(self._on_update) and hub._loop.is_running():
+            self._notify(notify_value, now)
+        if hub._value_store is not None:
+            self._write_through()
 
         for dependency in self._depend_on_me:
             assert self != dependency, f"Circular dependency detected: {self}"
             dependency._handle_formula(log_debug)
+
+    def _record_sample(self, value: Any, now: float, update_last_seen: bool) -> None:
+        """Add a received value to the aggregation window and, if numeric and live, to the history."""
+        if self._window is not None:
+            self._window.add(value, now)
+        history = self._history
+        if (
+            history is not None
+            and update_last_seen
+            and isinstance(value, float | int)
+            and not isinstance(value, bool)  # bool is a subclass of int, but we only want real numeric values.
+        ):
+            history.append(value, now)
+
+    def _notify(self, notify_value: Any, now: float) -> None:
+        """Schedule the on_update callback with notify_value and start a new aggregation window."""
+        hub = self._hub
+        assert hub._loop is not None
+        self._last_notified = now
+        self._notified_value = notify_value
+        if self._traced:
+            hub._trace.record(TraceEvent.NOTIFIED, self._unique_id, notify_value)
+        window = self._window
+        if window is not None:
+            if window.start is not None:
+                self._window_min, self._window_max = window.minimum, window.maximum
+                window.restart(window.value, now)
+            else:
+                self._window_min = self._window_max = None
+        try:
+            # If the event loop is running, schedule the callback. High priority updates go
+            # straight to the loop, ahead of the batches of the queued ones.
+            if self._high_priority:
+                hub._loop.call_soon_threadsafe(self._on_update, self, notify_value)
+            else:
+                hub._queue_update(self._on_update, self, notify_value)
+        except RuntimeError as exc:
+            # The loop can close between the is_running() check above and this call during shutdown
+            _LOGGER.debug("Skipping on_update callback for %s: %s", self.unique_id, exc)
+        except Exception as exc:
+            _LOGGER.exception("Error scheduling on_update callback for %s: %s", self.unique_id, exc)
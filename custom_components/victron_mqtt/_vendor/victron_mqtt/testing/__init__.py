@@ -18,18 +18,39 @@ Example:
     ```
 """
 
+from .broker_emulator import BrokerEmulatorStats, VenusBrokerEmulator
 from .hub_helpers import (
     create_mocked_hub,
     finalize_injection,
     hub_disconnect,
     inject_message,
+    inject_messages,
     sleep_short,
 )
+from .installation_generator import (
+    DEFAULT_CHANGE_RATES,
+    LARGE_INSTALLATION,
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    read_capture,
+    write_capture,
+)
 
 __all__ = [
+    "DEFAULT_CHANGE_RATES",
+    "LARGE_INSTALLATION",
+    "BrokerEmulatorStats",
+    "DeviceGroup",
+    "InstallationSpec",
+    "SyntheticInstallation",
+    "VenusBrokerEmulator",
     "create_mocked_hub",
     "finalize_injection",
     "hub_disconnect",
     "inject_message",
+    "inject_messages",
+    "read_capture",
     "sleep_short",
+    "write_capture",
 ]
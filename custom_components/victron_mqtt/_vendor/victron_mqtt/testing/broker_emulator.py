@@ -0,0 +1,507 @@
+"""In-process MQTT broker emulating the Venus OS (dbus-flashmq) behaviour.
+
+`create_mocked_hub` replaces the paho client with mocks, so the network path,
+SUBSCRIBE handling and keepalive semantics are never exercised. This module
+provides a small asyncio MQTT 3.1.1/5 broker listening on localhost that
+behaves like dbus-flashmq for everything the `Hub` relies on:
+
+- `N/<id>/system/0/Serial` is sent to any matching subscription, so the
+  installation id can be discovered.
+- `R/<id>/keepalive` keeps the installation alive. Unless the payload carries
+  `suppress-republish` (and the installation was already alive), all values are
+  republished, followed by `N/<id>/full_publish_completed` echoing the
+  `full-publish-completed-echo` keepalive option.
+- `R/<id>/<path>` republishes a single value.
+- `W/<id>/<path>` updates the value and publishes the `N/` echo.
+- Value changes are only forwarded while the installation is alive.
+
+It is not a general purpose broker: incoming QoS 1/2 publishes are acknowledged
+but everything is delivered with QoS 0, and there are no retained messages,
+persistent sessions, wills or TLS.
+"""
+
+import asyncio
+import json
+import logging
+import struct
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from typing import Any, Self
+
+from ..constants import TOPIC_INSTALLATION_ID
+from ..hub import Hub
+from .installation_generator import SyntheticInstallation
+
+logger = logging.getLogger(__name__)
+
+# Packet types (upper nibble of the fixed header)
+_CONNECT = 1
+_CONNACK = 2
+_PUBLISH = 3
+_PUBACK = 4
+_PUBREC = 5
+_PUBREL = 6
+_PUBCOMP = 7
+_SUBSCRIBE = 8
+_SUBACK = 9
+_UNSUBSCRIBE = 10
+_UNSUBACK = 11
+_PINGREQ = 12
+_PINGRESP = 13
+_DISCONNECT = 14
+
+_MQTT_V5 = 5
+# CONNACK return codes for rejected credentials
+_BAD_CREDENTIALS_V311 = 4
+_BAD_CREDENTIALS_V5 = 134
+
+# dbus-flashmq stops forwarding values when no keepalive arrived for this long
+DEFAULT_KEEPALIVE_TIMEOUT_SECONDS = 60.0
+
+
+@dataclass
+class BrokerEmulatorStats:
+    """Counters collected by the broker emulator."""
+
+    connections: int = 0
+    subscriptions: int = 0
+    keepalives: int = 0
+    full_publishes: int = 0
+    reads: int = 0
+    writes: int = 0
+    packets_in: int = 0
+    messages_out: int = 0
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Return whether an MQTT topic filter (with `+` and `#` wildcards) matches a topic."""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[index]:
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+def _encode_length(length: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, length = length % 128, length // 128
+        encoded.append(byte | 0x80 if length else byte)
+        if not length:
+            return bytes(encoded)
+
+
+def _encode_string(value: str) -> bytes:
+    data = value.encode()
+    return struct.pack("!H", len(data)) + data
+
+
+def _packet(packet_type: int, body: bytes, flags: int = 0) -> bytes:
+    return bytes([packet_type << 4 | flags]) + _encode_length(len(body)) + body
+
+
+class _Reader:
+    """Cursor over the variable header and payload of a packet."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.pos = 0
+
+    def byte(self) -> int:
+        value = self.data[self.pos]
+        self.pos += 1
+        return value
+
+    def uint16(self) -> int:
+        (value,) = struct.unpack_from("!H", self.data, self.pos)
+        self.pos += 2
+        return value
+
+    def binary(self) -> bytes:
+        length = self.uint16()
+        value = self.data[self.pos : self.pos + length]
+        self.pos += length
+        return value
+
+    def string(self) -> str:
+        return self.binary().decode()
+
+    def varint(self) -> int:
+        value = 0
+        multiplier = 1
+        while True:
+            byte = self.byte()
+            value += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                return value
+            multiplier *= 128
+
+    def skip_properties(self) -> None:
+        length = self.varint()
+        self.pos += length
+
+    def remaining(self) -> bytes:
+        return self.data[self.pos :]
+
+    def at_end(self) -> bool:
+        return self.pos >= len(self.data)
+
+
+class _Session:
+    """State of one connected client."""
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.client_id = ""
+        self.protocol_level = 4
+        self.filters: list[str] = []
+        # Topic -> whether any filter matches; cleared on (un)subscribe.
+        self._match_cache: dict[str, bool] = {}
+
+    def subscribed_to(self, topic: str) -> bool:
+        matched = self._match_cache.get(topic)
+        if matched is None:
+            matched = any(topic_matches(topic_filter, topic) for topic_filter in self.filters)
+            self._match_cache[topic] = matched
+        return matched
+
+    def subscribe(self, topic_filter: str) -> None:
+        if topic_filter not in self.filters:
+            self.filters.append(topic_filter)
+        self._match_cache.clear()
+
+    def unsubscribe(self, topic_filter: str) -> None:
+        if topic_filter in self.filters:
+            self.filters.remove(topic_filter)
+        self._match_cache.clear()
+
+    def send_publish(self, topic: str, payload: bytes) -> None:
+        body = _encode_string(topic)
+        if self.protocol_level == _MQTT_V5:
+            body += b"\x00"
+        self.writer.write(_packet(_PUBLISH, body + payload))
+
+
+class VenusBrokerEmulator:
+    """A localhost MQTT broker behaving like the MQTT interface of a Venus OS device.
+
+    Args:
+        installation_id: Installation id (portal id) served by the emulated device.
+        host: Interface to listen on.
+        port: Port to listen on, 0 picks a free one (see `port`).
+        keepalive_timeout: Seconds after the last keepalive during which value
+            changes are forwarded.
+        supports_echo: If False, behave like old firmware that does not echo the
+            `full-publish-completed-echo` option.
+        credentials: Optional (username, password) the clients must present.
+
+    Example:
+        ```python
+        installation = SyntheticInstallation(LARGE_INSTALLATION)
+        async with VenusBrokerEmulator() as broker:
+            broker.load(installation.full_publish())
+            hub = broker.create_hub()
+            await hub.connect()
+            await hub.wait_for_first_refresh()
+            await broker.drive(installation, ticks=10)
+            await hub.disconnect()
+        ```
+    """
+
+    def __init__(
+        self,
+        installation_id: str = "123",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT_SECONDS,
+        supports_echo: bool = True,
+        credentials: tuple[str, str] | None = None,
+    ) -> None:
+        """Initialize the emulator without listening yet."""
+        self.installation_id = installation_id
+        self.host = host
+        self.port = port
+        self.keepalive_timeout = keepalive_timeout
+        self.supports_echo = supports_echo
+        self.credentials = credentials
+        self.stats = BrokerEmulatorStats()
+        # Every W/ message received, as (topic, payload), for assertions.
+        self.written: list[tuple[str, str]] = []
+        self._serial_topic = TOPIC_INSTALLATION_ID.replace("+", installation_id)
+        self._values: dict[str, bytes] = {self._serial_topic: json.dumps({"value": installation_id}).encode()}
+        self._alive_until = 0.0
+        self._sessions: set[_Session] = set()
+        self._server: asyncio.Server | None = None
+
+    async def __aenter__(self) -> Self:
+        """Start listening."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_exc_info: object) -> None:
+        """Stop listening and drop all clients."""
+        await self.close()
+
+    async def start(self) -> None:
+        """Start listening; `port` holds the actual port afterwards."""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Venus broker emulator listening on %s:%d", self.host, self.port)
+
+    async def close(self) -> None:
+        """Stop listening and drop all clients."""
+        if self._server is not None:
+            self._server.close()
+            await self.disconnect_clients()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def disconnect_clients(self) -> None:
+        """Drop every client connection, as a restarting broker would."""
+        sessions = list(self._sessions)
+        self._sessions.clear()
+        for session in sessions:
+            session.writer.close()
+        for session in sessions:
+            try:
+                await session.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @property
+    def alive(self) -> bool:
+        """Return whether a keepalive was received within the keepalive timeout."""
+        return time.monotonic() < self._alive_until
+
+    @property
+    def client_count(self) -> int:
+        """Return the number of connected clients."""
+        return len(self._sessions)
+
+    def create_hub(self, **kwargs: Any) -> Hub:
+        """Create a (not yet connected) Hub pointing at this emulator."""
+        return Hub(host=self.host, port=self.port, username=None, password=None, use_ssl=False, **kwargs)
+
+    def load(self, messages: Iterable[tuple[str, str]]) -> None:
+        """Set the current values without publishing them, e.g. a generator's full publish."""
+        for topic, payload in messages:
+            self._values[topic] = payload.encode()
+
+    async def publish(self, messages: Iterable[tuple[str, str]]) -> int:
+        """Update values and forward them to subscribers while the installation is alive.
+
+        Returns:
+            The number of messages sent to clients.
+        """
+        alive = self.alive
+        sent = 0
+        for topic, payload in messages:
+            data = payload.encode()
+            self._values[topic] = data
+            if alive:
+                sent += self._forward(topic, data)
+        await self._drain()
+        return sent
+
+    async def drive(self, installation: SyntheticInstallation, ticks: int, interval: float = 0.0) -> int:
+        """Publish the given number of generator ticks, sleeping `interval` seconds between them.
+
+        Returns:
+            The number of messages sent to clients.
+        """
+        sent = 0
+        for _ in range(ticks):
+            sent += await self.publish(installation.tick())
+            await asyncio.sleep(interval)
+        return sent
+
+    def _forward(self, topic: str, payload: bytes) -> int:
+        sent = 0
+        for session in self._sessions:
+            if session.subscribed_to(topic):
+                session.send_publish(topic, payload)
+                sent += 1
+        self.stats.messages_out += sent
+        return sent
+
+    async def _drain(self) -> None:
+        for session in list(self._sessions):
+            try:
+                await session.writer.drain()
+            except ConnectionError:
+                self._sessions.discard(session)
+
+    def _full_publish(self, echo: str | None) -> None:
+        self.stats.full_publishes += 1
+        for topic, payload in self._values.items():
+            self._forward(topic, payload)
+        completed: dict[str, Any] = {"value": int(time.time())}
+        if echo is not None and self.supports_echo:
+            completed["full-publish-completed-echo"] = echo
+        self._forward(f"N/{self.installation_id}/full_publish_completed", json.dumps(completed).encode())
+
+    def _handle_keepalive(self, payload: bytes) -> None:
+        self.stats.keepalives += 1
+        echo: str | None = None
+        suppress = False
+        try:
+            options = json.loads(payload).get("keepalive-options", []) if payload else []
+        except (ValueError, AttributeError):
+            options = []
+        for option in options:
+            if option == "suppress-republish":
+                suppress = True
+            elif isinstance(option, dict) and "full-publish-completed-echo" in option:
+                echo = option["full-publish-completed-echo"]
+        was_alive = self.alive
+        self._alive_until = time.monotonic() + self.keepalive_timeout
+        if suppress and was_alive:
+            return
+        self._full_publish(echo)
+
+    def _handle_publish(self, topic: str, payload: bytes) -> None:
+        kind, _, rest = topic.partition("/")
+        installation_id, _, path = rest.partition("/")
+        if installation_id != self.installation_id or kind not in ("R", "W"):
+            self._forward(topic, payload)
+            return
+        read_topic = f"N/{installation_id}/{path}"
+        if kind == "R":
+            if path == "keepalive":
+                self._handle_keepalive(payload)
+                return
+            self.stats.reads += 1
+            value = self._values.get(read_topic)
+            if value is not None:
+                self._forward(read_topic, value)
+            return
+        self.stats.writes += 1
+        self.written.append((topic, payload.decode()))
+        self._values[read_topic] = payload
+        if self.alive:
+            self._forward(read_topic, payload)
+
+    def _handle_subscribe(self, session: _Session, reader: _Reader) -> None:
+        packet_id = reader.uint16()
+        if session.protocol_level == _MQTT_V5:
+            reader.skip_properties()
+        granted = bytearray()
+        new_filters: list[str] = []
+        while not reader.at_end():
+            topic_filter = reader.string()
+            reader.byte()  # subscription options / requested QoS
+            session.subscribe(topic_filter)
+            new_filters.append(topic_filter)
+            granted.append(0)
+            self.stats.subscriptions += 1
+        properties = b"\x00" if session.protocol_level == _MQTT_V5 else b""
+        session.writer.write(_packet(_SUBACK, struct.pack("!H", packet_id) + properties + granted))
+        # The serial topic is published periodically by the device; answer right away.
+        if any(topic_matches(topic_filter, self._serial_topic) for topic_filter in new_filters):
+            session.send_publish(self._serial_topic, self._values[self._serial_topic])
+            self.stats.messages_out += 1
+
+    def _handle_unsubscribe(self, session: _Session, reader: _Reader) -> None:
+        packet_id = reader.uint16()
+        if session.protocol_level == _MQTT_V5:
+            reader.skip_properties()
+        count = 0
+        while not reader.at_end():
+            session.unsubscribe(reader.string())
+            count += 1
+        body = struct.pack("!H", packet_id)
+        if session.protocol_level == _MQTT_V5:
+            body += b"\x00" + bytes(count)
+        session.writer.write(_packet(_UNSUBACK, body))
+
+    def _handle_connect(self, session: _Session, reader: _Reader) -> bool:
+        reader.string()  # protocol name
+        session.protocol_level = reader.byte()
+        flags = reader.byte()
+        reader.uint16()  # keepalive interval
+        if session.protocol_level == _MQTT_V5:
+            reader.skip_properties()
+        session.client_id = reader.string()
+        if flags & 0x04:  # will flag
+            if session.protocol_level == _MQTT_V5:
+                reader.skip_properties()
+            reader.string()
+            reader.binary()
+        username = reader.string() if flags & 0x80 else None
+        password = reader.binary().decode() if flags & 0x40 else None
+        accepted = self.credentials is None or (username, password) == self.credentials
+        if session.protocol_level == _MQTT_V5:
+            code = 0 if accepted else _BAD_CREDENTIALS_V5
+            session.writer.write(_packet(_CONNACK, bytes([0, code, 0])))
+        else:
+            code = 0 if accepted else _BAD_CREDENTIALS_V311
+            session.writer.write(_packet(_CONNACK, bytes([0, code])))
+        logger.info("Client %s connected (MQTT level %d, accepted=%s)", session.client_id, session.protocol_level, accepted)
+        return accepted
+
+    def _handle_packet(self, session: _Session, header: int, reader: _Reader) -> bool:
+        """Handle one packet, returning False when the connection must be closed."""
+        packet_type = header >> 4
+        self.stats.packets_in += 1
+        if packet_type == _PUBLISH:
+            qos = (header >> 1) & 0x03
+            topic = reader.string()
+            packet_id = reader.uint16() if qos else 0
+            if session.protocol_level == _MQTT_V5:
+                reader.skip_properties()
+            if qos == 1:
+                session.writer.write(_packet(_PUBACK, struct.pack("!H", packet_id)))
+            elif qos == 2:
+                session.writer.write(_packet(_PUBREC, struct.pack("!H", packet_id)))
+            self._handle_publish(topic, reader.remaining())
+        elif packet_type == _PUBREL:
+            session.writer.write(_packet(_PUBCOMP, struct.pack("!H", reader.uint16())))
+        elif packet_type == _SUBSCRIBE:
+            self._handle_subscribe(session, reader)
+        elif packet_type == _UNSUBSCRIBE:
+            self._handle_unsubscribe(session, reader)
+        elif packet_type == _PINGREQ:
+            session.writer.write(_packet(_PINGRESP, b""))
+        elif packet_type == _DISCONNECT:
+            return False
+        elif packet_type == _CONNECT:
+            return self._handle_connect(session, reader)
+        return True
+
+    async def _read_packet(self, stream: asyncio.StreamReader) -> tuple[int, _Reader]:
+        header = (await stream.readexactly(1))[0]
+        length = 0
+        multiplier = 1
+        while True:
+            byte = (await stream.readexactly(1))[0]
+            length += (byte & 0x7F) * multiplier
+            if not byte & 0x80:
+                break
+            multiplier *= 128
+        return header, _Reader(await stream.readexactly(length))
+
+    async def _handle_client(self, stream: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = _Session(writer)
+        self.stats.connections += 1
+        try:
+            header, reader = await self._read_packet(stream)
+            if header >> 4 != _CONNECT or not self._handle_packet(session, header, reader):
+                return
+            self._sessions.add(session)
+            while True:
+                header, reader = await self._read_packet(stream)
+                if not self._handle_packet(session, header, reader):
+                    return
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._sessions.discard(session)
+            writer.close()
+            logger.info("Client %s disconnected", session.client_id or "<unknown>")
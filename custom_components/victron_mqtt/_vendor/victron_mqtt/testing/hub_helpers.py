@@ -7,6 +7,7 @@ to write their own tests involving Hub objects and MQTT message simulation.
 import asyncio
 import json
 import logging
+from collections.abc import Iterable
 from itertools import count
 from typing import Any, Literal
 from unittest.mock import MagicMock, patch
@@ -22,12 +23,24 @@ from ..hub import Hub
 logger = logging.getLogger(__name__)
 
 
+class MQTTMessageStub:
+    """Minimal stand-in for paho's MQTTMessage, cheaper than a MagicMock for bulk injection."""
+
+    __slots__ = ("payload", "topic")
+
+    def __init__(self, topic: str, payload: bytes) -> None:
+        """Initialize the message."""
+        self.topic = topic
+        self.payload = payload
+
+
 async def create_mocked_hub(
     installation_id: str | None = None,
     operation_mode: OperationMode = OperationMode.FULL,
     device_type_exclude_filter: list[DeviceType] | None = None,
     update_frequency_seconds: int | Literal["auto", "auto_power_none"] | None = None,
     disable_keepalive_loop: bool = True,
+    **hub_kwargs: Any,
 ) -> Hub:
     """Create and return a mocked Hub object for testing.
 
@@ -43,8 +56,9 @@ async def create_mocked_hub(
         update_frequency_seconds: Optional update frequency for metrics in seconds,
             or an auto profile ("auto", "auto_power_none") for per-metric-type
             intervals chosen by the library.
-        disable_keepalive_loop: If True (default), disables the keepalive loop to prevent
-            background tasks during testing. Set to False if you need to test keepalive behavior.
+        disable_keepalive_loop: If True (default), disables the keepalive loop and the load
+            probe to prevent background tasks during testing. Set to False if you need to test keepalive behavior.
+        **hub_kwargs: Further Hub constructor arguments, e.g. `deadbands` or `load_shedding`.
 
     Returns:
         A Hub instance with a mocked MQTT client, ready for testing.
@@ -68,9 +82,13 @@ async def create_mocked_hub(
     async def _async_noop(_self: Any) -> None:
         pass
 
-    keepalive_patch: Any = patch.object(Hub, "_keepalive_loop", new=_async_noop) if disable_keepalive_loop else None
+    keepalive_patches: list[Any] = (
+        [patch.object(Hub, "_keepalive_loop", new=_async_noop), patch.object(Hub, "_load_probe_loop", new=_async_noop)]
+        if disable_keepalive_loop
+        else []
+    )
 
-    if keepalive_patch:
+    for keepalive_patch in keepalive_patches:
         keepalive_patch.start()
 
     try:
@@ -86,6 +104,7 @@ async def create_mocked_hub(
                 operation_mode=operation_mode,
                 device_type_exclude_filter=device_type_exclude_filter,
                 update_frequency_seconds=update_frequency_seconds,
+                **hub_kwargs,
             )
             mocked_client = MagicMock()
             mock_client.return_value = mocked_client
@@ -155,7 +174,7 @@ async def create_mocked_hub(
 
             return hub
     finally:
-        if keepalive_patch:
+        for keepalive_patch in keepalive_patches:
             keepalive_patch.stop()
 
 
@@ -215,6 +234,27 @@ async def inject_message(hub_instance: Hub, topic: str, payload: str, mock_time:
     await sleep_short(mock_time)
 
 
+async def inject_messages(
+    hub_instance: Hub, messages: Iterable[tuple[str, str]], mock_time: MagicMock | None = None
+) -> None:
+    """Inject a batch of MQTT messages into a mocked Hub.
+
+    Unlike calling `inject_message` in a loop, the event loop is only yielded to
+    once after the whole batch, which keeps large synthetic streams fast.
+
+    Args:
+        hub_instance: The Hub instance to inject the messages into.
+        messages: (topic, payload) pairs, e.g. from a `SyntheticInstallation`.
+        mock_time: Optional MagicMock for time.monotonic() to advance time simulation.
+    """
+    assert hub_instance._client is not None
+    on_message = hub_instance._client.on_message
+    assert on_message is not None
+    for topic, payload in messages:
+        on_message(hub_instance._client, None, MQTTMessageStub(topic, payload.encode()))
+    await sleep_short(mock_time)
+
+
 async def finalize_injection(hub: Hub, disconnect: bool = True, mock_time: MagicMock | None = None):
     """Finalize the injection of messages into the Hub.
 
@@ -0,0 +1,358 @@
+"""Synthetic Venus OS installations generated from the topic table.
+
+The generator walks the library's own topic descriptors, expands every
+placeholder for a configurable set of devices and produces payload streams the
+way a GX device publishes them: one full publish with every current value,
+followed by ticks that only contain the values that changed. How often each
+metric changes is configured per metric type.
+
+The produced messages can be injected into a mocked Hub (see
+`inject_messages`) or written to a capture file that can be replayed later.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import random
+import re
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any
+
+from .._victron_topics import topics
+from ..constants import MetricKind, MetricNature, MetricType, ValueType
+from ..data_classes import TopicDescriptor
+from ..hub import Hub
+
+logger = logging.getLogger(__name__)
+
+Message = tuple[str, str]
+
+# Probability that a metric of the given type changes during one tick.
+DEFAULT_CHANGE_RATES: dict[MetricType, float] = {
+    MetricType.POWER: 0.9,
+    MetricType.APPARENT_POWER: 0.9,
+    MetricType.CURRENT: 0.9,
+    MetricType.VOLTAGE: 0.5,
+    MetricType.FREQUENCY: 0.5,
+    MetricType.POWER_FACTOR: 0.3,
+    MetricType.ENERGY: 0.2,
+    MetricType.TEMPERATURE: 0.05,
+    MetricType.ELECTRIC_STORAGE_PERCENTAGE: 0.02,
+}
+# Change rate for metric types not listed in the change rates (enums, settings, names...).
+DEFAULT_CHANGE_RATE = 0.01
+
+# Plausible value ranges used when a descriptor does not define numeric min/max.
+_TYPICAL_RANGES: dict[MetricType, tuple[float, float]] = {
+    MetricType.POWER: (0, 3000),
+    MetricType.APPARENT_POWER: (0, 3000),
+    MetricType.CURRENT: (0, 40),
+    MetricType.VOLTAGE: (11.5, 240),
+    MetricType.FREQUENCY: (49.9, 50.1),
+    MetricType.POWER_FACTOR: (0.8, 1),
+    MetricType.ENERGY: (0, 5000),
+    MetricType.TEMPERATURE: (5, 35),
+    MetricType.HUMIDITY: (30, 70),
+    MetricType.PRESSURE: (990, 1030),
+    MetricType.ELECTRIC_STORAGE_PERCENTAGE: (20, 100),
+    MetricType.PERCENTAGE: (0, 100),
+    MetricType.ELECTRIC_STORAGE_CAPACITY: (50, 400),
+}
+_DEFAULT_RANGE = (0, 100)
+# Epoch used for timestamp metrics so generated streams are reproducible.
+_BASE_EPOCH = 1_760_000_000
+
+_ATTRIBUTE_VALUES = {
+    "model": "Synthetic {device_type}",
+    "manufacturer": "Victron Energy",
+    "serial_number": "HQSYN{device_id}",
+    "firmware_version": "v3.70",
+    "custom_name": "",
+}
+
+_PLACEHOLDER = re.compile(r"\{([a-z_]+)\}")
+
+
+@dataclass(frozen=True)
+class DeviceGroup:
+    """A number of identical devices of one native device type.
+
+    Args:
+        device_type: The device type as it appears in the topic (e.g. "solarcharger").
+        count: Number of device instances.
+        first_device_id: Device id of the first instance; the others follow sequentially.
+        placeholder_counts: Overrides of `InstallationSpec.placeholder_counts` for these
+            devices, e.g. `{"tracker": 4}` for a four-tracker MPPT.
+    """
+
+    device_type: str
+    count: int = 1
+    first_device_id: int = 0
+    placeholder_counts: Mapping[str, int] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class InstallationSpec:
+    """Description of a synthetic installation.
+
+    Args:
+        groups: The device groups making up the installation.
+        installation_id: Installation id used in every topic.
+        placeholder_counts: How many values each per-device placeholder expands to
+            (`{phase}`, `{tracker}`, `{output}`...). Unlisted placeholders expand once.
+        change_rates: Per-metric-type probability that a metric changes in a tick.
+        include_experimental: Also generate topics marked as experimental.
+        seed: Seed of the random generator, so streams are reproducible.
+    """
+
+    groups: tuple[DeviceGroup, ...]
+    installation_id: str = "123"
+    placeholder_counts: Mapping[str, int] = field(
+        default_factory=lambda: {
+            "phase": 3,
+            "tracker": 2,
+            "output": 4,
+            "mppt_id": 2,
+            "mpptnumber": 2,
+            "slot": 5,
+            "relay": 2,
+            "device_number": 1,
+        }
+    )
+    change_rates: Mapping[MetricType, float] = field(default_factory=lambda: dict(DEFAULT_CHANGE_RATES))
+    include_experimental: bool = False
+    seed: int = 0
+
+    def scaled(self, factor: int) -> InstallationSpec:
+        """Return a copy with every multi-device group holding `factor` times more devices."""
+        groups = tuple(
+            replace(group, count=group.count * factor) if group.count > 1 else group for group in self.groups
+        )
+        return replace(self, groups=groups)
+
+
+# 20 MPPTs, 4 batteries, 50 switchable outputs, tanks and temperature sensors.
+LARGE_INSTALLATION = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("settings"),
+        DeviceGroup("platform"),
+        DeviceGroup("vebus", first_device_id=276),
+        DeviceGroup("grid", first_device_id=30),
+        DeviceGroup("solarcharger", count=20, first_device_id=278, placeholder_counts={"tracker": 4}),
+        DeviceGroup("battery", count=4, first_device_id=512),
+        DeviceGroup("switch", count=5, first_device_id=100, placeholder_counts={"output": 10}),
+        DeviceGroup("tank", count=4, first_device_id=20),
+        DeviceGroup("temperature", count=8, first_device_id=40),
+    )
+)
+
+
+@dataclass
+class SyntheticMetric:
+    """A single generated topic and its current value."""
+
+    topic: str
+    descriptor: TopicDescriptor
+    value: Any
+    change_rate: float
+
+    @property
+    def payload(self) -> str:
+        """Return the MQTT payload for the current value."""
+        return json.dumps({"value": self.value})
+
+
+class SyntheticInstallation:
+    """Generates the message streams of a synthetic installation.
+
+    Example:
+        ```python
+        installation = SyntheticInstallation(LARGE_INSTALLATION)
+        hub = await create_mocked_hub()
+        await inject_messages(hub, installation.full_publish())
+        await finalize_injection(hub, disconnect=False)
+        for _ in range(10):
+            await inject_messages(hub, installation.tick())
+        ```
+    """
+
+    def __init__(self, spec: InstallationSpec) -> None:
+        """Expand the topic table for every device of the spec."""
+        self._spec = spec
+        self._random = random.Random(spec.seed)
+        self._metrics: list[SyntheticMetric] = []
+        descriptors = [
+            desc
+            for desc in Hub.expand_topic_list(topics)
+            if desc.topic.startswith("N/")
+            and not desc.is_formula
+            and desc.message_type != MetricKind.SERVICE
+            and (spec.include_experimental or not desc.experimental)
+        ]
+        seen: set[str] = set()
+        for group in spec.groups:
+            counts = {**spec.placeholder_counts, **group.placeholder_counts}
+            group_descriptors = [desc for desc in descriptors if _belongs_to(desc, group.device_type)]
+            for device_id in range(group.first_device_id, group.first_device_id + group.count):
+                for desc in group_descriptors:
+                    for topic in _expand(desc.topic, group.device_type, str(device_id), spec.installation_id, counts):
+                        if topic in seen:
+                            continue
+                        value = self._initial_value(desc, group.device_type, device_id)
+                        if value is None:
+                            continue
+                        seen.add(topic)
+                        rate = spec.change_rates.get(desc.metric_type, DEFAULT_CHANGE_RATE)
+                        if desc.message_type == MetricKind.ATTRIBUTE:
+                            rate = 0.0
+                        self._metrics.append(SyntheticMetric(topic, desc, value, rate))
+        logger.info("Synthetic installation generated with %d topics", len(self._metrics))
+
+    @property
+    def metrics(self) -> list[SyntheticMetric]:
+        """Return every generated topic with its current value."""
+        return self._metrics
+
+    def full_publish(self) -> list[Message]:
+        """Return every topic with its current value, as sent after a forced keepalive."""
+        return [(metric.topic, metric.payload) for metric in self._metrics]
+
+    def tick(self) -> list[Message]:
+        """Advance the installation by one step and return only the values that changed."""
+        changed: list[Message] = []
+        rnd = self._random.random
+        for metric in self._metrics:
+            if metric.change_rate <= 0 or rnd() >= metric.change_rate:
+                continue
+            new_value = self._next_value(metric)
+            if new_value == metric.value:
+                continue
+            metric.value = new_value
+            changed.append((metric.topic, metric.payload))
+        return changed
+
+    def stream(self, ticks: int) -> Iterator[list[Message]]:
+        """Yield the full publish followed by the given number of ticks."""
+        yield self.full_publish()
+        for _ in range(ticks):
+            yield self.tick()
+
+    def _initial_value(self, desc: TopicDescriptor, device_type: str, device_id: int) -> Any:
+        if desc.message_type == MetricKind.ATTRIBUTE:
+            if desc.short_id == "victron_productid":
+                return 0xA000 + device_id
+            template = _ATTRIBUTE_VALUES.get(desc.short_id, desc.short_id)
+            return template.format(device_type=device_type, device_id=device_id)
+        value_type = desc.value_type
+        if value_type == ValueType.STRING:
+            if desc.short_id.endswith("_version"):
+                return _ATTRIBUTE_VALUES["firmware_version"]
+            return f"{desc.short_id} {device_id}"
+        if value_type in (ValueType.EPOCH, ValueType.EPOCH_DEFAULT_NA):
+            return _BASE_EPOCH
+        if value_type == ValueType.GPS_LOCATION:
+            return None
+        if value_type in (ValueType.ENUM, ValueType.BITMASK):
+            assert desc.enum is not None
+            return next(iter(desc.enum)).code
+        low, high = _value_range(desc)
+        if value_type in (ValueType.FLOAT, ValueType.FLOAT_M3_TO_LITERS):
+            return round(self._random.uniform(low, high), 2)
+        return self._random.randint(int(low), int(high))
+
+    def _next_value(self, metric: SyntheticMetric) -> Any:
+        desc = metric.descriptor
+        value_type = desc.value_type
+        if value_type in (ValueType.ENUM, ValueType.BITMASK):
+            assert desc.enum is not None
+            codes = [member.code for member in desc.enum]
+            return self._random.choice(codes)
+        if value_type in (ValueType.EPOCH, ValueType.EPOCH_DEFAULT_NA):
+            return metric.value + 60
+        if not isinstance(metric.value, int | float):
+            return metric.value
+        low, high = _value_range(desc)
+        step = (high - low) * 0.05 or 1
+        if desc.metric_nature in (MetricNature.TOTAL, MetricNature.TOTAL_INCREASING):
+            delta = self._random.uniform(0, step)
+        else:
+            delta = self._random.uniform(-step, step)
+        new_value = min(max(metric.value + delta, low), high)
+        if value_type in (ValueType.FLOAT, ValueType.FLOAT_M3_TO_LITERS):
+            return round(new_value, 2)
+        return round(new_value)
+
+
+def _belongs_to(desc: TopicDescriptor, device_type: str) -> bool:
+    """Return True when the descriptor is published by devices of this native type."""
+    parts = desc.topic.split("/")
+    if len(parts) == 3:
+        # Root topics such as N/{installation_id}/heartbeat belong to the system device.
+        return device_type == "system"
+    if parts[2] == "{device_type}":
+        # Generic attributes (ProductName, CustomName...) are published by every device.
+        return device_type not in ("settings", "system")
+    return parts[2] == device_type
+
+
+def _expand(
+    template: str, device_type: str, device_id: str, installation_id: str, counts: Mapping[str, int]
+) -> Iterable[str]:
+    """Expand every placeholder of a topic template into concrete topics."""
+    topic = (
+        template.replace("{installation_id}", installation_id)
+        .replace("{device_type}", device_type)
+        .replace("{device_id}", device_id)
+    )
+    topics_out = [topic]
+    for name in dict.fromkeys(_PLACEHOLDER.findall(topic)):
+        values = _placeholder_values(name, counts.get(name, 1))
+        topics_out = [t.replace(f"{{{name}}}", value) for t in topics_out for value in values]
+    return topics_out
+
+
+def _placeholder_values(name: str, count: int) -> list[str]:
+    if name == "phase":
+        return [f"L{i}" for i in range(1, count + 1)]
+    if name == "output":
+        return [f"output_{i}" for i in range(1, count + 1)]
+    return [str(i) for i in range(count)]
+
+
+def _value_range(desc: TopicDescriptor) -> tuple[float, float]:
+    low, high = _TYPICAL_RANGES.get(desc.metric_type, _DEFAULT_RANGE)
+    if isinstance(desc.min, int | float):
+        low = desc.min
+    if isinstance(desc.max, int | float):
+        high = desc.max
+    if desc.message_type in (MetricKind.SWITCH, MetricKind.BINARY_SENSOR) and desc.value_type == ValueType.INT:
+        return 0, 1
+    return low, max(low, high)
+
+
+def write_capture(path: str | Path, messages: Iterable[Message]) -> int:
+    """Write messages to a capture file and return how many were written.
+
+    A capture file holds one JSON object per line with `topic` and `payload` keys.
+    """
+    written = 0
+    with Path(path).open("w", encoding="utf-8") as capture:
+        for topic, payload in messages:
+            capture.write(json.dumps({"topic": topic, "payload": payload}) + "\n")
+            written += 1
+    return written
+
+
+def read_capture(path: str | Path) -> list[Message]:
+    """Read the messages of a capture file written by `write_capture`."""
+    messages: list[Message] = []
+    with Path(path).open(encoding="utf-8") as capture:
+        for line in capture:
+            if line.strip():
+                entry = json.loads(line)
+                messages.append((entry["topic"], entry["payload"]))
+    return messages
@@ -0,0 +1,90 @@
+"""Compact records of what happened to the traced topics, kept in a fixed size ring buffer."""
+
+import time
+from array import array
+from datetime import UTC, datetime
+from enum import IntEnum
+from typing import Any
+
+
+class TraceEvent(IntEnum):
+    """What happened to the subject of a trace record."""
+
+    RECEIVED = 1  # Message received, the value is the payload
+    IGNORED = 2  # Message dropped, the value is the reason
+    CHANGED = 3  # Metric value changed
+    UNCHANGED = 4  # Metric value received again
+    THROTTLED = 5  # Change held back by the update frequency
+    DEADBAND = 6  # Change held back by the deadband
+    NOTIFIED = 7  # Value handed to on_update
+    REPUBLISHED = 8  # Value held back earlier notified by the keepalive
+    RESET = 9  # Metric reset to unavailable by the keepalive
+    PUBLISHED = 10  # Message published, the value is the payload
+    WRITTEN = 11  # Formula metric set, the value is the value written
+
+
+class TraceBuffer:
+    """The last trace records: monotonic time, event, subject and value.
+
+    Times and events live in preallocated arrays, subjects (a topic or a metric
+    unique id) and values in preallocated lists holding references only, so a
+    record formats no string. Nothing is formatted until the records are dumped.
+    Records are written from the MQTT thread and the event loop without locking:
+    two records racing for a slot may lose one of them, which a trace can afford.
+    """
+
+    __slots__ = ("_events", "_next", "_subjects", "_times", "_values", "capacity")
+
+    def __init__(self, capacity: int) -> None:
+        """Initialize an empty buffer of capacity records."""
+        self.capacity = capacity
+        self._times = array("d", [0.0]) * capacity
+        self._events = array("B", [0]) * capacity
+        self._subjects: list[str | None] = [None] * capacity
+        self._values: list[Any] = [None] * capacity
+        self._next = 0
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    @property
+    def recorded(self) -> int:
+        """Records written since the buffer was created or cleared, including the overwritten ones."""
+        return self._next
+
+    def record(self, event: TraceEvent, subject: str, value: Any = None) -> None:
+        """Store a record, replacing the oldest one when full."""
+        position = self._next
+        self._next = position + 1
+        index = position % self.capacity
+        self._times[index] = time.monotonic()
+        self._events[index] = event
+        self._subjects[index] = subject
+        self._values[index] = value
+
+    def clear(self) -> None:
+        """Forget all records, keeping the buffers."""
+        self._next = 0
+        self._subjects[:] = [None] * self.capacity
+        self._values[:] = [None] * self.capacity
+
+    def dump(self) -> list[dict[str, Any]]:
+        """Return the records oldest first, with their wall clock time, as JSON compatible dicts."""
+        end = self._next
+        capacity = self.capacity
+        offset = time.time() - time.monotonic()
+        result: list[dict[str, Any]] = []
+        for position in range(max(0, end - capacity), end):
+            index = position % capacity
+            value = self._values[index]
+            if value is not None and not isinstance(value, str | int | float):
+                value = str(value)
+            result.append(
+                {
+                    "time": datetime.fromtimestamp(self._times[index] + offset, UTC).isoformat(),
+                    "event": TraceEvent(self._events[index]).name.lower(),
+                    "subject": self._subjects[index],
+                    "value": value,
+                }
+            )
+        return result
@@ -0,0 +1,154 @@
+"""Columnar copy of the values and timestamps of the metrics of a hub, for bulk sweeps."""
+
+from __future__ import annotations
+
+import math
+from array import array
+from typing import TYPE_CHECKING, Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional, the sweeps fall back to plain loops
+    np = None
+
+if TYPE_CHECKING:
+    from .metric import Metric
+
+# Flags column
+_HAS_VALUE = 1
+_NUMERIC = 2
+
+
+class ValueStore:
+    """The value, last seen and last notified time of every metric, in contiguous arrays.
+
+    Every metric added gets a dense index into the columns, the index of a removed
+    metric is handed to the next one. Metrics keep their own attributes and write
+    them through on every message, the store only answers the questions asked
+    about all metrics at once: which ones need a keepalive, which ones are silent,
+    and what are the numeric values. With numpy those are answered on snapshots of
+    the columns, so a growing store on the MQTT thread never races a sweep.
+    """
+
+    def __init__(self, use_numpy: bool = True) -> None:
+        """Initialize an empty store, use_numpy=False forces the pure Python sweeps."""
+        self.vectorized = use_numpy and np is not None
+        self._metrics: list[Metric | None] = []
+        self._free: list[int] = []
+        self._values = array("d")
+        self._last_seen = array("d")
+        self._last_notified = array("d")
+        self._flags = array("B")
+
+    def __len__(self) -> int:
+        return len(self._metrics) - len(self._free)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the columns in bytes."""
+        return sum(column.itemsize * len(column) for column in self._columns())
+
+    def _columns(self) -> tuple[array, ...]:
+        return (self._values, self._last_seen, self._last_notified, self._flags)
+
+    def add(self, metric: Metric) -> None:
+        """Give the metric an index and copy its current state."""
+        if self._free:
+            index = self._free.pop()
+        else:
+            # Grow the columns before the metrics list, sweeps only read the rows of listed metrics
+            index = len(self._metrics)
+            for column in self._columns():
+                column.append(0)
+            self._metrics.append(None)
+        self._metrics[index] = metric
+        metric._store_index = index  # pylint: disable=protected-access
+        self.record(index, metric._value, metric._last_seen, metric._last_notified)  # pylint: disable=protected-access
+
+    def remove(self, metric: Metric) -> None:
+        """Free the index of the metric."""
+        index = metric._store_index  # pylint: disable=protected-access
+        if index < 0 or self._metrics[index] is not metric:
+            return
+        metric._store_index = -1  # pylint: disable=protected-access
+        self._metrics[index] = None
+        self._flags[index] = 0
+        self._free.append(index)
+
+    def record(self, index: int, value: Any, last_seen: float, last_notified: float) -> None:
+        """Write the state of the metric at index."""
+        if value is None:
+            self._flags[index] = 0
+            self._values[index] = math.nan
+        elif isinstance(value, float | int) and not isinstance(value, bool):
+            self._flags[index] = _HAS_VALUE | _NUMERIC
+            self._values[index] = value
+        else:
+            self._flags[index] = _HAS_VALUE
+            self._values[index] = math.nan
+        self._last_seen[index] = last_seen
+        self._last_notified[index] = last_notified
+
+    def keepalive_candidates(self, now: float, stale_timeout: float | None) -> list[Metric]:
+        """Return the metrics a keepalive sweep may act on.
+
+        Those seen since their last notification, and with stale_timeout those with
+        a value not seen for longer than that. The others are up to date.
+        """
+        size = len(self._metrics)
+        if self.vectorized:
+            last_seen = np.frombuffer(self._last_seen.tobytes(), dtype=np.float64)[:size]
+            mask = last_seen > np.frombuffer(self._last_notified.tobytes(), dtype=np.float64)[:size]
+            if stale_timeout is not None:
+                has_value = np.frombuffer(self._flags.tobytes(), dtype=np.uint8)[:size] & _HAS_VALUE
+                mask |= (has_value != 0) & (now - last_seen > stale_timeout)
+            return self._select(np.flatnonzero(mask).tolist())
+        oldest = now - stale_timeout if stale_timeout is not None else -math.inf
+        return self._select(
+            [
+                index
+                for index, (seen, notified, flags) in enumerate(
+                    zip(self._last_seen[:size], self._last_notified[:size], self._flags[:size], strict=True)
+                )
+                if seen > notified or (flags & _HAS_VALUE and seen < oldest)
+            ]
+        )
+
+    def silent_since(self, before: float) -> list[Metric]:
+        """Return the metrics with a value that were last seen before the given time, in index order."""
+        size = len(self._metrics)
+        if self.vectorized:
+            last_seen = np.frombuffer(self._last_seen.tobytes(), dtype=np.float64)[:size]
+            has_value = np.frombuffer(self._flags.tobytes(), dtype=np.uint8)[:size] & _HAS_VALUE
+            return self._select(np.flatnonzero((has_value != 0) & (last_seen < before)).tolist())
+        return self._select(
+            [
+                index
+                for index, (seen, flags) in enumerate(zip(self._last_seen[:size], self._flags[:size], strict=True))
+                if flags & _HAS_VALUE and seen < before
+            ]
+        )
+
+    def numeric_values(self) -> dict[str, float]:
+        """Return the current value of every metric with a numeric value, by unique id."""
+        size = len(self._metrics)
+        metrics = self._metrics
+        if self.vectorized:
+            values = np.frombuffer(self._values.tobytes(), dtype=np.float64)[:size]
+            flags = np.frombuffer(self._flags.tobytes(), dtype=np.uint8)[:size]
+            indexes = np.flatnonzero(flags & _NUMERIC).tolist()
+            numbers = values[indexes].tolist()
+            return {
+                metric.unique_id: number
+                for metric, number in zip((metrics[index] for index in indexes), numbers, strict=True)
+                if metric is not None
+            }
+        return {
+            metric.unique_id: value
+            for metric, value, flags in zip(metrics, self._values[:size], self._flags[:size], strict=True)
+            if metric is not None and flags & _NUMERIC
+        }
+
+    def _select(self, indexes: list[int]) -> list[Metric]:
+        metrics = self._metrics
+        return [metric for metric in (metrics[index] for index in indexes) if metric is not None]
@@ -10,6 +10,7 @@ from . import _victron_formulas as formulas
 from .constants import VictronEnum
 from .data_classes import TopicDescriptor
 from .formula_metric import FormulaMetric
+from .trace import TraceEvent
 from .writable_metric import WritableMetric
 
 _LOGGER = logging.getLogger(__name__)
@@ -46,13 +47,13 @@ class WritableFormulaMetric(WritableMetric, FormulaMetric):
         log_debug: Callable[..., None],
         stale_timeout: float | None = None,
     ):
-        log_debug("Metric is WritableFormulaMetric so no keepalive for now: %s", self.unique_id)
+        """No keepalive for WritableFormulaMetric for now."""
 
     def set(self, value: str | float | int | bool | VictronEnum) -> None:
-        # Determine log level based on the substring
-        is_info_level = self._hub._topic_log_info and self._hub._topic_log_info in self._descriptor.topic
-        log_debug = _LOGGER.info if is_info_level else _LOGGER.debug
+        log_debug = _LOGGER.debug
         log_debug("Formula %s set to: %s", self._func, value)
+        if self._traced:
+            self._hub._trace.record(TraceEvent.WRITTEN, self._unique_id, value)
 
         # Formula functions may return None to indicate no value/update.
         result = self._write_func(value, self._depends_on, self.transient_state)
@@ -2,16 +2,17 @@
 Support for Victron Venus WritableMetric.
 """
 
+import asyncio
 import json
 import logging
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from enum import Enum
 from typing import Any
 
-from ._unwrappers import VALUE_TYPE_WRAPPER, wrap_bitmask, wrap_enum
+from ._unwrappers import VALUE_TYPE_WRAPPER, unwrap_payload, wrap_bitmask, wrap_enum
 from ._victron_enums import SwitchableOutputType
 from ._victron_products import get_product_capabilities
-from .constants import MetricKind, ValueType, VictronEnum
+from .constants import WRITE_CONFIRM_TIMEOUT_SECONDS, MetricKind, ValueType, VictronEnum
 from .data_classes import ParsedTopic, ProductCapabilityRef, TopicDescriptor
 from .metric import Metric
 
@@ -38,10 +39,12 @@ class WritableMetric(Metric):
             descriptor.metric_nature,
         )
         self._write_topic: str | None = None
+        # (value written, rollback timer, token of the timer) while an optimistic write awaits its report
+        self._optimistic: tuple[Any, asyncio.TimerHandle, object] | None = None
         if topic is not None:
             assert topic.startswith("N")
             self._write_topic = "W" + topic[1:]
-        super().__init__(descriptor=descriptor, **kwargs)
+        super().__init__(descriptor=descriptor, topic=topic, **kwargs)
 
     def __str__(self) -> str:
         return f"WritableMetric({super().__str__()}, write_topic = {self._write_topic})"
@@ -208,6 +211,11 @@ class WritableMetric(Metric):
     def set(self, value: str | float | int | bool | VictronEnum) -> None:
         """Set the value of this metric by publishing to the write topic.
 
+        Writes to the same topic within the hub's minimum write interval are
+        coalesced and only the latest one is published, see `pending_value`.
+        Switches and buttons are always published right away. With optimistic
+        writes enabled on the hub, on_update is notified of the value right away.
+
         Raises
         ------
         ValueError
@@ -215,6 +223,58 @@ class WritableMetric(Metric):
             dropdown value is not one of the available labels.
         """
         assert self._write_topic is not None
+        payload = self._build_payload(value)
+        self._mark_optimistic(value, payload)
+        self._hub._write(self._write_topic, payload, value, self._is_discrete)  # pylint: disable=protected-access
+
+    async def set_and_confirm(
+        self, value: str | float | int | bool | VictronEnum, timeout: float = WRITE_CONFIRM_TIMEOUT_SECONDS
+    ) -> None:
+        """Set the value of this metric and wait until the device reports it.
+
+        Completes once the N/ topic of this metric reports the value written, or
+        the value of a later write that superseded it. Writing the value the
+        metric already has completes right away, as the broker does not publish
+        unchanged values again.
+
+        Raises
+        ------
+        ValueError
+            If the value is invalid, see `set()`.
+        WriteTimeoutError
+            If no value was reported within `timeout` seconds.
+        WriteMismatchError
+            If only other values were reported within `timeout` seconds.
+        """
+        assert self._write_topic is not None
+        payload = self._build_payload(value)
+        if self.pending_value is None and self._reports(payload):
+            self._hub._write(self._write_topic, payload, value, self._is_discrete)  # pylint: disable=protected-access
+            return
+        self._mark_optimistic(value, payload)
+        await self._hub._write_and_confirm(  # pylint: disable=protected-access
+            self._write_topic, payload, value, self._is_discrete, timeout, self._write_tolerance
+        )
+
+    @property
+    def _write_tolerance(self) -> float:
+        """Largest difference between a value written and the value reported back."""
+        # Half a step absorbs the rounding of the device
+        return self._step_value / 2 if self._step_value else 0.0
+
+    def _reports(self, payload: str) -> bool:
+        """Whether the current value of this metric is the one the payload writes."""
+        if self._value is None or self._is_dynamic_dropdown:
+            return False
+        return WritableMetric._wrap_payload(self._descriptor, self._value) == payload
+
+    @property
+    def _is_discrete(self) -> bool:
+        """Whether writes are published right away instead of being coalesced."""
+        return self.metric_kind in (MetricKind.SWITCH, MetricKind.BUTTON)
+
+    def _build_payload(self, value: str | float | int | bool | VictronEnum) -> str:
+        """Validate the value and return the payload to publish."""
         if isinstance(value, float | int) and not isinstance(value, bool):
             if self._min_value is not None and value < self._min_value:
                 raise ValueError(f"Value {value} is below the minimum {self._min_value} for {self.unique_id}")
@@ -224,10 +284,85 @@ class WritableMetric(Metric):
             assert self._labels is not None
             if value not in self._labels:
                 raise ValueError(f"Invalid value '{value}' for {self.unique_id}; valid options: {self._labels}")
-            payload = json.dumps({"value": self._labels.index(value)})
-        else:
-            payload = WritableMetric._wrap_payload(self._descriptor, value)
-        self._hub._publish(self._write_topic, payload)  # pylint: disable=protected-access
+            return json.dumps({"value": self._labels.index(value)})
+        return WritableMetric._wrap_payload(self._descriptor, value)
+
+    @property
+    def pending_value(self) -> Any:
+        """Get the value written but not reported yet, or None.
+
+        That is the value held back by write coalescing, or with optimistic writes
+        the value written until the device reports a value.
+        """
+        scheduler = self._hub._write_scheduler  # pylint: disable=protected-access
+        if scheduler is not None and self._write_topic is not None:
+            pending = scheduler.pending_value(self._write_topic)
+            if pending is not None:
+                return pending
+        optimistic = self._optimistic
+        return optimistic[0] if optimistic is not None else None
+
+    def _mark_optimistic(self, value: Any, payload: str) -> None:
+        """Notify the value about to be written, if the hub writes optimistically.
+
+        Called on the event loop. The next value reported ends the optimistic state,
+        see `_handle_message()`, otherwise the timer rolls it back.
+        """
+        hub = self._hub
+        if not hub._optimistic_writes or hub._loop is None:  # pylint: disable=protected-access
+            return
+        notified = unwrap_payload(self._descriptor, payload)
+        previous = self._optimistic
+        if previous is not None:
+            previous[1].cancel()
+        if notified == self._value:
+            self._optimistic = None
+            if previous is not None and callable(self._on_update):
+                # Back to the reported value before the earlier write was reported
+                hub._loop.call_soon(self._on_update, self, notified)
+            return
+        token = object()
+        timer = hub._loop.call_later(WRITE_CONFIRM_TIMEOUT_SECONDS, self._rollback_optimistic, token)
+        self._optimistic = (value, timer, token)
+        if callable(self._on_update):
+            hub._loop.call_soon(self._on_update, self, notified)
+
+    def _drop_optimistic(self) -> None:
+        """Forget the optimistic write without notifying, called on the event loop."""
+        optimistic = self._optimistic
+        if optimistic is not None:
+            self._optimistic = None
+            optimistic[1].cancel()
+
+    def _rollback_optimistic(self, token: object) -> None:
+        """Notify the reported value again, as the optimistic one was never reported."""
+        optimistic = self._optimistic
+        if optimistic is None or optimistic[2] is not token:
+            # Ended by a report, the state is of a later write if any
+            return
+        self._optimistic = None
+        _LOGGER.debug("Write of %s to %s not reported, rolling back", optimistic[0], self.unique_id)
+        self._handle_message(self._value, _LOGGER.debug, update_last_seen=False, force=True)
+
+    def _handle_message(
+        self,
+        value: str | float | int | bool | VictronEnum | None,
+        log_debug: Callable[..., None],
+        update_last_seen: bool = True,
+        force: bool = False,
+    ):
+        """Handle a message, ending the optimistic state on a report."""
+        optimistic = self._optimistic
+        if update_last_seen and optimistic is not None:
+            # Either the echo of the write or the value the device kept, notified either way as
+            # on_update last saw the optimistic value
+            log_debug("Metric %s reported %s after an optimistic write of %s", self.unique_id, value, optimistic[0])
+            self._optimistic = None
+            force = True
+            loop = self._hub._loop
+            if loop is not None and loop.is_running():
+                loop.call_soon_threadsafe(optimistic[1].cancel)
+        super()._handle_message(value, log_debug, update_last_seen, force)
 
     @staticmethod
     def _wrap_payload(topic_desc: TopicDescriptor, value: str | float | int | bool | Enum) -> str:
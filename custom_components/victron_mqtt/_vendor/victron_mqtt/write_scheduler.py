@@ -0,0 +1,175 @@
+"""Coalescing of the writes of a hub, so slider drags do not flood the broker."""
+
+import asyncio
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+_NOT_REPORTED = object()
+
+
+@dataclass(frozen=True)
+class WriteStats:
+    """Snapshot of the write coalescing state of a Hub."""
+
+    pending_writes: int
+    writes_requested: int
+    writes_published: int
+    writes_coalesced: int
+
+
+@dataclass(frozen=True)
+class WriteOutcome:
+    """Outcome of one write of `Hub.set_many()`."""
+
+    metric: Any
+    value: Any
+    # None when the write was published (and confirmed, if requested)
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the write succeeded."""
+        return self.error is None
+
+
+class WriteConfirmationError(Exception):
+    """Error to indicate that a write was not confirmed by the broker."""
+
+
+class WriteTimeoutError(WriteConfirmationError):
+    """No value was reported for the topic before the timeout."""
+
+
+class WriteMismatchError(WriteConfirmationError):
+    """The topic reported another value than the one written until the timeout."""
+
+    def __init__(self, message: str, reported_value: Any) -> None:
+        super().__init__(message)
+        self.reported_value = reported_value
+
+
+class WriteWaiter:
+    """A write waiting for the N/ topic to report its value."""
+
+    __slots__ = ("expected", "future", "reported", "tolerance", "topic")
+
+    def __init__(self, topic: str, future: asyncio.Future[None], expected: Any, tolerance: float) -> None:
+        self.topic = topic
+        self.future = future
+        self.expected = expected
+        self.tolerance = tolerance
+        # Last other value reported while waiting
+        self.reported: Any = _NOT_REPORTED
+
+    @property
+    def has_reported(self) -> bool:
+        """Whether another value was reported while waiting."""
+        return self.reported is not _NOT_REPORTED
+
+    def matches(self, reported: Any) -> bool:
+        """Whether the raw value reported by the broker is the value written."""
+        if reported == self.expected:
+            return True
+        numbers = (int, float)
+        if (
+            isinstance(reported, numbers)
+            and isinstance(self.expected, numbers)
+            and not isinstance(reported, bool)
+            and not isinstance(self.expected, bool)
+        ):
+            return math.isclose(reported, self.expected, rel_tol=1e-9, abs_tol=self.tolerance)
+        return False
+
+
+class WriteScheduler:
+    """Publish the writes of a hub at most once per minimum interval and write topic.
+
+    A write to a topic not written during the last interval is published right away.
+    Later writes within the interval are held back and the latest one wins: it is
+    published once the interval passed, the values in between are dropped. Immediate
+    writes (switches, buttons) are always published right away and replace any held
+    back write of their topic.
+
+    Held back writes are timed on the event loop, so writes are submitted from it.
+    """
+
+    def __init__(self, publish: Callable[[str, str], None], min_interval: float) -> None:
+        """Initialize the scheduler, publish is called with the write topic and payload."""
+        self._publish = publish
+        self.min_interval = min_interval
+        self._last_published: dict[str, float] = {}
+        # Write topic -> (payload, value) held back until the interval passed
+        self._pending: dict[str, tuple[str, Any]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._requested = 0
+        self._published = 0
+        self._coalesced = 0
+
+    def submit(self, topic: str, payload: str, value: Any, immediate: bool = False) -> None:
+        """Publish the write now, or hold it back until the interval of its topic passed."""
+        self._requested += 1
+        now = time.monotonic()
+        due = self._last_published.get(topic, -self.min_interval) + self.min_interval
+        if immediate or (topic not in self._pending and now >= due):
+            if self._drop(topic):
+                self._coalesced += 1
+            self._send(topic, payload, now)
+            return
+        if topic in self._pending:
+            self._coalesced += 1
+        self._pending[topic] = (payload, value)
+        if topic not in self._timers:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # Not on the event loop, nothing would fire the timer
+                self._flush_topic(topic)
+                return
+            self._timers[topic] = loop.call_later(max(due - now, 0.0), self._flush_topic, topic)
+
+    def pending_value(self, topic: str) -> Any:
+        """Return the value of the write held back for the topic, or None."""
+        pending = self._pending.get(topic)
+        return pending[1] if pending is not None else None
+
+    def flush(self) -> None:
+        """Publish all held back writes now."""
+        for topic in list(self._pending):
+            self._flush_topic(topic)
+
+    def forget(self, topic: str) -> None:
+        """Drop the held back write and the last publish time of a topic no longer written."""
+        self._drop(topic)
+        self._last_published.pop(topic, None)
+
+    def stats(self) -> WriteStats:
+        """Return a snapshot of the counters."""
+        return WriteStats(
+            pending_writes=len(self._pending),
+            writes_requested=self._requested,
+            writes_published=self._published,
+            writes_coalesced=self._coalesced,
+        )
+
+    def _flush_topic(self, topic: str) -> None:
+        timer = self._timers.pop(topic, None)
+        if timer is not None:
+            timer.cancel()
+        pending = self._pending.pop(topic, None)
+        if pending is not None:
+            self._send(topic, pending[0], time.monotonic())
+
+    def _drop(self, topic: str) -> bool:
+        """Forget the held back write of the topic, return whether there was one."""
+        timer = self._timers.pop(topic, None)
+        if timer is not None:
+            timer.cancel()
+        return self._pending.pop(topic, None) is not None
+
+    def _send(self, topic: str, payload: str, now: float) -> None:
+        self._last_published[topic] = now
+        self._published += 1
+        self._publish(topic, payload)
@@ -20,7 +20,7 @@ from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .const import BINARY_SENSOR_OFF_ID, BINARY_SENSOR_ON_ID
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 PARALLEL_UPDATES = 0  # There is no I/O in the entity itself.
 
@@ -39,18 +39,22 @@ async def async_setup_entry(
     """Set up Victron GX binary sensors from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new binary sensor metric discovery."""
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new binary sensor metrics."""
         async_add_entities(
-            [VictronBinarySensor(device, metric, device_info, hub.simple_naming, installation_id)]
+            [
+                VictronBinarySensor(
+                    device,
+                    metric,
+                    device_info,
+                    hub.simple_naming,
+                    installation_id,
+                )
+                for device, metric, device_info in metrics
+            ]
         )
 
-    hub.register_new_metric_callback(MetricKind.BINARY_SENSOR, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.BINARY_SENSOR, on_new_metrics)
 
 
 class VictronBinarySensor(VictronBaseEntity, BinarySensorEntity):
@@ -5,7 +5,6 @@ from typing import TYPE_CHECKING, Any
 
 from ._vendor.victron_mqtt import (
     Device as VictronVenusDevice,
-    Metric as VictronVenusMetric,
     MetricKind,
     WritableMetric as VictronVenusWritableMetric,
 )
@@ -17,7 +16,7 @@ from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .const import BINARY_SENSOR_ON_ID
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,17 +31,13 @@ async def async_setup_entry(
     """Set up Victron GX button entities from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new button metric discovery."""
-        if TYPE_CHECKING:
-            assert isinstance(metric, VictronVenusWritableMetric)
-        async_add_entities(
-            [
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new button metrics."""
+        entities: list[VictronButton] = []
+        for device, metric, device_info in metrics:
+            if TYPE_CHECKING:
+                assert isinstance(metric, VictronVenusWritableMetric)
+            entities.append(
                 VictronButton(
                     device,
                     metric,
@@ -50,10 +45,10 @@ async def async_setup_entry(
                     hub.simple_naming,
                     installation_id,
                 )
-            ]
-        )
+            )
+        async_add_entities(entities)
 
-    hub.register_new_metric_callback(MetricKind.BUTTON, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.BUTTON, on_new_metrics)
 
 
 class VictronButton(VictronBaseEntity, ButtonEntity):
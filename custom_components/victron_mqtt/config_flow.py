@@ -14,12 +14,14 @@ from ._vendor.victron_mqtt import (
     OperationMode,
     PairingError,
     PairingToken,
+    UpdateAggregation,
     request_pairing_token,
 )
 import voluptuous as vol
 
 from homeassistant.config_entries import (
     ConfigEntry,
+    ConfigEntryState,
     ConfigFlow,
     ConfigFlowResult,
     OptionsFlow,
@@ -49,11 +51,13 @@ from .const import (
     CONF_ROOT_TOPIC_PREFIX,
     CONF_SERIAL,
     CONF_SIMPLE_NAMING,
+    CONF_UPDATE_AGGREGATION,
     CONF_UPDATE_FREQUENCY_MODE,
     CONF_UPDATE_FREQUENCY_SECONDS,
     DEFAULT_HOST,
     DEFAULT_PORT,
     DEFAULT_SIMPLE_NAMING,
+    DEFAULT_UPDATE_AGGREGATION,
     DEFAULT_UPDATE_FREQUENCY_MODE,
     DEFAULT_UPDATE_FREQUENCY_SECONDS,
     DOMAIN,
@@ -139,6 +143,31 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
             )
         ),
         vol.Optional(CONF_UPDATE_FREQUENCY_SECONDS, default=DEFAULT_UPDATE_FREQUENCY_SECONDS): int,
+        vol.Optional(
+            CONF_UPDATE_AGGREGATION, default=DEFAULT_UPDATE_AGGREGATION
+        ): SelectSelector(
+            SelectSelectorConfig(
+                options=[
+                    SelectOptionDict(
+                        value=UpdateAggregation.LAST.value,
+                        label="Last value",
+                    ),
+                    SelectOptionDict(
+                        value=UpdateAggregation.MEAN.value,
+                        label="Average over the interval",
+                    ),
+                    SelectOptionDict(
+                        value=UpdateAggregation.MIN.value,
+                        label="Minimum over the interval",
+                    ),
+                    SelectOptionDict(
+                        value=UpdateAggregation.MAX.value,
+                        label="Maximum over the interval",
+                    ),
+                ],
+                mode=SelectSelectorMode.DROPDOWN,
+            )
+        ),
         vol.Optional(CONF_EXCLUDED_DEVICES, default=[]): SelectSelector(
             SelectSelectorConfig(
                 options=DEVICE_CODES,
@@ -574,8 +603,10 @@ class VictronMQTTOptionsFlow(OptionsFlow):
             self.hass.config_entries.async_update_entry(
                 self.config_entry, data=user_input
             )
-            # Reload the entry to apply the new options
-            await self.hass.config_entries.async_reload(self.config_entry.entry_id)
+            # A loaded entry applies the new options from its update listener, which
+            # only reloads when the running hub cannot take the change.
+            if self.config_entry.state is not ConfigEntryState.LOADED:
+                await self.hass.config_entries.async_reload(self.config_entry.entry_id)
             return self.async_create_entry(title="", data={})
         return self.async_show_form(
             step_id="init",
@@ -14,6 +14,7 @@ CONF_SERIAL = "serial"
 CONF_ROOT_TOPIC_PREFIX = "root_topic_prefix"
 CONF_UPDATE_FREQUENCY_SECONDS = "update_frequency"
 CONF_UPDATE_FREQUENCY_MODE = "update_frequency_mode"
+CONF_UPDATE_AGGREGATION = "update_aggregation"
 CONF_OPERATION_MODE = "operation_mode"
 CONF_EXCLUDED_DEVICES = "excluded_devices"
 CONF_SIMPLE_NAMING = "simple_naming"
@@ -32,13 +33,28 @@ UPDATE_FREQUENCY_MODE_AUTO = "auto"
 UPDATE_FREQUENCY_MODE_MANUAL = "manual"
 DEFAULT_UPDATE_FREQUENCY_MODE = UPDATE_FREQUENCY_MODE_AUTO
 
+# Value reported for a measurement when its update interval passed, one of the
+# library UpdateAggregation values. "last" reports the latest sample.
+DEFAULT_UPDATE_AGGREGATION = "last"
+
+# Storage of the discovered devices and metrics, used to create entities right away on restart
+DISCOVERY_STORAGE_KEY = f"{DOMAIN}.discovery"
+DISCOVERY_STORAGE_VERSION = 1
+
 # Service names
 SERVICE_PUBLISH = "publish"
+SERVICE_DUMP_TRACE = "dump_trace"
 
 # Service data attributes
 ATTR_METRIC_ID = "metric_id"
 ATTR_DEVICE_ID = "device_id"
 ATTR_VALUE = "value"
+ATTR_WRITES = "writes"
+ATTR_CLEAR = "clear"
+
+# Sensor attributes with the extremes of the last update interval
+ATTR_INTERVAL_MIN = "interval_min"
+ATTR_INTERVAL_MAX = "interval_max"
 
 # Binary sensor enum ids must be "on" for on and "off" for off.
 BINARY_SENSOR_ON_ID = "on"
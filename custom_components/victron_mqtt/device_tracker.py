@@ -19,7 +19,7 @@ from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from homeassistant.helpers.typing import StateType
 
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 PARALLEL_UPDATES = 0
 
@@ -36,18 +36,22 @@ async def async_setup_entry(
     """Set up Victron GX device trackers from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new device tracker metric discovery."""
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new device tracker metrics."""
         async_add_entities(
-            [VictronDeviceTracker(device, metric, device_info, hub.simple_naming, installation_id)]
+            [
+                VictronDeviceTracker(
+                    device,
+                    metric,
+                    device_info,
+                    hub.simple_naming,
+                    installation_id,
+                )
+                for device, metric, device_info in metrics
+            ]
         )
 
-    hub.register_new_metric_callback(MetricKind.DEVICE_TRACKER, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.DEVICE_TRACKER, on_new_metrics)
 
 
 class VictronDeviceTracker(VictronBaseEntity, TrackerEntity):
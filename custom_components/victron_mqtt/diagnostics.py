@@ -0,0 +1,18 @@
+"""Diagnostics support for the victron_mqtt integration."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.core import HomeAssistant
+
+from .hub import TO_REDACT, VictronGxConfigEntry
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: VictronGxConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    return {
+        "config": async_redact_data(entry.data, TO_REDACT),
+        "hub": entry.runtime_data.diagnostics(),
+    }
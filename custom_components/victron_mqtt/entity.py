@@ -1,19 +1,28 @@
 """Base entity for entities in victron_gx integration."""
 
 from abc import abstractmethod
+import logging
 from typing import Any
 
 from ._vendor.victron_mqtt import (
     Device as VictronVenusDevice,
     Metric as VictronVenusMetric,
     MetricType,
+    WritableMetric as VictronVenusWritableMetric,
+    WriteConfirmationError,
+    WriteTimeoutError,
 )
+from .const import DOMAIN
 
 from homeassistant.const import EntityCategory
 from homeassistant.core import callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity import Entity
 
+_LOGGER = logging.getLogger(__name__)
+
 # Entities that should be marked as diagnostic
 ENTITIES_CATEGORY_DIAGNOSTIC = ["system_heartbeat", "solarcharger_device_off_reason"]
 # Entities that should be disabled by default
@@ -45,6 +54,20 @@ SPECIAL_NATIVE_UNITS = {"%", "Ah"}
 ENTITY_PREFIX = "victron_mqtt"
 
 
+def entity_unique_id(
+    entity_platform: str, metric_unique_id: str, simple_naming: bool, installation_id: str
+) -> str:
+    """Return the unique id of the entity created for a metric."""
+    if simple_naming:
+        return f"{entity_platform}.{ENTITY_PREFIX}_{metric_unique_id}"
+    return f"{entity_platform}.{ENTITY_PREFIX}_{installation_id}_{metric_unique_id}"
+
+
+def device_removed_signal(installation_id: str, device_unique_id: str) -> str:
+    """Return the dispatcher signal sent when the library forgets a device."""
+    return f"{DOMAIN}_{installation_id}_{device_unique_id}_removed"
+
+
 class VictronBaseEntity(Entity):
     """Implementation of a Victron GX base entity."""
 
@@ -70,11 +93,12 @@ class VictronBaseEntity(Entity):
         if self._follow_metric_availability:
             self._attr_available = metric.value is not None
         self._attr_device_info = device_info
-        if simple_naming:
-            entity_id = f"{entity_platform}.{ENTITY_PREFIX}_{metric.unique_id}"
-        else:
-            entity_id = f"{entity_platform}.{ENTITY_PREFIX}_{installation_id}_{metric.unique_id}"
-        self._attr_unique_id = entity_id
+        self._attr_unique_id = entity_unique_id(
+            entity_platform, metric.unique_id, simple_naming, installation_id
+        )
+        self._device_removed_signal = device_removed_signal(
+            installation_id, device.unique_id
+        )
         self._attr_suggested_display_precision = metric.precision
         # Always set translation_key so HA can resolve state/option translations (e.g. select options).
         self._attr_translation_key = metric.generic_short_id.replace(
@@ -118,6 +142,27 @@ class VictronBaseEntity(Entity):
 
         return None
 
+    async def _async_set_and_confirm(self, value: Any) -> None:
+        """Write a value and report a failure if the device reports another value.
+
+        Not every device echoes every write, so a write nothing was reported for
+        is only logged.
+        """
+        assert isinstance(self._metric, VictronVenusWritableMetric)
+        try:
+            await self._metric.set_and_confirm(value)
+        except WriteTimeoutError as err:
+            _LOGGER.warning(
+                "Setting %s to %s was not confirmed by the device: %s",
+                self.entity_id,
+                value,
+                err,
+            )
+        except WriteConfirmationError as err:
+            raise HomeAssistantError(
+                f"Setting {self.entity_id} to {value} was not confirmed by the device: {err}"
+            ) from err
+
     @callback
     @abstractmethod
     def _on_update_cb(self, value: Any) -> None:
@@ -140,6 +185,16 @@ class VictronBaseEntity(Entity):
         """Run when entity about to be added to hass."""
         await super().async_added_to_hass()
         self._metric.on_update = self._on_update
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, self._device_removed_signal, self._on_device_removed
+            )
+        )
+
+    @callback
+    def _on_device_removed(self) -> None:
+        # Unloaded only, the registry entry is kept for when the device comes back
+        self.hass.async_create_task(self.async_remove())
 
     async def async_will_remove_from_hass(self) -> None:
         """Run when entity will be removed from hass."""
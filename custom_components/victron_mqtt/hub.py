@@ -1,6 +1,7 @@
 """Main Hub class."""
 
-from collections.abc import Callable, Mapping
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import asdict
 import logging
 from typing import Any, Literal
 
@@ -12,8 +13,11 @@ from ._vendor.victron_mqtt import (
     Hub as VictronVenusHub,
     Metric as VictronVenusMetric,
     MetricKind,
+    NotConnectedError,
     OperationMode,
     UPDATE_FREQUENCY_AUTO,
+    UpdateAggregation,
+    WritableMetric as VictronVenusWritableMetric,
 )
 
 from homeassistant.config_entries import ConfigEntry
@@ -25,11 +29,23 @@ from homeassistant.const import (
     CONF_USERNAME,
 )
 from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    ConfigEntryNotReady,
+    HomeAssistantError,
+)
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 from homeassistant.helpers.redact import async_redact_data
+from homeassistant.helpers.storage import Store
+
+from ._vendor import VICTRON_MQTT_VERSION
 
 from .const import (
+    ATTR_DEVICE_ID,
+    ATTR_METRIC_ID,
+    ATTR_VALUE,
     CONF_ELEVATED_TRACING,
     CONF_EXCLUDED_DEVICES,
     CONF_INSTALLATION_ID,
@@ -38,23 +54,39 @@ from .const import (
     CONF_ROOT_TOPIC_PREFIX,
     CONF_SERIAL,
     CONF_SIMPLE_NAMING,
+    CONF_UPDATE_AGGREGATION,
     CONF_UPDATE_FREQUENCY_MODE,
     CONF_UPDATE_FREQUENCY_SECONDS,
+    DEFAULT_UPDATE_AGGREGATION,
     DEFAULT_UPDATE_FREQUENCY_MODE,
     DEFAULT_UPDATE_FREQUENCY_SECONDS,
+    DISCOVERY_STORAGE_KEY,
+    DISCOVERY_STORAGE_VERSION,
     DOMAIN,
     UPDATE_FREQUENCY_MODE_MANUAL,
 )
+from .entity import device_removed_signal, entity_unique_id
 
 _LOGGER = logging.getLogger(__name__)
 
 TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
 
+# Options the library hub can change at runtime, anything else needs a reload
+LIVE_CONFIG_KEYS = frozenset(
+    {
+        CONF_UPDATE_FREQUENCY_MODE,
+        CONF_UPDATE_FREQUENCY_SECONDS,
+        CONF_UPDATE_AGGREGATION,
+        CONF_EXCLUDED_DEVICES,
+        CONF_ELEVATED_TRACING,
+    }
+)
+
 type VictronGxConfigEntry = ConfigEntry[Hub]
 
-NewMetricCallback = Callable[
-    [VictronVenusDevice, VictronVenusMetric, DeviceInfo, str], None
-]
+# A discovered metric with the DeviceInfo of its device, as handed to the platforms
+type NewMetric = tuple[VictronVenusDevice, VictronVenusMetric, DeviceInfo]
+NewMetricCallback = Callable[[list[NewMetric], str], None]
 
 
 def _resolve_update_frequency(
@@ -75,6 +107,25 @@ def _resolve_update_frequency(
     return auto
 
 
+def _update_aggregation(config: Mapping[str, Any]) -> UpdateAggregation:
+    """Return the configured aggregation of throttled measurements."""
+    return UpdateAggregation(config.get(CONF_UPDATE_AGGREGATION, DEFAULT_UPDATE_AGGREGATION))
+
+
+def _excluded_device_types(config: Mapping[str, Any]) -> list[DeviceType]:
+    """Convert the configured device type codes into DeviceType instances."""
+    return [
+        dt
+        for device_string in config.get(CONF_EXCLUDED_DEVICES, [])
+        if (dt := DeviceType.from_code(device_string)) is not None
+    ]
+
+
+def discovery_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store holding the discovered structure of a config entry."""
+    return Store(hass, DISCOVERY_STORAGE_VERSION, f"{DISCOVERY_STORAGE_KEY}.{entry_id}")
+
+
 class Hub:
     """Victron MQTT Hub for managing communication and sensors."""
 
@@ -99,13 +150,7 @@ class Hub:
         )
         self.simple_naming = config.get(CONF_SIMPLE_NAMING, False)
 
-        # Convert string device type exclusions to DeviceType instances
-        excluded_device_strings = config.get(CONF_EXCLUDED_DEVICES, [])
-        excluded_device_types: list[DeviceType] = [
-            dt
-            for device_string in excluded_device_strings
-            if (dt := DeviceType.from_code(device_string)) is not None
-        ]
+        excluded_device_types = _excluded_device_types(config)
 
         _LOGGER.info(
             "Final excluded device types: %s", [dt.code for dt in excluded_device_types]
@@ -126,14 +171,24 @@ class Hub:
             operation_mode=operation_mode,
             device_type_exclude_filter=excluded_device_types,
             update_frequency_seconds=_resolve_update_frequency(config),
+            update_aggregation=_update_aggregation(config),
+            optimistic_writes=True,
         )
-        self._hub.on_new_metric = self._on_new_metric
+        self._hub.on_new_metrics = self._on_new_metrics
+        self._hub.on_metric_removed = self._on_metric_removed
+        self._hub.on_device_unavailable = self._on_device_unavailable
+        self._hub.on_device_removed = self._on_device_removed
+        self._config_entry = entry
+        # The configuration the running library hub reflects, see apply_config()
+        self._config = dict(config)
         self._config_entry_id = entry.entry_id
+        self._store = discovery_store(hass, entry.entry_id)
         self.new_metric_callbacks: dict[MetricKind, NewMetricCallback] = {}
 
     async def start(self) -> None:
         """Start the Victron MQTT hub."""
         _LOGGER.info("Starting hub")
+        await self._async_restore_discovery()
         try:
             await self._hub.connect()
         except AuthenticationError as auth_error:
@@ -144,24 +199,153 @@ class Hub:
             raise ConfigEntryNotReady(
                 f"Cannot connect to the hub: {connect_error}"
             ) from connect_error
+        self._config_entry.async_create_background_task(
+            self.hass,
+            self._async_save_discovery_after_first_refresh(),
+            "victron_mqtt save discovery",
+        )
 
     async def stop(self) -> None:
         """Stop the Victron MQTT hub."""
         _LOGGER.info("Stopping hub")
+        await self._async_save_discovery()
         await self._hub.disconnect()
 
-    def _on_new_metric(
+    def apply_config(self, config: Mapping[str, Any]) -> bool:
+        """Apply a changed configuration to the running hub without reconnecting.
+
+        Returns False, leaving the hub untouched, when an option that can only be
+        applied by reloading the config entry was changed.
+        """
+        changed = {
+            key
+            for key in config.keys() | self._config.keys()
+            if config.get(key) != self._config.get(key)
+        }
+        if not changed <= LIVE_CONFIG_KEYS:
+            _LOGGER.info("Options requiring a reload changed: %s", sorted(changed - LIVE_CONFIG_KEYS))
+            return False
+        _LOGGER.info("Applying changed options without reload: %s", sorted(changed))
+        if changed & {CONF_UPDATE_FREQUENCY_MODE, CONF_UPDATE_FREQUENCY_SECONDS}:
+            self._hub.set_update_frequency(_resolve_update_frequency(config))
+        if CONF_UPDATE_AGGREGATION in changed:
+            self._hub.set_update_aggregation(_update_aggregation(config))
+        if CONF_EXCLUDED_DEVICES in changed:
+            self._hub.set_device_type_exclude_filter(_excluded_device_types(config))
+        if CONF_ELEVATED_TRACING in changed:
+            self._hub.set_topic_log_info(config.get(CONF_ELEVATED_TRACING) or None)
+        self._config = dict(config)
+        return True
+
+    def diagnostics(self) -> dict[str, Any]:
+        """Return the runtime state of the library hub for the diagnostics download."""
+        stats = self._hub.load_shedding_stats
+        write_stats = self._hub.write_stats
+        return {
+            "installation_id": self._hub.installation_id,
+            "devices": len(self._hub.devices),
+            "load_shedding": asdict(stats) if stats is not None else None,
+            "writes": asdict(write_stats) if write_stats is not None else None,
+            "history": asdict(self._hub.history_stats),
+            "unavailable_devices": [
+                device.unique_id
+                for device in self._hub.devices.values()
+                if not device.available
+            ],
+            "trace": self._hub.dump_trace(),
+            "memory": asdict(self._hub.memory_report()),
+        }
+
+    async def _async_restore_discovery(self) -> None:
+        """Create the entities known from the previous run, unavailable until data arrives."""
+        data = await self._store.async_load()
+        if data is None:
+            return
+        if data.get("library_version") != VICTRON_MQTT_VERSION:
+            _LOGGER.info(
+                "Ignoring discovery cache of victron_mqtt version %s",
+                data.get("library_version"),
+            )
+            return
+        restored = await self._hub.restore_structure(data["structure"])
+        _LOGGER.info("Created %d metrics from the discovery cache", restored)
+
+    async def _async_save_discovery(self) -> None:
+        """Persist the discovered structure for the next start."""
+        structure = self._hub.export_structure()
+        if not structure["messages"]:
+            return
+        await self._store.async_save(
+            {"library_version": VICTRON_MQTT_VERSION, "structure": structure}
+        )
+
+    async def _async_save_discovery_after_first_refresh(self) -> None:
+        try:
+            await self._hub.wait_for_first_refresh()
+        except CannotConnectError:
+            _LOGGER.warning("First refresh did not complete, discovery cache not updated")
+            return
+        await self._async_save_discovery()
+
+    def _on_new_metrics(
+        self,
+        hub: VictronVenusHub,
+        metrics: list[tuple[VictronVenusDevice, VictronVenusMetric]],
+    ) -> None:
+        """Hand a discovery batch to the platforms, one call per metric kind."""
+        assert hub.installation_id is not None
+        device_infos: dict[str, DeviceInfo] = {}
+        by_kind: dict[MetricKind, list[NewMetric]] = {}
+        for device, metric in metrics:
+            _LOGGER.info("New metric received. Device: %s, Metric: %s", device, metric)
+            device_info = device_infos.get(device.unique_id)
+            if device_info is None:
+                device_info = Hub._map_device_info(device, hub.installation_id)
+                device_infos[device.unique_id] = device_info
+            by_kind.setdefault(metric.metric_kind, []).append(
+                (device, metric, device_info)
+            )
+        for kind, kind_metrics in by_kind.items():
+            callback = self.new_metric_callbacks.get(kind)
+            if callback is not None:
+                callback(kind_metrics, hub.installation_id)
+
+    def _on_metric_removed(
         self,
         hub: VictronVenusHub,
         device: VictronVenusDevice,
         metric: VictronVenusMetric,
     ) -> None:
-        _LOGGER.info("New metric received. Device: %s, Metric: %s", device, metric)
+        _LOGGER.info("Metric removed. Device: %s, Metric: %s", device, metric)
         assert hub.installation_id is not None
-        device_info = Hub._map_device_info(device, hub.installation_id)
-        callback = self.new_metric_callbacks.get(metric.metric_kind)
-        if callback is not None:
-            callback(device, metric, device_info, hub.installation_id)
+        platform = metric.metric_kind.value
+        registry = er.async_get(self.hass)
+        entity_id = registry.async_get_entity_id(
+            platform,
+            DOMAIN,
+            entity_unique_id(
+                platform, metric.unique_id, self.simple_naming, hub.installation_id
+            ),
+        )
+        if entity_id is not None:
+            registry.async_remove(entity_id)
+
+    def _on_device_unavailable(
+        self, hub: VictronVenusHub, device: VictronVenusDevice
+    ) -> None:
+        # Its entities are marked unavailable through their own on_update callbacks
+        _LOGGER.info("Device stopped publishing: %s", device)
+
+    def _on_device_removed(
+        self, hub: VictronVenusHub, device: VictronVenusDevice
+    ) -> None:
+        # Its entities are unloaded but stay registered, and come back with the device.
+        # Deleting them is left to async_remove_config_entry_device.
+        _LOGGER.info("Device removed: %s", device)
+        assert hub.installation_id is not None
+        async_dispatcher_send(
+            self.hass, device_removed_signal(hub.installation_id, device.unique_id)
+        )
 
     @staticmethod
     def _map_device_info(
@@ -188,7 +372,7 @@ class Hub:
     def register_new_metric_callback(
         self, kind: MetricKind, new_metric_callback: NewMetricCallback
     ) -> None:
-        """Register a callback to handle a new specific metric kind."""
+        """Register a callback receiving each discovery batch of a specific metric kind."""
         _LOGGER.debug("Registering NewMetricCallback. kind: %s", kind)
         assert kind not in self.new_metric_callbacks, (
             f"NewMetricCallback for kind {kind} is already registered"
@@ -212,3 +396,72 @@ class Hub:
         )
         self._hub.publish(metric_id, device_id, value)
 
+    def dump_trace(self, clear: bool = False) -> list[dict[str, Any]]:
+        """Return the records of the elevated tracing, oldest first."""
+        return self._hub.dump_trace(clear=clear)
+
+    async def async_publish_many(
+        self, writes: Sequence[Mapping[str, Any]], raise_on_failure: bool = True
+    ) -> list[dict[str, Any]]:
+        """Write several metrics at once and return the outcome of every write.
+
+        Every write is looked up and validated before anything is published.
+        """
+        items: list[tuple[VictronVenusWritableMetric, Any]] = []
+        for write in writes:
+            metric_id = write.get(ATTR_METRIC_ID)
+            device_id = str(write.get(ATTR_DEVICE_ID, ""))
+            metric = self._find_writable_metric(metric_id, device_id)
+            if metric is None:
+                raise HomeAssistantError(
+                    f"No writable metric {metric_id} on device {device_id}"
+                )
+            value = write.get(ATTR_VALUE)
+            if isinstance(value, str) and metric.metric_kind in (
+                MetricKind.NUMBER,
+                MetricKind.TIME,
+            ):
+                try:
+                    value = float(value)
+                except ValueError as err:
+                    raise HomeAssistantError(
+                        f"Invalid value {value} for {metric_id}"
+                    ) from err
+            items.append((metric, value))
+        _LOGGER.info("Publish service called with %d writes", len(items))
+        try:
+            outcomes = await self._hub.set_many(items, confirm=True)
+        except (ValueError, NotConnectedError) as err:
+            raise HomeAssistantError(str(err)) from err
+
+        results = [
+            {
+                ATTR_METRIC_ID: write.get(ATTR_METRIC_ID),
+                ATTR_DEVICE_ID: str(write.get(ATTR_DEVICE_ID, "")),
+                "success": outcome.ok,
+                "error": str(outcome.error) if outcome.error is not None else None,
+            }
+            for write, outcome in zip(writes, outcomes, strict=True)
+        ]
+        failed = [result for result in results if not result["success"]]
+        if failed and raise_on_failure:
+            details = ", ".join(
+                f"{result[ATTR_METRIC_ID]}: {result['error']}" for result in failed
+            )
+            raise HomeAssistantError(f"Writes not confirmed: {details}")
+        return results
+
+    def _find_writable_metric(
+        self, metric_id: str | None, device_id: str
+    ) -> VictronVenusWritableMetric | None:
+        """Find a writable metric by its short id and the id of its device."""
+        if not metric_id:
+            return None
+        for device in self._hub.devices.values():
+            if device.device_id != device_id:
+                continue
+            metric = device.get_metric(metric_id)
+            if isinstance(metric, VictronVenusWritableMetric):
+                return metric
+        return None
+
@@ -1,10 +1,9 @@
 """Support for Victron GX number entities."""
 
-from typing import TYPE_CHECKING, Any
+from typing import Any
 
 from ._vendor.victron_mqtt import (
     Device as VictronVenusDevice,
-    Metric as VictronVenusMetric,
     MetricKind,
     MetricType,
     WritableMetric as VictronVenusWritableMetric,
@@ -16,7 +15,7 @@ from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 PARALLEL_UPDATES = 0
 
@@ -49,16 +48,12 @@ async def async_setup_entry(
     """Set up Victron GX number entities from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new number metric discovery."""
-        assert isinstance(metric, VictronVenusWritableMetric)
-        async_add_entities(
-            [
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new number metrics."""
+        entities: list[VictronNumber] = []
+        for device, metric, device_info in metrics:
+            assert isinstance(metric, VictronVenusWritableMetric)
+            entities.append(
                 VictronNumber(
                     device,
                     metric,
@@ -66,10 +61,10 @@ async def async_setup_entry(
                     hub.simple_naming,
                     installation_id,
                 )
-            ]
-        )
+            )
+        async_add_entities(entities)
 
-    hub.register_new_metric_callback(MetricKind.NUMBER, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.NUMBER, on_new_metrics)
 
 
 class VictronNumber(VictronBaseEntity, NumberEntity):
@@ -113,6 +108,4 @@ class VictronNumber(VictronBaseEntity, NumberEntity):
 
     async def async_set_native_value(self, value: float) -> None:
         """Set a new value."""
-        if TYPE_CHECKING:
-            assert isinstance(self._metric, VictronVenusWritableMetric)
-        self._metric.set(value)
+        await self._async_set_and_confirm(value)
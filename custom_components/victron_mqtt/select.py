@@ -5,7 +5,6 @@ from typing import TYPE_CHECKING, Any
 
 from ._vendor.victron_mqtt import (
     Device as VictronVenusDevice,
-    Metric as VictronVenusMetric,
     MetricKind,
     VictronEnum,
     WritableMetric as VictronVenusWritableMetric,
@@ -17,7 +16,7 @@ from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,16 +31,12 @@ async def async_setup_entry(
     """Set up Victron GX select entities from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new select metric discovery."""
-        assert isinstance(metric, VictronVenusWritableMetric)
-        async_add_entities(
-            [
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new select metrics."""
+        entities: list[VictronSelect] = []
+        for device, metric, device_info in metrics:
+            assert isinstance(metric, VictronVenusWritableMetric)
+            entities.append(
                 VictronSelect(
                     device,
                     metric,
@@ -49,10 +44,10 @@ async def async_setup_entry(
                     hub.simple_naming,
                     installation_id,
                 )
-            ]
-        )
+            )
+        async_add_entities(entities)
 
-    hub.register_new_metric_callback(MetricKind.SELECT, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.SELECT, on_new_metrics)
 
 
 class VictronSelect(VictronBaseEntity, SelectEntity):
@@ -87,10 +82,8 @@ class VictronSelect(VictronBaseEntity, SelectEntity):
 
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
-        if TYPE_CHECKING:
-            assert isinstance(self._metric, VictronVenusWritableMetric)
         _LOGGER.debug("Setting select %s to %s", self._attr_unique_id, option)
-        self._metric.set(option)
+        await self._async_set_and_confirm(option)
 
     @staticmethod
     def _normalize_value(value: Any) -> Any:
@@ -22,9 +22,11 @@ from homeassistant.components.sensor import (
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
+from homeassistant.helpers.typing import StateType
 
+from .const import ATTR_INTERVAL_MAX, ATTR_INTERVAL_MIN
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -67,13 +69,8 @@ async def async_setup_entry(
     """Set up Victron GX sensors from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new sensor metric discovery."""
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new sensor metrics."""
         async_add_entities(
             [
                 VictronSensor(
@@ -83,16 +80,19 @@ async def async_setup_entry(
                     hub.simple_naming,
                     installation_id,
                 )
+                for device, metric, device_info in metrics
             ]
         )
 
-    hub.register_new_metric_callback(MetricKind.SENSOR, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.SENSOR, on_new_metrics)
 
 
 class VictronSensor(VictronBaseEntity, RestoreSensor):
     """Implementation of a Victron GX sensor."""
 
     _baseline: float | None = None
+    # The interval extremes change with nearly every update, keep them out of the recorder
+    _unrecorded_attributes = frozenset({ATTR_INTERVAL_MIN, ATTR_INTERVAL_MAX})
 
     def __init__(
         self,
@@ -130,6 +130,15 @@ class VictronSensor(VictronBaseEntity, RestoreSensor):
         self._attr_native_value = self._normalize_value(value)
         self.async_write_ha_state()
 
+    @property
+    def extra_state_attributes(self) -> dict[str, StateType] | None:
+        """Return the minimum and maximum of the last update interval when aggregating."""
+        minimum = self._metric.window_min
+        maximum = self._metric.window_max
+        if minimum is None or maximum is None:
+            return None
+        return {ATTR_INTERVAL_MIN: minimum, ATTR_INTERVAL_MAX: maximum}
+
     @staticmethod
     def _normalize_value(value: Any) -> Any:
         """Normalize Victron enum values to their enum code."""
@@ -158,7 +167,9 @@ class VictronSensor(VictronBaseEntity, RestoreSensor):
             await super().async_added_to_hass()
             return
 
-        if not isinstance(self._attr_native_value, int | float):
+        if self._attr_native_value is not None and not isinstance(
+            self._attr_native_value, int | float
+        ):
             _LOGGER.warning(
                 "Cannot restore baseline for %s: current value is %r (expected numeric)",
                 self.entity_id,
@@ -180,7 +191,9 @@ class VictronSensor(VictronBaseEntity, RestoreSensor):
             return
 
         self._baseline = float(native_value)
-        self._attr_native_value += self._baseline
+        # Metrics restored from the discovery cache have no value until live data arrives.
+        if self._attr_native_value is not None:
+            self._attr_native_value += self._baseline
         _LOGGER.debug(
             "Restored baseline of %.3f for %s", self._baseline, self.entity_id
         )
@@ -4,7 +4,6 @@ from typing import TYPE_CHECKING, Any
 
 from ._vendor.victron_mqtt import (
     Device as VictronVenusDevice,
-    Metric as VictronVenusMetric,
     MetricKind,
     WritableMetric as VictronVenusWritableMetric,
 )
@@ -17,7 +16,7 @@ from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 from .binary_sensor import VictronBinarySensor
 from .const import BINARY_SENSOR_OFF_ID, BINARY_SENSOR_ON_ID
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 PARALLEL_UPDATES = 0
 
@@ -30,17 +29,13 @@ async def async_setup_entry(
     """Set up Victron GX switches from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new switch metric discovery."""
-        if TYPE_CHECKING:
-            assert isinstance(metric, VictronVenusWritableMetric)
-        async_add_entities(
-            [
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new switch metrics."""
+        entities: list[VictronSwitch] = []
+        for device, metric, device_info in metrics:
+            if TYPE_CHECKING:
+                assert isinstance(metric, VictronVenusWritableMetric)
+            entities.append(
                 VictronSwitch(
                     device,
                     metric,
@@ -48,10 +43,10 @@ async def async_setup_entry(
                     hub.simple_naming,
                     installation_id,
                 )
-            ]
-        )
+            )
+        async_add_entities(entities)
 
-    hub.register_new_metric_callback(MetricKind.SWITCH, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.SWITCH, on_new_metrics)
 
 
 class VictronSwitch(VictronBaseEntity, SwitchEntity):
@@ -85,12 +80,8 @@ class VictronSwitch(VictronBaseEntity, SwitchEntity):
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the switch on."""
-        if TYPE_CHECKING:
-            assert isinstance(self._metric, VictronVenusWritableMetric)
-        self._metric.set(BINARY_SENSOR_ON_ID)
+        await self._async_set_and_confirm(BINARY_SENSOR_ON_ID)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off."""
-        if TYPE_CHECKING:
-            assert isinstance(self._metric, VictronVenusWritableMetric)
-        self._metric.set(BINARY_SENSOR_OFF_ID)
+        await self._async_set_and_confirm(BINARY_SENSOR_OFF_ID)
@@ -2,11 +2,10 @@
 
 from datetime import time
 import logging
-from typing import TYPE_CHECKING, Any
+from typing import Any
 
 from ._vendor.victron_mqtt import (
     Device as VictronVenusDevice,
-    Metric as VictronVenusMetric,
     MetricKind,
     WritableMetric as VictronVenusWritableMetric,
 )
@@ -17,7 +16,7 @@ from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddConfigEntryEntitiesCallback
 
 from .entity import VictronBaseEntity
-from .hub import VictronGxConfigEntry
+from .hub import NewMetric, VictronGxConfigEntry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,17 +31,13 @@ async def async_setup_entry(
     """Set up Victron GX time entities from a config entry."""
     hub = config_entry.runtime_data
 
-    def on_new_metric(
-        device: VictronVenusDevice,
-        metric: VictronVenusMetric,
-        device_info: DeviceInfo,
-        installation_id: str,
-    ) -> None:
-        """Handle new time metric discovery."""
-        assert isinstance(metric, VictronVenusWritableMetric)
+    def on_new_metrics(metrics: list[NewMetric], installation_id: str) -> None:
+        """Handle a batch of new time metrics."""
         assert hub._hub.installation_id is not None
-        async_add_entities(
-            [
+        entities: list[VictronTime] = []
+        for device, metric, device_info in metrics:
+            assert isinstance(metric, VictronVenusWritableMetric)
+            entities.append(
                 VictronTime(
                     device,
                     metric,
@@ -50,10 +45,10 @@ async def async_setup_entry(
                     hub.simple_naming,
                     installation_id,
                 )
-            ]
-        )
+            )
+        async_add_entities(entities)
 
-    hub.register_new_metric_callback(MetricKind.TIME, on_new_metric)
+    hub.register_new_metric_callback(MetricKind.TIME, on_new_metrics)
 
 
 class VictronTime(VictronBaseEntity, TimeEntity):
@@ -81,8 +76,6 @@ class VictronTime(VictronBaseEntity, TimeEntity):
 
     async def async_set_value(self, value: time) -> None:
         """Set a new time value."""
-        if TYPE_CHECKING:
-            assert isinstance(self._metric, VictronVenusWritableMetric)
         total_minutes = VictronTime.time_to_victron_time(value)
         _LOGGER.debug(
             "Setting time %s (%d minutes) on entity: %s",
@@ -90,7 +83,7 @@ class VictronTime(VictronBaseEntity, TimeEntity):
             total_minutes,
             self._attr_unique_id,
         )
-        self._metric.set(total_minutes)
+        await self._async_set_and_confirm(total_minutes)
 
     @staticmethod
     def victron_time_to_time(value: int | None) -> time | None:
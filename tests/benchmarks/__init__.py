@@ -0,0 +1 @@
+"""Performance benchmarks for the victron_mqtt hot paths."""
@@ -0,0 +1,93 @@
+"""Fixtures for the victron_mqtt benchmarks.
+
+Run with ``pytest tests/benchmarks --benchmark-json=bench.json`` to get
+machine-readable results, or ``--benchmark-autosave`` / ``--benchmark-compare``
+to keep a history under ``.benchmarks/`` and compare runs over time.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Generator
+from typing import Any
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt import Metric
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    create_mocked_hub,
+    finalize_injection,
+)
+
+from .corpus import Corpus, deliver, to_messages
+
+LIBRARY_LOGGER = "custom_components.victron_mqtt"
+
+
+def _noop_on_update(_metric: Metric, _value: Any) -> None:
+    """Stand-in for an entity callback so notifications are really scheduled."""
+
+
+async def _call_and_drain(func: Callable[..., Any], args: tuple[Any, ...]) -> Any:
+    """Call func from inside the running loop, then let the callbacks it scheduled run."""
+    result = func(*args)
+    await asyncio.sleep(0)
+    return result
+
+
+@pytest.fixture(autouse=True)
+def production_log_level() -> Generator[None]:
+    """Measure with the default Home Assistant log level instead of the test DEBUG level."""
+    logger = logging.getLogger(LIBRARY_LOGGER)
+    previous = logger.level
+    logger.setLevel(logging.WARNING)
+    yield
+    logger.setLevel(previous)
+
+
+@pytest.fixture
+def bench_loop() -> Generator[asyncio.AbstractEventLoop]:
+    """Provide a private event loop so benchmarks can run the hub synchronously."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+
+@pytest.fixture
+def in_loop(bench_loop: asyncio.AbstractEventLoop) -> Callable[..., Any]:
+    """Return a runner executing a synchronous hub call the way the event loop does.
+
+    The hub only schedules on_update callbacks while its loop is running, so the
+    measured call must happen inside the loop for notifications to be counted.
+    """
+
+    def runner(func: Callable[..., Any], *args: Any) -> Any:
+        return bench_loop.run_until_complete(_call_and_drain(func, args))
+
+    return runner
+
+
+@pytest.fixture
+def hub_factory(
+    bench_loop: asyncio.AbstractEventLoop, in_loop: Callable[..., Any]
+) -> Generator[Callable[..., VictronVenusHub]]:
+    """Return a factory creating a mocked hub, optionally populated from a corpus."""
+    hubs: list[VictronVenusHub] = []
+
+    def run[T](awaitable: Awaitable[T]) -> T:
+        return bench_loop.run_until_complete(awaitable)
+
+    def factory(corpus: Corpus | None = None, **kwargs: Any) -> VictronVenusHub:
+        hub = run(create_mocked_hub(**kwargs))
+        hubs.append(hub)
+        if corpus is not None:
+            in_loop(deliver, hub, to_messages(corpus))
+            run(finalize_injection(hub, disconnect=False))
+            for metric in hub._all_metrics.values():
+                metric.on_update = _noop_on_update
+        return hub
+
+    yield factory
+    for hub in hubs:
+        bench_loop.run_until_complete(hub.disconnect())
@@ -0,0 +1,68 @@
+"""Message corpora used by the benchmarks.
+
+Two kinds of corpora are available:
+
+* Synthetic corpora, produced by the library's synthetic installation
+  generator so they can be scaled to any number of metrics.
+* Recorded corpora, read from ``data/*.jsonl`` capture files (see
+  ``read_capture``), replayed with installation id ``123`` into a mocked hub.
+"""
+
+from collections.abc import Iterable
+from pathlib import Path
+
+from paho.mqtt.client import MQTTMessage
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    LARGE_INSTALLATION,
+    SyntheticInstallation,
+    read_capture,
+)
+
+DATA_DIR = Path(__file__).parent / "data"
+
+Corpus = list[tuple[str, str]]
+
+
+def synthetic_installation(metric_count: int) -> SyntheticInstallation:
+    """Return the smallest scaled-up large installation with at least ``metric_count`` topics."""
+    factor = 1
+    while True:
+        installation = SyntheticInstallation(LARGE_INSTALLATION.scaled(factor))
+        if len(installation.metrics) >= metric_count:
+            return installation
+        factor *= 2
+
+
+def synthetic_corpus(metric_count: int) -> Corpus:
+    """Return the full publish of a synthetic installation cut to exactly ``metric_count`` topics."""
+    return synthetic_installation(metric_count).full_publish()[:metric_count]
+
+
+def synthetic_ticks(installation: SyntheticInstallation, corpus: Corpus, count: int) -> list[Corpus]:
+    """Advance the installation ``count`` times, keeping only changes to topics of ``corpus``."""
+    topics = {topic for topic, _ in corpus}
+    return [[message for message in installation.tick() if message[0] in topics] for _ in range(count)]
+
+
+def recorded_corpora() -> dict[str, Corpus]:
+    """Load every capture file in the data directory, keyed by file stem."""
+    return {path.stem: read_capture(path) for path in sorted(DATA_DIR.glob("*.jsonl"))}
+
+
+def to_messages(corpus: Iterable[tuple[str, str]]) -> list[MQTTMessage]:
+    """Convert a corpus into paho messages, as the hub receives them from the network thread."""
+    messages: list[MQTTMessage] = []
+    for topic, payload in corpus:
+        message = MQTTMessage(topic=topic.encode())
+        message.payload = payload.encode()
+        messages.append(message)
+    return messages
+
+
+def deliver(hub: Hub, messages: Iterable[MQTTMessage]) -> None:
+    """Deliver messages through the hub's paho on_message callback."""
+    on_message = hub._on_message
+    for message in messages:
+        on_message(hub._client, None, message)
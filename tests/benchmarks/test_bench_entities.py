@@ -0,0 +1,148 @@
+"""Benchmarks for creating Home Assistant entities from discovered metrics."""
+
+import logging
+from collections.abc import Generator
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+from homeassistant.const import CONF_HOST, Platform
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import EntityPlatform
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import MetricKind
+from custom_components.victron_mqtt.binary_sensor import VictronBinarySensor
+from custom_components.victron_mqtt.button import VictronButton
+from custom_components.victron_mqtt.const import DOMAIN
+from custom_components.victron_mqtt.hub import Hub
+from custom_components.victron_mqtt.number import VictronNumber
+from custom_components.victron_mqtt.select import VictronSelect
+from custom_components.victron_mqtt.sensor import VictronSensor
+from custom_components.victron_mqtt.switch import VictronSwitch
+from custom_components.victron_mqtt.time import VictronTime
+
+from .corpus import recorded_corpora, synthetic_corpus
+
+ENTITY_CLASSES = {
+    MetricKind.SENSOR: VictronSensor,
+    MetricKind.BINARY_SENSOR: VictronBinarySensor,
+    MetricKind.NUMBER: VictronNumber,
+    MetricKind.SELECT: VictronSelect,
+    MetricKind.SWITCH: VictronSwitch,
+    MetricKind.BUTTON: VictronButton,
+    MetricKind.TIME: VictronTime,
+}
+
+CORPORA = {"synthetic_1000": synthetic_corpus(1000), **recorded_corpora()}
+
+
+def _entity_hub(created: list) -> Hub:
+    """Create an integration hub whose platform callbacks only construct entities."""
+    entry = MockConfigEntry(domain=DOMAIN, unique_id="bench", data={CONF_HOST: "venus.local"})
+    hub = Hub(MagicMock(), entry)
+    for kind, entity_class in ENTITY_CLASSES.items():
+
+        def on_new_metrics(metrics, installation_id, entity_class=entity_class):
+            created.extend(
+                entity_class(device, metric, device_info, hub.simple_naming, installation_id)
+                for device, metric, device_info in metrics
+            )
+
+        hub.register_new_metric_callback(kind, on_new_metrics)
+    return hub
+
+
+def _discovered(library_hub, kinds) -> list:
+    """Return the (device, metric) pairs of the given kinds, as a discovery batch."""
+    return [
+        (device, metric)
+        for device in library_hub.devices.values()
+        for metric in device.metrics
+        if metric.metric_kind in kinds
+    ]
+
+
+@pytest.fixture
+def bench_hass(bench_loop) -> Generator[HomeAssistant]:
+    """Provide a Home Assistant instance running on the benchmark loop."""
+    context = async_test_home_assistant(bench_loop)
+    hass = bench_loop.run_until_complete(context.__aenter__())
+    yield hass
+    bench_loop.run_until_complete(hass.async_stop(force=True))
+    bench_loop.run_until_complete(context.__aexit__(None, None, None))
+
+
+@pytest.mark.parametrize("corpus_name", sorted(CORPORA))
+def test_entity_creation(benchmark, hub_factory, corpus_name):
+    """Time Hub._on_new_metrics, DeviceInfo mapping and entity construction for every metric."""
+    library_hub = hub_factory(CORPORA[corpus_name])
+    discovered = _discovered(library_hub, ENTITY_CLASSES)
+    created: list = []
+    hub = _entity_hub(created)
+
+    def create_all():
+        created.clear()
+        hub._on_new_metrics(library_hub, discovered)
+
+    benchmark.extra_info["metrics"] = len(discovered)
+    benchmark(create_all)
+    assert len(created) == len(discovered)
+
+
+@pytest.mark.parametrize("batched", [False, True], ids=["per_metric", "batched"])
+def test_entity_platform_add(benchmark, bench_loop, bench_hass, hub_factory, batched):
+    """Time adding the sensors of a first full publish to a live sensor entity platform.
+
+    ``per_metric`` delivers one single-metric batch per sensor, which is how entities
+    were added before discovery batches: one async_add_entities call and one
+    DeviceInfo mapping per metric.
+    """
+    library_hub = hub_factory(synthetic_corpus(1500))
+    discovered = _discovered(library_hub, {MetricKind.SENSOR})
+    entry = MockConfigEntry(domain=DOMAIN, unique_id="bench", data={CONF_HOST: "venus.local"})
+    entry.add_to_hass(bench_hass)
+    hub = Hub(bench_hass, entry)
+    platform = EntityPlatform(
+        hass=bench_hass,
+        logger=logging.getLogger(__name__),
+        domain=Platform.SENSOR,
+        platform_name=DOMAIN,
+        platform=None,
+        scan_interval=timedelta(seconds=30),
+        entity_namespace=None,
+    )
+    platform.config_entry = entry
+
+    def on_new_metrics(metrics, installation_id):
+        platform._async_schedule_add_entities_for_entry(
+            [
+                VictronSensor(device, metric, device_info, hub.simple_naming, installation_id)
+                for device, metric, device_info in metrics
+            ]
+        )
+
+    hub.register_new_metric_callback(MetricKind.SENSOR, on_new_metrics)
+
+    def setup():
+        bench_loop.run_until_complete(platform.async_reset())
+        return (), {}
+
+    async def add_all():
+        if batched:
+            hub._on_new_metrics(library_hub, discovered)
+        else:
+            for device, metric in discovered:
+                hub._on_new_metrics(library_hub, [(device, metric)])
+        await bench_hass.async_block_till_done()
+
+    benchmark.extra_info["entities"] = len(discovered)
+    benchmark.pedantic(lambda: bench_loop.run_until_complete(add_all()), setup=setup, rounds=5)
+    registry = er.async_get(bench_hass)
+    assert len(er.async_entries_for_config_entry(registry, entry.entry_id)) == len(discovered)
@@ -0,0 +1,177 @@
+"""Benchmarks for message routing, full publish handling, formulas and keepalive sweeps."""
+
+import itertools
+import json
+import logging
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from custom_components.victron_mqtt._vendor.victron_mqtt.hub import (
+    STALE_METRIC_TIMEOUT_SECONDS,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    LARGE_INSTALLATION,
+    SyntheticInstallation,
+)
+
+from .corpus import (
+    deliver,
+    recorded_corpora,
+    synthetic_corpus,
+    synthetic_installation,
+    synthetic_ticks,
+    to_messages,
+)
+
+RECORDED = recorded_corpora()
+FULL_PUBLISH_ROUNDS = {100: 20, 1000: 5, 10000: 2}
+
+
+@pytest.mark.parametrize("metric_count", sorted(FULL_PUBLISH_ROUNDS))
+def test_first_full_publish(benchmark, hub_factory, in_loop, metric_count):
+    """Time turning pending placeholders into metrics, formulas and callbacks."""
+    messages = to_messages(synthetic_corpus(metric_count))
+
+    def setup():
+        hub = hub_factory()
+        in_loop(deliver, hub, messages)
+        benchmark.extra_info["placeholders"] = len(hub._metrics_placeholders)
+        return (hub,), {}
+
+    def full_publish(hub):
+        hub._handle_full_publish_message(skip_validation=True)
+
+    benchmark.pedantic(full_publish, setup=setup, rounds=FULL_PUBLISH_ROUNDS[metric_count], iterations=1)
+
+
+@pytest.mark.parametrize("metric_count", [1000, 10000])
+def test_repeated_full_publish(benchmark, hub_factory, in_loop, metric_count):
+    """Time a full publish that finds every metric known, with the visible devices and metrics read."""
+    hub = hub_factory()
+    in_loop(deliver, hub, to_messages(synthetic_corpus(metric_count)))
+    hub._handle_full_publish_message(skip_validation=True)
+
+    def full_publish():
+        hub._handle_full_publish_message(skip_validation=True)
+        for device in hub.devices.values():
+            _ = device.metrics, device.parent_device
+
+    benchmark(full_publish)
+
+
+@pytest.mark.parametrize("corpus_name", sorted(RECORDED))
+def test_first_full_publish_recorded(benchmark, hub_factory, in_loop, corpus_name):
+    messages = to_messages(RECORDED[corpus_name])
+
+    def setup():
+        hub = hub_factory()
+        in_loop(deliver, hub, messages)
+        return (hub,), {}
+
+    def full_publish(hub):
+        hub._handle_full_publish_message(skip_validation=True)
+
+    benchmark.extra_info["messages"] = len(messages)
+    benchmark.pedantic(full_publish, setup=setup, rounds=10, iterations=1)
+
+
+@pytest.mark.parametrize("update_frequency_seconds", [None, 30], ids=["on_change", "throttled"])
+def test_steady_state_routing_synthetic(benchmark, hub_factory, in_loop, update_frequency_seconds):
+    """Route the changes of the large synthetic installation, including on_update scheduling."""
+    installation = SyntheticInstallation(LARGE_INSTALLATION)
+    corpus = installation.full_publish()
+    hub = hub_factory(corpus, update_frequency_seconds=update_frequency_seconds)
+    ticks = [to_messages(tick) for tick in synthetic_ticks(installation, corpus, 20)]
+    batches = itertools.cycle(ticks)
+
+    benchmark.extra_info["metrics"] = len(hub._all_metrics)
+    benchmark.extra_info["messages_per_tick"] = sum(map(len, ticks)) // len(ticks)
+    benchmark(lambda: in_loop(deliver, hub, next(batches)))
+
+
+@pytest.mark.parametrize("corpus_name", sorted(RECORDED))
+def test_steady_state_routing_recorded(benchmark, hub_factory, in_loop, corpus_name):
+    """Replay a capture into an initialized hub, mostly exercising the unchanged-value path."""
+    corpus = RECORDED[corpus_name]
+    hub = hub_factory(corpus)
+    messages = to_messages(corpus)
+
+    benchmark.extra_info["messages"] = len(messages)
+    benchmark(in_loop, deliver, hub, messages)
+
+
+def test_metric_handle_message(benchmark, hub_factory, in_loop):
+    """Time Metric._handle_message alone for a metric whose value keeps changing."""
+    hub = hub_factory([("N/123/battery/0/Dc/0/Voltage", '{"value": 12.5}')])
+    metric = hub._all_metrics["battery_0_battery_voltage"]
+    values = [12.0 + i / 100 for i in range(1000)]
+    log_debug = logging.getLogger(__name__).debug
+
+    def handle_all():
+        for value in values:
+            metric._handle_message(value, log_debug)
+
+    benchmark.extra_info["calls"] = len(values)
+    benchmark(in_loop, handle_all)
+
+
+def test_formula_recompute(benchmark, hub_factory, in_loop):
+    """Route battery power updates, which recompute the dependent energy formulas."""
+    corpus = RECORDED["sample_installation"]
+    hub = hub_factory(corpus)
+    source = hub._all_metrics["system_0_system_dc_battery_power"]
+    assert source._depend_on_me, "expected formulas depending on battery power"
+    topic = "N/123/system/0/Dc/Battery/Power"
+    batches = itertools.cycle(
+        [to_messages([(topic, json.dumps({"value": power}))] * 100) for power in (-450.0, 620.0)]
+    )
+
+    benchmark.extra_info["formulas"] = len(source._depend_on_me)
+    benchmark(lambda: in_loop(deliver, hub, next(batches)))
+
+
+@pytest.mark.parametrize("columnar_store", [False, True], ids=["objects", "columnar"])
+@pytest.mark.parametrize("metric_count", [1000, 10000])
+def test_keepalive_sweep_fresh(benchmark, hub_factory, in_loop, metric_count, columnar_store):
+    """Sweep metrics that are all notified and up to date."""
+    hub = hub_factory(synthetic_corpus(metric_count), columnar_store=columnar_store)
+
+    benchmark.extra_info["metrics"] = len(hub._all_metrics)
+    benchmark(in_loop, hub._keepalive_metrics, False, STALE_METRIC_TIMEOUT_SECONDS)
+
+
+@pytest.mark.parametrize("columnar_store", [False, True], ids=["objects", "columnar"])
+def test_stale_refresh_scan(benchmark, hub_factory, bench_loop, columnar_store):
+    """Look for the metrics about to turn stale among 10k fresh ones, without publishing read requests."""
+    hub = hub_factory(synthetic_corpus(10000), columnar_store=columnar_store)
+    hub._read_requests_supported = True
+
+    benchmark.extra_info["metrics"] = len(hub._all_metrics)
+    benchmark(lambda: bench_loop.run_until_complete(hub._refresh_stale_metrics()))
+
+
+@pytest.mark.parametrize("columnar_store", [False, True], ids=["objects", "columnar"])
+def test_export_values(benchmark, hub_factory, columnar_store):
+    """Export the numeric values of 10k metrics."""
+    hub = hub_factory(synthetic_corpus(10000), columnar_store=columnar_store)
+
+    benchmark.extra_info["values"] = len(hub.export_values())
+    benchmark(hub.export_values)
+
+
+@pytest.mark.parametrize("metric_count", [1000, 10000])
+def test_keepalive_sweep_throttled(benchmark, hub_factory, in_loop, metric_count):
+    """Sweep metrics whose last change was held back by the throttle and must be republished."""
+    installation = synthetic_installation(metric_count)
+    corpus = installation.full_publish()[:metric_count]
+    hub = hub_factory(corpus, update_frequency_seconds=3600)
+    changes = itertools.cycle([to_messages(tick) for tick in synthetic_ticks(installation, corpus, 5)])
+
+    def setup():
+        in_loop(deliver, hub, next(changes))
+        return (hub._keepalive_metrics, False, STALE_METRIC_TIMEOUT_SECONDS), {}
+
+    benchmark.extra_info["metrics"] = len(hub._all_metrics)
+    benchmark.pedantic(in_loop, setup=setup, rounds=5)
@@ -0,0 +1,191 @@
+"""End-to-end benchmarks over real localhost sockets against the Venus OS broker emulator."""
+
+import asyncio
+import time
+from collections.abc import Callable, Generator
+from typing import Any
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.keepalive_scheduler import (
+    KeepaliveScheduler,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    LARGE_INSTALLATION,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+STARTUP_HUBS = 3
+PEAK_RATE_WINDOW_SECONDS = 0.25
+
+
+def _peak_rate(times: list[float]) -> float:
+    """Return the highest number of events per second within any window of the sorted times."""
+    peak = 0
+    first = 0
+    for last, now in enumerate(times):
+        while times[first] < now - PEAK_RATE_WINDOW_SECONDS:
+            first += 1
+        peak = max(peak, last - first + 1)
+    return peak / PEAK_RATE_WINDOW_SECONDS
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 30) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.001)
+
+
+class _ReceiveCounter:
+    """Count the messages the hub's paho thread handed to the hub."""
+
+    def __init__(self, hub: VictronVenusHub) -> None:
+        self.count = 0
+        on_message = hub._client.on_message
+        assert on_message is not None
+
+        def counting_on_message(client: Any, userdata: Any, message: Any) -> None:
+            on_message(client, userdata, message)
+            self.count += 1
+
+        hub._client.on_message = counting_on_message
+
+    async def wait_for(self, count: int) -> None:
+        await _wait_until(lambda: self.count >= count)
+
+
+@pytest.fixture
+def emulated(
+    bench_loop: asyncio.AbstractEventLoop,
+) -> Generator[tuple[SyntheticInstallation, VenusBrokerEmulator, VictronVenusHub, _ReceiveCounter]]:
+    """Connect a hub to an emulator serving the large synthetic installation."""
+    run: Callable[[Any], Any] = bench_loop.run_until_complete
+    installation = SyntheticInstallation(LARGE_INSTALLATION)
+    broker = VenusBrokerEmulator()
+    run(broker.start())
+    broker.load(installation.full_publish())
+    hub = broker.create_hub()
+    run(hub.connect())
+    run(hub.wait_for_first_refresh())
+    yield installation, broker, hub, _ReceiveCounter(hub)
+    run(hub.disconnect())
+    run(broker.close())
+
+
+def test_socket_throughput(benchmark, bench_loop, emulated):
+    """Publish generator ticks through the broker and wait until the hub handled all of them."""
+    installation, broker, _hub, received = emulated
+
+    async def publish_tick():
+        expected = received.count
+        sent = await broker.publish(installation.tick())
+        await received.wait_for(expected + sent)
+        return sent
+
+    sent = benchmark(lambda: bench_loop.run_until_complete(publish_tick()))
+    benchmark.extra_info["messages_per_tick"] = sent
+
+
+def test_full_republish(benchmark, bench_loop, emulated):
+    """Time a forced keepalive until the whole installation was received again."""
+    _installation, broker, hub, received = emulated
+
+    async def full_republish():
+        full_publishes = broker.stats.full_publishes
+        expected = received.count - broker.stats.messages_out
+        hub._keepalive(force=True)
+        await _wait_until(lambda: broker.stats.full_publishes > full_publishes)
+        await received.wait_for(expected + broker.stats.messages_out)
+
+    benchmark.extra_info["messages"] = len(broker._values)
+    benchmark.pedantic(lambda: bench_loop.run_until_complete(full_republish()), rounds=5)
+
+
+def test_reconnect(benchmark, bench_loop, emulated):
+    """Drop the connection and time until the hub resubscribed and got a full republish.
+
+    paho waits at least one second before reconnecting, which dominates the result.
+    """
+    _installation, broker, _hub, received = emulated
+
+    async def reconnect():
+        full_publishes = broker.stats.full_publishes
+        expected = received.count - broker.stats.messages_out
+        await broker.disconnect_clients()
+        await _wait_until(lambda: broker.stats.full_publishes > full_publishes)
+        await received.wait_for(expected + broker.stats.messages_out)
+
+    benchmark.pedantic(lambda: bench_loop.run_until_complete(reconnect()), rounds=3)
+
+
+
+@pytest.mark.parametrize("coordinated", [False, True], ids=["uncoordinated", "coordinated"])
+def test_startup_full_publishes(benchmark, bench_loop, coordinated):
+    """Start several hubs, each with its own broker, together and record how their full publishes overlap.
+
+    Uncoordinated hubs ask for their first full publish at once, coordinated hubs take turns.
+    Real GX devices each send their full publish at their own pace, so the peak message rate
+    reaching Home Assistant grows with extra_info["peak_full_publishes_in_flight"]. The
+    emulators share one event loop and serialize their sends, so the measured
+    extra_info["peak_messages_per_second"] only shows the rate one broker reaches.
+    """
+    run: Callable[[Any], Any] = bench_loop.run_until_complete
+    brokers = [VenusBrokerEmulator() for _ in range(STARTUP_HUBS)]
+    for broker in brokers:
+        run(broker.start())
+        broker.load(SyntheticInstallation(LARGE_INSTALLATION).full_publish())
+    # A zero length slot lets every hub take the full publish slot right away
+    scheduler = KeepaliveScheduler(full_publish_slot_seconds=10 if coordinated else 0)
+    # +1 when a hub asks for a full publish, -1 when it completed
+    in_flight: list[tuple[float, int]] = []
+    release = scheduler.release_full_publish
+
+    def record_release(hub: Any) -> None:
+        in_flight.append((time.monotonic(), -1))
+        release(hub)
+
+    scheduler.release_full_publish = record_release  # type: ignore[method-assign]
+    received: list[float] = []
+    hubs = [broker.create_hub() for broker in brokers]
+    for hub in hubs:
+        hub._keepalive_scheduler = scheduler
+        keepalive = hub._keepalive
+        on_message = hub._on_message
+
+        def record_request(force: bool = False, keepalive=keepalive) -> None:
+            if force:
+                in_flight.append((time.monotonic(), 1))
+            keepalive(force)
+
+        def counting_on_message(client: Any, userdata: Any, message: Any, on_message=on_message) -> None:
+            on_message(client, userdata, message)
+            received.append(time.monotonic())
+
+        hub._keepalive = record_request  # type: ignore[method-assign]
+        hub._on_message = counting_on_message  # type: ignore[method-assign]
+
+    async def start_together() -> float:
+        start = time.monotonic()
+        await asyncio.gather(*(hub.connect() for hub in hubs))
+        await asyncio.gather(*(hub.wait_for_first_refresh() for hub in hubs))
+        return time.monotonic() - start
+
+    duration = benchmark.pedantic(lambda: run(start_together()), rounds=1)
+    for hub in hubs:
+        run(hub.disconnect())
+    for broker in brokers:
+        run(broker.close())
+    count = peak = 0
+    for _time, change in sorted(in_flight):
+        count += change
+        peak = max(peak, count)
+    benchmark.extra_info["messages"] = len(received)
+    benchmark.extra_info["startup_seconds"] = duration
+    benchmark.extra_info["peak_full_publishes_in_flight"] = peak
+    benchmark.extra_info["peak_messages_per_second"] = _peak_rate(received)
@@ -0,0 +1,79 @@
+"""Benchmarks for topic parsing and payload unwrapping."""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from custom_components.victron_mqtt._vendor.victron_mqtt._unwrappers import (
+    unwrap_bitmask,
+    unwrap_bool,
+    unwrap_enum,
+    unwrap_epoch,
+    unwrap_float,
+    unwrap_int,
+    unwrap_string,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt._victron_enums import (
+    DeviceType,
+    SolarChargerDeviceOffReason,
+    State,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.data_classes import ParsedTopic
+
+from .corpus import recorded_corpora, synthetic_corpus
+
+RECORDED = recorded_corpora()
+
+UNWRAPPER_CASES = {
+    "float": (unwrap_float, '{"value": 231.456}', (1,)),
+    "int": (unwrap_int, '{"value": 42}', ()),
+    "bool": (unwrap_bool, '{"value": 1}', ()),
+    "string": (unwrap_string, '{"value": "SmartSolar MPPT 150/35"}', ()),
+    "epoch": (unwrap_epoch, '{"value": 1760000000}', ()),
+    "enum": (unwrap_enum, '{"value": 3}', (State,)),
+    "bitmask": (unwrap_bitmask, '{"value": 13}', (SolarChargerDeviceOffReason,)),
+}
+
+ENUM_LOOKUP_CASES = {
+    "code": (State.from_code, 3),
+    "device_code": (DeviceType.from_code, "solarcharger"),
+    "mapped_device_code": (DeviceType.from_code, "CGwacs"),
+    "id_or_string": (State.from_id_or_string, "Absorption"),
+}
+
+
+@pytest.mark.parametrize("corpus_name", sorted(RECORDED))
+def test_parsed_topic_from_recorded(benchmark, corpus_name):
+    topics = [topic for topic, _ in RECORDED[corpus_name]]
+    benchmark.extra_info["messages"] = len(topics)
+
+    def parse_all():
+        for topic in topics:
+            ParsedTopic.from_topic(topic)
+
+    benchmark(parse_all)
+
+
+def test_parsed_topic_from_synthetic(benchmark):
+    topics = [topic for topic, _ in synthetic_corpus(1000)]
+    benchmark.extra_info["messages"] = len(topics)
+
+    def parse_all():
+        for topic in topics:
+            ParsedTopic.from_topic(topic)
+
+    benchmark(parse_all)
+
+
+@pytest.mark.parametrize("case", sorted(UNWRAPPER_CASES))
+def test_unwrapper(benchmark, case):
+    unwrapper, payload, args = UNWRAPPER_CASES[case]
+    assert unwrapper(payload, *args) is not None
+    benchmark(unwrapper, payload, *args)
+
+
+@pytest.mark.parametrize("case", sorted(ENUM_LOOKUP_CASES))
+def test_enum_lookup(benchmark, case):
+    lookup, value = ENUM_LOOKUP_CASES[case]
+    assert lookup(value) is not None
+    benchmark(lookup, value)
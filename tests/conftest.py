@@ -7,6 +7,10 @@ import pytest
 from pytest_homeassistant_custom_component.syrupy import HomeAssistantSnapshotExtension
 from syrupy.assertion import SnapshotAssertion
 
+# The benchmarks are timing sensitive and slow, they only run when asked for: pytest tests/benchmarks
+# CI runs each of them once without timing: pytest tests/benchmarks --benchmark-disable
+collect_ignore = ["benchmarks"]
+
 
 @pytest.fixture
 def snapshot(snapshot: SnapshotAssertion) -> SnapshotAssertion:
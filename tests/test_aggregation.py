@@ -0,0 +1,157 @@
+"""Test aggregating the samples of throttled measurements."""
+
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, Sequence
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Metric,
+    MetricType,
+    UpdateAggregation,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("battery", first_device_id=512),
+        DeviceGroup("evcharger", first_device_id=40),
+    )
+)
+log_debug = logging.getLogger(__name__).debug
+
+# Samples of a 5 s interval after the first notification of 100 at t=1000:
+# 100 for 1 s, 300 for 2 s and 200 for 2 s.
+SAMPLES = [(1000.0, 100.0), (1001.0, 300.0), (1003.0, 200.0), (1005.0, 200.0)]
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+async def _connected_hub(broker: VenusBrokerEmulator, **kwargs) -> VictronVenusHub:
+    kwargs.setdefault("update_frequency_seconds", 5)
+    hub = broker.create_hub(deadbands={MetricType.POWER: None}, **kwargs)
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+    return hub
+
+
+async def _notified(metric: Metric, samples: Sequence[tuple[float, float | None]]) -> list[float | None]:
+    """Handle the samples at their monotonic time and return the values handed to on_update."""
+    notified: list[float | None] = []
+    metric.on_update = lambda _metric, value: notified.append(value)
+    metric._clear_value()
+    for now, value in samples:
+        with patch(f"{Metric.__module__}.time.monotonic", return_value=now):
+            metric._handle_message(value, log_debug)
+        await asyncio.sleep(0)
+    return notified
+
+
+@pytest.mark.parametrize(
+    ("aggregation", "expected"),
+    [
+        (UpdateAggregation.LAST, 200.0),
+        (UpdateAggregation.MEAN, 220.0),
+        (UpdateAggregation.MIN, 100.0),
+        (UpdateAggregation.MAX, 300.0),
+    ],
+)
+async def test_aggregation(broker, aggregation, expected):
+    hub = await _connected_hub(broker, update_aggregation=aggregation)
+    power = hub._all_metrics["battery_512_battery_power"]
+
+    assert await _notified(power, SAMPLES) == [100.0, expected]
+
+    # The metric itself keeps the latest sample, e.g. for formulas
+    assert power.value == 200.0
+    if aggregation is UpdateAggregation.LAST:
+        assert power._window is None
+        assert power.window_min is None
+        assert power.window_max is None
+    else:
+        assert (power.window_min, power.window_max) == (100.0, 300.0)
+    await hub.disconnect()
+
+
+async def test_window_restarts_from_current_value(broker):
+    hub = await _connected_hub(broker, update_aggregation=UpdateAggregation.MEAN)
+    power = hub._all_metrics["battery_512_battery_power"]
+
+    # The 200 of the previous interval holds until 500 arrives at t=1008
+    notified = await _notified(power, [*SAMPLES, (1008.0, 500.0), (1010.0, 500.0)])
+
+    assert notified == [100.0, 220.0, 320.0]
+    assert (power.window_min, power.window_max) == (200.0, 500.0)
+    await hub.disconnect()
+
+
+async def test_keepalive_delivers_aggregate(broker):
+    """A window cut short by the throttle is delivered by the keepalive sweep."""
+    hub = await _connected_hub(broker, update_aggregation=UpdateAggregation.MAX)
+    power = hub._all_metrics["battery_512_battery_power"]
+    notified = await _notified(power, [(1000.0, 100.0), (1001.0, 400.0), (1002.0, 150.0)])
+    assert notified == [100.0]
+
+    with patch(f"{Metric.__module__}.time.monotonic", return_value=1030.0):
+        power._keepalive(False, log_debug)
+    await asyncio.sleep(0)
+
+    assert notified == [100.0, 400.0]
+    await hub.disconnect()
+
+
+async def test_unavailable_empties_window(broker):
+    hub = await _connected_hub(broker, update_aggregation=UpdateAggregation.MAX)
+    power = hub._all_metrics["battery_512_battery_power"]
+
+    notified = await _notified(power, [(1000.0, 100.0), (1001.0, 400.0), (1002.0, None), (1003.0, 50.0)])
+
+    assert notified == [100.0, None, 50.0]
+    assert (power.window_min, power.window_max) == (50.0, 50.0)
+    await hub.disconnect()
+
+
+async def test_only_throttled_measurements_aggregate(broker):
+    hub = await _connected_hub(broker, update_aggregation=UpdateAggregation.MEAN)
+    assert hub._all_metrics["battery_512_battery_power"]._window is not None
+    assert hub._all_metrics["evcharger_40_evcharger_max_set_current"]._window is None
+    assert hub._all_metrics["battery_512_battery_charged_energy"]._window is None
+
+    hub.set_update_frequency(None)
+    assert all(metric._window is None for metric in hub._all_metrics.values())
+    await hub.disconnect()
+
+
+async def test_set_update_aggregation(broker):
+    hub = await _connected_hub(broker)
+    power = hub._all_metrics["battery_512_battery_power"]
+    assert power._window is None
+
+    hub.set_update_aggregation(UpdateAggregation.MEAN)
+    assert await _notified(power, SAMPLES) == [100.0, 220.0]
+
+    hub.set_update_aggregation(UpdateAggregation.LAST)
+    assert power._window is None
+    assert power.window_min is None
+
+    with pytest.raises(TypeError):
+        hub.set_update_aggregation("mean")  # type: ignore[arg-type]
+    await hub.disconnect()
@@ -0,0 +1,156 @@
+"""Test the Venus OS broker emulator against a real Hub over localhost sockets."""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+from paho.mqtt.client import Client as MQTTClient
+from paho.mqtt.client import MQTTv5
+from paho.mqtt.enums import CallbackAPIVersion
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import AuthenticationError
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing.broker_emulator import (
+    topic_matches,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", count=2, first_device_id=278),
+        DeviceGroup("battery", first_device_id=512),
+    )
+)
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    """Provide a running emulator loaded with a small synthetic installation."""
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    """Provide a Hub connected to the emulator with its first refresh done."""
+    victron_hub = broker.create_hub()
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+@pytest.mark.parametrize(
+    ("topic_filter", "topic", "expected"),
+    [
+        ("N/123/battery/+/Soc", "N/123/battery/512/Soc", True),
+        ("N/123/battery/+/Soc", "N/123/battery/512/Dc/0/Voltage", False),
+        ("N/123/#", "N/123/battery/512/Soc", True),
+        ("N/+/system/0/Serial", "N/123/system/0/Serial", True),
+        ("N/123/battery", "N/123/battery/512", False),
+    ],
+)
+def test_topic_matches(topic_filter, topic, expected):
+    assert topic_matches(topic_filter, topic) is expected
+
+
+async def test_hub_discovers_installation(broker, hub):
+    """The hub finds the installation id and builds devices from the full publish."""
+    assert hub.installation_id == "123"
+    assert {"solarcharger_278", "solarcharger_279", "battery_512"} <= set(hub.devices)
+    assert broker.stats.full_publishes == 1
+    assert broker.client_count == 1
+
+
+async def test_suppress_republish_while_alive(broker, hub):
+    """A suppressing keepalive only republishes once the installation went silent."""
+    keepalives = broker.stats.keepalives
+    hub._keepalive()
+    await _wait_until(lambda: broker.stats.keepalives == keepalives + 1)
+    assert broker.stats.full_publishes == 1
+
+    broker._alive_until = 0
+    hub._keepalive()
+    await _wait_until(lambda: broker.stats.full_publishes == 2)
+
+
+async def test_changes_forwarded_only_while_alive(broker, hub):
+    """Value changes reach the hub only while the keepalive has not expired."""
+    metric = hub._all_metrics["battery_512_battery_soc"]
+    assert await broker.publish([("N/123/battery/512/Soc", '{"value": 42.5}')]) == 1
+    await _wait_until(lambda: metric.value == 42.5)
+
+    broker._alive_until = 0
+    assert await broker.publish([("N/123/battery/512/Soc", '{"value": 43.5}')]) == 0
+
+
+async def test_write_is_echoed(broker, hub):
+    """A W/ message updates the value and is echoed back on N/."""
+    metric = hub._all_metrics["solarcharger_278_solarcharger_charge_current_limit"]
+    metric.set(12.5)
+    await _wait_until(lambda: metric.value == 12.5)
+    assert broker.written == [("W/123/solarcharger/278/Settings/ChargeCurrentLimit", '{"value": 12.5}')]
+
+
+async def test_old_firmware_without_echo():
+    """Without echo support the hub still completes its first refresh."""
+    async with VenusBrokerEmulator(supports_echo=False) as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        victron_hub = emulator.create_hub()
+        await victron_hub.connect()
+        await victron_hub.wait_for_first_refresh()
+        assert "battery_512" in victron_hub.devices
+        await victron_hub.disconnect()
+
+
+async def test_rejects_bad_credentials():
+    """Wrong credentials are refused, which the hub reports as an authentication error."""
+    async with VenusBrokerEmulator(credentials=("victron_mqtt", "secret")) as emulator:
+        victron_hub = VictronVenusHub(
+            host=emulator.host, port=emulator.port, username=None, password="wrong", use_ssl=False
+        )
+        with pytest.raises(AuthenticationError):
+            await victron_hub.connect()
+
+
+async def test_mqtt_v5_client(broker):
+    """An MQTT 5 client can subscribe and receives the full publish after a keepalive."""
+    received: list[str] = []
+    completed = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def on_message(_client, _userdata, message):
+        received.append(message.topic)
+        if message.topic.endswith("full_publish_completed"):
+            loop.call_soon_threadsafe(completed.set)
+
+    client = MQTTClient(callback_api_version=CallbackAPIVersion.VERSION2, protocol=MQTTv5)
+    client.on_message = on_message
+    client.connect(broker.host, broker.port)
+    client.loop_start()
+    try:
+        client.subscribe("N/123/battery/#")
+        client.subscribe("N/123/full_publish_completed")
+        client.publish("R/123/keepalive", "")
+        async with asyncio.timeout(5):
+            await completed.wait()
+    finally:
+        client.disconnect()
+        client.loop_stop()
+    assert "N/123/battery/512/Soc" in received
+    assert not any(topic.startswith("N/123/solarcharger") for topic in received)
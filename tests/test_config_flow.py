@@ -15,10 +15,12 @@ from custom_components.victron_mqtt.const import (
     CONF_ROOT_TOPIC_PREFIX,
     CONF_SERIAL,
     CONF_SIMPLE_NAMING,
+    CONF_UPDATE_AGGREGATION,
     CONF_UPDATE_FREQUENCY_MODE,
     CONF_UPDATE_FREQUENCY_SECONDS,
     DEFAULT_PORT,
     DEFAULT_SIMPLE_NAMING,
+    DEFAULT_UPDATE_AGGREGATION,
     DEFAULT_UPDATE_FREQUENCY_SECONDS,
     DOMAIN,
     UPDATE_FREQUENCY_MODE_AUTO,
@@ -103,6 +105,7 @@ async def test_user_flow_full_config(hass: HomeAssistant) -> None:
         CONF_UPDATE_FREQUENCY_MODE: UPDATE_FREQUENCY_MODE_MANUAL,
         CONF_UPDATE_FREQUENCY_SECONDS: 60,
         CONF_EXCLUDED_DEVICES: [],
+        CONF_UPDATE_AGGREGATION: DEFAULT_UPDATE_AGGREGATION,
         CONF_INSTALLATION_ID: MOCK_INSTALLATION_ID,
     }
 
@@ -141,6 +144,7 @@ async def test_user_flow_minimal_config(hass: HomeAssistant) -> None:
         CONF_UPDATE_FREQUENCY_SECONDS: DEFAULT_UPDATE_FREQUENCY_SECONDS,
         CONF_OPERATION_MODE: OperationMode.FULL.value,
         CONF_EXCLUDED_DEVICES: [],
+        CONF_UPDATE_AGGREGATION: DEFAULT_UPDATE_AGGREGATION,
         CONF_INSTALLATION_ID: MOCK_INSTALLATION_ID,
     }
 
@@ -422,6 +426,7 @@ async def test_options_flow_success(hass: HomeAssistant) -> None:
             CONF_UPDATE_FREQUENCY_SECONDS: 45,
             CONF_OPERATION_MODE: OperationMode.FULL.value,
             CONF_EXCLUDED_DEVICES: [],
+            CONF_UPDATE_AGGREGATION: DEFAULT_UPDATE_AGGREGATION,
         }
         assert len(mock_reload.mock_calls) == 1
 
@@ -0,0 +1,149 @@
+"""Test holding back insignificant changes of noisy measurements."""
+
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, Sequence
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    DEFAULT_DEADBANDS,
+    Deadband,
+    Metric,
+    MetricType,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("battery", first_device_id=512),
+        DeviceGroup("evcharger", first_device_id=40),
+    )
+)
+log_debug = logging.getLogger(__name__).debug
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+async def _connected_hub(broker: VenusBrokerEmulator, **kwargs) -> VictronVenusHub:
+    hub = broker.create_hub(update_frequency_seconds=None, **kwargs)
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+    return hub
+
+
+async def _notified(metric: Metric, values: Sequence[float | None]) -> list[float | None]:
+    """Handle the values one by one and return those handed to on_update."""
+    notified: list[float | None] = []
+    metric.on_update = lambda _metric, value: notified.append(value)
+    for value in values:
+        metric._handle_message(value, log_debug)
+        await asyncio.sleep(0)
+    return notified
+
+
+async def test_absolute_deadband(broker):
+    hub = await _connected_hub(broker)
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+    assert voltage._deadband == DEFAULT_DEADBANDS[MetricType.VOLTAGE]
+
+    notified = await _notified(voltage, [12.60, 12.62, 12.64, 12.66, 12.67, 12.60])
+
+    # Drift is measured against the last notified value, not the previous message
+    assert notified == [12.60, 12.66, 12.60]
+    assert voltage.value == 12.60
+    await hub.disconnect()
+
+
+async def test_relative_deadband(broker):
+    hub = await _connected_hub(broker)
+    power = hub._all_metrics["battery_512_battery_power"]
+
+    notified = await _notified(power, [2000.0, 2015.0, 2025.0, 10.0, 14.0, 16.0])
+
+    # 1% of 2000 W is above the 5 W floor, near zero the floor applies
+    assert notified == [2000.0, 2025.0, 10.0, 16.0]
+    await hub.disconnect()
+
+
+async def test_unavailable_is_always_notified(broker):
+    hub = await _connected_hub(broker)
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+
+    notified = await _notified(voltage, [12.60, None, 12.61])
+
+    assert notified == [12.60, None, 12.61]
+    await hub.disconnect()
+
+
+async def test_deadband_overrides(broker):
+    hub = await _connected_hub(
+        broker,
+        deadbands={"battery_voltage": None, MetricType.POWER: Deadband(absolute=100)},
+    )
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+    power = hub._all_metrics["battery_512_battery_power"]
+    assert voltage._deadband is None
+    assert hub._all_metrics["battery_512_battery_current"]._deadband == DEFAULT_DEADBANDS[MetricType.CURRENT]
+
+    assert await _notified(voltage, [12.60, 12.61]) == [12.60, 12.61]
+    assert await _notified(power, [2000.0, 2090.0, 2100.0]) == [2000.0, 2100.0]
+    await hub.disconnect()
+
+
+async def test_setpoints_are_not_deadbanded(broker):
+    hub = await _connected_hub(broker)
+    setpoint = hub._all_metrics["evcharger_40_evcharger_max_set_current"]
+    assert setpoint.metric_type == MetricType.CURRENT
+    assert setpoint._deadband is None
+
+    assert await _notified(setpoint, [16.0, 16.05]) == [16.0, 16.05]
+    await hub.disconnect()
+
+
+async def test_max_silence(broker):
+    """A held change is delivered by the keepalive sweep once the metric was silent too long."""
+    hub = await _connected_hub(broker, deadband_max_silence_seconds=60)
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+    notified = await _notified(voltage, [12.60, 12.62])
+    assert notified == [12.60]
+
+    voltage._keepalive(False, log_debug)
+    await asyncio.sleep(0)
+    assert notified == [12.60]
+
+    voltage._last_notified -= 61
+    voltage._keepalive(False, log_debug)
+    await asyncio.sleep(0)
+    assert notified == [12.60, 12.62]
+
+    voltage._last_notified -= 61
+    voltage._handle_message(12.61, log_debug)
+    await asyncio.sleep(0)
+    assert notified == [12.60, 12.62, 12.61]
+    await hub.disconnect()
+
+
+async def test_invalid_deadbands(broker):
+    with pytest.raises(ValueError):
+        Deadband(absolute=-1)
+    with pytest.raises(TypeError):
+        broker.create_hub(deadbands={MetricType.POWER: 5})
+    with pytest.raises(ValueError):
+        broker.create_hub(deadband_max_silence_seconds=0)
@@ -0,0 +1,98 @@
+"""Test invalidating the metrics of a device that stopped publishing all at once."""
+
+import asyncio
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Device, DeviceType
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.hub import (
+    STALE_METRIC_TIMEOUT_SECONDS,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+SPEC = InstallationSpec(groups=(DeviceGroup("system"), DeviceGroup("battery", count=2, first_device_id=512)))
+
+
+async def _hub(**hub_kwargs) -> tuple[VictronVenusHub, list[Device]]:
+    hub = await create_mocked_hub(**hub_kwargs)
+    await inject_messages(hub, SyntheticInstallation(SPEC).full_publish())
+    await finalize_injection(hub, disconnect=False)
+    unavailable: list[Device] = []
+    hub.on_device_unavailable = lambda _hub, device: unavailable.append(device)
+    return hub, unavailable
+
+
+def _silence(device: Device, seconds: float) -> None:
+    """Make the device and its metrics look silent for seconds."""
+    device._last_seen -= seconds
+    for metric in device._metrics.values():
+        metric._last_seen -= seconds
+
+
+async def test_silent_device_is_invalidated_at_once():
+    hub, unavailable = await _hub()
+    battery = hub._devices["battery_512"]
+    _silence(battery, STALE_METRIC_TIMEOUT_SECONDS - 100)
+    # A metric silent for longer than the timeout, while the rest of the device is silent too
+    next(iter(battery._metrics.values()))._last_seen -= 200
+
+    hub._keepalive_metrics(stale_timeout=STALE_METRIC_TIMEOUT_SECONDS)
+    assert all(metric.value is not None for metric in battery.metrics)
+
+    _silence(battery, 200)
+    hub._keepalive_metrics(stale_timeout=STALE_METRIC_TIMEOUT_SECONDS)
+    await asyncio.sleep(0)
+
+    assert unavailable == [battery]
+    assert not battery.available
+    assert all(metric.value is None for metric in battery.metrics)
+    assert all(metric.value is not None for metric in hub._devices["battery_513"].metrics)
+
+    hub._keepalive_metrics(stale_timeout=STALE_METRIC_TIMEOUT_SECONDS)
+    await asyncio.sleep(0)
+    assert unavailable == [battery]
+
+    await inject_messages(hub, [("N/123/battery/512/Dc/0/Voltage", '{"value": 12.3}')])
+    assert battery.available
+
+
+async def test_metric_silent_while_device_publishes_is_invalidated_alone():
+    hub, unavailable = await _hub()
+    battery = hub._devices["battery_512"]
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+    voltage._last_seen -= STALE_METRIC_TIMEOUT_SECONDS + 10
+
+    hub._keepalive_metrics(stale_timeout=STALE_METRIC_TIMEOUT_SECONDS)
+    await asyncio.sleep(0)
+
+    assert voltage.value is None
+    assert battery.available
+    assert unavailable == []
+    assert [metric for metric in battery.metrics if metric.value is None] == [voltage]
+
+
+async def test_timeout_per_device_type():
+    hub, unavailable = await _hub(device_timeouts={DeviceType.BATTERY: 30})
+    for device in hub._devices.values():
+        _silence(device, 60)
+
+    hub._keepalive_metrics(stale_timeout=STALE_METRIC_TIMEOUT_SECONDS)
+    await asyncio.sleep(0)
+
+    assert {device.unique_id for device in unavailable} == {"battery_512", "battery_513"}
+    assert hub._devices["system_0"].available
+
+
+async def test_invalid_device_timeouts():
+    with pytest.raises(ValueError):
+        await create_mocked_hub(device_timeouts={DeviceType.BATTERY: 0})
+    with pytest.raises(TypeError):
+        await create_mocked_hub(device_timeouts={"battery": 30})
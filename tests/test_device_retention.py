@@ -0,0 +1,115 @@
+"""Test forgetting the devices silent for longer than the retention."""
+
+import asyncio
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Device, Metric
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+RETENTION_SECONDS = 600
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("battery", count=2, first_device_id=512),
+        DeviceGroup("solarcharger", count=2, first_device_id=278),
+    )
+)
+SWITCH_MESSAGES = [
+    ("N/123/switch/100/SwitchableOutput/output_1/State", '{"value": 1}'),
+    ("N/123/switch/100/SwitchableOutput/output_1/Settings/Type", '{"value": 1}'),
+]
+
+
+async def _hub() -> tuple[VictronVenusHub, list[Device], list[Metric]]:
+    hub = await create_mocked_hub(device_retention_seconds=RETENTION_SECONDS, metric_settle_seconds=0)
+    await inject_messages(hub, [*SyntheticInstallation(SPEC).full_publish(), *SWITCH_MESSAGES])
+    await finalize_injection(hub, disconnect=False)
+    removed_devices: list[Device] = []
+    removed_metrics: list[Metric] = []
+    hub.on_device_removed = lambda _hub, device: removed_devices.append(device)
+    hub.on_metric_removed = lambda _hub, _device, metric: removed_metrics.append(metric)
+    # Connected long enough for every present device to have published
+    hub._connected_at -= RETENTION_SECONDS * 2
+    return hub, removed_devices, removed_metrics
+
+
+async def _full_publish(hub: VictronVenusHub) -> None:
+    hub._handle_full_publish_message(skip_validation=True)
+    await asyncio.sleep(0)
+
+
+async def test_silent_device_is_evicted_and_rediscovered():
+    hub, removed_devices, removed_metrics = await _hub()
+    charger = hub._devices["solarcharger_278"]
+    charger_metrics = list(charger._metrics.values())
+    charger._last_seen -= RETENTION_SECONDS + 1
+
+    await _full_publish(hub)
+
+    assert removed_devices == [charger]
+    # Reported as a device only, its metrics are not removed one by one
+    assert removed_metrics == []
+    assert "solarcharger_278" not in hub._devices
+    assert "solarcharger_278" not in hub.devices
+    assert "solarcharger_278" not in hub._notified_device_ids
+    assert not any(metric.unique_id.startswith("solarcharger_278") for metric in hub._all_metrics.values())
+    assert not any(set(metric._depend_on_me) & set(charger_metrics) for metric in hub._all_metrics.values())
+    assert not any("/solarcharger/278/" in topic for topic, _payload in hub.export_structure()["messages"])
+    assert "solarcharger_279" in hub.devices
+
+    await inject_messages(
+        hub,
+        [
+            ("N/123/solarcharger/278/Yield/Power", '{"value": 120}'),
+            ("N/123/solarcharger/278/Pv/V", '{"value": 40}'),
+        ],
+    )
+    await inject_messages(hub, [("N/123/system/0/Dc/Battery/Soc", '{"value": 51}')])
+    assert "solarcharger_278" in hub.devices
+
+
+async def test_parent_goes_with_its_last_sub_device():
+    hub, removed_devices, _removed_metrics = await _hub()
+    hub._devices["switch_100_output_output_1"]._last_seen -= RETENTION_SECONDS + 1
+
+    await _full_publish(hub)
+
+    assert {device.unique_id for device in removed_devices} == {"switch_100_output_output_1", "switch_100"}
+    assert not any(device_id.startswith("switch_100") for device_id in hub._devices)
+
+
+async def test_nothing_is_evicted_right_after_connecting():
+    hub, removed_devices, _removed_metrics = await _hub()
+    for device in hub._devices.values():
+        device._last_seen -= RETENTION_SECONDS + 1
+    hub._connected_at = device._last_seen + RETENTION_SECONDS + 1
+
+    await _full_publish(hub)
+
+    assert removed_devices == []
+
+
+async def test_retention_is_off_by_default():
+    hub = await create_mocked_hub(metric_settle_seconds=0)
+    await inject_messages(hub, SyntheticInstallation(SPEC).full_publish())
+    await finalize_injection(hub, disconnect=False)
+    hub._connected_at -= RETENTION_SECONDS * 2
+    hub._devices["solarcharger_278"]._last_seen -= RETENTION_SECONDS * 1000
+
+    await _full_publish(hub)
+
+    assert "solarcharger_278" in hub.devices
+
+
+async def test_invalid_retention():
+    with pytest.raises(ValueError):
+        await create_mocked_hub(device_retention_seconds=0)
@@ -0,0 +1,76 @@
+"""Test the incrementally maintained visible devices, visible metrics and effective parents."""
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+SPEC = InstallationSpec(groups=(DeviceGroup("system"), DeviceGroup("battery", count=2, first_device_id=512)))
+SWITCH_MESSAGES = [
+    ("N/123/switch/100/SwitchableOutput/output_1/State", '{"value": 1}'),
+    ("N/123/switch/100/SwitchableOutput/output_1/Settings/Type", '{"value": 1}'),
+]
+OUTPUT = "switch_100_output_output_1"
+
+
+async def _hub() -> VictronVenusHub:
+    hub = await create_mocked_hub()
+    await inject_messages(hub, [*SyntheticInstallation(SPEC).full_publish(), *SWITCH_MESSAGES])
+    await finalize_injection(hub, disconnect=False)
+    return hub
+
+
+def _scanned_devices(hub: VictronVenusHub) -> dict:
+    """The devices as they were filtered on every access."""
+    return {k: v for k, v in hub._devices.items() if [m for m in v._metrics.values() if not m._descriptor.hidden]}
+
+
+async def test_devices_follow_metric_changes():
+    hub = await _hub()
+    devices = hub.devices
+    assert devices == _scanned_devices(hub)
+    assert "switch_100" in hub._devices
+    assert "switch_100" not in devices
+    # Kept while nothing changes
+    assert hub.devices is devices
+
+    battery = hub._devices["battery_513"]
+    metrics = battery.metrics
+    assert battery.metrics is metrics
+    for metric in list(metrics)[:-1]:
+        hub._remove_metric(metric)
+    assert len(battery.metrics) == 1
+    assert hub.devices is devices
+
+    hub._remove_metric(battery.metrics[0])
+    assert battery.metrics == []
+    assert not battery.has_visible_metrics
+    assert "battery_513" not in hub.devices
+    assert hub.devices == _scanned_devices(hub)
+
+
+async def test_parent_skips_empty_devices_until_they_get_a_metric():
+    hub = await _hub()
+    system = hub._devices["system_0"]
+    switch = hub._devices["switch_100"]
+    output = hub._devices[OUTPUT]
+    assert switch.parent_device is system
+    assert output.parent_device is system
+
+    # A visible metric on the switch device makes it the parent of its outputs
+    state = output.get_metric("switch_output_1_state")
+    assert state is not None
+    switch._store_metric(state)
+    hub._update_device_visibility(switch)
+    assert output.parent_device is switch
+    assert "switch_100" in hub.devices
+
+    switch._remove_metric(state.short_id)
+    hub._update_device_visibility(switch)
+    assert output.parent_device is system
+    assert hub.devices == _scanned_devices(hub)
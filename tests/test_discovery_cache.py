@@ -0,0 +1,187 @@
+"""Test exporting and restoring the discovered structure of an installation."""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Device,
+    Metric,
+    ProgrammingError,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.hub import (
+    STRUCTURE_FORMAT_VERSION,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", count=2, first_device_id=278),
+        DeviceGroup("battery", first_device_id=512),
+    )
+)
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def structure() -> dict:
+    """Discover the synthetic installation once and return its exported structure."""
+    async with VenusBrokerEmulator() as broker:
+        broker.load(SyntheticInstallation(SPEC).full_publish())
+        hub = broker.create_hub()
+        await hub.connect()
+        await hub.wait_for_first_refresh()
+        exported = hub.export_structure()
+        await hub.disconnect()
+    return exported
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        yield emulator
+
+
+def _collect(hub: VictronVenusHub) -> tuple[dict[str, Metric], list[Metric]]:
+    """Record the metrics announced and removed by the hub."""
+    announced: dict[str, Metric] = {}
+    removed: list[Metric] = []
+
+    def on_new_metric(_hub: VictronVenusHub, _device: Device, metric: Metric) -> None:
+        announced[metric.unique_id] = metric
+
+    def on_metric_removed(_hub: VictronVenusHub, _device: Device, metric: Metric) -> None:
+        removed.append(metric)
+
+    hub.on_new_metric = on_new_metric
+    hub.on_metric_removed = on_metric_removed
+    return announced, removed
+
+
+async def test_export_structure(structure):
+    assert structure["version"] == STRUCTURE_FORMAT_VERSION
+    assert structure["installation_id"] == "123"
+    topics = [topic for topic, _payload in structure["messages"]]
+    assert len(topics) == len(set(topics))
+    assert all(topic.startswith("N/123/") for topic in topics)
+
+
+async def test_restore_announces_metrics_without_values(broker, structure):
+    """Restored metrics are announced before connecting and carry no value."""
+    hub = broker.create_hub()
+    announced, _removed = _collect(hub)
+
+    restored = await hub.restore_structure(structure)
+
+    assert restored == len(announced) > 0
+    assert {"solarcharger_278", "solarcharger_279", "battery_512"} <= set(hub.devices)
+    assert all(metric.value is None for metric in announced.values())
+    assert all(metric.name for metric in announced.values())
+
+
+async def test_restored_metrics_receive_live_values(broker, structure):
+    broker.load(SyntheticInstallation(SPEC).full_publish())
+    hub = broker.create_hub()
+    announced, removed = _collect(hub)
+    await hub.restore_structure(structure)
+    restored_ids = set(announced)
+
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+    await asyncio.sleep(0)
+
+    assert removed == []
+    assert set(announced) == restored_ids
+    assert all(hub._all_metrics[unique_id] is announced[unique_id] for unique_id in restored_ids)
+    assert hub._all_metrics["battery_512_battery_soc"].value is not None
+    await hub.disconnect()
+
+
+async def test_restored_metrics_missing_on_broker_stay_unavailable(broker, structure):
+    """Metrics of a device offline since the export are kept, without a value."""
+    spec = InstallationSpec(
+        groups=(
+            DeviceGroup("system"),
+            DeviceGroup("solarcharger", first_device_id=278),
+            DeviceGroup("battery", first_device_id=512),
+        )
+    )
+    broker.load(SyntheticInstallation(spec).full_publish())
+    hub = broker.create_hub()
+    announced, removed = _collect(hub)
+    await hub.restore_structure(structure)
+
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+    await asyncio.sleep(0)
+
+    assert removed == []
+    offline = [metric for metric in announced.values() if metric._device.unique_id == "solarcharger_279"]
+    assert offline
+    assert all(metric.unique_id in hub._all_metrics and metric.value is None for metric in offline)
+    assert hub._all_metrics["solarcharger_278_solarcharger_yield_power"].value is not None
+    await hub.disconnect()
+
+
+async def test_restored_metric_published_as_null_is_kept(broker, structure):
+    """A restored topic still on the broker with a null value stays, unavailable."""
+    null_topic = "N/123/battery/512/Soc"
+    broker.load(
+        [
+            (topic, '{"value": null}' if topic == null_topic else payload)
+            for topic, payload in SyntheticInstallation(SPEC).full_publish()
+        ]
+    )
+    hub = broker.create_hub()
+    _announced, removed = _collect(hub)
+    await hub.restore_structure(structure)
+
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+    await asyncio.sleep(0)
+
+    assert removed == []
+    assert hub._all_metrics["battery_512_battery_soc"].value is None
+    await hub.disconnect()
+
+
+@pytest.mark.parametrize(
+    "change",
+    [{"version": STRUCTURE_FORMAT_VERSION + 1}, {"installation_id": "456"}, {"installation_id": None}],
+    ids=["version", "installation", "no_installation"],
+)
+async def test_restore_ignores_unusable_structure(broker, structure, change):
+    hub = broker.create_hub(installation_id="123")
+    announced, _removed = _collect(hub)
+
+    assert await hub.restore_structure(structure | change) == 0
+    assert announced == {}
+    assert hub._all_metrics == {}
+
+
+async def test_restore_after_discovery_raises(broker, structure):
+    broker.load(SyntheticInstallation(SPEC).full_publish())
+    hub = broker.create_hub()
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+
+    with pytest.raises(ProgrammingError):
+        await hub.restore_structure(structure)
+    await hub.disconnect()
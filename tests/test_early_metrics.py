@@ -0,0 +1,128 @@
+"""Test creating the metrics of topics appearing after the first full publish without waiting for the next one."""
+
+import asyncio
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Device,
+    Metric,
+    MetricKind,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+SETTLE_SECONDS = 0.05
+KNOWN_DEVICES = [
+    ("N/123/system/0/Dc/Battery/Soc", '{"value": 50}'),
+    ("N/123/battery/512/Dc/0/Voltage", '{"value": 12.1}'),
+    ("N/123/vebus/276/Ac/ActiveIn/ActiveInput", '{"value": 0}'),
+    ("N/123/ev/40/Ac/Power", '{"value": 0}'),
+]
+CURRENT_LIMIT = "N/123/vebus/276/Ac/ActiveIn/CurrentLimit"
+
+
+async def _hub(**hub_kwargs) -> tuple[VictronVenusHub, list[Device], list[Metric]]:
+    hub = await create_mocked_hub(**{"metric_settle_seconds": SETTLE_SECONDS, **hub_kwargs})
+    new_devices: list[Device] = []
+    new_metrics: list[Metric] = []
+    hub.on_new_device = lambda _hub, device: new_devices.append(device)
+    hub.on_new_metrics = lambda _hub, batch: new_metrics.extend(metric for _device, metric in batch)
+    await inject_messages(hub, KNOWN_DEVICES)
+    await finalize_injection(hub, disconnect=False)
+    new_devices.clear()
+    new_metrics.clear()
+    return hub, new_devices, new_metrics
+
+
+async def _settle(hub: VictronVenusHub) -> None:
+    """Let the settle time pass, then deliver a message of a known topic."""
+    await asyncio.sleep(SETTLE_SECONDS * 2)
+    await inject_messages(hub, [("N/123/system/0/Dc/Battery/Soc", '{"value": 51}')])
+
+
+async def test_new_topic_of_known_device_is_created_right_away():
+    hub, new_devices, new_metrics = await _hub()
+
+    await inject_messages(hub, [("N/123/battery/512/Dc/0/Current", '{"value": 3.2}')])
+
+    assert [metric.unique_id for metric in new_metrics] == ["battery_512_battery_current"]
+    assert new_devices == []
+    assert hub._metrics_placeholders == {}
+
+
+async def test_new_device_is_created_once_settled():
+    hub, new_devices, new_metrics = await _hub()
+
+    await inject_messages(
+        hub,
+        [
+            ("N/123/battery/513/Dc/0/Voltage", '{"value": 12.4}'),
+            ("N/123/battery/513/ProductName", '{"value": "SmartShunt"}'),
+            ("N/123/battery/513/Soc", '{"value": 80}'),
+        ],
+    )
+    assert new_metrics == []
+
+    await _settle(hub)
+
+    assert [device.unique_id for device in new_devices] == ["battery_513"]
+    assert new_devices[0].model == "SmartShunt"
+    assert {metric.unique_id for metric in new_metrics} == {"battery_513_battery_voltage", "battery_513_battery_soc"}
+    assert hub._staged_placeholders == {}
+
+
+async def test_dependency_arriving_later_creates_waiting_metric():
+    hub, _new_devices, new_metrics = await _hub()
+
+    await inject_messages(hub, [("N/123/ev/40/ChargingStarted", '{"value": 1700000000}')])
+    await _settle(hub)
+    assert new_metrics == []
+    assert hub._placeholders_by_dependency == {"ev_40_ev_charging_state": ["ev_40_ev_charging_started"]}
+
+    await inject_messages(hub, [("N/123/ev/40/ChargingState", '{"value": 1}')])
+
+    assert [metric.unique_id for metric in new_metrics] == ["ev_40_ev_charging_state", "ev_40_ev_charging_started"]
+    assert hub._placeholders_by_dependency == {}
+
+
+async def test_adjustable_topic_waits_for_its_fallback():
+    hub, _new_devices, new_metrics = await _hub()
+
+    await inject_messages(hub, [(CURRENT_LIMIT, '{"value": 10, "min": 0, "max": 50}')])
+    assert new_metrics == []
+    await inject_messages(hub, [(CURRENT_LIMIT + "IsAdjustable", '{"value": 0}')])
+    await _settle(hub)
+
+    assert len(new_metrics) == 1
+    assert new_metrics[0].metric_kind is MetricKind.SENSOR
+    assert hub._fallback_placeholders == {}
+
+
+async def test_fallback_first_creates_adjustable_topic_right_away():
+    hub, _new_devices, new_metrics = await _hub()
+
+    await inject_messages(
+        hub,
+        [(CURRENT_LIMIT + "IsAdjustable", '{"value": 1}'), (CURRENT_LIMIT, '{"value": 10, "min": 0, "max": 50}')],
+    )
+
+    assert len(new_metrics) == 1
+    assert new_metrics[0].metric_kind is MetricKind.NUMBER
+
+
+async def test_without_settle_time_metrics_wait_for_full_publish():
+    hub, new_devices, new_metrics = await _hub(metric_settle_seconds=None)
+
+    await inject_messages(hub, [("N/123/battery/513/Dc/0/Voltage", '{"value": 12.4}')])
+    await _settle(hub)
+    assert new_metrics == []
+
+    hub._handle_full_publish_message(skip_validation=True)
+    await asyncio.sleep(0.01)
+    assert [device.unique_id for device in new_devices] == ["battery_513"]
+    assert [metric.unique_id for metric in new_metrics] == ["battery_513_battery_voltage"]
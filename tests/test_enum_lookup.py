@@ -0,0 +1,50 @@
+"""Test the lookup tables of the Victron enums and the bitmask decoding."""
+
+from custom_components.victron_mqtt._vendor.victron_mqtt._unwrappers import (
+    _decode_bitmask,
+    unwrap_bitmask,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt._victron_enums import (
+    DeviceType,
+    GenericOnOff,
+    SolarChargerDeviceOffReason,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.constants import (
+    BITMASK_DECODE_CACHE_SIZE,
+)
+
+
+def test_tables_are_built_per_class():
+    assert GenericOnOff._lookup_by_code == {member.code: member for member in GenericOnOff}
+    assert GenericOnOff._lookup_by_code is not SolarChargerDeviceOffReason._lookup_by_code
+    assert GenericOnOff.from_id_or_string("on") is GenericOnOff.from_id_or_string("On") is GenericOnOff.ON
+    assert GenericOnOff.from_code(42, GenericOnOff.OFF) is GenericOnOff.OFF
+
+
+def test_device_codes_follow_mappings():
+    assert DeviceType.from_code("CGwacs") is DeviceType.SYSTEM
+    assert DeviceType.from_code("solarcharger") is DeviceType.SOLAR_CHARGER
+    assert DeviceType.from_code("unknown") is None
+    # The default value is mapped too
+    assert DeviceType.from_code("unknown", DeviceType.CGWACS) is DeviceType.SYSTEM
+
+
+def test_bitmask_decoding():
+    assert unwrap_bitmask('{"value": 0}', SolarChargerDeviceOffReason) == "-"
+    assert unwrap_bitmask('{"value": 9}', SolarChargerDeviceOffReason) == "No/low input power,Remote input"
+    # Bits without a member are left out
+    assert unwrap_bitmask('{"value": 8388609}', SolarChargerDeviceOffReason) == "No/low input power"
+    for payload in ('{"value": null}', '{"value": 1.5}', '{"value": "9"}', "{}", "not json"):
+        assert unwrap_bitmask(payload, SolarChargerDeviceOffReason) is None
+
+
+def test_bitmask_cache_is_bounded():
+    _decode_bitmask.cache_clear()
+    for value in range(BITMASK_DECODE_CACHE_SIZE * 2):
+        unwrap_bitmask(f'{{"value": {value}}}', SolarChargerDeviceOffReason)
+    unwrap_bitmask('{"value": 9}', SolarChargerDeviceOffReason)
+    unwrap_bitmask('{"value": 9}', SolarChargerDeviceOffReason)
+
+    info = _decode_bitmask.cache_info()
+    assert info.currsize == BITMASK_DECODE_CACHE_SIZE
+    assert info.hits >= 1
@@ -0,0 +1,112 @@
+"""Test keeping the recent values of metrics in memory."""
+
+import logging
+from collections.abc import AsyncGenerator
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    HistoryPolicy,
+    MetricType,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.history import MetricHistory
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("battery", first_device_id=512),
+    )
+)
+log_debug = logging.getLogger(__name__).debug
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+async def _connected_hub(broker: VenusBrokerEmulator, **kwargs) -> VictronVenusHub:
+    hub = broker.create_hub(**kwargs)
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+    return hub
+
+
+def test_ring_buffer_keeps_latest_samples():
+    history = MetricHistory(3)
+    for second in range(5):
+        history.append(float(second), float(second))
+
+    assert history.samples(10.0) == [(2.0, 2.0), (3.0, 3.0), (4.0, 4.0)]
+    assert history.samples(10.0, max_age_seconds=7) == [(3.0, 3.0), (4.0, 4.0)]
+    assert len(history) == 3
+    assert history.nbytes == 3 * 16
+
+    history.max_age_seconds = 6.5
+    assert history.samples(10.0) == [(4.0, 4.0)]
+    history.clear()
+    assert history.samples(10.0) == []
+
+
+async def test_history_of_metric_type(broker):
+    hub = await _connected_hub(broker, update_frequency_seconds=30, history={MetricType.VOLTAGE: HistoryPolicy(4)})
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+
+    # Also the values held back by the update frequency
+    for value in (12.1, 12.2, 12.3, 12.4, 12.5):
+        voltage._handle_message(value, log_debug)
+
+    assert [value for _timestamp, value in voltage.history()] == [12.2, 12.3, 12.4, 12.5]
+    assert voltage.history(max_age_seconds=0.0) == []
+    assert hub._all_metrics["battery_512_battery_power"].history() == []
+
+    stats = hub.history_stats
+    assert stats.metrics >= 1
+    assert stats.capacity == 4 * stats.metrics
+    assert stats.bytes == 16 * stats.capacity
+    await hub.disconnect()
+
+
+async def test_history_is_off_by_default(broker):
+    hub = await _connected_hub(broker)
+    voltage = hub._all_metrics["battery_512_battery_voltage"]
+
+    voltage._handle_message(12.1, log_debug)
+
+    assert voltage.history() == []
+    assert hub.history_stats.bytes == 0
+    await hub.disconnect()
+
+
+async def test_short_id_overrides_metric_type(broker):
+    hub = await _connected_hub(
+        broker, history={MetricType.VOLTAGE: HistoryPolicy(), "battery_voltage": None, "battery_soc": HistoryPolicy(2)}
+    )
+
+    assert hub._all_metrics["battery_512_battery_voltage"]._history is None
+    history = hub._all_metrics["battery_512_battery_soc"]._history
+    assert history is not None
+    assert history.capacity == 2
+    await hub.disconnect()
+
+
+async def test_invalid_history(broker):
+    with pytest.raises(ValueError):
+        HistoryPolicy(max_samples=0)
+    with pytest.raises(ValueError):
+        HistoryPolicy(max_age_seconds=0)
+    with pytest.raises(TypeError):
+        broker.create_hub(history={MetricType.POWER: 10})
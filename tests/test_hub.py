@@ -3,25 +3,40 @@
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+import voluptuous as vol
 from custom_components.victron_mqtt import PLATFORMS
 from custom_components.victron_mqtt._vendor.victron_mqtt import (
     AuthenticationError,
     CannotConnectError,
     Device as VictronVenusDevice,
+    HistoryStats,
     Hub as VictronVenusHub,
+    LoadSheddingStats,
+    MemoryReport,
+    MemoryUsage,
+    MetricKind,
+    UpdateAggregation,
+    WritableMetric,
+    WriteOutcome,
+    WriteStats,
+    WriteMismatchError,
+    WriteTimeoutError,
 )
 from custom_components.victron_mqtt._vendor.victron_mqtt.testing import create_mocked_hub, finalize_injection, inject_message
 
 from custom_components.victron_mqtt.const import (
+    CONF_ELEVATED_TRACING,
     CONF_EXCLUDED_DEVICES,
     CONF_INSTALLATION_ID,
     CONF_MODEL,
     CONF_ROOT_TOPIC_PREFIX,
     CONF_SERIAL,
+    CONF_UPDATE_AGGREGATION,
     CONF_UPDATE_FREQUENCY_SECONDS,
     CONF_SIMPLE_NAMING,
     DOMAIN,
 )
+from custom_components.victron_mqtt.diagnostics import async_get_config_entry_diagnostics
 from custom_components.victron_mqtt.hub import Hub
 from homeassistant.config_entries import ConfigEntryState
 from homeassistant.const import (
@@ -84,6 +99,11 @@ def mock_victron_hub():
         mock_hub.disconnect = AsyncMock()
         mock_hub.publish = MagicMock()
         mock_hub.installation_id = "12345"
+        mock_hub.export_structure.return_value = {
+            "version": 1,
+            "installation_id": "12345",
+            "messages": [],
+        }
         mock_hub_class.return_value = mock_hub
         yield mock_hub
 
@@ -205,6 +225,93 @@ async def test_map_device_info_no_manufacturer() -> None:
     )  # device_id == "0" uses name only
 
 
+async def test_apply_config_live(
+    hass: HomeAssistant, mock_config_entry, mock_victron_hub
+) -> None:
+    """Test options the library can change at runtime are applied without reload."""
+    hub = Hub(hass, mock_config_entry)
+    config = {
+        **mock_config_entry.data,
+        CONF_UPDATE_FREQUENCY_SECONDS: 45,
+        CONF_EXCLUDED_DEVICES: ["battery", "solarcharger"],
+        CONF_ELEVATED_TRACING: "battery/512",
+        CONF_UPDATE_AGGREGATION: "mean",
+    }
+
+    assert hub.apply_config(config) is True
+
+    mock_victron_hub.set_update_frequency.assert_called_once()
+    mock_victron_hub.set_update_aggregation.assert_called_once_with(UpdateAggregation.MEAN)
+    excluded = mock_victron_hub.set_device_type_exclude_filter.call_args.args[0]
+    assert {device_type.code for device_type in excluded} == {"battery", "solarcharger"}
+    mock_victron_hub.set_topic_log_info.assert_called_once_with("battery/512")
+
+    # Applying the same configuration again changes nothing
+    assert hub.apply_config(config) is True
+    mock_victron_hub.set_update_frequency.assert_called_once()
+
+
+async def test_apply_config_needs_reload(
+    hass: HomeAssistant, mock_config_entry, mock_victron_hub
+) -> None:
+    """Test connection and naming options are left to a reload."""
+    hub = Hub(hass, mock_config_entry)
+    config = {
+        **mock_config_entry.data,
+        CONF_HOST: "venus2.local",
+        CONF_UPDATE_FREQUENCY_SECONDS: 45,
+    }
+
+    assert hub.apply_config(config) is False
+    mock_victron_hub.set_update_frequency.assert_not_called()
+
+
+async def test_library_hub_delivers_one_discovery_batch() -> None:
+    """Test the library announces a full publish as one ordered batch."""
+    victron_hub = await create_mocked_hub()
+    batches: list[list] = []
+    victron_hub.on_new_metrics = lambda _hub, metrics: batches.append(metrics)
+
+    await inject_message(victron_hub, "N/123/battery/0/Soc", '{"value": 75}')
+    await inject_message(victron_hub, "N/123/battery/0/Dc/0/Voltage", '{"value": 12.6}')
+    await inject_message(victron_hub, "N/123/system/0/Dc/Battery/Power", '{"value": 120}')
+    await finalize_injection(victron_hub)
+
+    assert len(batches) == 1
+    unique_ids = [metric.unique_id for _device, metric in batches[0]]
+    assert {"battery_0_battery_soc", "battery_0_battery_voltage"} <= set(unique_ids)
+    # The system device is the parent of everything else and comes first
+    assert batches[0][0][0].unique_id == "system_0"
+
+
+async def test_on_new_metrics_groups_by_kind(
+    hass: HomeAssistant, mock_config_entry, mock_victron_hub
+) -> None:
+    """Test a discovery batch reaches each platform once, sharing DeviceInfo per device."""
+    hub = Hub(hass, mock_config_entry)
+    sensors = MagicMock()
+    switches = MagicMock()
+    hub.register_new_metric_callback(MetricKind.SENSOR, sensors)
+    hub.register_new_metric_callback(MetricKind.SWITCH, switches)
+    device = MagicMock(spec=VictronVenusDevice)
+    device.unique_id = "battery_0"
+    device.parent_device = None
+    metrics = [
+        MagicMock(metric_kind=kind)
+        for kind in (MetricKind.SENSOR, MetricKind.SWITCH, MetricKind.SENSOR, MetricKind.BUTTON)
+    ]
+
+    hub._on_new_metrics(mock_victron_hub, [(device, metric) for metric in metrics])
+
+    sensors.assert_called_once()
+    sensor_batch, installation_id = sensors.call_args.args
+    assert installation_id == "12345"
+    assert [metric for _device, metric, _info in sensor_batch] == [metrics[0], metrics[2]]
+    assert sensor_batch[0][2] is sensor_batch[1][2]
+    switches.assert_called_once()
+    assert switches.call_args.args[0][0][2] is sensor_batch[0][2]
+
+
 async def test_unregister_add_entities_callback(
     hass: HomeAssistant, init_integration
 ) -> None:
@@ -853,16 +960,16 @@ async def test_switch_turn_on_off(
     assert len(switch_entities) > 0
     entity_id = switch_entities[0].entity_id
 
-    # Get the entity object to spy on _metric.set
+    # Get the entity object to spy on _metric.set_and_confirm
     entity = hass.data["entity_components"]["switch"].get_entity(entity_id)
     assert entity is not None
-    with patch.object(entity._metric, "set", wraps=entity._metric.set) as mock_set:
+    with patch.object(entity._metric, "set_and_confirm") as mock_set:
         # Turn on
         await hass.services.async_call(
             "switch", "turn_on", {"entity_id": entity_id}, blocking=True
         )
         await hass.async_block_till_done()
-        mock_set.assert_called_once_with("on")
+        mock_set.assert_awaited_once_with("on")
 
         mock_set.reset_mock()
 
@@ -871,7 +978,7 @@ async def test_switch_turn_on_off(
             "switch", "turn_off", {"entity_id": entity_id}, blocking=True
         )
         await hass.async_block_till_done()
-        mock_set.assert_called_once_with("off")
+        mock_set.assert_awaited_once_with("off")
 
 
 async def test_select_option(
@@ -900,15 +1007,15 @@ async def test_select_option(
     options = state.attributes.get("options", [])
     assert len(options) > 0
 
-    # Get the entity object to spy on _metric.set
+    # Get the entity object to spy on _metric.set_and_confirm
     entity = hass.data["entity_components"]["select"].get_entity(entity_id)
     assert entity is not None
-    with patch.object(entity._metric, "set", wraps=entity._metric.set) as mock_set:
+    with patch.object(entity._metric, "set_and_confirm") as mock_set:
         await hass.services.async_call(
             "select", "select_option", {"entity_id": entity_id, "option": options[0]}, blocking=True
         )
         await hass.async_block_till_done()
-        mock_set.assert_called_once_with(options[0])
+        mock_set.assert_awaited_once_with(options[0])
 
 
 async def test_number_set_value(
@@ -944,12 +1051,53 @@ async def test_number_set_value(
     # Set value via service
     entity = hass.data["entity_components"]["number"].get_entity(entity_id)
     assert entity is not None
-    with patch.object(entity._metric, "set", wraps=entity._metric.set) as mock_set:
+    with patch.object(entity._metric, "set_and_confirm") as mock_set:
         await hass.services.async_call(
             "number", "set_value", {"entity_id": entity_id, "value": 10.0}, blocking=True
         )
         await hass.async_block_till_done()
-        mock_set.assert_called_once_with(10.0)
+        mock_set.assert_awaited_once_with(10.0)
+
+
+async def test_number_set_value_not_confirmed(
+    hass: HomeAssistant,
+    init_integration,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test a write nothing is reported for only logs, while another reported value fails."""
+    from homeassistant.exceptions import HomeAssistantError
+
+    victron_hub, mock_config_entry = init_integration
+
+    await inject_message(victron_hub, "N/123/evcharger/0/SetCurrent", '{"value": 16.0}')
+    await finalize_injection(victron_hub)
+    await hass.async_block_till_done()
+
+    entity_registry = er.async_get(hass)
+    entities = er.async_entries_for_config_entry(
+        entity_registry, mock_config_entry.entry_id
+    )
+    entity_id = next(e.entity_id for e in entities if "number." in e.entity_id)
+    entity = hass.data["entity_components"]["number"].get_entity(entity_id)
+    assert entity is not None
+
+    with patch.object(
+        entity._metric, "set_and_confirm", side_effect=WriteTimeoutError("no value reported")
+    ):
+        await hass.services.async_call(
+            "number", "set_value", {"entity_id": entity_id, "value": 10.0}, blocking=True
+        )
+    assert "was not confirmed by the device: no value reported" in caplog.text
+
+    with (
+        patch.object(
+            entity._metric, "set_and_confirm", side_effect=WriteMismatchError("reported 16.0", 16.0)
+        ),
+        pytest.raises(HomeAssistantError, match="reported 16.0"),
+    ):
+        await hass.services.async_call(
+            "number", "set_value", {"entity_id": entity_id, "value": 10.0}, blocking=True
+        )
 
 
 async def test_time_set_value(
@@ -984,12 +1132,12 @@ async def test_time_set_value(
     # Set value via service (triggers set_value)
     entity = hass.data["entity_components"]["time"].get_entity(entity_id)
     assert entity is not None
-    with patch.object(entity._metric, "set", wraps=entity._metric.set) as mock_set:
+    with patch.object(entity._metric, "set_and_confirm") as mock_set:
         await hass.services.async_call(
             "time", "set_value", {"entity_id": entity_id, "time": "12:30:00"}, blocking=True
         )
         await hass.async_block_till_done()
-        mock_set.assert_called_once_with(750)  # 12*60 + 30 = 750 minutes
+        mock_set.assert_awaited_once_with(750)  # 12*60 + 30 = 750 minutes
 
 
 async def test_hub_auth_error(
@@ -1071,6 +1219,27 @@ async def test_publish_service_missing_fields(
         )
 
 
+async def test_publish_service_rejects_malformed_writes(
+    hass: HomeAssistant,
+    init_integration,
+) -> None:
+    """Test the publish service validates writes before calling the hub."""
+    _victron_hub, mock_config_entry = init_integration
+    hub = mock_config_entry.runtime_data
+
+    with patch.object(hub, "async_publish_many") as mock_publish_many:
+        for writes in (
+            "not a list of writes",
+            [["generator_service_counter_reset", "261", 1]],
+            [{"metric_id": "generator_service_counter_reset", "value": 1}],
+        ):
+            with pytest.raises(vol.Invalid):
+                await hass.services.async_call(
+                    DOMAIN, "publish", {"writes": writes}, blocking=True
+                )
+        mock_publish_many.assert_not_called()
+
+
 async def test_binary_sensor_update(
     hass: HomeAssistant,
     init_integration,
@@ -1211,3 +1380,95 @@ async def test_number_with_step(
     assert state is not None
     assert float(state.state) == 57.6
     assert state.attributes.get("step") == 0.1
+
+
+async def test_diagnostics_include_runtime_stats(
+    hass: HomeAssistant, mock_config_entry, mock_victron_hub
+) -> None:
+    """Test the diagnostics download reports the load shedding, write, history, trace and memory state."""
+    mock_victron_hub.devices = {}
+    mock_victron_hub.load_shedding_stats = LoadSheddingStats(
+        active=True,
+        factor=4,
+        loop_lag_seconds=0.3,
+        max_loop_lag_seconds=0.5,
+        pending_notifications=12,
+        max_pending_notifications=2400,
+        activations=1,
+    )
+    mock_victron_hub.write_stats = WriteStats(
+        pending_writes=1, writes_requested=20, writes_published=2, writes_coalesced=18
+    )
+    mock_victron_hub.history_stats = HistoryStats(
+        metrics=2, samples=150, capacity=240, bytes=3840
+    )
+    mock_victron_hub.dump_trace.return_value = [
+        {
+            "time": "2026-01-01T00:00:00+00:00",
+            "event": "received",
+            "subject": "N/123/battery/512/Soc",
+            "value": '{"value": 42.5}',
+        }
+    ]
+    mock_victron_hub.memory_report.return_value = MemoryReport(
+        groups={"devices": MemoryUsage(count=3, sampled=3, bytes=9000)},
+        total_bytes=9000,
+    )
+    mock_config_entry.runtime_data = Hub(hass, mock_config_entry)
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, mock_config_entry)
+
+    assert diagnostics["config"][CONF_PASSWORD] == "**REDACTED**"
+    assert diagnostics["hub"]["load_shedding"]["factor"] == 4
+    assert diagnostics["hub"]["load_shedding"]["active"] is True
+    assert diagnostics["hub"]["writes"]["writes_coalesced"] == 18
+    assert diagnostics["hub"]["history"]["bytes"] == 3840
+    assert diagnostics["hub"]["trace"][0]["subject"] == "N/123/battery/512/Soc"
+    assert diagnostics["hub"]["memory"]["groups"]["devices"]["bytes"] == 9000
+
+
+async def test_publish_many(
+    hass: HomeAssistant, mock_config_entry, mock_victron_hub
+) -> None:
+    """Test the publish service writes a list of metrics at once."""
+    from homeassistant.exceptions import HomeAssistantError
+
+    metric = MagicMock(spec=WritableMetric)
+    metric.metric_kind = MetricKind.NUMBER
+    device = MagicMock(spec=VictronVenusDevice)
+    device.device_id = "278"
+    device.get_metric.return_value = metric
+    mock_victron_hub.devices = {"solarcharger_278": device}
+    mock_victron_hub.set_many = AsyncMock(return_value=[WriteOutcome(metric, 20.0)])
+    hub = Hub(hass, mock_config_entry)
+    writes = [
+        {"metric_id": "solarcharger_charge_current_limit", "device_id": 278, "value": "20"}
+    ]
+
+    results = await hub.async_publish_many(writes)
+
+    mock_victron_hub.set_many.assert_awaited_once_with([(metric, 20.0)], confirm=True)
+    device.get_metric.assert_called_once_with("solarcharger_charge_current_limit")
+    assert results == [
+        {
+            "metric_id": "solarcharger_charge_current_limit",
+            "device_id": "278",
+            "success": True,
+            "error": None,
+        }
+    ]
+
+    # An unconfirmed write fails the call, unless the outcomes are returned
+    mock_victron_hub.set_many.return_value = [
+        WriteOutcome(metric, 20.0, WriteTimeoutError("no value reported"))
+    ]
+    with pytest.raises(HomeAssistantError, match="no value reported"):
+        await hub.async_publish_many(writes)
+    results = await hub.async_publish_many(writes, raise_on_failure=False)
+    assert results[0]["success"] is False
+
+    # Unknown metrics are reported before anything is written
+    mock_victron_hub.set_many.reset_mock()
+    with pytest.raises(HomeAssistantError, match="No writable metric"):
+        await hub.async_publish_many([{**writes[0], "device_id": "279"}])
+    mock_victron_hub.set_many.assert_not_awaited()
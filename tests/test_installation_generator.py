@@ -0,0 +1,87 @@
+"""Test the synthetic installation generator used as load source for benchmarks."""
+
+from dataclasses import replace
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import MetricType
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    LARGE_INSTALLATION,
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+    read_capture,
+    write_capture,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing.installation_generator import (
+    DEFAULT_CHANGE_RATE,
+)
+
+SMALL_INSTALLATION = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", count=3, first_device_id=278, placeholder_counts={"tracker": 2}),
+        DeviceGroup("battery", count=2, first_device_id=512),
+    )
+)
+
+
+def test_large_installation_expands_every_group():
+    """The large installation has all solar chargers, each with its trackers."""
+    installation = SyntheticInstallation(LARGE_INSTALLATION)
+    topics = {topic for topic, _ in installation.full_publish()}
+    for device_id in range(278, 298):
+        assert f"N/123/solarcharger/{device_id}/Yield/Power" in topics
+        assert f"N/123/solarcharger/{device_id}/Pv/3/V" in topics
+    assert "N/123/solarcharger/298/Yield/Power" not in topics
+    assert "N/123/battery/515/Dc/0/Voltage" in topics
+
+
+def test_same_seed_is_deterministic():
+    """Two installations with the same seed produce identical streams."""
+    first = SyntheticInstallation(SMALL_INSTALLATION)
+    second = SyntheticInstallation(SMALL_INSTALLATION)
+    assert first.full_publish() == second.full_publish()
+    assert list(first.stream(5)) == list(second.stream(5))
+
+
+def test_tick_only_returns_changes():
+    """A tick publishes only the metrics whose value changed."""
+    installation = SyntheticInstallation(SMALL_INSTALLATION)
+    before = dict(installation.full_publish())
+    changes = installation.tick()
+    assert 0 < len(changes) < len(before)
+    for topic, payload in changes:
+        assert before[topic] != payload
+
+
+def test_change_rates_are_configurable():
+    """Metric types change with the configured rate, unlisted ones with the default."""
+    spec = replace(SMALL_INSTALLATION, change_rates={MetricType.POWER: 1.0})
+    installation = SyntheticInstallation(spec)
+    rates = {metric.topic: metric.change_rate for metric in installation.metrics}
+    assert rates["N/123/solarcharger/278/Yield/Power"] == 1.0
+    assert rates["N/123/battery/512/Dc/0/Voltage"] == DEFAULT_CHANGE_RATE
+
+
+def test_capture_roundtrip(tmp_path):
+    """Messages written to a capture file are read back unchanged."""
+    messages = SyntheticInstallation(SMALL_INSTALLATION).full_publish()
+    path = tmp_path / "capture.jsonl"
+    assert write_capture(path, messages) == len(messages)
+    assert read_capture(path) == messages
+
+
+@pytest.mark.asyncio
+async def test_inject_into_hub():
+    """Injecting the full publish creates the configured devices."""
+    installation = SyntheticInstallation(SMALL_INSTALLATION)
+    hub = await create_mocked_hub()
+    await inject_messages(hub, installation.full_publish())
+    await finalize_injection(hub)
+    device_ids = set(hub.devices)
+    assert {"solarcharger_278", "solarcharger_280", "battery_513"} <= device_ids
+    assert "solarcharger_281" not in device_ids
@@ -0,0 +1,126 @@
+"""Test scheduling the keepalives of several hubs in one process."""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt.keepalive_scheduler import (
+    KeepaliveScheduler,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    LARGE_INSTALLATION,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+# dbus-flashmq stops forwarding values when no keepalive arrived for this long
+BROKER_KEEPALIVE_WINDOW_SECONDS = 60
+
+
+def test_phase_offsets_are_spread():
+    scheduler = KeepaliveScheduler()
+    hubs = [object() for _ in range(5)]
+    offsets = sorted(scheduler.register(hub) for hub in hubs)
+
+    assert all(0 <= offset < scheduler.interval for offset in offsets)
+    gaps = [b - a for a, b in zip(offsets, [*offsets[1:], offsets[0] + scheduler.interval], strict=True)]
+    assert min(gaps) > scheduler.interval / 10
+
+    # A freed slot is handed to the next hub, registering twice keeps the slot
+    second = scheduler.register(hubs[1])
+    scheduler.unregister(hubs[1])
+    assert scheduler.register(object()) == second
+    assert scheduler.register(hubs[0]) == 0
+
+
+def test_keepalives_stay_within_broker_window():
+    scheduler = KeepaliveScheduler()
+    delays = [scheduler.next_delay() for _ in range(1000)]
+
+    assert min(delays) >= scheduler.interval - scheduler.jitter
+    assert max(delays) <= scheduler.interval + scheduler.jitter
+    assert len(set(delays)) > 1
+    # A forced republish waiting for its turn still leaves margin before the broker stops forwarding
+    assert (
+        scheduler.interval + scheduler.jitter + scheduler.full_publish_max_wait_seconds
+        < BROKER_KEEPALIVE_WINDOW_SECONDS
+    )
+
+
+async def test_full_publishes_take_turns():
+    scheduler = KeepaliveScheduler(full_publish_slot_seconds=10)
+    first, second = object(), object()
+    await scheduler.acquire_full_publish(first)
+
+    waiting = asyncio.create_task(scheduler.acquire_full_publish(second))
+    await asyncio.sleep(0.15)
+    assert not waiting.done()
+
+    scheduler.release_full_publish(first)
+    await asyncio.wait_for(waiting, 1)
+    # The holder itself never waits
+    await asyncio.wait_for(scheduler.acquire_full_publish(second), 0.05)
+
+
+async def test_full_publish_slot_expires():
+    scheduler = KeepaliveScheduler(full_publish_slot_seconds=0.1)
+    await scheduler.acquire_full_publish(object())
+
+    start = time.monotonic()
+    await asyncio.wait_for(scheduler.acquire_full_publish(object()), 1)
+    assert 0.05 <= time.monotonic() - start < 0.5
+
+
+async def test_full_publish_wait_is_bounded():
+    scheduler = KeepaliveScheduler(full_publish_slot_seconds=10, full_publish_max_wait_seconds=0.1)
+    await scheduler.acquire_full_publish(object())
+
+    await asyncio.wait_for(scheduler.acquire_full_publish(object()), 1)
+
+
+@pytest.fixture
+async def brokers() -> AsyncGenerator[list[VenusBrokerEmulator]]:
+    emulators = [VenusBrokerEmulator(), VenusBrokerEmulator()]
+    for emulator in emulators:
+        await emulator.start()
+        emulator.load(SyntheticInstallation(LARGE_INSTALLATION).full_publish())
+    yield emulators
+    for emulator in emulators:
+        await emulator.close()
+
+
+@pytest.mark.usefixtures("socket_enabled")
+async def test_hubs_started_together_do_not_overlap(brokers):
+    """Hubs connecting at the same time (e.g. on startup) ask for their full publish one after the other."""
+    scheduler = KeepaliveScheduler()
+    released: list[float] = []
+    release = scheduler.release_full_publish
+
+    def record_release(hub: object) -> None:
+        released.append(time.monotonic())
+        release(hub)
+
+    scheduler.release_full_publish = record_release  # type: ignore[method-assign]
+    # The first keepalive of each hub, which makes its broker publish everything
+    requested: dict[int, float] = {}
+    hubs = [broker.create_hub() for broker in brokers]
+    for index, hub in enumerate(hubs):
+        hub._keepalive_scheduler = scheduler
+        keepalive = hub._keepalive
+
+        def record_request(force: bool = False, keepalive=keepalive, index=index) -> None:
+            requested.setdefault(index, time.monotonic())
+            keepalive(force)
+
+        hub._keepalive = record_request  # type: ignore[method-assign]
+
+    await asyncio.gather(*(hub.connect() for hub in hubs))
+    await asyncio.gather(*(hub.wait_for_first_refresh() for hub in hubs))
+
+    first, second = sorted(requested.values())
+    assert second >= released[0] > first
+    for hub in hubs:
+        await hub.disconnect()
+    assert scheduler._slots == {}
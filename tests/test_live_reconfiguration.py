@@ -0,0 +1,153 @@
+"""Test changing the Hub configuration while connected."""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    AUTO_UPDATE_INTERVALS,
+    Device,
+    DeviceType,
+    Metric,
+    MetricPriority,
+    MetricType,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", count=2, first_device_id=278),
+        DeviceGroup("battery", first_device_id=512),
+    )
+)
+SOLARCHARGER = DeviceType.from_code("solarcharger")
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    victron_hub = broker.create_hub(update_frequency_seconds=30)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+def _solarcharger_metrics(hub: VictronVenusHub) -> list[Metric]:
+    return [metric for metric in hub._all_metrics.values() if metric._device.device_type == SOLARCHARGER]
+
+
+async def test_set_update_frequency(hub):
+    # High priority metrics are never throttled
+    metrics = [metric for metric in hub._all_metrics.values() if metric.priority is not MetricPriority.HIGH]
+    assert all(metric.update_interval_seconds == 30 for metric in metrics)
+
+    hub.set_update_frequency("auto")
+
+    for metric in metrics:
+        expected = AUTO_UPDATE_INTERVALS["auto"].get(metric.metric_type)
+        if metric.metric_type in AUTO_UPDATE_INTERVALS["auto"]:
+            assert metric.update_interval_seconds == expected
+    power = next(metric for metric in metrics if metric.metric_type == MetricType.POWER)
+    assert power.update_interval_seconds == AUTO_UPDATE_INTERVALS["auto"][MetricType.POWER]
+
+    hub.set_update_frequency(None)
+    assert all(metric.update_interval_seconds is None for metric in metrics)
+
+
+async def test_set_update_frequency_rejects_invalid(hub):
+    with pytest.raises(ValueError):
+        hub.set_update_frequency("fast")  # type: ignore[arg-type]
+    assert all(
+        metric.update_interval_seconds == 30
+        for metric in hub._all_metrics.values()
+        if metric.priority is not MetricPriority.HIGH
+    )
+
+
+async def test_set_topic_log_info(broker, hub, caplog):
+    topic = "N/123/battery/512/Soc"
+    hub.set_topic_log_info("battery/512")
+    caplog.clear()
+
+    await broker.publish([(topic, '{"value": 42.5}')])
+    await _wait_until(lambda: hub._all_metrics["battery_512_battery_soc"].value == 42.5)
+
+    assert {"event": "received", "subject": topic} in [
+        {"event": record["event"], "subject": record["subject"]} for record in hub.dump_trace()
+    ]
+    # Traced in the buffer instead of the log
+    assert not any(topic in record.getMessage() for record in caplog.records)
+
+
+async def test_exclude_device_type_while_connected(broker, hub):
+    """Excluding a device type removes its metrics and stops its subscriptions."""
+    removed: list[Metric] = []
+    hub.on_metric_removed = lambda _hub, _device, metric: removed.append(metric)
+    solarcharger_metrics = _solarcharger_metrics(hub)
+    assert solarcharger_metrics
+    full_publishes = broker.stats.full_publishes
+
+    hub.set_device_type_exclude_filter([SOLARCHARGER])
+    await _wait_until(lambda: len(removed) >= len(solarcharger_metrics))
+
+    assert _solarcharger_metrics(hub) == []
+    assert {metric.unique_id for metric in solarcharger_metrics} <= {metric.unique_id for metric in removed}
+    assert not any("/solarcharger/" in topic for topic in hub._resolved_subscription_list)
+    assert broker.stats.full_publishes == full_publishes
+
+    # Changes of the excluded devices no longer reach the hub
+    topic = "N/123/solarcharger/278/Yield/Power"
+    assert await broker.publish([(topic, '{"value": 1234}')]) == 0
+
+
+async def test_include_device_type_again(broker, hub):
+    """Removing an exclusion subscribes again and rediscovers through a full publish."""
+    count = len(_solarcharger_metrics(hub))
+    hub.set_device_type_exclude_filter([SOLARCHARGER])
+    announced: list[tuple[Device, Metric]] = []
+    hub.on_new_metric = lambda _hub, device, metric: announced.append((device, metric))
+    full_publishes = broker.stats.full_publishes
+
+    hub.set_device_type_exclude_filter(None)
+    await _wait_until(lambda: len(announced) == count)
+
+    assert len(_solarcharger_metrics(hub)) == count
+    assert broker.stats.full_publishes == full_publishes + 1
+    assert {device.unique_id for device, _metric in announced} == {"solarcharger_278", "solarcharger_279"}
+    assert all(metric.value is not None for metric in _solarcharger_metrics(hub) if not metric._descriptor.hidden)
+
+
+async def test_exclude_before_connect(broker):
+    hub = broker.create_hub()
+    hub.set_device_type_exclude_filter([SOLARCHARGER])
+    await hub.connect()
+    await hub.wait_for_first_refresh()
+
+    assert _solarcharger_metrics(hub) == []
+    assert "battery_512" in hub.devices
+    await hub.disconnect()
@@ -0,0 +1,152 @@
+"""Test stretching low priority update intervals while the event loop is under pressure."""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    LOW_PRIORITY_METRIC_TYPES,
+    MetricPriority,
+    MetricType,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.constants import (
+    LOAD_SHEDDING_MAX_FACTOR,
+    LOAD_SHEDDING_MIN_INTERVAL_SECONDS,
+    LOAD_SHEDDING_RESTORE_PROBES,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.load_shedding import (
+    LoadShedder,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+# Only the low priority measurements change, each of them on every tick
+FLOOD = InstallationSpec(
+    groups=(DeviceGroup("system"), DeviceGroup("battery", count=4, first_device_id=512)),
+    change_rates={metric_type: float(metric_type in LOW_PRIORITY_METRIC_TYPES) for metric_type in MetricType},
+)
+FLOOD_TICKS = 200
+BACKLOG_HIGH = 100
+
+
+async def _flood(**hub_kwargs) -> tuple[VictronVenusHub, int]:
+    """Deliver a flood without yielding to the event loop and return the on_update calls it queued."""
+    installation = SyntheticInstallation(FLOOD)
+    hub = await create_mocked_hub(deadbands=dict.fromkeys(LOW_PRIORITY_METRIC_TYPES), **hub_kwargs)
+    if hub._load_shedder is not None:
+        hub._load_shedder.backlog_high = BACKLOG_HIGH
+    await inject_messages(hub, installation.full_publish())
+    await finalize_injection(hub, disconnect=False)
+    calls = 0
+
+    def on_update(_metric, _value) -> None:
+        nonlocal calls
+        calls += 1
+
+    for metric in hub._all_metrics.values():
+        metric.on_update = on_update
+    messages = [message for _ in range(FLOOD_TICKS) for message in installation.tick()]
+    await inject_messages(hub, messages)
+    while hub._pending_updates:
+        await asyncio.sleep(0)
+    return hub, calls
+
+
+async def test_flood_backlog_is_bounded():
+    unbounded_hub, unbounded = await _flood(load_shedding=False)
+    hub, bounded = await _flood()
+    low_priority = [metric for metric in hub._all_metrics.values() if metric.priority is MetricPriority.LOW]
+    assert low_priority
+
+    assert unbounded >= FLOOD_TICKS * len(low_priority) // 2
+    assert bounded <= BACKLOG_HIGH + len(low_priority)
+    stats = hub.load_shedding_stats
+    assert stats is not None
+    assert stats.active
+    assert stats.activations == 1
+    assert stats.pending_notifications == 0
+    assert stats.max_pending_notifications > BACKLOG_HIGH
+    assert unbounded_hub.load_shedding_stats is None
+    await unbounded_hub.disconnect()
+    await hub.disconnect()
+
+
+async def test_intervals_stretch_and_restore():
+    hub = await create_mocked_hub(update_frequency_seconds=30)
+    await inject_messages(hub, SyntheticInstallation(FLOOD).full_publish())
+    await finalize_injection(hub, disconnect=False)
+    temperature = hub._all_metrics["battery_512_battery_temperature"]
+    power = hub._all_metrics["battery_512_battery_power"]
+    soc = hub._all_metrics["battery_512_battery_soc"]
+
+    hub._apply_load_shedding(4)
+    assert temperature.update_interval_seconds == 120
+    assert power.update_interval_seconds == 30
+    assert soc.update_interval_seconds == 30
+
+    hub._apply_load_shedding(1)
+    assert temperature.update_interval_seconds == 30
+
+    # Metrics notifying every change get a minimum interval to stretch
+    hub.set_update_frequency(None)
+    hub._apply_load_shedding(2)
+    assert temperature.update_interval_seconds == 2 * LOAD_SHEDDING_MIN_INTERVAL_SECONDS
+    assert power.update_interval_seconds is None
+    hub._apply_load_shedding(1)
+    assert temperature.update_interval_seconds is None
+    await hub.disconnect()
+
+
+def test_shedder_escalates_and_relaxes():
+    apply_factor = MagicMock()
+    shedder = LoadShedder(apply_factor, lambda: 0)
+
+    for _ in range(10):
+        shedder.probe(1.0)
+    assert shedder.factor == LOAD_SHEDDING_MAX_FACTOR
+    assert shedder.stats().max_loop_lag_seconds == 1.0
+
+    # A probe in between the thresholds keeps the factor and restarts the calm count
+    for _ in range(LOAD_SHEDDING_RESTORE_PROBES - 1):
+        shedder.probe(0.0)
+    shedder.probe(0.1)
+    for _ in range(LOAD_SHEDDING_RESTORE_PROBES - 1):
+        shedder.probe(0.0)
+    assert shedder.factor == LOAD_SHEDDING_MAX_FACTOR
+
+    for _ in range(LOAD_SHEDDING_RESTORE_PROBES * 10):
+        shedder.probe(0.0)
+    assert shedder.factor == 1
+    assert [call.args[0] for call in apply_factor.call_args_list] == [2, 4, 8, 16, 8, 4, 2, 1]
+    stats = shedder.stats()
+    assert not stats.active
+    assert stats.activations == 1
+    assert stats.loop_lag_seconds == 0.0
+
+
+async def test_probe_measures_loop_lag():
+    hub = await create_mocked_hub()
+    hub_module = VictronVenusHub.__module__
+    with patch(f"{hub_module}.LOAD_PROBE_INTERVAL_SECONDS", 0.05):
+        # Replace the probe disabled by create_mocked_hub with the real one
+        hub._stop_load_probe()
+        hub._start_load_probe()
+        await asyncio.sleep(0.01)
+        time.sleep(0.4)  # Block the event loop
+        await asyncio.sleep(0.2)
+
+    stats = hub.load_shedding_stats
+    assert stats is not None
+    assert stats.max_loop_lag_seconds >= 0.25
+    assert stats.factor >= 2
+    await hub.disconnect()
+    assert hub._load_probe_task is None
@@ -0,0 +1,86 @@
+"""Test the memory report of a hub and the sampled deep sizing behind it."""
+
+import sys
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.memory import MemorySizer
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+SPEC = InstallationSpec(groups=(DeviceGroup("system"), DeviceGroup("battery", count=2, first_device_id=512)))
+CURRENT_LIMIT = "N/123/vebus/276/Ac/ActiveIn/CurrentLimit"
+
+
+class _Node:
+    __slots__ = ("children", "name")
+
+    def __init__(self, name: str, children: list) -> None:
+        self.name = name
+        self.children = children
+
+
+async def _hub(messages: list[tuple[str, str]] | None = None) -> VictronVenusHub:
+    hub = await create_mocked_hub()
+    await inject_messages(hub, [*SyntheticInstallation(SPEC).full_publish(), *(messages or [])])
+    await finalize_injection(hub, disconnect=False)
+    return hub
+
+
+def test_objects_are_counted_once_and_stop_types_not_followed():
+    shared = "x" * 1000
+    leaf = _Node("leaf", [shared])
+    root = _Node("root", [leaf, shared])
+    sizer = MemorySizer((_Node,), sample_size=10)
+
+    size = sizer.sizeof(root)
+    assert size == sys.getsizeof(root) + sys.getsizeof(root.children) + sys.getsizeof(shared) + sys.getsizeof("root")
+    # The stop type is sized as a root, without what was counted already
+    assert sizer.sizeof(leaf) == sys.getsizeof(leaf) + sys.getsizeof(leaf.children) + sys.getsizeof("leaf")
+    assert sizer.sizeof(root) == 0
+
+
+def test_usage_is_extrapolated_from_samples():
+    nodes = [_Node(f"node{index}", [float(index)]) for index in range(100)]
+    exact = sum(MemorySizer((), sample_size=100).sizeof(node) for node in nodes)
+
+    usage = MemorySizer((), sample_size=10).usage(nodes)
+
+    assert usage.count == 100
+    assert usage.sampled == 10
+    assert abs(usage.bytes - exact) < exact * 0.05
+
+
+async def test_report_breaks_down_the_hub():
+    hub = await _hub()
+
+    report = hub.memory_report(sample_size=8)
+
+    groups = report.groups
+    assert report.total_bytes == sum(usage.bytes for usage in groups.values())
+    assert groups["devices"].count == len(hub._devices)
+    assert sum(usage.count for name, usage in groups.items() if name.startswith("metrics.")) == len(hub._all_metrics)
+    assert groups["metrics.FormulaMetric"].count > 0
+    assert groups["topic_tables"].bytes > groups["metrics.Metric"].bytes / groups["metrics.Metric"].count
+    assert all(usage.sampled <= 8 for name, usage in groups.items() if name not in ("caches", "trace"))
+    assert groups["descriptor_copies"].count == 0
+    assert groups["placeholders"].count == 0
+    # Taken again, the report is the same
+    assert hub.memory_report(sample_size=8) == report
+
+
+async def test_report_counts_descriptor_copies():
+    hub = await _hub([(CURRENT_LIMIT + "IsAdjustable", '{"value": 0}'), (CURRENT_LIMIT, '{"value": 10}')])
+    hub._handle_full_publish_message(skip_validation=True)
+
+    assert hub.memory_report().groups["descriptor_copies"].count == 1
+
+    with pytest.raises(ValueError):
+        hub.memory_report(sample_size=0)
@@ -0,0 +1,152 @@
+"""Test notifying writes before the device reports them."""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator, Callable
+from typing import Any
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt import writable_metric
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", first_device_id=278),
+    )
+)
+CURRENT_LIMIT = "solarcharger_278_solarcharger_charge_current_limit"
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    # Throttled, so only the bypass for the reports of writes gets them notified
+    victron_hub = broker.create_hub(optimistic_writes=True, update_frequency_seconds=30)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+def _record(metric: Any) -> list[Any]:
+    notified: list[Any] = []
+    metric.on_update = lambda _metric, value: notified.append(value)
+    # As if just notified, so the update frequency holds back the next values
+    metric._last_notified = time.monotonic()
+    return notified
+
+
+def _refuse_writes(broker: VenusBrokerEmulator, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Answer writes with the value kept, like a device refusing them."""
+    handle_publish = broker._handle_publish
+
+    def refuse(topic: str, payload: bytes) -> None:
+        if topic.startswith("W/"):
+            topic = "R" + topic[1:]
+            payload = b""
+        handle_publish(topic, payload)
+
+    monkeypatch.setattr(broker, "_handle_publish", refuse)
+
+
+async def test_write_is_notified_then_reconciled(broker, hub):
+    metric = hub._all_metrics[CURRENT_LIMIT]
+    notified = _record(metric)
+
+    metric.set(12.5)
+    await asyncio.sleep(0)
+    assert notified == [12.5]
+    assert metric.pending_value == 12.5
+
+    await _wait_until(lambda: len(notified) == 2)
+    assert notified == [12.5, 12.5]
+    assert metric.value == 12.5
+    assert metric.pending_value is None
+
+
+async def test_refused_write_is_rolled_back(broker, hub, monkeypatch):
+    _refuse_writes(broker, monkeypatch)
+    metric = hub._all_metrics["solarcharger_278_solarcharger_mode"]
+    notified = _record(metric)
+
+    metric.set("Off")
+    await _wait_until(lambda: len(notified) == 2)
+
+    assert [value.string for value in notified] == ["Off", "On"]
+    assert metric.pending_value is None
+
+
+async def test_unreported_write_is_rolled_back(broker, hub, monkeypatch):
+    monkeypatch.setattr(writable_metric, "WRITE_CONFIRM_TIMEOUT_SECONDS", 0.2)
+    monkeypatch.setattr(broker, "_handle_publish", lambda topic, payload: None)
+    metric = hub._all_metrics[CURRENT_LIMIT]
+    previous = metric.value
+    notified = _record(metric)
+
+    metric.set(12.5)
+    await _wait_until(lambda: len(notified) == 2)
+
+    assert notified == [12.5, previous]
+    assert metric.pending_value is None
+
+
+async def test_current_value_is_not_notified(broker, hub):
+    mode = hub._all_metrics["solarcharger_278_solarcharger_mode"]
+    notified = _record(mode)
+
+    mode.set("On")
+    await asyncio.sleep(0)
+
+    assert notified == []
+    assert mode.pending_value is None
+
+
+async def test_writes_are_not_notified_by_default(broker):
+    victron_hub = broker.create_hub()
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    metric = victron_hub._all_metrics[CURRENT_LIMIT]
+    notified = _record(metric)
+
+    metric.set(12.5)
+    await asyncio.sleep(0)
+
+    assert notified == []
+    assert metric.pending_value is None
+    await victron_hub.disconnect()
+
+
+async def test_disconnect_drops_optimistic_writes(broker, monkeypatch):
+    victron_hub = broker.create_hub(optimistic_writes=True)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    monkeypatch.setattr(broker, "_handle_publish", lambda topic, payload: None)
+    metric = victron_hub._all_metrics[CURRENT_LIMIT]
+
+    metric.set(12.5)
+    assert metric.pending_value == 12.5
+    await victron_hub.disconnect()
+
+    assert metric.pending_value is None
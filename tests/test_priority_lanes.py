@@ -0,0 +1,119 @@
+"""Test delivering alarms and critical state ahead of the other updates."""
+
+import asyncio
+import time
+from typing import cast
+
+from paho.mqtt.client import MQTTMessage
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    DEFAULT_DEADBANDS,
+    Metric,
+    MetricPriority,
+    MetricType,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt._victron_topics import topics
+from custom_components.victron_mqtt._vendor.victron_mqtt.constants import (
+    NOTIFICATION_BATCH_SIZE,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing.hub_helpers import (
+    MQTTMessageStub,
+)
+
+# Every measurement changes on every tick, the enums (alarms and states) never do
+FLOOD = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("vebus", first_device_id=276),
+        DeviceGroup("battery", count=4, first_device_id=512),
+    ),
+    change_rates={metric_type: float(metric_type is not MetricType.ENUM) for metric_type in MetricType},
+)
+FLOOD_TICKS = 100
+GRID_LOST_TOPIC = "N/123/vebus/276/Alarms/GridLost"
+
+
+def _priority(short_id: str) -> MetricPriority | None:
+    return next(topic.priority for topic in topics if topic.short_id == short_id)
+
+
+def _message(topic: str, payload: bytes) -> MQTTMessage:
+    """Return a cheap stand-in for the paho message the network thread hands over."""
+    return cast(MQTTMessage, MQTTMessageStub(topic, payload))
+
+
+def test_priority_classification():
+    # Alarm enums keep their priority although their metric type becomes ENUM
+    assert _priority("vebus_inverter_alarm_grid_lost") is MetricPriority.HIGH
+    assert _priority("battery_low_voltage") is MetricPriority.HIGH
+    assert _priority("solarcharger_error_code") is MetricPriority.HIGH
+    assert _priority("vebus_inverter_state") is MetricPriority.HIGH
+    assert _priority("battery_voltage") is MetricPriority.LOW
+    assert _priority("battery_power") is MetricPriority.NORMAL
+
+
+async def test_high_priority_is_never_throttled():
+    hub = await create_mocked_hub(update_frequency_seconds=30)
+    await inject_messages(hub, SyntheticInstallation(FLOOD).full_publish())
+    await finalize_injection(hub, disconnect=False)
+    alarm = hub._all_metrics["vebus_276_vebus_inverter_alarm_grid_lost"]
+    power = hub._all_metrics["battery_512_battery_power"]
+
+    assert alarm.priority is MetricPriority.HIGH
+    assert alarm.update_interval_seconds is None
+    assert alarm._deadband is None
+    assert power.update_interval_seconds == 30
+
+    hub._apply_load_shedding(16)
+    assert alarm.update_interval_seconds is None
+    await hub.disconnect()
+
+
+async def test_alarm_overtakes_flood():
+    """An alarm arriving behind thousands of queued updates is delivered within one batch."""
+    installation = SyntheticInstallation(FLOOD)
+    hub = await create_mocked_hub(
+        update_frequency_seconds=None, deadbands=dict.fromkeys(DEFAULT_DEADBANDS), load_shedding=False
+    )
+    await inject_messages(hub, installation.full_publish())
+    await finalize_injection(hub, disconnect=False)
+    delivered: list[Metric] = []
+    alarm_delivered_at = 0.0
+
+    def on_update(metric: Metric, _value) -> None:
+        nonlocal alarm_delivered_at
+        delivered.append(metric)
+        if metric is alarm:
+            alarm_delivered_at = time.perf_counter()
+
+    for metric in hub._all_metrics.values():
+        metric.on_update = on_update
+    alarm = hub._all_metrics["vebus_276_vebus_inverter_alarm_grid_lost"]
+
+    # Deliver the flood and then the alarm without yielding to the event loop
+    assert hub._client is not None
+    on_message = hub._client.on_message
+    assert on_message is not None
+    for topic, payload in [message for _ in range(FLOOD_TICKS) for message in installation.tick()]:
+        on_message(hub._client, None, _message(topic, payload.encode()))
+    queued = len(hub._pending_updates)
+    assert queued > 10 * NOTIFICATION_BATCH_SIZE
+    start = time.perf_counter()
+    on_message(hub._client, None, _message(GRID_LOST_TOPIC, b'{"value": 2}'))
+    while hub._pending_updates or not alarm_delivered_at:
+        await asyncio.sleep(0)
+    drained_at = time.perf_counter()
+
+    position = delivered.index(alarm)
+    assert position <= NOTIFICATION_BATCH_SIZE
+    assert len(delivered) == queued + 1
+    assert alarm_delivered_at - start < drained_at - start
+    await hub.disconnect()
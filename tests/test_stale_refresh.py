@@ -0,0 +1,167 @@
+"""Test refreshing metrics about to turn stale with read requests."""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator, Callable
+from unittest.mock import patch
+
+import pytest
+from paho.mqtt.client import ConnectFlags
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.reasoncodes import ReasonCode
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt import Metric
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("battery", count=2, first_device_id=512),
+    )
+)
+# Older than the refresh threshold, younger than the stale timeout
+SILENCE_SECONDS = 200
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    victron_hub = broker.create_hub()
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+def _silence(hub: VictronVenusHub, device_id: str) -> list[Metric]:
+    """Age the last_seen of the metrics of a device backed by a topic and return them."""
+    metrics = [
+        metric
+        for metric in hub._all_metrics.values()
+        if metric._device.unique_id == device_id and metric._read_topic is not None and metric.value is not None
+    ]
+    for metric in metrics:
+        metric._last_seen -= SILENCE_SECONDS
+    return metrics
+
+
+async def test_reads_refresh_silent_metrics(broker, hub):
+    silent = _silence(hub, "battery_512")
+    assert silent
+    full_publishes = broker.stats.full_publishes
+    requested_at = time.monotonic()
+
+    await hub._refresh_stale_metrics()
+    await _wait_until(lambda: all(metric._last_seen >= requested_at for metric in silent))
+
+    # Only the silent metrics are requested, each topic once
+    assert broker.stats.reads == len({metric._read_topic for metric in silent})
+    assert all(metric.value is not None for metric in silent)
+
+    await hub._refresh_stale_metrics()
+    assert hub._read_requests_supported is True
+    assert broker.stats.reads == len({metric._read_topic for metric in silent})
+    assert broker.stats.full_publishes == full_publishes
+
+
+async def test_full_republish_fallback(broker, hub, monkeypatch):
+    """A broker ignoring read requests, like older firmware, gets a forced full republish instead."""
+    handle_publish = broker._handle_publish
+
+    def ignore_reads(topic: str, payload: bytes) -> None:
+        if topic.startswith("R/") and not topic.endswith("/keepalive"):
+            return
+        handle_publish(topic, payload)
+
+    monkeypatch.setattr(broker, "_handle_publish", ignore_reads)
+    silent = _silence(hub, "battery_512")
+    full_publishes = broker.stats.full_publishes
+
+    await hub._refresh_stale_metrics()
+    await asyncio.sleep(0.1)
+    assert hub._read_requests_supported is None
+
+    await hub._refresh_stale_metrics()
+    assert hub._read_requests_supported is False
+    await _wait_until(lambda: broker.stats.full_publishes == full_publishes + 1)
+    await _wait_until(lambda: all(time.monotonic() - metric._last_seen < 5 for metric in silent))
+
+    # No more read requests once the fallback is in place
+    _silence(hub, "battery_513")
+    await hub._refresh_stale_metrics()
+    assert broker.stats.full_publishes == full_publishes + 1
+
+
+async def test_silent_device_does_not_decide_the_probe(broker, hub, monkeypatch):
+    """Unanswered reads of a device that stopped publishing do not disable read requests."""
+    handle_publish = broker._handle_publish
+
+    def ignore_battery_reads(topic: str, payload: bytes) -> None:
+        if topic.startswith("R/123/battery/512/"):
+            return
+        handle_publish(topic, payload)
+
+    monkeypatch.setattr(broker, "_handle_publish", ignore_battery_reads)
+    _silence(hub, "battery_512")
+    hub._devices["battery_512"]._last_seen -= SILENCE_SECONDS
+    full_publishes = broker.stats.full_publishes
+
+    await hub._refresh_stale_metrics()
+    await asyncio.sleep(0.1)
+    await hub._refresh_stale_metrics()
+
+    assert hub._read_requests_supported is None
+    assert broker.stats.full_publishes == full_publishes
+
+
+async def test_probe_is_reset_on_reconnect(hub):
+    hub._read_requests_supported = False
+
+    # As called by the client when it reconnected on its own
+    hub._on_connect(hub._client, None, ConnectFlags(False), ReasonCode(PacketTypes.CONNACK, identifier=0), None)
+
+    assert hub._read_requests_supported is None
+
+
+async def test_reads_are_rate_limited(hub):
+    hub_module = VictronVenusHub.__module__
+    silent = _silence(hub, "battery_512") + _silence(hub, "battery_513")
+    assert len({metric._read_topic for metric in silent}) > 25
+    published: list[tuple[float, str]] = []
+
+    def publish(topic: str, _value) -> None:
+        published.append((time.monotonic(), topic))
+
+    with (
+        patch(f"{hub_module}.READ_REQUEST_BATCH_SIZE", 10),
+        patch(f"{hub_module}.READ_REQUEST_BATCH_INTERVAL_SECONDS", 0.05),
+        patch(f"{hub_module}.READ_REQUESTS_PER_SWEEP", 25),
+        patch.object(hub, "_publish", publish),
+    ):
+        await hub._refresh_stale_metrics()
+
+    assert len(published) == 25
+    assert all(topic.startswith("R/") for _sent, topic in published)
+    # Three batches, one interval apart
+    assert published[-1][0] - published[0][0] >= 0.1
+    assert published[10][0] - published[9][0] >= 0.05
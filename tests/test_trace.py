@@ -0,0 +1,147 @@
+"""Test tracing the messages and metrics matching the trace filter into the ring buffer."""
+
+import logging
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.trace import (
+    TraceBuffer,
+    TraceEvent,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.writable_formula_metric import (
+    WritableFormulaMetric,
+)
+
+SPEC = InstallationSpec(groups=(DeviceGroup("system"), DeviceGroup("battery", count=2, first_device_id=512)))
+VOLTAGE = "battery_512_battery_voltage"
+log_debug = logging.getLogger(__name__).debug
+
+
+async def _hub(**hub_kwargs) -> VictronVenusHub:
+    hub = await create_mocked_hub(**hub_kwargs)
+    await inject_messages(hub, SyntheticInstallation(SPEC).full_publish())
+    await finalize_injection(hub, disconnect=False)
+    return hub
+
+
+def _events(hub: VictronVenusHub) -> list[tuple[str, str]]:
+    return [(record["event"], record["subject"]) for record in hub.dump_trace()]
+
+
+def test_ring_buffer_keeps_latest_records():
+    trace = TraceBuffer(3)
+    for value in range(5):
+        trace.record(TraceEvent.CHANGED, "metric", value)
+    trace.record(TraceEvent.RECEIVED, "N/123/battery/512/Dc/0/Voltage", b"raw")
+
+    records = trace.dump()
+    assert [record["value"] for record in records] == [3, 4, "b'raw'"]
+    assert [record["event"] for record in records] == ["changed", "changed", "received"]
+    assert records[0]["time"] <= records[-1]["time"]
+    assert len(trace) == 3
+    assert trace.recorded == 6
+
+    trace.clear()
+    assert trace.dump() == []
+
+
+async def test_nothing_is_traced_without_filter():
+    hub = await _hub()
+
+    hub._all_metrics[VOLTAGE]._handle_message(11.9, log_debug)
+
+    assert hub.dump_trace() == []
+    assert not any(metric._traced for metric in hub._all_metrics.values())
+
+
+async def test_filter_selects_device_messages_and_metrics():
+    hub = await _hub(topic_log_info="battery/512")
+    voltage = hub._all_metrics[VOLTAGE]
+    assert voltage._traced
+    assert not hub._all_metrics["battery_513_battery_voltage"]._traced
+    hub.dump_trace(clear=True)
+
+    await inject_messages(
+        hub,
+        [
+            ("N/123/battery/512/Dc/0/Voltage", '{"value": 11.8}'),
+            ("N/123/battery/513/Dc/0/Voltage", '{"value": 11.8}'),
+            ("N/123/battery/512/Unknown/Path", '{"value": 1}'),
+        ],
+    )
+
+    assert _events(hub) == [
+        ("received", "N/123/battery/512/Dc/0/Voltage"),
+        ("changed", VOLTAGE),
+        ("received", "N/123/battery/512/Unknown/Path"),
+        ("ignored", "N/123/battery/512/Unknown/Path"),
+    ]
+    assert hub.dump_trace()[1]["value"] == 11.8
+    assert hub._trace.recorded == 4
+
+
+async def test_filter_matches_unique_id_and_can_change():
+    hub = await _hub(update_frequency_seconds=3600)
+    voltage = hub._all_metrics[VOLTAGE]
+    voltage.on_update = lambda _metric, _value: None
+
+    hub.set_topic_log_info(VOLTAGE)
+    assert voltage._traced
+    assert [metric for metric in hub._all_metrics.values() if metric._traced] == [voltage]
+
+    voltage._handle_message(12.0, log_debug)
+    voltage._handle_message(12.5, log_debug)
+    hub._keepalive_metrics(stale_timeout=None)
+    records = hub.dump_trace(clear=True)
+    assert [(record["event"], record["value"]) for record in records] == [
+        ("changed", 12.0),
+        ("notified", 12.0),
+        ("changed", 12.5),
+        ("throttled", 12.5),
+        ("republished", 12.5),
+        ("unchanged", 12.5),
+        ("notified", 12.5),
+    ]
+
+    hub.set_topic_log_info(None)
+    assert not voltage._traced
+    voltage._handle_message(13.0, log_debug)
+    assert hub.dump_trace() == []
+
+
+async def test_formula_metric_write_is_traced():
+    hub = await _hub(topic_log_info="ess_batterylife_state")
+    await inject_messages(
+        hub,
+        [
+            ("N/123/settings/0/Settings/CGwacs/BatteryLife/State", '{"value": 10}'),
+            ("N/123/settings/0/Settings/CGwacs/Hub4Mode", '{"value": 1}'),
+        ],
+    )
+    ess_mode = hub._all_metrics["system_0_system_ess_batterylife_state"]
+    assert isinstance(ess_mode, WritableFormulaMetric)
+    assert ess_mode._traced
+    hub.dump_trace(clear=True)
+
+    ess_mode.set("keep_batteries_charged")
+
+    records = hub.dump_trace()
+    assert (records[0]["event"], records[0]["subject"], records[0]["value"]) == (
+        "written",
+        "system_0_system_ess_batterylife_state",
+        "keep_batteries_charged",
+    )
+
+
+async def test_invalid_trace_buffer_size():
+    with pytest.raises(ValueError):
+        await create_mocked_hub(trace_buffer_size=0)
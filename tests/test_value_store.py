@@ -0,0 +1,107 @@
+"""Test the columnar copy of the metric values used by the sweeps."""
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    create_mocked_hub,
+    finalize_injection,
+    inject_messages,
+)
+
+SPEC = InstallationSpec(groups=(DeviceGroup("system"), DeviceGroup("battery", count=2, first_device_id=512)))
+VOLTAGE = "battery_512_battery_voltage"
+log_debug = logging.getLogger(__name__).debug
+
+
+async def _hub(**hub_kwargs) -> VictronVenusHub:
+    hub = await create_mocked_hub(columnar_store=True, **hub_kwargs)
+    await inject_messages(hub, SyntheticInstallation(SPEC).full_publish())
+    await finalize_injection(hub, disconnect=False)
+    return hub
+
+
+def _mark_notified(hub: VictronVenusHub) -> None:
+    """Make every metric look up to date."""
+    for metric in hub._all_metrics.values():
+        metric._last_notified = metric._last_seen
+        metric._write_through()
+
+
+@pytest.mark.parametrize("vectorized", [True, False], ids=["numpy", "python"])
+async def test_store_answers_like_the_metrics(vectorized):
+    hub = await _hub()
+    store = hub._value_store
+    assert store is not None
+    store.vectorized = vectorized
+    metrics = hub._all_metrics
+
+    assert len(store) == len(metrics)
+    assert hub.export_values() == {
+        unique_id: float(metric.value)
+        for unique_id, metric in metrics.items()
+        if isinstance(metric.value, float | int) and not isinstance(metric.value, bool)
+    }
+
+    _mark_notified(hub)
+    assert store.keepalive_candidates(time.monotonic(), None) == []
+    # Seen but not notified, as nobody listens
+    metrics[VOLTAGE]._handle_message(11.9, log_debug)
+    assert store.keepalive_candidates(time.monotonic(), None) == [metrics[VOLTAGE]]
+    assert hub.export_values()[VOLTAGE] == 11.9
+
+    with_value = {metric for metric in metrics.values() if metric.value is not None}
+    later = time.monotonic() + 1000
+    assert set(store.keepalive_candidates(later, 10)) == with_value
+    assert set(store.silent_since(later)) == with_value
+    assert store.silent_since(0) == []
+
+
+async def test_removed_metric_frees_its_row():
+    hub = await _hub()
+    store = hub._value_store
+    assert store is not None
+    metric = hub._all_metrics[VOLTAGE]
+    index = metric._store_index
+    count = len(store)
+
+    hub._remove_metric(metric)
+
+    assert metric._store_index == -1
+    assert len(store) == count - 1
+    assert VOLTAGE not in hub.export_values()
+    store.add(metric)
+    assert metric._store_index == index
+
+
+async def test_sweep_republishes_throttled_value():
+    hub = await _hub(update_frequency_seconds=3600)
+    notified: list[float] = []
+    voltage = hub._all_metrics[VOLTAGE]
+    voltage.on_update = lambda _metric, value: notified.append(value)
+    voltage._handle_message(12.0, log_debug)
+    _mark_notified(hub)
+
+    voltage._handle_message(12.3, log_debug)
+    await asyncio.sleep(0)
+    assert notified == [12.0]
+
+    hub._keepalive_metrics(stale_timeout=None)
+    await asyncio.sleep(0)
+    assert notified == [12.0, 12.3]
+
+
+async def test_no_store_by_default():
+    hub = await create_mocked_hub()
+    await inject_messages(hub, SyntheticInstallation(SPEC).full_publish())
+    await finalize_injection(hub, disconnect=False)
+
+    assert hub._value_store is None
+    assert hub.export_values()[VOLTAGE] == hub._all_metrics[VOLTAGE].value
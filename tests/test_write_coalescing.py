@@ -0,0 +1,142 @@
+"""Test coalescing bursts of writes, like those of a dragged slider."""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import Hub as VictronVenusHub
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.write_scheduler import (
+    WriteScheduler,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", first_device_id=278),
+    )
+)
+MIN_WRITE_INTERVAL = 0.2
+CURRENT_LIMIT_TOPIC = "W/123/solarcharger/278/Settings/ChargeCurrentLimit"
+MODE_TOPIC = "W/123/solarcharger/278/Mode"
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    victron_hub = broker.create_hub(min_write_interval_seconds=MIN_WRITE_INTERVAL)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+async def test_slider_burst_is_coalesced(broker, hub):
+    metric = hub._all_metrics["solarcharger_278_solarcharger_charge_current_limit"]
+    values = [float(step) for step in range(1, 21)]
+
+    for value in values:
+        metric.set(value)
+        await asyncio.sleep(0.005)
+
+    # The first value went out right away, the last one waits for the interval
+    assert broker.written == [(CURRENT_LIMIT_TOPIC, '{"value": 1.0}')]
+    assert metric.pending_value == 20.0
+    assert hub.write_stats.pending_writes == 1
+
+    await _wait_until(lambda: metric.value == 20.0)
+    assert broker.written == [(CURRENT_LIMIT_TOPIC, '{"value": 1.0}'), (CURRENT_LIMIT_TOPIC, '{"value": 20.0}')]
+    assert metric.pending_value is None
+    stats = hub.write_stats
+    assert stats.writes_requested == 20
+    assert stats.writes_published == 2
+    assert stats.writes_coalesced == 18
+
+
+async def test_switch_is_written_right_away(broker, hub):
+    mode = hub._all_metrics["solarcharger_278_solarcharger_mode"]
+
+    mode.set("Off")
+    mode.set("On")
+
+    await _wait_until(lambda: len(broker.written) == 2)
+    assert [topic for topic, _payload in broker.written] == [MODE_TOPIC, MODE_TOPIC]
+    assert mode.pending_value is None
+
+
+async def test_pending_write_is_flushed_on_disconnect(broker):
+    victron_hub = broker.create_hub(min_write_interval_seconds=60)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    metric = victron_hub._all_metrics["solarcharger_278_solarcharger_charge_current_limit"]
+    metric.set(5.0)
+    metric.set(7.0)
+    assert metric.pending_value == 7.0
+
+    await victron_hub.disconnect()
+    await _wait_until(lambda: len(broker.written) == 2)
+    assert broker.written == [(CURRENT_LIMIT_TOPIC, '{"value": 5.0}'), (CURRENT_LIMIT_TOPIC, '{"value": 7.0}')]
+
+
+async def test_every_write_published_without_interval(broker):
+    victron_hub = broker.create_hub(min_write_interval_seconds=None)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    metric = victron_hub._all_metrics["solarcharger_278_solarcharger_charge_current_limit"]
+
+    for value in (5.0, 6.0, 7.0):
+        metric.set(value)
+
+    await _wait_until(lambda: len(broker.written) == 3)
+    assert victron_hub.write_stats is None
+    await victron_hub.disconnect()
+
+
+async def test_immediate_write_replaces_pending_one():
+    published: list[tuple[str, str]] = []
+    scheduler = WriteScheduler(lambda topic, payload: published.append((topic, payload)), 10)
+
+    scheduler.submit("W/topic", "1", 1)
+    scheduler.submit("W/topic", "2", 2)
+    scheduler.submit("W/topic", "3", 3, immediate=True)
+    await asyncio.sleep(0)
+
+    assert published == [("W/topic", "1"), ("W/topic", "3")]
+    assert scheduler.pending_value("W/topic") is None
+    assert not scheduler._timers
+    assert scheduler.stats().writes_coalesced == 1
+
+
+async def test_forgotten_topic_is_dropped():
+    published: list[tuple[str, str]] = []
+    scheduler = WriteScheduler(lambda topic, payload: published.append((topic, payload)), 10)
+
+    scheduler.submit("W/topic", "1", 1)
+    scheduler.submit("W/topic", "2", 2)
+    scheduler.forget("W/topic")
+
+    assert scheduler.pending_value("W/topic") is None
+    assert not scheduler._timers
+    assert not scheduler._last_published
+    scheduler.submit("W/topic", "3", 3)
+    assert published == [("W/topic", "1"), ("W/topic", "3")]
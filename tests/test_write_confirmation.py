@@ -0,0 +1,104 @@
+"""Test awaiting the N/ echo of writes."""
+
+import asyncio
+import json
+from collections.abc import AsyncGenerator
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    WriteMismatchError,
+    WriteTimeoutError,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", first_device_id=278),
+    )
+)
+CURRENT_LIMIT = "solarcharger_278_solarcharger_charge_current_limit"
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    victron_hub = broker.create_hub(min_write_interval_seconds=0.2)
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+async def test_write_is_confirmed(broker, hub):
+    metric = hub._all_metrics[CURRENT_LIMIT]
+    mode = hub._all_metrics["solarcharger_278_solarcharger_mode"]
+
+    await asyncio.wait_for(metric.set_and_confirm(12.5), 1)
+    assert metric.value == 12.5
+    await asyncio.wait_for(mode.set_and_confirm("Off"), 1)
+    assert mode.value.string == "Off"
+    # Nothing is left behind for the incoming messages to look at
+    assert hub._write_waiters == {}
+
+
+async def test_chained_writes_are_confirmed_in_order(broker, hub):
+    metric = hub._all_metrics[CURRENT_LIMIT]
+
+    # Coalesced writes: the later ones are published once the interval passed
+    await asyncio.wait_for(asyncio.gather(*(metric.set_and_confirm(value) for value in (5.0, 6.0, 7.0))), 2)
+
+    assert [payload for _topic, payload in broker.written] == ['{"value": 5.0}', '{"value": 7.0}']
+    assert metric.value == 7.0
+
+
+async def test_current_value_completes_right_away(broker, hub):
+    mode = hub._all_metrics["solarcharger_278_solarcharger_mode"]
+    assert mode.value.string == "On"
+
+    await asyncio.wait_for(mode.set_and_confirm("On", timeout=10), 0.5)
+
+
+async def test_unanswered_write_times_out(broker, hub, monkeypatch):
+    monkeypatch.setattr(broker, "_handle_publish", lambda topic, payload: None)
+    metric = hub._all_metrics[CURRENT_LIMIT]
+
+    with pytest.raises(WriteTimeoutError):
+        await metric.set_and_confirm(12.5, timeout=0.2)
+    assert hub._write_waiters == {}
+
+
+async def test_rejected_write_reports_mismatch(broker, hub, monkeypatch):
+    """A device keeping its previous value, like one refusing the write, is reported."""
+    handle_publish = broker._handle_publish
+
+    def refuse_writes(topic: str, payload: bytes) -> None:
+        if topic.startswith("W/"):
+            topic = "R" + topic[1:]
+            payload = b""
+        handle_publish(topic, payload)
+
+    monkeypatch.setattr(broker, "_handle_publish", refuse_writes)
+    metric = hub._all_metrics[CURRENT_LIMIT]
+    previous = json.loads(broker._values["N/123/solarcharger/278/Settings/ChargeCurrentLimit"])["value"]
+
+    with pytest.raises(WriteMismatchError) as excinfo:
+        await metric.set_and_confirm(12.5, timeout=0.3)
+    assert excinfo.value.reported_value == previous
@@ -0,0 +1,112 @@
+"""Test writing several metrics at once."""
+
+import asyncio
+from collections.abc import AsyncGenerator, Callable
+
+import pytest
+
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    Hub as VictronVenusHub,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt import (
+    NotConnectedError,
+    WriteTimeoutError,
+)
+from custom_components.victron_mqtt._vendor.victron_mqtt.testing import (
+    DeviceGroup,
+    InstallationSpec,
+    SyntheticInstallation,
+    VenusBrokerEmulator,
+)
+
+pytestmark = pytest.mark.usefixtures("socket_enabled")
+
+SPEC = InstallationSpec(
+    groups=(
+        DeviceGroup("system"),
+        DeviceGroup("solarcharger", count=2, first_device_id=278),
+    )
+)
+
+
+async def _wait_until(predicate: Callable[[], bool], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def broker() -> AsyncGenerator[VenusBrokerEmulator]:
+    async with VenusBrokerEmulator() as emulator:
+        emulator.load(SyntheticInstallation(SPEC).full_publish())
+        yield emulator
+
+
+@pytest.fixture
+async def hub(broker: VenusBrokerEmulator) -> AsyncGenerator[VictronVenusHub]:
+    victron_hub = broker.create_hub()
+    await victron_hub.connect()
+    await victron_hub.wait_for_first_refresh()
+    yield victron_hub
+    await victron_hub.disconnect()
+
+
+def _limits(hub: VictronVenusHub) -> list:
+    return [hub._all_metrics[f"solarcharger_{device_id}_solarcharger_charge_current_limit"] for device_id in (278, 279)]
+
+
+async def test_writes_are_published_together(broker, hub):
+    first, second = _limits(hub)
+    mode = hub._all_metrics["solarcharger_278_solarcharger_mode"]
+
+    outcomes = await hub.set_many([(first, 10.0), (second, 11.0), (mode, "Off")])
+
+    assert all(outcome.ok for outcome in outcomes)
+    assert [outcome.metric for outcome in outcomes] == [first, second, mode]
+    await _wait_until(lambda: len(broker.written) == 3)
+    assert [payload for _topic, payload in broker.written] == ['{"value": 10.0}', '{"value": 11.0}', '{"value": 4}']
+
+
+async def test_writes_are_confirmed_together(broker, hub):
+    first, second = _limits(hub)
+
+    outcomes = await asyncio.wait_for(hub.set_many([(first, 10.0), (second, 11.0)], confirm=True), 1)
+
+    assert all(outcome.ok for outcome in outcomes)
+    assert (first.value, second.value) == (10.0, 11.0)
+    assert hub._write_waiters == {}
+
+
+async def test_invalid_value_writes_nothing(broker, hub):
+    first, second = _limits(hub)
+    assert second.max_value is not None
+
+    with pytest.raises(ValueError, match="above the maximum"):
+        await hub.set_many([(first, 10.0), (second, second.max_value + 1)])
+    await asyncio.sleep(0.1)
+    assert broker.written == []
+
+
+async def test_outcome_per_write(broker, hub, monkeypatch):
+    """An unconfirmed write fails on its own, the others still succeed."""
+    first, second = _limits(hub)
+    handle_publish = broker._handle_publish
+
+    def ignore_second(topic: str, payload: bytes) -> None:
+        if topic != second._write_topic:
+            handle_publish(topic, payload)
+
+    monkeypatch.setattr(broker, "_handle_publish", ignore_second)
+
+    outcomes = await hub.set_many([(first, 10.0), (second, 11.0)], confirm=True, timeout=0.3)
+
+    assert outcomes[0].ok
+    assert isinstance(outcomes[1].error, WriteTimeoutError)
+    assert hub._write_waiters == {}
+
+
+async def test_not_connected(broker):
+    victron_hub = broker.create_hub()
+
+    with pytest.raises(NotConnectedError):
+        await victron_hub.set_many([])